@@ -1,7 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from .routes import router as api_router
 from ..graphql.graphql_router import graphql_app
+from ..logic import metrics
+from ..logic.tracing import TraceMiddleware
 from ..logic.lifespan import on_startup, on_shutdown
 
 app = FastAPI()
@@ -19,6 +22,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Root span for sampled requests (TRACE_FILE / TRACE_SAMPLE_RATE); added last, so outermost
+app.add_middleware(TraceMiddleware)
+
 app.include_router(api_router, prefix="/api")
 
 # mount GraphQL endpoint at /graphql
@@ -27,4 +33,10 @@ app.mount("/graphql", graphql_app)
 
 @app.get("/")
 def read_root():
-    return {"message": "Welcome to the FastAPI backend! GraphQL available at /graphql"}
\ No newline at end of file
+    return {"message": "Welcome to the FastAPI backend! GraphQL available at /graphql"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    # Prometheus scrape target: resolver, store, Couchbase, subscription and queue metrics
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -1,11 +1,19 @@
 from fastapi import APIRouter
 
+from ..graphql import graphql_documents
+from ..logic import store
+
 router = APIRouter()
 
 @router.get("/")
 async def read_root():
     return {"message": "Welcome to the FastAPI backend!"}
 
+@router.get("/health")
+async def health():
+    # storage backend, Couchbase circuit breaker / retry counters, cache stats
+    return {**store.health(), "graphql": graphql_documents.stats()}
+
 @router.get("/items/{item_id}")
 async def read_item(item_id: int, q: str = None):
-    return {"item_id": item_id, "query": q}
\ No newline at end of file
+    return {"item_id": item_id, "query": q}
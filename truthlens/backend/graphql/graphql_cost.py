@@ -0,0 +1,179 @@
+"""Static cost and depth limits for GraphQL operations.
+
+QueryCost scores every operation after validation, before any resolver
+runs, and rejects it with QUERY_TOO_DEEP / QUERY_TOO_COMPLEX when it is over
+AppConfig.GRAPHQL_MAX_DEPTH / GRAPHQL_MAX_COST. The score is reported in the
+response as `extensions.cost` either way, so clients can see their budget.
+
+Scoring: a field costs its weight from FIELD_COSTS, by default 1 for an
+object field and 0 for a scalar. An object field's selections are added
+once per item it is expected to return: the `first` argument where the field
+has one (pages), otherwise LIST_SIZES or GRAPHQL_DEFAULT_LIST_SIZE for
+lists, otherwise 1. Fragments count as if written out; @skip/@include are
+ignored, so a query is scored as if every field were selected. Introspection
+fields are free and do not count towards depth.
+"""
+from typing import Any, Dict, Iterator, NamedTuple, Optional
+
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLSchema,
+    SelectionSetNode,
+    Undefined,
+    get_named_type,
+    get_nullable_type,
+    is_interface_type,
+    is_list_type,
+    is_object_type,
+)
+from graphql.language import DocumentNode
+from graphql.utilities import get_operation_ast, value_from_ast
+from strawberry.extensions import SchemaExtension
+
+from backend.logic.app_config import AppConfig
+
+# Weights of fields that do more than read a value off a loaded document,
+# by GraphQL "Type.field" name
+FIELD_COSTS: Dict[str, int] = {
+    # one store read (nested ones batched through the request's DataLoaders)
+    "Query.user": 10,
+    "Query.upload": 10,
+    "Query.analysis": 10,
+    "Query.uploadsByUser": 10,
+    "Query.analysesByStatus": 10,
+    "Upload.analysis": 10,
+    "FileRef.user": 10,
+    "Subscription.analysisReady": 10,
+    "Subscription.analysisStatus": 10,
+    # store writes; startAnalysis also loads fixtures and queues a job
+    "Mutation.createUser": 10,
+    "Mutation.createUpload": 10,
+    "Mutation.startAnalysis": 50,
+    "Mutation.clearUpload": 10,
+}
+
+# Expected lengths of list fields, where they differ from GRAPHQL_DEFAULT_LIST_SIZE
+LIST_SIZES: Dict[str, int] = {
+    "Upload.files": 5,
+    "FactCheck.sourcesFor": 5,
+    "FactCheck.sourcesAgainst": 5,
+}
+
+
+class Cost(NamedTuple):
+    cost: int
+    depth: int
+
+
+def _multiplier(key: str, field: Any, node: FieldNode, variables: Dict[str, Any]) -> int:
+    """Items a field is expected to return."""
+    first = field.args.get("first")
+    if first is not None:
+        value = Undefined
+        for argument in node.arguments:
+            if argument.name.value == "first":
+                value = value_from_ast(argument.value, first.type, variables)
+        if value is Undefined:
+            value = first.default_value
+        if isinstance(value, int):
+            return max(value, 0)
+    if is_list_type(get_nullable_type(field.type)):
+        return LIST_SIZES.get(key, AppConfig.GRAPHQL_DEFAULT_LIST_SIZE)
+    return 1
+
+
+def operation_cost(
+    schema: GraphQLSchema,
+    document: DocumentNode,
+    operation_name: Optional[str] = None,
+    variables: Optional[Dict[str, Any]] = None,
+) -> Cost:
+    """Cost and depth of the operation a request would execute.
+
+    `document` must already be validated (known fields, no fragment cycles).
+    """
+    operation = get_operation_ast(document, operation_name)
+    if operation is None:
+        return Cost(0, 0)
+    root = schema.get_root_type(operation.operation)
+    fragments = {
+        definition.name.value: definition
+        for definition in document.definitions
+        if isinstance(definition, FragmentDefinitionNode)
+    }
+    variables = variables or {}
+
+    def selections(parent: Any, selection_set: SelectionSetNode, depth: int) -> Cost:
+        total, deepest = 0, depth
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                name = selection.name.value
+                if name.startswith("__") or name not in parent.fields:
+                    continue
+                field = parent.fields[name]
+                key = f"{parent.name}.{name}"
+                child_type = get_named_type(field.type)
+                composite = is_object_type(child_type) or is_interface_type(child_type)
+                total += FIELD_COSTS.get(key, 1 if composite else 0)
+                deepest = max(deepest, depth + 1)
+                if composite and selection.selection_set is not None:
+                    child = selections(child_type, selection.selection_set, depth + 1)
+                    total += _multiplier(key, field, selection, variables) * child.cost
+                    deepest = max(deepest, child.depth)
+                continue
+            if isinstance(selection, FragmentSpreadNode):
+                fragment = fragments.get(selection.name.value)
+                if fragment is None:
+                    continue
+                condition, selection_set = fragment.type_condition, fragment.selection_set
+            else:  # InlineFragmentNode
+                condition, selection_set = selection.type_condition, selection.selection_set
+            fragment_type = schema.get_type(condition.name.value) if condition is not None else parent
+            if is_object_type(fragment_type) or is_interface_type(fragment_type):
+                child = selections(fragment_type, selection_set, depth)
+                total += child.cost
+                deepest = max(deepest, child.depth)
+        return Cost(total, deepest)
+
+    return selections(root, operation.selection_set, 0) if root is not None else Cost(0, 0)
+
+
+class QueryCost(SchemaExtension):
+    """Reject operations over the depth or cost budget; report their cost."""
+
+    def __init__(self, *, execution_context=None):
+        super().__init__(execution_context=execution_context)
+        self._cost: Optional[Cost] = None
+
+    def on_execute(self) -> Iterator[None]:
+        context = self.execution_context
+        self._cost = operation_cost(
+            context.schema._schema, context.graphql_document, context.operation_name, context.variables
+        )
+        # raised before the yield, so no resolver runs (also for subscriptions)
+        if AppConfig.GRAPHQL_MAX_DEPTH and self._cost.depth > AppConfig.GRAPHQL_MAX_DEPTH:
+            raise GraphQLError(
+                f"Query depth {self._cost.depth} exceeds the maximum of {AppConfig.GRAPHQL_MAX_DEPTH}",
+                extensions={"code": "QUERY_TOO_DEEP"},
+            )
+        if AppConfig.GRAPHQL_MAX_COST and self._cost.cost > AppConfig.GRAPHQL_MAX_COST:
+            raise GraphQLError(
+                f"Query cost {self._cost.cost} exceeds the maximum of {AppConfig.GRAPHQL_MAX_COST}",
+                extensions={"code": "QUERY_TOO_COMPLEX"},
+            )
+        yield
+
+    def get_results(self) -> Dict[str, Any]:
+        if self._cost is None:
+            return {}
+        return {
+            "cost": {
+                "requested": self._cost.cost,
+                "maximum": AppConfig.GRAPHQL_MAX_COST or None,
+                "depth": self._cost.depth,
+                "maxDepth": AppConfig.GRAPHQL_MAX_DEPTH or None,
+            }
+        }
@@ -0,0 +1,111 @@
+"""Automatic persisted queries and a parsed-document cache for the GraphQL schema.
+
+Clients send the same few large query strings over and over. Two schema
+extensions avoid resending and re-processing them:
+
+- PersistedQueries implements Apollo's automatic persisted queries (APQ).
+  A client sends only `extensions.persistedQuery.sha256Hash`; if the server
+  does not know the hash it answers PERSISTED_QUERY_NOT_FOUND, and the client
+  retries once with the full query and the hash, which registers it.
+- DocumentCache keeps parsed documents and their validation errors in an
+  LRU keyed by query text, so a repeated query skips both parsing and
+  validation.
+
+Both caches are per process and bounded by AppConfig.GRAPHQL_*; stats()
+reports their sizes and hit rates (GET /api/health).
+"""
+import hashlib
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from graphql import GraphQLError
+from graphql.language import DocumentNode
+from strawberry.extensions import SchemaExtension
+
+from backend.logic.app_config import AppConfig
+from backend.logic.cache import LRUCache
+
+_FOREVER = float("inf")  # entries only leave the caches by LRU eviction
+
+# query text by SHA-256 hex digest
+persisted_queries = LRUCache(AppConfig.GRAPHQL_PERSISTED_QUERIES)
+# _Parsed by query text
+parsed_documents = LRUCache(AppConfig.GRAPHQL_DOCUMENT_CACHE_SIZE)
+
+
+class _Parsed(NamedTuple):
+    document: DocumentNode
+    rules: Tuple[Any, ...]  # validation rules the errors were computed with
+    errors: Optional[List[GraphQLError]]  # None until validated
+
+
+def query_hash(query: str) -> str:
+    """SHA-256 hex digest of a query, as APQ clients compute it."""
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+def _apq_error(message: str, code: str) -> GraphQLError:
+    return GraphQLError(message, extensions={"code": code})
+
+
+class PersistedQueries(SchemaExtension):
+    """Resolve `extensions.persistedQuery` hashes to registered query text."""
+
+    def on_operation(self) -> Iterator[None]:
+        context = self.execution_context
+        persisted = (context.operation_extensions or {}).get("persistedQuery")
+        if persisted is not None:
+            if not isinstance(persisted, dict) or persisted.get("version") != 1:
+                raise _apq_error("Unsupported persisted query version", "PERSISTED_QUERY_NOT_SUPPORTED")
+            digest = persisted.get("sha256Hash")
+            if context.query:
+                if digest != query_hash(context.query):
+                    raise _apq_error("provided sha does not match query", "BAD_USER_INPUT")
+                persisted_queries.set(digest, context.query, _FOREVER)
+            else:
+                query = persisted_queries.get(digest)
+                if query is None:
+                    raise _apq_error("PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND")
+                context.query = query
+        yield
+
+
+class DocumentCache(SchemaExtension):
+    """Serve parsed and validated documents from the LRU by query text."""
+
+    def __init__(self, *, execution_context=None):
+        super().__init__(execution_context=execution_context)
+        self._cached: Optional[_Parsed] = None  # this request's entry, set by on_parse
+
+    def on_parse(self) -> Iterator[None]:
+        context = self.execution_context
+        self._cached = parsed_documents.get(context.query) if context.query else None
+        if self._cached is not None:
+            context.graphql_document = self._cached.document
+        yield
+        if self._cached is None and context.query and context.graphql_document is not None:
+            # syntax errors are raised before this point, so only valid parses are kept
+            self._cached = _Parsed(context.graphql_document, (), None)
+            parsed_documents.set(context.query, self._cached, _FOREVER)
+
+    def on_validate(self) -> Iterator[None]:
+        context = self.execution_context
+        cached = self._cached
+        rules = tuple(context.validation_rules)
+        if cached is not None and cached.errors is not None and cached.rules == rules:
+            context.pre_execution_errors = list(cached.errors)
+        yield
+        validated = cached is not None and (cached.errors is None or cached.rules != rules)
+        if validated and context.pre_execution_errors is not None:
+            entry = cached._replace(rules=rules, errors=list(context.pre_execution_errors))
+            parsed_documents.set(context.query, entry, _FOREVER)
+
+
+def stats() -> Dict[str, Any]:
+    """Sizes and hit rates of the persisted-query registry and the document cache."""
+    return {"persisted_queries": persisted_queries.stats(), "documents": parsed_documents.stats()}
+
+
+def clear() -> None:
+    """Drop every registered query and cached document."""
+    persisted_queries.clear()
+    parsed_documents.clear()
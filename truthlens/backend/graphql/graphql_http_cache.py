@@ -0,0 +1,71 @@
+"""HTTP validators (ETag / If-None-Match) for GraphQL GET responses.
+
+Analyses carry an `etag` the store replaces on every write, so a response
+built from them can be versioned without hashing its body. Query.analysis
+records the etag of the document behind each root field in the request's
+ResponseVersions; when every root field of a GET response was recorded, the
+app sends
+
+- ETag: a hash of the request (query hash, operation name, variables) and
+  the recorded etags; the same whether the query is sent as text or as a
+  persisted-query hash
+- Cache-Control: immutable for max-age=GRAPHQL_CACHE_MAX_AGE if every
+  analysis is ready (ready analyses never change), otherwise no-cache, so
+  clients revalidate each poll
+
+and answers 304 Not Modified, without a body, when If-None-Match already
+holds that ETag. POST responses and responses with errors are not cached.
+"""
+import hashlib
+import json
+from typing import Any, Dict, Optional, Tuple
+
+import strawberry
+
+from backend.logic.app_config import AppConfig
+from backend.logic.jobs import READY
+
+
+class ResponseVersions:
+    """Etags of the documents behind the root fields of one response."""
+
+    def __init__(self):
+        self.fields: Dict[str, Tuple[str, bool]] = {}  # response key -> (etag, immutable)
+
+    def headers(self, request: Dict[str, Any], data: Optional[Dict[str, Any]]) -> Optional[Dict[str, str]]:
+        """ETag and Cache-Control for a response, or None if it is not cacheable.
+
+        Args:
+            request: What identifies the response besides the etags (query
+                hash, operation name, variables)
+            data: The response data; every key must have a recorded etag
+        """
+        if not data or set(data) != set(self.fields):
+            return None
+        payload = json.dumps([request, sorted(self.fields.items())], sort_keys=True, default=str)
+        etag = '"' + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32] + '"'
+        if all(immutable for _, immutable in self.fields.values()):
+            cache_control = f"public, max-age={AppConfig.GRAPHQL_CACHE_MAX_AGE}, immutable"
+        else:
+            cache_control = "no-cache"
+        return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def record_version(info: strawberry.Info, doc: Dict[str, Any]) -> None:
+    """Note the analysis a root field was resolved from (no-op without ResponseVersions)."""
+    context = info.context
+    versions = context.get("versions") if isinstance(context, dict) else getattr(context, "versions", None)
+    if versions is None or info.path.prev is not None or not doc.get("etag"):
+        return
+    versions.fields[str(info.path.key)] = (doc["etag"], doc.get("status") == READY)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header covers `etag` (weak comparison, as RFC 9110 asks)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
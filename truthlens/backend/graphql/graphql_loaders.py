@@ -0,0 +1,53 @@
+"""Request-scoped DataLoaders that batch store lookups made by GraphQL resolvers."""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+import strawberry
+from strawberry.dataloader import DataLoader
+
+from backend.logic import store
+
+BatchLoadFn = Callable[[List[str]], Awaitable[List[Union[Optional[Dict[str, Any]], Exception]]]]
+
+
+def _batch_load(get_many: Callable[[List[str]], Awaitable[store.BulkResult]]) -> BatchLoadFn:
+    """Adapt a store.get_many_* function to the DataLoader batch function contract.
+
+    Keys that failed in the bulk fetch resolve to an exception so only the
+    fields depending on them error; missing documents resolve to None.
+    """
+    async def load(keys: List[str]) -> List[Union[Optional[Dict[str, Any]], Exception]]:
+        result = await get_many(keys)
+        return [
+            Exception(result.errors[key]) if key in result.errors else result.results.get(key)
+            for key in keys
+        ]
+    return load
+
+
+class Loaders:
+    """One DataLoader per document type.
+
+    Loads requested within the same event-loop tick are coalesced and
+    deduplicated into a single store.get_many_* call, and each loader
+    memoizes its results for the lifetime of the request.
+    """
+
+    def __init__(self) -> None:
+        self.users = DataLoader(load_fn=_batch_load(store.get_many_users))
+        self.uploads = DataLoader(load_fn=_batch_load(store.get_many_uploads))
+        self.analyses = DataLoader(load_fn=_batch_load(store.get_many_analyses))
+
+
+def get_loaders(info: strawberry.Info) -> Loaders:
+    """Return the loaders for the current request, creating them on first use.
+
+    The HTTP app puts a Loaders instance in the context; direct
+    schema.execute() calls with a dict (or no) context still work.
+    """
+    context = info.context
+    if isinstance(context, dict):
+        loaders = context.get("loaders")
+        if loaders is None:
+            loaders = context["loaders"] = Loaders()
+        return loaders
+    return getattr(context, "loaders", None) or Loaders()
@@ -0,0 +1,49 @@
+"""Per-field resolver latency for the GraphQL schema.
+
+ResolverMetrics times the fields that have their own resolver (root
+queries, mutations, Upload.analysis, FileRef.user, ...) into
+truthlens_graphql_resolver_seconds{field="Type.field"}. Fields read
+straight off a stored document are not timed; there are many of them per
+response and each takes well under a microsecond.
+"""
+import time
+from typing import Any, Callable
+
+from graphql import GraphQLResolveInfo
+from strawberry.extensions import SchemaExtension
+from strawberry.utils.await_maybe import AwaitableOrValue
+
+from backend.logic import metrics
+
+from .graphql_types import resolver_field
+
+RESOLVER_SECONDS = metrics.histogram(
+    "truthlens_graphql_resolver_seconds",
+    "Latency of GraphQL fields with their own resolver, until their value is ready",
+    ("field",),
+)
+
+
+async def _observe(result: Any, histogram: Any, start: float) -> Any:
+    try:
+        return await result
+    finally:
+        histogram.observe(time.perf_counter() - start)
+
+
+class ResolverMetrics(SchemaExtension):
+    """Record the latency of every field resolved by a resolver function."""
+
+    def resolve(
+        self, _next: Callable, root: Any, info: GraphQLResolveInfo, *args: Any, **kwargs: Any
+    ) -> AwaitableOrValue[object]:
+        field = resolver_field(self.execution_context.schema, info)
+        if field is None:
+            return _next(root, info, *args, **kwargs)
+        histogram = RESOLVER_SECONDS.labels(field)
+        start = time.perf_counter()
+        result = _next(root, info, *args, **kwargs)
+        if hasattr(result, "__await__"):
+            return _observe(result, histogram, start)
+        histogram.observe(time.perf_counter() - start)
+        return result
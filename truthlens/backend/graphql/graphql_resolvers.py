@@ -1,53 +1,87 @@
 """GraphQL resolvers and mutations for TruthLens."""
-import asyncio
 from typing import AsyncGenerator, List, Optional
 
 import strawberry
 
+from .graphql_http_cache import record_version
 from .graphql_types import (
     User, FileRef, Source, FactCheck, Fallacy, AICheck, AnalysisSummary,
-    AnalysisBreakdown, Analysis, UploadSettings, Upload,
-    CreateUserInput, CreateUploadInput, FileInput
+    AnalysisBreakdown, Analysis, UploadSettings, Upload, UploadPage, AnalysisPage,
+    CreateUserInput, CreateUploadInput, FileInput, from_doc, requested_fields
 )
 
 # Import logic modules
-from backend.logic.utils import now_iso, make_id
-from backend.logic.analysis import compute_breakdown
-from backend.logic.fixtures import load_fixture_analysis
+from backend.logic.utils import now_iso, make_id, make_etag
+from backend.logic.jobs import (
+    analysis_jobs, new_analysis_doc, QueueFullError, PENDING, FAILED, TERMINAL_STATUSES
+)
 from backend.logic import store
+from backend.logic.app_config import AppConfig
+from backend.logic.pubsub import analysis_events
+
 
-# Simple queue for subscription notifications
-_analysis_queue: "asyncio.Queue[dict]" = asyncio.Queue()
+def _page_size(first: int) -> int:
+    """Validate a requested page size."""
+    if not 1 <= first <= AppConfig.MAX_PAGE_SIZE:
+        raise Exception(f"first must be between 1 and {AppConfig.MAX_PAGE_SIZE}")
+    return first
 
 
 @strawberry.type
 class Query:
     @strawberry.field
-    def user(self, id: strawberry.ID) -> Optional[User]:
-        u = store.get_user(str(id))
+    async def user(self, id: strawberry.ID) -> Optional[User]:
+        u = await store.get_user(str(id))
         if not u:
             return None
         return User(**u)
 
     @strawberry.field
-    def upload(self, id: strawberry.ID) -> Optional[Upload]:
-        u = store.get_upload(str(id))
+    async def upload(self, id: strawberry.ID) -> Optional[Upload]:
+        u = await store.get_upload(str(id))
         if not u:
             return None
         return Upload(**u)
 
     @strawberry.field
-    def analysis(self, id: strawberry.ID) -> Optional[Analysis]:
-        a = store.get_analysis(str(id))
+    async def analysis(self, id: strawberry.ID, info: strawberry.Info) -> Optional[Analysis]:
+        # fetch only the selected fields, e.g. not every fact check's sources for a status poll
+        fields = requested_fields(info, Analysis)
+        if fields is not None:
+            fields = sorted({*fields, "etag", "status"})  # for the response's HTTP validators
+        a = await store.get_analysis(str(id), fields=fields)
         if not a:
             return None
-        return Analysis(**a)
+        record_version(info, a)
+        return from_doc(Analysis, a)
+
+    @strawberry.field
+    async def uploads_by_user(
+        self, user_id: strawberry.ID, first: int = 20, after: Optional[str] = None
+    ) -> UploadPage:
+        page = await store.list_uploads_by_user(str(user_id), _page_size(first), after)
+        return UploadPage(
+            items=[Upload(**u) for u in page.items],
+            end_cursor=page.end_cursor,
+            has_next_page=page.has_next_page,
+        )
+
+    @strawberry.field
+    async def analyses_by_status(
+        self, status: str, first: int = 20, after: Optional[str] = None
+    ) -> AnalysisPage:
+        page = await store.list_analyses_by_status(status, _page_size(first), after)
+        return AnalysisPage(
+            items=[Analysis(**a) for a in page.items],
+            end_cursor=page.end_cursor,
+            has_next_page=page.has_next_page,
+        )
 
 
 @strawberry.type
 class Mutation:
     @strawberry.mutation
-    def create_user(self, input: CreateUserInput) -> User:
+    async def create_user(self, input: CreateUserInput) -> User:
         user_id = make_id("user")
         doc = {
             "id": user_id,
@@ -57,11 +91,11 @@ class Mutation:
             "wallet_address": input.wallet_address,
             "created_at": now_iso(),
         }
-        store.save_user(user_id, doc)
+        await store.save_user(user_id, doc)
         return User(**doc)
 
     @strawberry.mutation
-    def create_upload(self, input: CreateUploadInput) -> Upload:
+    async def create_upload(self, input: CreateUploadInput) -> Upload:
         upload_id = make_id("upload")
         files = []
         for f in input.files:
@@ -90,78 +124,40 @@ class Mutation:
             "settings": settings,
             "analysis_id": None,
         }
-        store.save_upload(upload_id, doc)
+        await store.save_upload(upload_id, doc)
         return Upload(**doc)
 
     @strawberry.mutation
     async def start_analysis(self, upload_id: strawberry.ID) -> Analysis:
-        # find upload
-        up = store.get_upload(str(upload_id))
-        if not up:
+        # create pending analysis master; a background worker runs the checks
+        analysis_id = make_id("analysis")
+        doc = await store.save_analysis(analysis_id, new_analysis_doc(analysis_id, str(upload_id)))
+
+        # link upload -> analysis (sub-document patch, no full read/rewrite of the upload)
+        linked = await store.patch_upload(str(upload_id), {"analysis_id": analysis_id, "status": PENDING})
+        if not linked:
+            await store.delete_analysis(analysis_id)
             raise Exception("Upload not found")
 
-        # create analysis master
-        analysis_id = make_id("analysis")
-        started = now_iso()
-        # load fixture for detail content where available
-        fixture = load_fixture_analysis()
-        if fixture:
-            # patch ids to link
-            fixture["id"] = analysis_id
-            fixture["upload_id"] = upload_id
-            fixture["started_at"] = started
-            fixture["finished_at"] = now_iso()
-            fixture["status"] = "ready"
-            # compute breakdown scores
-            breakdown = compute_breakdown(
-                fixture.get("fact_checks", []),
-                fixture.get("fallacies", []),
-                fixture.get("ai_check", {})
-            )
-            fixture["breakdown"] = breakdown
-            store.save_analysis(analysis_id, fixture)
-        else:
-            summary = {"fact_checks": 0, "fallacies": 0, "ai_score": None}
-            breakdown = {
-                "fact_check_score": None,
-                "logical_fallacy_score": None,
-                "ai_generation_score": None,
-                "overall_credibility_score": None,
-            }
-            doc = {
-                "id": analysis_id,
-                "upload_id": upload_id,
-                "started_at": started,
-                "finished_at": now_iso(),
-                "status": "ready",
-                "summary": summary,
-                "breakdown": breakdown,
-                "fact_checks": [],
-                "fallacies": [],
-                "ai_check": {"id": make_id("ai"), "is_ai": False, "score": 0.0, "explanation": "placeholder"},
-            }
-            store.save_analysis(analysis_id, doc)
-
-        # link upload -> analysis
-        up["analysis_id"] = analysis_id
-        up["status"] = "ready"
-        store.save_upload(str(upload_id), up)
-
-        # notify subscribers
-        await _analysis_queue.put(store.get_analysis(analysis_id))
-
-        return Analysis(**store.get_analysis(analysis_id))
+        try:
+            analysis_jobs.submit(analysis_id, str(upload_id))
+        except QueueFullError as e:
+            doc.update(status=FAILED, finished_at=now_iso(), error=str(e), etag=make_etag())
+            await store.patch_analysis(analysis_id, {k: doc[k] for k in ("status", "finished_at", "error", "etag")})
+            raise
+
+        return Analysis(**doc)
 
     @strawberry.mutation
-    def clear_upload(self, upload_id: strawberry.ID) -> bool:
-        up = store.get_upload(str(upload_id))
+    async def clear_upload(self, upload_id: strawberry.ID) -> bool:
+        up = await store.get_upload(str(upload_id))
         if not up:
             return False
         # simple clear: remove upload and related analysis
         aid = up.get("analysis_id")
         if aid:
-            store.delete_analysis(str(aid))
-        store.delete_upload(str(upload_id))
+            await store.delete_analysis(str(aid))
+        await store.delete_upload(str(upload_id))
         return True
 
 
@@ -169,8 +165,16 @@ class Mutation:
 class Subscription:
     @strawberry.subscription
     async def analysis_ready(self, upload_id: strawberry.ID) -> AsyncGenerator[Analysis, None]:
-        # yields analysis document when ready
-        while True:
-            item = await _analysis_queue.get()
-            if item.get("upload_id") == str(upload_id):
-                yield Analysis(**item)
\ No newline at end of file
+        # yields analysis document when ready (or failed); unsubscribes when the client disconnects
+        async with analysis_events.subscribe(str(upload_id)) as events:
+            async for item in events:
+                if item.get("status") in TERMINAL_STATUSES:
+                    yield Analysis(**item)
+
+    @strawberry.subscription
+    async def analysis_status(self, upload_id: strawberry.ID) -> AsyncGenerator[Analysis, None]:
+        # yields the analysis document on every status transition (running, ready, failed)
+        # and on every progress update while running, with the partial breakdown
+        async with analysis_events.subscribe(str(upload_id)) as events:
+            async for item in events:
+                yield Analysis(**item)
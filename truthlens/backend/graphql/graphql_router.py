@@ -1,4 +1,63 @@
+from starlette.responses import Response
 from strawberry.asgi import GraphQL
+from strawberry.http import GraphQLRequestData
+from strawberry.types import ExecutionResult
+
+from .graphql_documents import query_hash
+from .graphql_http_cache import ResponseVersions, etag_matches
+from .graphql_loaders import Loaders
 from .graphql_schema import schema
 
-graphql_app = GraphQL(schema)
+
+class TruthLensGraphQL(GraphQL):
+    """GraphQL ASGI app with request-scoped DataLoaders in the context.
+
+    GET responses built from versioned analyses get an ETag and answer
+    If-None-Match with 304 (see graphql_http_cache).
+    """
+
+    async def get_context(self, request, response):
+        context = await super().get_context(request, response)
+        context["loaders"] = Loaders()
+        context["versions"] = ResponseVersions()
+        return context
+
+    def should_render_graphql_ide(self, request):
+        # persisted-query GETs carry only extensions, no query parameter
+        return "extensions" not in request.query_params and super().should_render_graphql_ide(request)
+
+    async def execute_operation(self, request, request_adapter, request_data, context, root_value, sub_response):
+        result = await super().execute_operation(
+            request=request,
+            request_adapter=request_adapter,
+            request_data=request_data,
+            context=context,
+            root_value=root_value,
+            sub_response=sub_response,
+        )
+        if (
+            request_adapter.method == "GET"
+            and isinstance(request_data, GraphQLRequestData)
+            and isinstance(result, ExecutionResult)
+            and not result.errors
+        ):
+            # by query hash, so sending the hash instead of the text keeps the ETag
+            persisted = (request_data.extensions or {}).get("persistedQuery") or {}
+            document = persisted.get("sha256Hash") or query_hash(request_data.query or "")
+            headers = context["versions"].headers(
+                {"document": document, "operationName": request_data.operation_name, "variables": request_data.variables},
+                result.data,
+            )
+            if headers:
+                sub_response.headers.update(headers)
+                if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+                    sub_response.status_code = 304
+        return result
+
+    def create_response(self, response_data, sub_response):
+        if sub_response.status_code == 304:
+            return Response(status_code=304, headers=dict(sub_response.headers))
+        return super().create_response(response_data, sub_response)
+
+
+graphql_app = TruthLensGraphQL(schema)
@@ -1,5 +1,17 @@
 import strawberry
+from strawberry.schema.config import StrawberryConfig
 
+from .graphql_cost import QueryCost
+from .graphql_documents import DocumentCache, PersistedQueries
+from .graphql_metrics import ResolverMetrics
 from .graphql_resolvers import Query, Mutation, Subscription
+from .graphql_tracing import ResolverTracing
+from .graphql_types import doc_field
 
-schema = strawberry.Schema(query=Query, mutation=Mutation, subscription=Subscription)
+schema = strawberry.Schema(
+    query=Query,
+    mutation=Mutation,
+    subscription=Subscription,
+    config=StrawberryConfig(default_resolver=doc_field),
+    extensions=[PersistedQueries, DocumentCache, QueryCost, ResolverTracing, ResolverMetrics],
+)
@@ -0,0 +1,71 @@
+"""Tracing spans for GraphQL operations and resolvers (see logic/tracing.py).
+
+Inside a sampled request, ResolverTracing records a span for the operation
+("graphql mutation startAnalysis") and one per field with its own resolver
+("graphql.resolve Mutation.startAnalysis"), so store and Couchbase spans
+show up under the field that caused them. Fields read straight off a
+stored document get no span. Outside sampled requests every hook returns
+after one contextvar read.
+"""
+from typing import Any, Callable, Iterator
+
+from graphql import GraphQLResolveInfo
+from strawberry.extensions import SchemaExtension
+from strawberry.utils.await_maybe import AwaitableOrValue
+
+from backend.logic import tracing
+
+from .graphql_types import resolver_field
+
+
+async def _finish(span: tracing.Span, result: Any) -> Any:
+    with tracing.activate(span):
+        try:
+            value = await result
+        except Exception as e:
+            span.end(e)
+            raise
+    span.end()
+    return value
+
+
+class ResolverTracing(SchemaExtension):
+    """Record spans for the operation and for every field resolved by a resolver function."""
+
+    def on_operation(self) -> Iterator[None]:
+        if tracing.current() is None:
+            yield
+            return
+        with tracing.span("graphql") as span:
+            yield
+            context = self.execution_context
+            try:
+                operation_type = context.operation_type.value
+            except Exception:
+                operation_type = "operation"  # the document did not parse
+            span.name = " ".join(filter(None, ("graphql", operation_type, context.operation_name)))
+            span.set(**{"graphql.operation.type": operation_type})
+            if context.operation_name:
+                span.set(**{"graphql.operation.name": context.operation_name})
+
+    def resolve(
+        self, _next: Callable, root: Any, info: GraphQLResolveInfo, *args: Any, **kwargs: Any
+    ) -> AwaitableOrValue[object]:
+        if tracing.current() is None:
+            return _next(root, info, *args, **kwargs)
+        field = resolver_field(self.execution_context.schema, info)
+        if field is None:
+            return _next(root, info, *args, **kwargs)
+        span = tracing.span("graphql.resolve " + field, **{"graphql.field.path": ".".join(map(str, info.path.as_list()))})
+        # the coroutine of an async resolver only runs once awaited, so the span
+        # is made active again around the await
+        with tracing.activate(span):
+            try:
+                result = _next(root, info, *args, **kwargs)
+            except Exception as e:
+                span.end(e)
+                raise
+        if hasattr(result, "__await__"):
+            return _finish(span, result)
+        span.end()
+        return result
@@ -1,7 +1,84 @@
 """GraphQL type definitions for TruthLens."""
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import strawberry
+from graphql import GraphQLResolveInfo
+from strawberry.types.nodes import SelectedField
+from strawberry.utils.str_converters import to_snake_case
+
+from .graphql_loaders import get_loaders
+
+
+def doc_field(source: Any, name: str) -> Any:
+    """Default field resolver that reads stored documents (dicts) as well as objects.
+
+    Nested values such as files, breakdown or fact_checks are kept as the
+    dicts the store returned rather than being rebuilt as type instances.
+    """
+    if isinstance(source, dict):
+        return source.get(name)
+    return getattr(source, name)
+
+
+def _stored_fields(type_: type) -> List[str]:
+    """Python names of a type's plain fields (those read straight from the document)."""
+    return [f.python_name for f in type_.__strawberry_definition__.fields if f.base_resolver is None]
+
+
+# (type name, field name) -> "Type.field" if the field has its own resolver, else None
+_resolver_fields: Dict[Tuple[str, str], Optional[str]] = {}
+
+
+def resolver_field(schema: strawberry.Schema, info: GraphQLResolveInfo) -> Optional[str]:
+    """"Type.field" for a field with its own resolver, None for one read by doc_field.
+
+    Schema extensions use it to instrument only root fields and resolver
+    fields; the answer is looked up in the schema once per field.
+    """
+    key = (info.parent_type.name, info.field_name)
+    try:
+        return _resolver_fields[key]
+    except KeyError:
+        field = schema.get_field_for_type(info.field_name, info.parent_type.name)
+        name = _resolver_fields[key] = ".".join(key) if field is not None and field.base_resolver else None
+        return name
+
+
+def requested_fields(info: strawberry.Info, type_: type) -> Optional[List[str]]:
+    """Stored fields of `type_` selected under the field being resolved.
+
+    Lets a resolver fetch only those fields from the store. Fragments are
+    followed; nested selections take their whole top-level field. Repeated
+    selections of the same response key are merged by GraphQL into one
+    resolver call, so the union of all of them is returned. Returns None
+    (fetch the whole document) when a selected field has its own resolver,
+    which may read any stored field.
+    """
+    if not info.selected_fields:
+        return None
+    stored = set(_stored_fields(type_))
+    fields: Set[str] = set()
+    pending = [selection for field in info.selected_fields for selection in field.selections]
+    while pending:
+        selection = pending.pop()
+        if not isinstance(selection, SelectedField):
+            pending.extend(selection.selections)  # inline fragment or fragment spread
+            continue
+        if selection.name.startswith("__"):
+            continue
+        name = to_snake_case(selection.name)
+        if name not in stored:
+            return None
+        fields.add(name)
+    return sorted(fields) or ["id"]
+
+
+def from_doc(type_: type, doc: Dict[str, Any]) -> Any:
+    """Instance of `type_` from a stored document that may hold only some of its fields.
+
+    Missing fields are None; they were not selected, so they are never resolved.
+    """
+    return type_(**{name: doc.get(name) for name in _stored_fields(type_)})
 
 
 @strawberry.type
@@ -23,6 +100,15 @@ class FileRef:
     size: Optional[int]
     storage_url: Optional[str]  # object storage reference (e.g., S3 URL)
 
+    @strawberry.field
+    async def user(self, info: strawberry.Info) -> Optional[User]:
+        """The uploader, fetched through the request's batched user loader."""
+        user_id = doc_field(self, "user_id")
+        if not user_id:
+            return None
+        doc = await get_loaders(info).users.load(str(user_id))
+        return User(**doc) if doc else None
+
 
 @strawberry.type
 class Source:
@@ -86,6 +172,9 @@ class Analysis:
     fact_checks: Optional[List[FactCheck]]
     fallacies: Optional[List[Fallacy]]
     ai_check: Optional[AICheck]
+    error: Optional[str] = None  # failure reason when status is "failed"
+    etag: Optional[str] = None  # content version, new on every write
+    created_at: Optional[str] = None  # absent on analyses stored by older versions
 
 
 @strawberry.type
@@ -105,6 +194,31 @@ class Upload:
     settings: UploadSettings
     analysis_id: Optional[strawberry.ID]
 
+    @strawberry.field
+    async def analysis(self, info: strawberry.Info) -> Optional[Analysis]:
+        """The linked analysis, fetched through the request's batched analysis loader."""
+        analysis_id = doc_field(self, "analysis_id")
+        if not analysis_id:
+            return None
+        doc = await get_loaders(info).analyses.load(str(analysis_id))
+        return Analysis(**doc) if doc else None
+
+
+@strawberry.type
+class UploadPage:
+    """One page of uploads, newest first; pass end_cursor as `after` for the next page"""
+    items: List[Upload]
+    end_cursor: Optional[str]
+    has_next_page: bool
+
+
+@strawberry.type
+class AnalysisPage:
+    """One page of analyses, newest first; pass end_cursor as `after` for the next page"""
+    items: List[Analysis]
+    end_cursor: Optional[str]
+    has_next_page: bool
+
 
 # Input types
 @strawberry.input
@@ -0,0 +1,111 @@
+"""Application (non-Couchbase) configuration settings."""
+import os
+
+
+# Accepted STORAGE_BACKEND values; anything else is refused at startup
+STORAGE_BACKENDS = ("auto", "memory", "sqlite", "couchbase")
+
+
+class AppConfig:
+    """Application tuning configuration."""
+
+    # Storage backend, chosen once at startup: "auto" (Couchbase when USE_COUCHBASE
+    # and the cluster is reachable, otherwise in-memory), "couchbase" (fail to start
+    # if the cluster is unreachable), "memory" or "sqlite"
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "auto").lower()
+    # Database file for the sqlite backend (WAL mode, durable across restarts)
+    SQLITE_PATH: str = os.getenv("SQLITE_PATH", "truthlens.db")
+
+    # In-memory backend: shards (each with its own lock) and an opt-in budget. Only when
+    # set, least recently used documents are evicted past MAX_ENTRIES / MAX_BYTES (0 = no
+    # limit, the default) and expire TTL seconds after their last write (0 = never), after
+    # which reads report them missing; pending analyses are never evicted.
+    MEMORY_STORE_SHARDS: int = int(os.getenv("MEMORY_STORE_SHARDS", "16"))
+    MEMORY_STORE_MAX_ENTRIES: int = int(os.getenv("MEMORY_STORE_MAX_ENTRIES", "0"))
+    MEMORY_STORE_MAX_BYTES: int = int(os.getenv("MEMORY_STORE_MAX_BYTES", "0"))
+    MEMORY_STORE_TTL: float = float(os.getenv("MEMORY_STORE_TTL", "0"))
+    # Persist the in-memory backend to an append-only log in this directory ("" = off),
+    # compacted into a snapshot once it passes COMPACT_BYTES; FSYNC flushes every write batch
+    MEMORY_LOG_DIR: str = os.getenv("MEMORY_LOG_DIR", "")
+    MEMORY_LOG_COMPACT_BYTES: int = int(os.getenv("MEMORY_LOG_COMPACT_BYTES", str(64 * 1024 * 1024)))
+    MEMORY_LOG_FSYNC: bool = os.getenv("MEMORY_LOG_FSYNC", "false").lower() == "true"
+
+    # Subscriptions: per-subscriber event buffer and what to do when it is full
+    # ("drop_oldest" keeps the most recent events, "drop_newest" keeps the oldest;
+    # the final ready/failed event is never dropped under either)
+    SUBSCRIPTION_QUEUE_SIZE: int = int(os.getenv("SUBSCRIPTION_QUEUE_SIZE", "16"))
+    SUBSCRIPTION_OVERFLOW: str = os.getenv("SUBSCRIPTION_OVERFLOW", "drop_oldest")
+
+    # Read-through cache in front of Couchbase (store.py); TTLs in seconds.
+    # Analyses are only cached once ready, since they never change afterwards.
+    STORE_CACHE_ENABLED: bool = os.getenv("STORE_CACHE_ENABLED", "false").lower() == "true"
+    STORE_CACHE_MAX_ENTRIES: int = int(os.getenv("STORE_CACHE_MAX_ENTRIES", "10000"))
+    STORE_CACHE_TTL_USER: float = float(os.getenv("STORE_CACHE_TTL_USER", "60"))
+    STORE_CACHE_TTL_UPLOAD: float = float(os.getenv("STORE_CACHE_TTL_UPLOAD", "5"))
+    STORE_CACHE_TTL_ANALYSIS: float = float(os.getenv("STORE_CACHE_TTL_ANALYSIS", "3600"))
+    # How long past its TTL an entry may still be served while Couchbase is unavailable
+    STORE_CACHE_STALE_GRACE: float = float(os.getenv("STORE_CACHE_STALE_GRACE", "300"))
+
+    # Background analysis jobs: concurrent workers and max queued jobs
+    ANALYSIS_WORKERS: int = int(os.getenv("ANALYSIS_WORKERS", "4"))
+    ANALYSIS_QUEUE_SIZE: int = int(os.getenv("ANALYSIS_QUEUE_SIZE", "1000"))
+    # Processes running CPU-bound checks (0 = run them on the default thread pool)
+    ANALYSIS_PROCESSES: int = int(os.getenv("ANALYSIS_PROCESSES", "2"))
+
+    # Paginated list queries: largest page a client may request
+    MAX_PAGE_SIZE: int = int(os.getenv("MAX_PAGE_SIZE", "100"))
+
+    # /graphql: parsed and validated documents kept by query text, and automatic
+    # persisted queries (query text by SHA-256 hash); entries each (0 = off)
+    GRAPHQL_DOCUMENT_CACHE_SIZE: int = int(os.getenv("GRAPHQL_DOCUMENT_CACHE_SIZE", "1000"))
+    GRAPHQL_PERSISTED_QUERIES: int = int(os.getenv("GRAPHQL_PERSISTED_QUERIES", "10000"))
+    # Operations nested deeper or scoring higher than this are rejected before execution
+    # (0 = no limit); unbounded lists are scored as DEFAULT_LIST_SIZE items (graphql_cost.py)
+    GRAPHQL_MAX_DEPTH: int = int(os.getenv("GRAPHQL_MAX_DEPTH", "10"))
+    GRAPHQL_MAX_COST: int = int(os.getenv("GRAPHQL_MAX_COST", "5000"))
+    GRAPHQL_DEFAULT_LIST_SIZE: int = int(os.getenv("GRAPHQL_DEFAULT_LIST_SIZE", "10"))
+    # Cache-Control max-age (seconds) of GET responses built only from ready analyses
+    GRAPHQL_CACHE_MAX_AGE: int = int(os.getenv("GRAPHQL_CACHE_MAX_AGE", "31536000"))
+
+    # Tracing (tracing.py): spans of sampled requests are appended to TRACE_FILE ("" = off)
+    # in TRACE_FORMAT ("chrome" trace events or "otlp" JSON lines). Requests with a sampled
+    # traceparent header are always traced, others with probability TRACE_SAMPLE_RATE.
+    TRACE_FILE: str = os.getenv("TRACE_FILE", "")
+    TRACE_FORMAT: str = os.getenv("TRACE_FORMAT", "chrome").lower()
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+
+    @classmethod
+    def to_dict(cls) -> dict:
+        """Return config as dict for easier inspection."""
+        return {
+            "storage_backend": cls.STORAGE_BACKEND,
+            "sqlite_path": cls.SQLITE_PATH,
+            "memory_store_shards": cls.MEMORY_STORE_SHARDS,
+            "memory_store_max_entries": cls.MEMORY_STORE_MAX_ENTRIES,
+            "memory_store_max_bytes": cls.MEMORY_STORE_MAX_BYTES,
+            "memory_store_ttl": cls.MEMORY_STORE_TTL,
+            "memory_log_dir": cls.MEMORY_LOG_DIR,
+            "memory_log_compact_bytes": cls.MEMORY_LOG_COMPACT_BYTES,
+            "memory_log_fsync": cls.MEMORY_LOG_FSYNC,
+            "subscription_queue_size": cls.SUBSCRIPTION_QUEUE_SIZE,
+            "subscription_overflow": cls.SUBSCRIPTION_OVERFLOW,
+            "store_cache_enabled": cls.STORE_CACHE_ENABLED,
+            "store_cache_max_entries": cls.STORE_CACHE_MAX_ENTRIES,
+            "store_cache_ttl_user": cls.STORE_CACHE_TTL_USER,
+            "store_cache_ttl_upload": cls.STORE_CACHE_TTL_UPLOAD,
+            "store_cache_ttl_analysis": cls.STORE_CACHE_TTL_ANALYSIS,
+            "store_cache_stale_grace": cls.STORE_CACHE_STALE_GRACE,
+            "analysis_workers": cls.ANALYSIS_WORKERS,
+            "analysis_queue_size": cls.ANALYSIS_QUEUE_SIZE,
+            "analysis_processes": cls.ANALYSIS_PROCESSES,
+            "max_page_size": cls.MAX_PAGE_SIZE,
+            "graphql_document_cache_size": cls.GRAPHQL_DOCUMENT_CACHE_SIZE,
+            "graphql_persisted_queries": cls.GRAPHQL_PERSISTED_QUERIES,
+            "graphql_max_depth": cls.GRAPHQL_MAX_DEPTH,
+            "graphql_max_cost": cls.GRAPHQL_MAX_COST,
+            "graphql_default_list_size": cls.GRAPHQL_DEFAULT_LIST_SIZE,
+            "graphql_cache_max_age": cls.GRAPHQL_CACHE_MAX_AGE,
+            "trace_file": cls.TRACE_FILE,
+            "trace_format": cls.TRACE_FORMAT,
+            "trace_sample_rate": cls.TRACE_SAMPLE_RATE,
+        }
@@ -0,0 +1,96 @@
+"""Size-bounded LRU cache with per-entry TTLs and hit/miss counters."""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """Least-recently-used cache whose entries also expire after a TTL.
+
+    Intended for use from the event loop thread; it does no locking.
+
+    With `stale_grace`, expired entries are kept that many seconds longer:
+    get() treats them as misses, but get_stale() still returns them, so a
+    caller can serve a stale copy when the backend is unavailable.
+
+    Attributes:
+        generation: Incremented on every invalidation, so a reader that
+            started a backend fetch before a write can tell that its result
+            may be stale and must not be cached.
+    """
+
+    def __init__(self, max_entries: int = 10000, clock=time.monotonic, stale_grace: float = 0.0):
+        self.max_entries = max_entries
+        self.stale_grace = stale_grace
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if absent or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        now = self._clock()
+        if expires_at <= now:
+            if expires_at + self.stale_grace <= now:
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get_stale(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value even if expired (within stale_grace), or None."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] + self.stale_grace <= self._clock():
+            return None
+        self.stale_hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """Cache a value for `ttl` seconds, evicting the least recently used entry if full."""
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (self._clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a key (if cached) and mark in-flight fetches as stale."""
+        self.generation += 1
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        self.generation += 1
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = self.expirations = self.stale_hits = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "stale_hits": self.stale_hits,
+        }
@@ -1,16 +1,202 @@
 """Couchbase SDK client and connection management."""
 import asyncio
-from typing import Optional, Dict, Any, List
+from itertools import chain, islice
+from typing import Optional, Dict, Any, List, Tuple, Iterator, AsyncIterator, Iterable, Union
 from datetime import timedelta
 
+from acouchbase.cluster import Cluster as AsyncCluster
 from couchbase.auth import PasswordAuthenticator
 from couchbase.cluster import Cluster
-from couchbase.exceptions import CouchbaseException, DocumentNotFoundException
-from couchbase.options import ClusterOptions, BucketOptions
+from couchbase.exceptions import (
+    CasMismatchException, CouchbaseException, DocumentNotFoundException, PathNotFoundException
+)
+from couchbase.options import ClusterOptions, MutateInOptions, QueryOptions
+import couchbase.subdocument as SD
 
+from . import resilience, tracing
 from .couchbase_config import CouchbaseConfig
 
 
+_END = object()  # end-of-rows sentinel (a row may itself be null)
+_PROBE_KEY = "health::probe"  # never written; a not-found answer proves the KV service is up
+
+# Most paths the server accepts in one sub-document lookup
+MAX_LOOKUP_PATHS = 16
+
+
+def _chunked(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Group an iterable of rows into lists of up to `size` rows."""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+async def _aprepend(first: Any, rows: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    """Yield `first`, then the rest of an async iterator."""
+    yield first
+    async for row in rows:
+        yield row
+
+
+async def _achunked(rows: AsyncIterator[Any], size: int) -> AsyncIterator[List[Any]]:
+    """Group an async iterable of rows into lists of up to `size` rows."""
+    chunk = []
+    async for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ConcurrentModificationError(Exception):
+    """Raised when a conditional patch keeps losing CAS races."""
+
+
+def _lookup_values(result: Any, paths: List[str]) -> Dict[str, Any]:
+    """Values of a lookup_in result by path (None for missing paths, like dict.get)."""
+    values = {}
+    for i, path in enumerate(paths):
+        try:
+            values[path] = result.content_as[lambda value: value](i)
+        except PathNotFoundException:
+            values[path] = None
+    return values
+
+
+# Query service error codes meaning a cached prepared plan is no longer valid
+# (e.g. after an index was dropped or rebuilt); the statement must be re-prepared.
+_PLAN_INVALIDATED_CODES = {4040, 4050, 4060, 4070, 4080, 4090}
+
+
+def _is_plan_invalidated(error: CouchbaseException) -> bool:
+    """Check whether a query failed because its prepared plan went stale."""
+    context = getattr(error, "context", None)
+    return getattr(context, "first_error_code", None) in _PLAN_INVALIDATED_CODES
+
+
+class PreparedStatement:
+    """A named, parameterized N1QL statement executed as prepared (adhoc=False).
+    
+    The SDK prepares the statement on first use and reuses the plan for
+    every later execution with the same text; parameters are passed
+    positionally ($1, $2, ...) so the text never changes. When the query
+    service reports the plan invalidated, reprepare() drops it: the
+    statement text gets a new plan-generation comment, so the SDK's plan
+    cache misses and the next execution prepares the statement afresh
+    instead of hitting the stale plan again. `executions` counts calls made
+    by the application; `reprepares` counts plans dropped this way.
+    """
+    
+    def __init__(self, name: str, sql: str):
+        self.name = name
+        self.sql = sql
+        self.text = sql
+        self.executions = 0
+        self.reprepares = 0
+    
+    def options(self, params: Optional[List[Any]] = None, retry: bool = False) -> QueryOptions:
+        """Query options for one execution of `text`.
+        
+        Args:
+            params: Positional parameters
+            retry: Options for re-running an execution after reprepare();
+                not counted as another execution
+        """
+        if not retry:
+            self.executions += 1
+        return QueryOptions(adhoc=False, positional_parameters=params or [])
+    
+    def reprepare(self) -> None:
+        """Drop the cached plan so the next execution prepares the statement again."""
+        self.reprepares += 1
+        self.text = f"{self.sql}/* plan {self.reprepares} */"
+
+
+class StatementRegistry:
+    """Per-process registry of the project's recurring N1QL statements."""
+    
+    def __init__(self):
+        self._statements: Dict[str, PreparedStatement] = {}
+    
+    def register(self, name: str, sql: str) -> PreparedStatement:
+        """Register a statement (idempotent for identical SQL).
+        
+        Raises:
+            ValueError: If the name is already registered with different SQL
+        """
+        existing = self._statements.get(name)
+        if existing is not None:
+            if existing.sql != sql:
+                raise ValueError(f"Statement {name!r} is already registered with different SQL")
+            return existing
+        statement = self._statements[name] = PreparedStatement(name, sql)
+        return statement
+    
+    def get(self, name: str) -> PreparedStatement:
+        """Look up a registered statement.
+        
+        Raises:
+            KeyError: If no statement has that name
+        """
+        return self._statements[name]
+    
+    def __iter__(self) -> Iterator[PreparedStatement]:
+        return iter(self._statements.values())
+    
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Executions and re-prepares per statement."""
+        return {
+            s.name: {"executions": s.executions, "reprepares": s.reprepares}
+            for s in self._statements.values()
+        }
+
+
+def _by_type_sql(doc_type: str) -> str:
+    # the type prefix stays literal: partial-index WHERE clauses only match constants
+    return f"""
+        SELECT * FROM {CouchbaseConfig.BUCKET_NAME}
+        WHERE META().id LIKE '{doc_type}::%'
+        """
+
+
+def _stream_sql(doc_type: str) -> str:
+    # SELECT RAW: rows are the documents themselves, not wrapped in {bucket: doc}
+    return f"""
+        SELECT RAW d FROM {CouchbaseConfig.BUCKET_NAME} AS d
+        WHERE META(d).id LIKE '{doc_type}::%'
+        """
+
+
+statements = StatementRegistry()
+for _doc_type in ("user", "upload", "analysis"):
+    statements.register(f"by_type:{_doc_type}", _by_type_sql(_doc_type))
+    statements.register(f"stream:{_doc_type}", _stream_sql(_doc_type))
+
+
+def _keyset_sql(doc_type: str, field: str, after: bool) -> str:
+    # newest first on the (field, created_at DESC, META().id DESC) index; "after" pages seek past
+    # the cursor: $1 = value, [$2 = cursor created_at, $3 = cursor ID,] last = limit
+    seek = "AND (d.created_at < $2 OR (d.created_at = $2 AND META(d).id < $3))" if after else ""
+    return f"""
+        SELECT RAW d FROM {CouchbaseConfig.BUCKET_NAME} AS d
+        WHERE META(d).id LIKE '{doc_type}::%' AND d.{field} = $1 {seek}
+        ORDER BY d.{field}, d.created_at DESC, META(d).id DESC
+        LIMIT {"$4" if after else "$2"}
+        """
+
+
+# Keyset listings (storage.INDEXES): the first page, and the pages after a cursor
+statements.register("uploads_by_user", _keyset_sql("upload", "user_id", after=False))
+statements.register("uploads_by_user:after", _keyset_sql("upload", "user_id", after=True))
+statements.register("analyses_by_status", _keyset_sql("analysis", "status", after=False))
+statements.register("analyses_by_status:after", _keyset_sql("analysis", "status", after=True))
+
+
 class CouchbaseClient:
     """Couchbase cluster and bucket management."""
     
@@ -55,7 +241,6 @@ class CouchbaseClient:
             
             # Open bucket
             cls._bucket = cls._cluster.bucket(CouchbaseConfig.BUCKET_NAME)
-            cls._bucket.on_connect()
             
             print(f"✓ Connected to Couchbase: {CouchbaseConfig.HOST}")
             print(f"✓ Using bucket: {CouchbaseConfig.BUCKET_NAME}")
@@ -86,6 +271,15 @@ class CouchbaseClient:
             raise RuntimeError("Not connected to Couchbase. Call connect() first.")
         return cls._bucket
     
+    @classmethod
+    def get_collection(cls):
+        """Get the default collection of the connected bucket.
+        
+        Raises:
+            RuntimeError: If not connected
+        """
+        return cls.get_bucket().default_collection()
+    
     @classmethod
     def get_cluster(cls) -> Cluster:
         """Get the connected cluster.
@@ -103,10 +297,94 @@ class CouchbaseClient:
         return cls._cluster is not None and cls._bucket is not None
 
 
+class AsyncCouchbaseClient:
+    """asyncio Couchbase cluster and bucket management (acouchbase).
+    
+    Mirrors CouchbaseClient, but every network operation is awaitable so
+    KV and query calls never block the event loop serving GraphQL requests.
+    """
+    
+    _cluster: Optional[AsyncCluster] = None
+    _bucket = None
+    
+    @classmethod
+    async def connect(cls) -> "AsyncCouchbaseClient":
+        """Establish an asyncio connection to the Couchbase cluster.
+        
+        Returns:
+            AsyncCouchbaseClient class
+            
+        Raises:
+            CouchbaseException: If connection fails
+        """
+        if cls._cluster is not None:
+            return cls  # Already connected
+        
+        try:
+            auth = PasswordAuthenticator(
+                CouchbaseConfig.USERNAME,
+                CouchbaseConfig.PASSWORD
+            )
+            options = ClusterOptions(auth)
+            options.timeout = timedelta(milliseconds=CouchbaseConfig.CONNECTION_TIMEOUT_MS)
+            
+            cluster = await AsyncCluster.connect(CouchbaseConfig.HOST, options)
+            bucket = cluster.bucket(CouchbaseConfig.BUCKET_NAME)
+            await bucket.on_connect()
+            cls._cluster = cluster
+            cls._bucket = bucket
+            
+            print(f"✓ Connected to Couchbase (async): {CouchbaseConfig.HOST}")
+            print(f"✓ Using bucket: {CouchbaseConfig.BUCKET_NAME}")
+            
+        except CouchbaseException as e:
+            print(f"✗ Couchbase async connection failed: {e}")
+            raise
+        
+        return cls
+    
+    @classmethod
+    async def disconnect(cls) -> None:
+        """Close the asyncio Couchbase connection."""
+        if cls._cluster is not None:
+            await cls._cluster.close()
+            cls._cluster = None
+            cls._bucket = None
+            print("✓ Disconnected from Couchbase (async)")
+    
+    @classmethod
+    def get_collection(cls):
+        """Get the default collection of the connected bucket.
+        
+        Raises:
+            RuntimeError: If not connected
+        """
+        if cls._bucket is None:
+            raise RuntimeError("Not connected to Couchbase. Call connect() first.")
+        return cls._bucket.default_collection()
+    
+    @classmethod
+    def get_cluster(cls) -> AsyncCluster:
+        """Get the connected cluster.
+        
+        Raises:
+            RuntimeError: If not connected
+        """
+        if cls._cluster is None:
+            raise RuntimeError("Not connected to Couchbase. Call connect() first.")
+        return cls._cluster
+    
+    @classmethod
+    def is_connected(cls) -> bool:
+        """Check if connected to Couchbase."""
+        return cls._cluster is not None and cls._bucket is not None
+
+
 class CouchbaseQuery:
     """Helper for N1QL queries."""
     
     @staticmethod
+    @tracing.traced("couchbase.get_document", tracing.CLIENT, "db.key")
     def get_document(doc_id: str) -> Optional[Dict[str, Any]]:
         """Get document by ID.
         
@@ -114,19 +392,48 @@ class CouchbaseQuery:
             doc_id: Document ID (e.g., 'user::abc123')
             
         Returns:
-            Document dict if found, None otherwise
+            Document dict if found, None if the document does not exist
+            
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            CouchbaseException: If the read fails (after retries)
         """
+        collection = CouchbaseClient.get_collection()
         try:
-            bucket = CouchbaseClient.get_bucket()
-            result = bucket.get(doc_id)
-            return result.content_as[dict]
+            result = resilience.call(collection.get, doc_id)
         except DocumentNotFoundException:
             return None
-        except CouchbaseException as e:
-            print(f"Error retrieving document {doc_id}: {e}")
+        return result.content_as[dict]
+    
+    @staticmethod
+    @tracing.traced("couchbase.get_fields", tracing.CLIENT, "db.key")
+    def get_fields(doc_id: str, fields: List[str]) -> Optional[Dict[str, Any]]:
+        """Get only some top-level fields of a document with one sub-document lookup.
+        
+        Unrequested fields (e.g. an analysis's fact-check sources) are never
+        read or sent by the server.
+        
+        Args:
+            doc_id: Document ID
+            fields: Up to MAX_LOOKUP_PATHS top-level field names
+            
+        Returns:
+            The fields by name (None for absent ones), or None if the document
+            does not exist
+            
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            CouchbaseException: If the lookup fails (after retries)
+        """
+        collection = CouchbaseClient.get_collection()
+        try:
+            result = resilience.call(collection.lookup_in, doc_id, [SD.get(field) for field in fields])
+        except DocumentNotFoundException:
             return None
+        return _lookup_values(result, fields)
     
     @staticmethod
+    @tracing.traced("couchbase.save_document", tracing.CLIENT, "db.key")
     def save_document(doc_id: str, document: Dict[str, Any]) -> bool:
         """Save document by ID (insert or update).
         
@@ -135,17 +442,18 @@ class CouchbaseQuery:
             document: Document dict
             
         Returns:
-            True if successful, False otherwise
+            True once the document is saved
+            
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            CouchbaseException: If the write fails (after retries)
         """
-        try:
-            bucket = CouchbaseClient.get_bucket()
-            bucket.upsert(doc_id, document)
-            return True
-        except CouchbaseException as e:
-            print(f"Error saving document {doc_id}: {e}")
-            return False
+        collection = CouchbaseClient.get_collection()
+        resilience.call(collection.upsert, doc_id, document)
+        return True
     
     @staticmethod
+    @tracing.traced("couchbase.delete_document", tracing.CLIENT, "db.key")
     def delete_document(doc_id: str) -> bool:
         """Delete document by ID.
         
@@ -153,19 +461,152 @@ class CouchbaseQuery:
             doc_id: Document ID
             
         Returns:
-            True if successful, False otherwise
+            True if deleted, False if the document does not exist
+            
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            CouchbaseException: If the remove fails (after retries)
         """
+        collection = CouchbaseClient.get_collection()
         try:
-            bucket = CouchbaseClient.get_bucket()
-            bucket.remove(doc_id)
-            return True
+            resilience.call(collection.remove, doc_id)
         except DocumentNotFoundException:
             return False
-        except CouchbaseException as e:
-            print(f"Error deleting document {doc_id}: {e}")
-            return False
+        return True
     
     @staticmethod
+    @tracing.traced("couchbase.patch_document", tracing.CLIENT, "db.key")
+    def patch_document(
+        doc_id: str,
+        changes: Dict[str, Any],
+        expected: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """Update top-level fields of a document in place with sub-document ops.
+        
+        Only the changed fields travel over the wire (mutate_in). With
+        `expected`, the current values of those fields are read (lookup_in)
+        and the mutation is made conditional on the document's CAS, retrying
+        from the read when another writer got in between.
+        
+        Args:
+            doc_id: Document ID
+            changes: New values by field name
+            expected: Required current values by field name
+            
+        Returns:
+            True if applied; False if the document does not exist or a field
+            did not have its expected value
+            
+        Raises:
+            ConcurrentModificationError: If every attempt lost a CAS race
+            CircuitOpenError: If the circuit breaker is open
+            CouchbaseException: If the lookup or mutation fails (after retries)
+        """
+        specs = [SD.upsert(path, value) for path, value in changes.items()]
+        for _ in range(CouchbaseConfig.CAS_RETRIES):
+            try:
+                collection = CouchbaseClient.get_collection()
+                options = MutateInOptions()
+                if expected:
+                    paths = list(expected)
+                    current = resilience.call(collection.lookup_in, doc_id, [SD.get(path) for path in paths])
+                    if _lookup_values(current, paths) != expected:
+                        return False
+                    options = MutateInOptions(cas=current.cas)
+                resilience.call(collection.mutate_in, doc_id, specs, options)
+                return True
+            except DocumentNotFoundException:
+                return False
+            except CasMismatchException:
+                continue
+        raise ConcurrentModificationError(
+            f"Document {doc_id} kept changing; gave up after {CouchbaseConfig.CAS_RETRIES} attempts"
+        )
+    
+    @staticmethod
+    @tracing.traced("couchbase.get_documents", tracing.CLIENT, "db.key_count")
+    def get_documents(doc_ids: List[str]) -> Tuple[Dict[str, Optional[Dict[str, Any]]], Dict[str, str]]:
+        """Get many documents in one batched KV operation (get_multi).
+        
+        Args:
+            doc_ids: Document IDs
+            
+        Returns:
+            Tuple of (documents by ID, None for missing ones; error message by ID)
+        """
+        if not doc_ids:
+            return {}, {}
+        try:
+            collection = CouchbaseClient.get_collection()
+            result = resilience.call(collection.get_multi, list(doc_ids), return_exceptions=True)
+        except (CouchbaseException, resilience.CircuitOpenError) as e:
+            print(f"Error retrieving documents {doc_ids}: {e}")
+            return {}, {doc_id: str(e) for doc_id in doc_ids}
+        
+        docs = {doc_id: res.content_as[dict] for doc_id, res in result.results.items()}
+        errors = {}
+        for doc_id, exc in result.exceptions.items():
+            if isinstance(exc, DocumentNotFoundException):
+                docs[doc_id] = None
+            else:
+                errors[doc_id] = str(exc)
+        return docs, errors
+    
+    @staticmethod
+    @tracing.traced("couchbase.save_documents", tracing.CLIENT, "db.key_count")
+    def save_documents(documents: Dict[str, Dict[str, Any]]) -> Tuple[Dict[str, bool], Dict[str, str]]:
+        """Save many documents in one batched KV operation (upsert_multi).
+        
+        Args:
+            documents: Document dicts keyed by document ID
+            
+        Returns:
+            Tuple of (True for each saved ID; error message by ID)
+        """
+        if not documents:
+            return {}, {}
+        try:
+            collection = CouchbaseClient.get_collection()
+            result = resilience.call(collection.upsert_multi, dict(documents), return_exceptions=True)
+        except (CouchbaseException, resilience.CircuitOpenError) as e:
+            print(f"Error saving documents {list(documents)}: {e}")
+            return {}, {doc_id: str(e) for doc_id in documents}
+        
+        saved = {doc_id: True for doc_id in result.results}
+        errors = {doc_id: str(exc) for doc_id, exc in result.exceptions.items()}
+        return saved, errors
+    
+    @staticmethod
+    @tracing.traced("couchbase.delete_documents", tracing.CLIENT, "db.key_count")
+    def delete_documents(doc_ids: List[str]) -> Tuple[Dict[str, bool], Dict[str, str]]:
+        """Delete many documents in one batched KV operation (remove_multi).
+        
+        Args:
+            doc_ids: Document IDs
+            
+        Returns:
+            Tuple of (True if deleted / False if missing, by ID; error message by ID)
+        """
+        if not doc_ids:
+            return {}, {}
+        try:
+            collection = CouchbaseClient.get_collection()
+            result = resilience.call(collection.remove_multi, list(doc_ids), return_exceptions=True)
+        except (CouchbaseException, resilience.CircuitOpenError) as e:
+            print(f"Error deleting documents {doc_ids}: {e}")
+            return {}, {doc_id: str(e) for doc_id in doc_ids}
+        
+        deleted = {doc_id: True for doc_id in result.results}
+        errors = {}
+        for doc_id, exc in result.exceptions.items():
+            if isinstance(exc, DocumentNotFoundException):
+                deleted[doc_id] = False
+            else:
+                errors[doc_id] = str(exc)
+        return deleted, errors
+    
+    @staticmethod
+    @tracing.traced("couchbase.query", tracing.CLIENT, "db.statement")
     def query(sql: str, params: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
         """Execute N1QL query.
         
@@ -178,9 +619,10 @@ class CouchbaseQuery:
         """
         try:
             cluster = CouchbaseClient.get_cluster()
-            result = cluster.query(sql, positional_parameters=params or [])
-            return [row for row in result.rows()]
-        except CouchbaseException as e:
+            return resilience.call(
+                lambda: list(cluster.query(sql, positional_parameters=params or []).rows())
+            )
+        except (CouchbaseException, *resilience.UNAVAILABLE_ERRORS) as e:
             print(f"Query error: {e}\nSQL: {sql}")
             return []
     
@@ -194,8 +636,499 @@ class CouchbaseQuery:
         Returns:
             List of matching documents
         """
-        sql = f"""
-        SELECT * FROM {CouchbaseConfig.BUCKET_NAME}
-        WHERE META().id LIKE '{doc_type}::%'
+        statement = statements.register(f"by_type:{doc_type}", _by_type_sql(doc_type))
+        try:
+            return CouchbaseQuery.execute(statement.name)
+        except (CouchbaseException, *resilience.UNAVAILABLE_ERRORS):
+            return []
+    
+    @staticmethod
+    @tracing.traced("couchbase.execute", tracing.CLIENT, "db.statement")
+    def execute(name: str, params: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+        """Execute a registered statement as a prepared query.
+        
+        If the cached plan has been invalidated, it is dropped and the
+        statement is prepared again and retried once (see
+        PreparedStatement.reprepare).
+        
+        Args:
+            name: Registered statement name (see `statements`)
+            params: Positional parameters
+            
+        Returns:
+            List of result rows (dicts)
+            
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            CouchbaseException: If the query fails
+        """
+        statement = statements.get(name)
+        cluster = CouchbaseClient.get_cluster()
+        
+        def run(options: QueryOptions) -> List[Dict[str, Any]]:
+            return list(cluster.query(statement.text, options).rows())
+        
+        try:
+            try:
+                return resilience.call(run, statement.options(params))
+            except CouchbaseException as e:
+                if not _is_plan_invalidated(e):
+                    raise
+                statement.reprepare()
+                return resilience.call(run, statement.options(params, retry=True))
+        except CouchbaseException as e:
+            print(f"Query error: {e}\nStatement: {name}")
+            raise
+    
+    @staticmethod
+    def stream(
+        name: str,
+        params: Optional[List[Any]] = None,
+        chunk_size: Optional[int] = None,
+    ) -> Union[Iterator[Dict[str, Any]], Iterator[List[Dict[str, Any]]]]:
+        """Execute a registered statement and yield rows as the SDK streams them.
+        
+        Unlike execute(), rows are never collected into one list, so memory
+        stays constant however many rows the query returns. Errors are
+        raised rather than ending the stream early, so a consumer cannot
+        mistake a failed query for a short result. A plan invalidated before
+        the first row is retried as in execute().
+        
+        Args:
+            name: Registered statement name (see `statements`)
+            params: Optional query parameters
+            chunk_size: If set, yield lists of up to this many rows instead
+            
+        Yields:
+            Result rows (dicts), or lists of rows when chunk_size is set
+            
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            CouchbaseException: If the query fails
+        """
+        statement = statements.get(name)
+        cluster = CouchbaseClient.get_cluster()
+        
+        def start(options: QueryOptions) -> Tuple[Iterator[Dict[str, Any]], Any]:
+            rows = iter(cluster.query(statement.text, options).rows())
+            return rows, next(rows, _END)
+        
+        try:
+            # retries only cover getting the stream started; a failure
+            # after rows have been yielded is raised to the consumer
+            try:
+                rows, first = resilience.call(start, statement.options(params))
+            except CouchbaseException as e:
+                if not _is_plan_invalidated(e):
+                    raise
+                statement.reprepare()
+                rows, first = resilience.call(start, statement.options(params, retry=True))
+            if first is _END:
+                return
+            rows = chain((first,), rows)
+            if chunk_size:
+                yield from _chunked(rows, chunk_size)
+            else:
+                yield from rows
+        except CouchbaseException as e:
+            print(f"Query error: {e}\nStatement: {name}")
+            raise
+    
+    @staticmethod
+    def stream_by_type(
+        doc_type: str,
+        chunk_size: Optional[int] = None,
+    ) -> Union[Iterator[Dict[str, Any]], Iterator[List[Dict[str, Any]]]]:
+        """Stream documents by type, using the same statement as CouchbaseBackend.scan.
+        
+        Unlike query_by_type, rows are the documents themselves rather than
+        wrapped in a {bucket: document} object.
+        
+        Args:
+            doc_type: Document type (prefix, e.g., 'user', 'upload', 'analysis')
+            chunk_size: If set, yield lists of up to this many rows
+            
+        Yields:
+            Matching documents, or lists of them when chunk_size is set
+        """
+        statement = statements.register(f"stream:{doc_type}", _stream_sql(doc_type))
+        return CouchbaseQuery.stream(statement.name, chunk_size=chunk_size)
+    
+    @staticmethod
+    def probe() -> None:
+        """Check that the KV service answers, bypassing retries and the breaker.
+        
+        Used by the recovery probe while the circuit breaker is open.
+        
+        Raises:
+            CouchbaseException: If the cluster does not answer
+        """
+        try:
+            CouchbaseClient.get_collection().get(_PROBE_KEY)
+        except DocumentNotFoundException:
+            pass
+
+
+class AsyncCouchbaseQuery:
+    """Awaitable counterpart of CouchbaseQuery backed by AsyncCouchbaseClient."""
+    
+    @staticmethod
+    @tracing.traced("couchbase.get_document", tracing.CLIENT, "db.key")
+    async def get_document(doc_id: str) -> Optional[Dict[str, Any]]:
+        """Get document by ID.
+        
+        Args:
+            doc_id: Document ID (e.g., 'user::abc123')
+            
+        Returns:
+            Document dict if found, None if the document does not exist
+            
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            CouchbaseException: If the read fails (after retries)
         """
-        return CouchbaseQuery.query(sql)
+        collection = AsyncCouchbaseClient.get_collection()
+        try:
+            result = await resilience.acall(collection.get, doc_id)
+        except DocumentNotFoundException:
+            return None
+        return result.content_as[dict]
+    
+    @staticmethod
+    @tracing.traced("couchbase.get_fields", tracing.CLIENT, "db.key")
+    async def get_fields(doc_id: str, fields: List[str]) -> Optional[Dict[str, Any]]:
+        """Get only some top-level fields of a document with one sub-document lookup.
+        
+        Unrequested fields (e.g. an analysis's fact-check sources) are never
+        read or sent by the server.
+        
+        Args:
+            doc_id: Document ID
+            fields: Up to MAX_LOOKUP_PATHS top-level field names
+            
+        Returns:
+            The fields by name (None for absent ones), or None if the document
+            does not exist
+            
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            CouchbaseException: If the lookup fails (after retries)
+        """
+        collection = AsyncCouchbaseClient.get_collection()
+        try:
+            result = await resilience.acall(collection.lookup_in, doc_id, [SD.get(field) for field in fields])
+        except DocumentNotFoundException:
+            return None
+        return _lookup_values(result, fields)
+    
+    @staticmethod
+    @tracing.traced("couchbase.save_document", tracing.CLIENT, "db.key")
+    async def save_document(doc_id: str, document: Dict[str, Any]) -> bool:
+        """Save document by ID (insert or update).
+        
+        Args:
+            doc_id: Document ID
+            document: Document dict
+            
+        Returns:
+            True once the document is saved
+            
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            CouchbaseException: If the write fails (after retries)
+        """
+        collection = AsyncCouchbaseClient.get_collection()
+        await resilience.acall(collection.upsert, doc_id, document)
+        return True
+    
+    @staticmethod
+    @tracing.traced("couchbase.delete_document", tracing.CLIENT, "db.key")
+    async def delete_document(doc_id: str) -> bool:
+        """Delete document by ID.
+        
+        Args:
+            doc_id: Document ID
+            
+        Returns:
+            True if deleted, False if the document does not exist
+            
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            CouchbaseException: If the remove fails (after retries)
+        """
+        collection = AsyncCouchbaseClient.get_collection()
+        try:
+            await resilience.acall(collection.remove, doc_id)
+        except DocumentNotFoundException:
+            return False
+        return True
+    
+    @staticmethod
+    @tracing.traced("couchbase.patch_document", tracing.CLIENT, "db.key")
+    async def patch_document(
+        doc_id: str,
+        changes: Dict[str, Any],
+        expected: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """Update top-level fields of a document in place with sub-document ops.
+        
+        See CouchbaseQuery.patch_document.
+        
+        Raises:
+            ConcurrentModificationError: If every attempt lost a CAS race
+        """
+        specs = [SD.upsert(path, value) for path, value in changes.items()]
+        for _ in range(CouchbaseConfig.CAS_RETRIES):
+            try:
+                collection = AsyncCouchbaseClient.get_collection()
+                options = MutateInOptions()
+                if expected:
+                    paths = list(expected)
+                    current = await resilience.acall(collection.lookup_in, doc_id, [SD.get(path) for path in paths])
+                    if _lookup_values(current, paths) != expected:
+                        return False
+                    options = MutateInOptions(cas=current.cas)
+                await resilience.acall(collection.mutate_in, doc_id, specs, options)
+                return True
+            except DocumentNotFoundException:
+                return False
+            except CasMismatchException:
+                continue
+        raise ConcurrentModificationError(
+            f"Document {doc_id} kept changing; gave up after {CouchbaseConfig.CAS_RETRIES} attempts"
+        )
+    
+    @staticmethod
+    @tracing.traced("couchbase.get_documents", tracing.CLIENT, "db.key_count")
+    async def get_documents(doc_ids: List[str]) -> Tuple[Dict[str, Optional[Dict[str, Any]]], Dict[str, str]]:
+        """Get many documents concurrently.
+        
+        acouchbase has no *_multi operations; issuing the gets together lets
+        the SDK pipeline them over the same KV connections.
+        
+        Args:
+            doc_ids: Document IDs
+            
+        Returns:
+            Tuple of (documents by ID, None for missing ones; error message by ID)
+        """
+        collection = AsyncCouchbaseClient.get_collection()
+        results = await asyncio.gather(
+            *(resilience.acall(collection.get, doc_id) for doc_id in doc_ids), return_exceptions=True
+        )
+        docs, errors = {}, {}
+        for doc_id, res in zip(doc_ids, results):
+            if isinstance(res, DocumentNotFoundException):
+                docs[doc_id] = None
+            elif isinstance(res, Exception):
+                errors[doc_id] = str(res)
+            else:
+                docs[doc_id] = res.content_as[dict]
+        return docs, errors
+    
+    @staticmethod
+    @tracing.traced("couchbase.save_documents", tracing.CLIENT, "db.key_count")
+    async def save_documents(documents: Dict[str, Dict[str, Any]]) -> Tuple[Dict[str, bool], Dict[str, str]]:
+        """Save many documents concurrently.
+        
+        Args:
+            documents: Document dicts keyed by document ID
+            
+        Returns:
+            Tuple of (True for each saved ID; error message by ID)
+        """
+        collection = AsyncCouchbaseClient.get_collection()
+        results = await asyncio.gather(
+            *(resilience.acall(collection.upsert, doc_id, doc) for doc_id, doc in documents.items()),
+            return_exceptions=True
+        )
+        saved, errors = {}, {}
+        for doc_id, res in zip(documents, results):
+            if isinstance(res, Exception):
+                errors[doc_id] = str(res)
+            else:
+                saved[doc_id] = True
+        return saved, errors
+    
+    @staticmethod
+    @tracing.traced("couchbase.delete_documents", tracing.CLIENT, "db.key_count")
+    async def delete_documents(doc_ids: List[str]) -> Tuple[Dict[str, bool], Dict[str, str]]:
+        """Delete many documents concurrently.
+        
+        Args:
+            doc_ids: Document IDs
+            
+        Returns:
+            Tuple of (True if deleted / False if missing, by ID; error message by ID)
+        """
+        collection = AsyncCouchbaseClient.get_collection()
+        results = await asyncio.gather(
+            *(resilience.acall(collection.remove, doc_id) for doc_id in doc_ids), return_exceptions=True
+        )
+        deleted, errors = {}, {}
+        for doc_id, res in zip(doc_ids, results):
+            if isinstance(res, DocumentNotFoundException):
+                deleted[doc_id] = False
+            elif isinstance(res, Exception):
+                errors[doc_id] = str(res)
+            else:
+                deleted[doc_id] = True
+        return deleted, errors
+    
+    @staticmethod
+    @tracing.traced("couchbase.query", tracing.CLIENT, "db.statement")
+    async def query(sql: str, params: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+        """Execute N1QL query.
+        
+        Args:
+            sql: N1QL query string
+            params: Optional query parameters
+            
+        Returns:
+            List of result rows (dicts)
+        """
+        try:
+            cluster = AsyncCouchbaseClient.get_cluster()
+            async def run():
+                return [row async for row in cluster.query(sql, positional_parameters=params or []).rows()]
+            
+            return await resilience.acall(run)
+        except (CouchbaseException, *resilience.UNAVAILABLE_ERRORS) as e:
+            print(f"Query error: {e}\nSQL: {sql}")
+            return []
+    
+    @staticmethod
+    async def query_by_type(doc_type: str) -> List[Dict[str, Any]]:
+        """Query documents by type.
+        
+        Args:
+            doc_type: Document type (prefix, e.g., 'user', 'upload', 'analysis')
+            
+        Returns:
+            List of matching documents
+        """
+        statement = statements.register(f"by_type:{doc_type}", _by_type_sql(doc_type))
+        try:
+            return await AsyncCouchbaseQuery.execute(statement.name)
+        except (CouchbaseException, *resilience.UNAVAILABLE_ERRORS):
+            return []
+    
+    @staticmethod
+    @tracing.traced("couchbase.execute", tracing.CLIENT, "db.statement")
+    async def execute(name: str, params: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+        """Execute a registered statement as a prepared query.
+        
+        If the cached plan has been invalidated, it is dropped and the
+        statement is prepared again and retried once (see
+        PreparedStatement.reprepare).
+        
+        Args:
+            name: Registered statement name (see `statements`)
+            params: Positional parameters
+            
+        Returns:
+            List of result rows (dicts)
+            
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            CouchbaseException: If the query fails
+        """
+        statement = statements.get(name)
+        cluster = AsyncCouchbaseClient.get_cluster()
+        
+        async def run(options: QueryOptions) -> List[Dict[str, Any]]:
+            return [row async for row in cluster.query(statement.text, options).rows()]
+        
+        try:
+            try:
+                return await resilience.acall(run, statement.options(params))
+            except CouchbaseException as e:
+                if not _is_plan_invalidated(e):
+                    raise
+                statement.reprepare()
+                return await resilience.acall(run, statement.options(params, retry=True))
+        except CouchbaseException as e:
+            print(f"Query error: {e}\nStatement: {name}")
+            raise
+    
+    @staticmethod
+    async def stream(
+        name: str,
+        params: Optional[List[Any]] = None,
+        chunk_size: Optional[int] = None,
+    ) -> Union[AsyncIterator[Dict[str, Any]], AsyncIterator[List[Dict[str, Any]]]]:
+        """Execute a registered statement and yield rows as the SDK streams them.
+        
+        Async-iterator counterpart of CouchbaseQuery.stream: constant memory,
+        errors are raised rather than ending the stream early, and a plan
+        invalidated before the first row is re-prepared and retried.
+        
+        Args:
+            name: Registered statement name (see `statements`)
+            params: Optional query parameters
+            chunk_size: If set, yield lists of up to this many rows instead
+            
+        Yields:
+            Result rows (dicts), or lists of rows when chunk_size is set
+            
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            CouchbaseException: If the query fails
+        """
+        statement = statements.get(name)
+        cluster = AsyncCouchbaseClient.get_cluster()
+        
+        async def start(options: QueryOptions) -> Tuple[AsyncIterator[Dict[str, Any]], Any]:
+            rows = cluster.query(statement.text, options).rows().__aiter__()
+            return rows, await anext(rows, _END)
+        
+        try:
+            try:
+                rows, first = await resilience.acall(start, statement.options(params))
+            except CouchbaseException as e:
+                if not _is_plan_invalidated(e):
+                    raise
+                statement.reprepare()
+                rows, first = await resilience.acall(start, statement.options(params, retry=True))
+            if first is _END:
+                return
+            items = _aprepend(first, rows)
+            if chunk_size:
+                items = _achunked(items, chunk_size)
+            async for item in items:
+                yield item
+        except CouchbaseException as e:
+            print(f"Query error: {e}\nStatement: {name}")
+            raise
+    
+    @staticmethod
+    def stream_by_type(
+        doc_type: str,
+        chunk_size: Optional[int] = None,
+    ) -> Union[AsyncIterator[Dict[str, Any]], AsyncIterator[List[Dict[str, Any]]]]:
+        """Stream documents by type, using the same statement as CouchbaseBackend.scan.
+        
+        Unlike query_by_type, rows are the documents themselves rather than
+        wrapped in a {bucket: document} object.
+        
+        Args:
+            doc_type: Document type (prefix, e.g., 'user', 'upload', 'analysis')
+            chunk_size: If set, yield lists of up to this many rows
+            
+        Yields:
+            Matching documents, or lists of them when chunk_size is set
+        """
+        statement = statements.register(f"stream:{doc_type}", _stream_sql(doc_type))
+        return AsyncCouchbaseQuery.stream(statement.name, chunk_size=chunk_size)
+    
+    @staticmethod
+    async def probe() -> None:
+        """Check that the KV service answers (see CouchbaseQuery.probe).
+        
+        Raises:
+            CouchbaseException: If the cluster does not answer
+        """
+        try:
+            await AsyncCouchbaseClient.get_collection().get(_PROBE_KEY)
+        except DocumentNotFoundException:
+            pass
@@ -15,7 +15,21 @@ class CouchbaseConfig:
     
     # Connection pool settings
     CONNECTION_TIMEOUT_MS: int = int(os.getenv("COUCHBASE_TIMEOUT", "5000"))
+    # Retries of timeouts / temporary failures, with jittered exponential backoff
     MAX_RETRIES: int = int(os.getenv("COUCHBASE_MAX_RETRIES", "3"))
+    RETRY_BASE_DELAY_MS: float = float(os.getenv("COUCHBASE_RETRY_BASE_DELAY_MS", "50"))
+    RETRY_MAX_DELAY_MS: float = float(os.getenv("COUCHBASE_RETRY_MAX_DELAY_MS", "1000"))
+    
+    # Circuit breaker: consecutive failed calls before failing fast, seconds
+    # before a trial call, and how often the background probe checks recovery
+    BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("COUCHBASE_BREAKER_THRESHOLD", "5"))
+    BREAKER_RESET_TIMEOUT_S: float = float(os.getenv("COUCHBASE_BREAKER_RESET_S", "30"))
+    PROBE_INTERVAL_S: float = float(os.getenv("COUCHBASE_PROBE_INTERVAL_S", "5"))
+    # Attempts for a conditional sub-document patch that keeps losing CAS races
+    CAS_RETRIES: int = int(os.getenv("COUCHBASE_CAS_RETRIES", "5"))
+    
+    # Use the asyncio (acouchbase) client instead of the blocking SDK
+    ASYNC_CLIENT: bool = os.getenv("COUCHBASE_ASYNC", "true").lower() == "true"
     
     # Feature flags
     USE_COUCHBASE: bool = os.getenv("USE_COUCHBASE", "true").lower() == "true"
@@ -29,5 +43,13 @@ class CouchbaseConfig:
             "username": cls.USERNAME,
             "scope": cls.SCOPE,
             "timeout_ms": cls.CONNECTION_TIMEOUT_MS,
+            "max_retries": cls.MAX_RETRIES,
+            "retry_base_delay_ms": cls.RETRY_BASE_DELAY_MS,
+            "retry_max_delay_ms": cls.RETRY_MAX_DELAY_MS,
+            "breaker_failure_threshold": cls.BREAKER_FAILURE_THRESHOLD,
+            "breaker_reset_timeout_s": cls.BREAKER_RESET_TIMEOUT_S,
+            "probe_interval_s": cls.PROBE_INTERVAL_S,
+            "cas_retries": cls.CAS_RETRIES,
             "use_couchbase": cls.USE_COUCHBASE,
+            "async_client": cls.ASYNC_CLIENT,
         }
@@ -1,8 +1,14 @@
 """Couchbase migration and initialization script."""
-from typing import List
-from .couchbase_client import CouchbaseClient, CouchbaseQuery
+from typing import Any, Dict, Iterator, List
+from .couchbase_client import CouchbaseClient, CouchbaseQuery, PreparedStatement, statements
 from .couchbase_config import CouchbaseConfig
 
+# Indexes created by older versions and replaced by the keyset indexes below. They are
+# dropped once their replacements exist: CREATE INDEX IF NOT EXISTS never redefines them.
+SUPERSEDED_INDEXES = (
+    "idx_upload_user", "idx_analysis_status", "idx_upload_user_keyset", "idx_analysis_status_keyset",
+)
+
 
 def create_indexes() -> bool:
     """Create N1QL indexes for common queries.
@@ -17,10 +23,10 @@ def create_indexes() -> bool:
         ON {CouchbaseConfig.BUCKET_NAME}(META().id)
         """,
         
-        # Index on user uploads
+        # Index on user uploads (created_at DESC + META().id DESC: newest-first keyset pages)
         f"""
-        CREATE INDEX IF NOT EXISTS idx_upload_user 
-        ON {CouchbaseConfig.BUCKET_NAME}(user_id)
+        CREATE INDEX IF NOT EXISTS idx_upload_user_created 
+        ON {CouchbaseConfig.BUCKET_NAME}(user_id, created_at DESC, META().id DESC)
         WHERE META().id LIKE 'upload::%'
         """,
         
@@ -31,10 +37,10 @@ def create_indexes() -> bool:
         WHERE META().id LIKE 'analysis::%'
         """,
         
-        # Index on analysis status
+        # Index on analysis status (created_at DESC + META().id DESC: newest-first keyset pages)
         f"""
-        CREATE INDEX IF NOT EXISTS idx_analysis_status 
-        ON {CouchbaseConfig.BUCKET_NAME}(status)
+        CREATE INDEX IF NOT EXISTS idx_analysis_status_created 
+        ON {CouchbaseConfig.BUCKET_NAME}(status, created_at DESC, META().id DESC)
         WHERE META().id LIKE 'analysis::%'
         """,
     ]
@@ -43,15 +49,150 @@ def create_indexes() -> bool:
     
     for idx_sql in indexes:
         try:
-            cluster.query(idx_sql)
-            print(f"✓ Index created: {idx_sql.split()[-3]}")
+            cluster.query(idx_sql).execute()  # queries are lazy until executed
+            print(f"✓ Index created: {idx_sql.split()[5]}")
         except Exception as e:
             print(f"✗ Index creation failed: {e}")
             return False
     
+    for name in SUPERSEDED_INDEXES:
+        try:
+            cluster.query(f"DROP INDEX IF EXISTS {name} ON {CouchbaseConfig.BUCKET_NAME}").execute()
+            print(f"✓ Superseded index dropped: {name}")
+        except Exception as e:
+            print(f"✗ Index drop failed: {e}")
+            return False
+    
     return True
 
 
+def _operators(plan: Any) -> Iterator[Dict[str, Any]]:
+    """Yield every operator node of an EXPLAIN plan, depth first."""
+    if isinstance(plan, dict):
+        if "#operator" in plan:
+            yield plan
+        for value in plan.values():
+            yield from _operators(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _operators(item)
+
+
+def check_plan(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Summarize an EXPLAIN plan and flag the patterns we do not want.
+    
+    Args:
+        plan: The 'plan' object of an EXPLAIN result row
+    
+    Returns:
+        Dict with the indexes used and a list of problems:
+            - primary scan: the query scans the whole bucket
+            - fetch without index limit: every matching document is fetched
+              before LIMIT applies
+            - in-memory sort: ORDER BY is not satisfied by index order
+    """
+    ops = list(_operators(plan))
+    names = {op["#operator"] for op in ops}
+    scans = [op for op in ops if op["#operator"].startswith(("IndexScan", "PrimaryScan"))]
+    problems = []
+    if any(op["#operator"].startswith("PrimaryScan") for op in ops):
+        problems.append("primary scan")
+    if "Fetch" in names and not any("limit" in op for op in scans):
+        problems.append("fetch without index limit")
+    if "Order" in names:
+        problems.append("in-memory sort")
+    return {
+        "indexes": sorted({op.get("index", "#primary") for op in scans}),
+        "covering": bool(scans) and all("covers" in op for op in scans),
+        "problems": problems,
+    }
+
+
+def explain_statement(statement: PreparedStatement) -> Dict[str, Any]:
+    """Run EXPLAIN for a registered statement and check its plan."""
+    rows = CouchbaseClient.get_cluster().query(f"EXPLAIN {statement.sql}").rows()
+    return check_plan(next(iter(rows))["plan"])
+
+
+def explain_queries() -> bool:
+    """EXPLAIN every registered application query and report its plan.
+    
+    Returns:
+        True if no query scans the primary index, False otherwise
+    """
+    ok = True
+    for statement in statements:
+        try:
+            report = explain_statement(statement)
+        except Exception as e:
+            print(f"✗ {statement.name}: EXPLAIN failed: {e}")
+            ok = False
+            continue
+        indexes = ", ".join(report["indexes"]) or "no index"
+        covering = " (covering)" if report["covering"] else ""
+        if "primary scan" in report["problems"]:
+            ok = False
+            print(f"✗ {statement.name}: {indexes}{covering} – {', '.join(report['problems'])}")
+        elif report["problems"]:
+            print(f"⚠ {statement.name}: {indexes}{covering} – {', '.join(report['problems'])}")
+        else:
+            print(f"✓ {statement.name}: {indexes}{covering}")
+    return ok
+
+
+def _advised_statements(advice_row: Dict[str, Any]) -> List[str]:
+    """Extract CREATE INDEX statements from an ADVISE result row (covering ones first)."""
+    info = advice_row.get("advice", {}).get("adviseinfo", {})
+    recommended = info.get("recommended_indexes")
+    if not isinstance(recommended, dict):  # "No index recommendation at this time."
+        return []
+    return [
+        index["index_statement"]
+        for key in ("covering_indexes", "indexes")
+        for index in recommended.get(key, [])
+        if index.get("index_statement")
+    ]
+
+
+def advise_indexes(create: bool = False) -> bool:
+    """Ask the index advisor about every registered query and propose indexes.
+    
+    Prints the advisor's recommendations per statement.
+    
+    Args:
+        create: Also create the proposed indexes
+    
+    Returns:
+        True if advising (and creating, if requested) succeeded
+    """
+    cluster = CouchbaseClient.get_cluster()
+    proposed: Dict[str, None] = {}  # advisor CREATE INDEX statements, in order, once each
+    ok = True
+    for statement in statements:
+        try:
+            row = next(iter(cluster.query(f"ADVISE {statement.sql}").rows()))
+        except Exception as e:
+            print(f"✗ {statement.name}: ADVISE failed: {e}")
+            ok = False
+            continue
+        advice = _advised_statements(row)
+        if not advice:
+            print(f"✓ {statement.name}: no recommendation")
+        for index_sql in advice:
+            print(f"ℹ {statement.name}: {index_sql}")
+            proposed.setdefault(index_sql)
+    if not create:
+        return ok
+    for index_sql in proposed:
+        try:
+            cluster.query(index_sql).execute()
+            print(f"✓ Index created: {index_sql}")
+        except Exception as e:
+            print(f"✗ Index creation failed: {e}")
+            ok = False
+    return ok
+
+
 def setup_couchbase() -> bool:
     """Complete Couchbase setup: connect and create indexes.
     
@@ -98,7 +239,19 @@ if __name__ == "__main__":
     elif len(sys.argv) > 1 and sys.argv[1] == "teardown":
         teardown_couchbase()
         sys.exit(0)
+    elif len(sys.argv) > 1 and sys.argv[1] in ("explain", "advise"):
+        CouchbaseClient.connect()
+        try:
+            if sys.argv[1] == "explain":
+                success = explain_queries()
+            else:
+                success = advise_indexes(create="--create" in sys.argv[2:])
+        finally:
+            CouchbaseClient.disconnect()
+        sys.exit(0 if success else 1)
     else:
         print("Usage:")
         print("  python -m backend.logic.couchbase_migration setup")
         print("  python -m backend.logic.couchbase_migration teardown")
+        print("  python -m backend.logic.couchbase_migration explain")
+        print("  python -m backend.logic.couchbase_migration advise [--create]")
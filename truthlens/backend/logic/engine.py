@@ -0,0 +1,183 @@
+"""Analysis execution engine for CPU-bound checks.
+
+Every (file, check) unit of an upload is dispatched to a process pool, so
+heavy checks run in parallel on other cores instead of on the event loop
+thread. The per-unit results are assembled into the fact_checks / fallacies
+/ ai_check shape that compute_breakdown consumes.
+
+Check functions run in worker processes: they must be module-level, take
+and return plain (picklable) data, and must not touch the store.
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import tracing
+from .analysis import BreakdownAccumulator
+from .app_config import AppConfig
+from .fixtures import load_fixture_analysis
+from .utils import make_id
+
+
+# --- Checks (run in worker processes) ---
+# Demo implementations backed by the analysis fixture until real checkers exist.
+
+def fact_check(file: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Fact-check the statements in a file."""
+    fixture = load_fixture_analysis() or {}
+    return [dict(fc, id=make_id("fact")) for fc in fixture.get("fact_checks", [])]
+
+
+def fallacy_check(file: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Detect logical fallacies in a file."""
+    fixture = load_fixture_analysis() or {}
+    return [dict(f, id=make_id("fallacy")) for f in fixture.get("fallacies", [])]
+
+
+def ai_generation_check(file: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Estimate how likely a file is to be AI-generated."""
+    fixture = load_fixture_analysis() or {}
+    ai_check = fixture.get("ai_check")
+    return dict(ai_check, id=make_id("ai")) if ai_check else None
+
+
+# Upload setting -> check function
+CHECKS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "fact_check": fact_check,
+    "logical_fallacy_check": fallacy_check,
+    "ai_generation_check": ai_generation_check,
+}
+
+
+def check_units(upload: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    """The (check, file) units an upload asks for: every enabled check on every file."""
+    settings = upload.get("settings") or {}
+    checks = [name for name in CHECKS if settings.get(name)]
+    return [(check, file) for file in upload.get("files") or [] for check in checks]
+
+
+def _merge_ai_checks(results: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Combine per-file AI checks: mean score, flagged if any file is flagged.
+
+    Checks without a score (score None) are left out of the mean; the score
+    is None if no check has one.
+    """
+    if not results:
+        return None
+    if len(results) == 1:
+        return results[0]
+    scores = [r.get("score", 0.0) for r in results]
+    scores = [score for score in scores if score is not None]
+    return {
+        "id": make_id("ai"),
+        "is_ai": any(r.get("is_ai") for r in results),
+        "score": sum(scores) / len(scores) if scores else None,
+        "explanation": "; ".join(r["explanation"] for r in results if r.get("explanation")),
+    }
+
+
+class AnalysisEngine:
+    """Runs check units on a process pool.
+
+    With processes=0 checks run on the default thread pool instead, which
+    avoids worker start-up cost in development and tests.
+    """
+
+    def __init__(self, processes: int = 2):
+        self.processes = processes
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.processes <= 0:
+            return None  # loop's default thread pool
+        if self._executor is None:
+            # spawn: forking a process that runs an event loop and SDK threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def run_check(self, check: str, file: Dict[str, Any]) -> Any:
+        """Run one check on one file in the pool and await its result."""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        with tracing.span("engine.check", check=check, file=file.get("name", ""), pool="process" if executor else "thread"):
+            fn = CHECKS[check]
+            if executor is None:
+                fn = tracing.bind_context(fn)  # threads share the trace; processes cannot
+            return await loop.run_in_executor(executor, fn, file)
+
+    async def analyze(
+        self,
+        upload: Dict[str, Any],
+        on_progress: Optional[Callable[[BreakdownAccumulator], None]] = None,
+    ) -> Dict[str, Any]:
+        """Run every enabled check on every file of an upload concurrently.
+
+        If a check fails, the others still pending or running are cancelled
+        before its error is raised.
+
+        Args:
+            upload: Upload document with files and settings
+            on_progress: Called with the running breakdown accumulator each
+                time a unit finishes, in completion order
+
+        Returns:
+            Dict with fact_checks, fallacies and ai_check, ready for compute_breakdown
+        """
+        units = check_units(upload)
+        results: List[Any] = [None] * len(units)
+        progress = BreakdownAccumulator()
+
+        async def run_unit(index: int) -> None:
+            check, file = units[index]
+            result = results[index] = await self.run_check(check, file)
+            if on_progress is None:
+                return
+            if check == "fact_check":
+                for fc in result:
+                    progress.add_fact_check(fc)
+            elif check == "logical_fallacy_check":
+                for f in result:
+                    progress.add_fallacy(f)
+            else:
+                progress.add_ai_check(result)
+            on_progress(progress)
+
+        tasks = [asyncio.ensure_future(run_unit(i)) for i in range(len(units))]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        fact_checks: List[Dict[str, Any]] = []
+        fallacies: List[Dict[str, Any]] = []
+        ai_checks: List[Dict[str, Any]] = []
+        for (check, _), result in zip(units, results):
+            if check == "fact_check":
+                fact_checks.extend(result)
+            elif check == "logical_fallacy_check":
+                fallacies.extend(result)
+            elif result is not None:
+                ai_checks.append(result)
+
+        return {
+            "fact_checks": fact_checks,
+            "fallacies": fallacies,
+            "ai_check": _merge_ai_checks(ai_checks),
+        }
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+# Shared engine used by the analysis workers
+analysis_engine = AnalysisEngine(processes=AppConfig.ANALYSIS_PROCESSES)
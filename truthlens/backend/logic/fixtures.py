@@ -1,19 +1,54 @@
 """Fixture loading for demo analysis data."""
 import json
-from typing import Optional, Dict, Any
+import os
+from pathlib import Path
+from typing import Optional, Dict, Any, Tuple
 
+from . import tracing
 
-def load_fixture_analysis() -> Optional[Dict[str, Any]]:
+# backend/fixtures/analysis_example.json, independent of the working directory
+FIXTURE_ANALYSIS_PATH = Path(__file__).resolve().parent.parent / "fixtures" / "analysis_example.json"
+
+# (resolved path, mtime_ns) -> raw fixture text
+_fixture_cache: Dict[Tuple[str, int], str] = {}
+
+
+def clear_fixture_cache() -> None:
+    """Forget all cached fixture files."""
+    _fixture_cache.clear()
+
+
+def _read_cached(path: Path) -> str:
+    """Return the file's text, re-reading it only when its mtime changes."""
+    resolved = str(path.resolve())
+    key = (resolved, os.stat(resolved).st_mtime_ns)
+    text = _fixture_cache.get(key)
+    if text is None:
+        with open(resolved, "r", encoding="utf-8") as fh:
+            text = fh.read()
+        # drop stale versions of this file before caching the new one
+        for stale in [k for k in _fixture_cache if k[0] == resolved]:
+            del _fixture_cache[stale]
+        _fixture_cache[key] = text
+    return text
+
+
+@tracing.traced("fixtures.load_analysis")
+def load_fixture_analysis(path: Optional[Path] = None) -> Optional[Dict[str, Any]]:
     """Load demo analysis fixture from JSON file.
-    
+
     Used as fallback data when no real analysis backend is available.
-    Attempts to load from backend/fixtures/analysis_example.json.
-    
+    Loads backend/fixtures/analysis_example.json unless another path is given.
+
+    The file is read once per modification and cached; every call parses a
+    fresh document from the cached text, so callers may patch the result in
+    place without affecting other callers. Parsing the cached text is cheaper
+    than deep-copying an already parsed document.
+
     Returns:
         Parsed JSON dict if file exists, None otherwise
     """
     try:
-        with open("backend/fixtures/analysis_example.json", "r", encoding="utf-8") as fh:
-            return json.load(fh)
+        return json.loads(_read_cached(path or FIXTURE_ANALYSIS_PATH))
     except Exception:
         return None
@@ -0,0 +1,353 @@
+"""Background analysis jobs.
+
+`startAnalysis` only creates a pending analysis document and enqueues a job;
+a pool of worker tasks in the app process then moves the analysis through
+running -> ready / failed, saving the document and publishing a subscription
+event on every transition.
+
+No analysis is left running for good: if a transition cannot be saved the
+analysis is marked failed (best effort) and a failed event is published
+anyway; one interrupted by stop() goes back to pending, and recover()
+requeues pending and running analyses when the app starts.
+"""
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from . import metrics, store, tracing
+from .analysis import BreakdownAccumulator, compute_breakdown
+from .app_config import AppConfig
+from .engine import analysis_engine, check_units
+from .fixtures import load_fixture_analysis
+from .pubsub import analysis_events
+from .utils import make_etag, make_id, now_iso
+
+# Analysis status values
+PENDING = "pending"
+RUNNING = "running"
+READY = "ready"
+FAILED = "failed"
+TERMINAL_STATUSES = (READY, FAILED)
+
+
+class AnalysisJob(NamedTuple):
+    """A queued analysis run."""
+    analysis_id: str
+    upload_id: str
+    enqueued_at: float  # time.monotonic() at submission
+    trace: Optional[tracing.Span] = None  # span of the submitting request, if it was sampled
+
+
+class QueueFullError(Exception):
+    """Raised when the analysis queue has no room for another job."""
+
+
+def new_analysis_doc(analysis_id: str, upload_id: str) -> Dict[str, Any]:
+    """Build the pending analysis document created by startAnalysis."""
+    return {
+        "id": analysis_id,
+        "upload_id": upload_id,
+        "created_at": now_iso(),
+        "status": PENDING,
+        "started_at": None,
+        "finished_at": None,
+        "summary": None,
+        "breakdown": None,
+        "fact_checks": [],
+        "fallacies": [],
+        "ai_check": None,
+        "error": None,
+    }
+
+
+def _fallback_analysis() -> Dict[str, Any]:
+    """Analysis of an upload with nothing to check (no files or no enabled checks).
+
+    The demo fixture's results where available, otherwise an empty analysis
+    with a placeholder AI check.
+    """
+    fixture = load_fixture_analysis()
+    if fixture:
+        fact_checks = fixture.get("fact_checks", [])
+        fallacies = fixture.get("fallacies", [])
+        ai_check = fixture.get("ai_check", {})
+        return {
+            "summary": fixture.get("summary"),
+            "breakdown": compute_breakdown(fact_checks, fallacies, ai_check),
+            "fact_checks": fact_checks,
+            "fallacies": fallacies,
+            "ai_check": ai_check,
+        }
+    return {
+        "summary": {"fact_checks": 0, "fallacies": 0, "ai_score": None},
+        "breakdown": {
+            "fact_check_score": None,
+            "logical_fallacy_score": None,
+            "ai_generation_score": None,
+            "overall_credibility_score": None,
+        },
+        "fact_checks": [],
+        "fallacies": [],
+        "ai_check": {"id": make_id("ai"), "is_ai": False, "score": 0.0, "explanation": "placeholder"},
+    }
+
+
+async def compute_analysis(
+    upload: Dict[str, Any],
+    on_progress: Optional[Callable[[BreakdownAccumulator], None]] = None,
+) -> Dict[str, Any]:
+    """Produce the analysis detail fields for an upload.
+
+    The checks enabled in the upload settings run on the analysis engine's
+    process pool, one unit per (file, check). An upload with no units (no
+    files, or no check enabled) gets _fallback_analysis() instead.
+
+    Args:
+        upload: Upload document to analyze
+        on_progress: Passed to AnalysisEngine.analyze for live partial scores
+
+    Returns:
+        Dict with summary, breakdown, fact_checks, fallacies and ai_check
+    """
+    if not check_units(upload):
+        return _fallback_analysis()
+    results = await analysis_engine.analyze(upload, on_progress)
+    fact_checks = results["fact_checks"]
+    fallacies = results["fallacies"]
+    ai_check = results["ai_check"]
+    return {
+        "summary": {
+            "fact_checks": len(fact_checks),
+            "fallacies": len(fallacies),
+            "ai_score": ai_check.get("score") if ai_check else None,
+        },
+        "breakdown": compute_breakdown(fact_checks, fallacies, ai_check),
+        "fact_checks": fact_checks,
+        "fallacies": fallacies,
+        "ai_check": ai_check,
+    }
+
+
+async def _transition(doc: Dict[str, Any], status: str, **fields: Any) -> None:
+    """Save an analysis in a new status and notify subscribers of its upload.
+
+    `doc` is run_analysis's working copy; it is updated once the change is saved.
+    """
+    # etag set here rather than by the store, so the published snapshot carries it
+    fields = dict(fields, status=status, etag=make_etag())
+    await store.patch_analysis(doc["id"], fields)
+    doc.update(fields)
+    # publish a snapshot so queued events keep the status they were sent with
+    analysis_events.publish(str(doc["upload_id"]), dict(doc), final=status in TERMINAL_STATUSES)
+
+
+async def _fail(doc: Dict[str, Any], error: str) -> None:
+    """Best effort: mark an analysis failed after one of its transitions could not be saved.
+
+    The failed event is published even if this save fails too, so
+    subscribers waiting for a final status are released.
+    """
+    fields = {"status": FAILED, "finished_at": now_iso(), "error": error, "etag": make_etag()}
+    doc.update(fields)
+    try:
+        await store.patch_analysis(doc["id"], fields)
+    except Exception as e:
+        print(f"⚠ Could not mark analysis {doc['id']} failed: {e}")
+    analysis_events.publish(str(doc["upload_id"]), dict(doc), final=True)
+
+
+async def _reset(doc: Dict[str, Any]) -> None:
+    """Best effort: put an analysis interrupted by shutdown back to pending for recover()."""
+    fields = {"status": PENDING, "started_at": None, "etag": make_etag()}
+    try:
+        await store.patch_analysis(doc["id"], fields, expected={"status": RUNNING})
+    except Exception as e:
+        print(f"⚠ Could not requeue interrupted analysis {doc['id']}: {e}")
+        return
+    doc.update(fields)
+
+
+def _publish_progress(doc: Dict[str, Any], progress: BreakdownAccumulator) -> None:
+    """Notify subscribers of the partial breakdown of a running analysis.
+
+    Progress events are only published, not saved; the stored document keeps
+    breakdown None until the analysis is ready.
+    """
+    analysis_events.publish(str(doc["upload_id"]), dict(doc, breakdown=progress.breakdown()))
+
+
+async def run_analysis(analysis_id: str, upload_id: str) -> Optional[Dict[str, Any]]:
+    """Carry one analysis from pending to ready (or failed).
+
+    Returns:
+        The final analysis document, or None if it was deleted before running
+    """
+    doc = await store.get_analysis(analysis_id)
+    if doc is None:
+        return None
+    doc = dict(doc)  # our working copy; every change is saved with store.patch_analysis
+    try:
+        await _transition(doc, RUNNING, started_at=now_iso())
+        try:
+            upload = await store.get_upload(upload_id)
+            if upload is None:
+                raise Exception("Upload not found")
+            result = await compute_analysis(upload, lambda progress: _publish_progress(doc, progress))
+        except Exception as e:
+            await _transition(doc, FAILED, finished_at=now_iso(), error=str(e))
+        else:
+            await _transition(doc, READY, finished_at=now_iso(), **result)
+    except asyncio.CancelledError:
+        if doc["status"] == RUNNING:
+            await _reset(doc)
+        raise
+    except Exception as e:
+        print(f"⚠ Could not save analysis {analysis_id}: {e}")
+        await _fail(doc, f"Could not save analysis: {e}")
+
+    # only if the upload has not been re-linked to a newer analysis meanwhile
+    await store.patch_upload(upload_id, {"status": doc["status"]}, expected={"analysis_id": analysis_id})
+    return doc
+
+
+QUEUE_WAIT_SECONDS = metrics.histogram(
+    "truthlens_analysis_queue_wait_seconds",
+    "Time analysis jobs waited in the queue for a worker",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+RUN_SECONDS = metrics.histogram(
+    "truthlens_analysis_run_seconds",
+    "Time from a worker picking an analysis job to its final status",
+    ("status",),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+
+
+class AnalysisJobQueue:
+    """Bounded job queue drained by a fixed number of worker tasks.
+
+    Workers are started lazily on the running event loop by the first
+    submit (or explicitly by start()), and restarted if the loop changes.
+    """
+
+    def __init__(self, workers: int = 4, max_pending: int = 1000):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._queue: Optional["asyncio.Queue[AnalysisJob]"] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        self._ensure_started()
+
+    async def stop(self) -> None:
+        """Cancel the workers.
+
+        Analyses being run go back to pending; they and the jobs still queued
+        are picked up by recover() on the next start.
+        """
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._queue = None
+        self._loop = None
+
+    async def recover(self) -> int:
+        """Requeue the analyses a previous process left pending or running.
+
+        Those are jobs it had queued, or was running when it stopped or
+        crashed. Analyses that do not fit in the queue are marked failed.
+
+        Returns:
+            Number of analyses requeued
+        """
+        stranded: List[Dict[str, Any]] = []
+        for status in (RUNNING, PENDING):
+            # collected first: requeued analyses change status, which would shift the pages
+            after = None
+            while True:
+                page = await store.list_analyses_by_status(status, first=AppConfig.MAX_PAGE_SIZE, after=after)
+                stranded.extend(page.items)
+                if not page.has_next_page:
+                    break
+                after = page.end_cursor
+        requeued = 0
+        for doc in stranded:
+            try:
+                self.submit(str(doc["id"]), str(doc["upload_id"]))
+                requeued += 1
+            except QueueFullError:
+                await _fail(dict(doc), "Analysis queue was full when it was recovered after a restart")
+        return requeued
+
+    def submit(self, analysis_id: str, upload_id: str) -> AnalysisJob:
+        """Enqueue an analysis run without waiting for it.
+
+        Raises:
+            QueueFullError: If max_pending jobs are already waiting
+        """
+        self._ensure_started()
+        job = AnalysisJob(analysis_id, upload_id, time.monotonic(), tracing.current())
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError("Analysis queue is full, try again later")
+        return job
+
+    async def join(self) -> None:
+        """Wait until every submitted job has finished."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    @property
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _worker(self) -> None:
+        # started by the first submit, possibly inside a traced request
+        tracing.detach()
+        queue = self._queue
+        while True:
+            job = await queue.get()
+            started = time.monotonic()
+            QUEUE_WAIT_SECONDS.observe(started - job.enqueued_at)
+            status = "crashed"
+            # a child of the request that submitted the job, exported when the job ends
+            span = tracing.span(
+                "analysis.job", parent=job.trace,
+                analysis_id=job.analysis_id, queue_wait_ms=round((started - job.enqueued_at) * 1000, 3),
+            )
+            try:
+                with span:
+                    doc = await run_analysis(job.analysis_id, job.upload_id)
+                    status = doc["status"] if doc is not None else "deleted"
+                    span.set(status=status)
+            except Exception as e:
+                print(f"Analysis job {job.analysis_id} crashed: {e}")
+            finally:
+                RUN_SECONDS.labels(status).observe(time.monotonic() - started)
+                queue.task_done()
+
+
+# Shared queue used by the GraphQL mutations
+analysis_jobs = AnalysisJobQueue(
+    workers=AppConfig.ANALYSIS_WORKERS,
+    max_pending=AppConfig.ANALYSIS_QUEUE_SIZE,
+)
+
+metrics.gauge(
+    "truthlens_analysis_queue_depth",
+    "Analysis jobs waiting for a worker",
+    lambda: analysis_jobs.depth,
+)
@@ -1,29 +1,106 @@
 """Application lifecycle management - startup and shutdown hooks."""
-from .couchbase_client import CouchbaseClient
+import asyncio
+import gc
+
+from . import resilience, store, tracing
+from .app_config import STORAGE_BACKENDS, AppConfig
+from .couchbase_client import CouchbaseClient, AsyncCouchbaseClient, CouchbaseQuery, AsyncCouchbaseQuery
 from .couchbase_config import CouchbaseConfig
+from .engine import analysis_engine
+from .jobs import analysis_jobs
+from .sqlite_backend import SQLiteBackend
+from .storage import CouchbaseBackend
+
+
+async def _connect_couchbase(required: bool = False) -> bool:
+    """Connect the configured Couchbase client; False if the cluster is unreachable.
+    
+    Raises:
+        RuntimeError: If `required` and the cluster is unreachable
+    """
+    try:
+        print("Connecting to Couchbase...")
+        if CouchbaseConfig.ASYNC_CLIENT:
+            await AsyncCouchbaseClient.connect()
+            resilience.recovery_probe.start(AsyncCouchbaseQuery.probe)
+        else:
+            CouchbaseClient.connect()
+            resilience.recovery_probe.start(lambda: asyncio.to_thread(CouchbaseQuery.probe))
+        print("✓ Couchbase connected")
+        return True
+    except Exception as e:
+        print(f"⚠ Couchbase connection failed: {e}")
+        if required:
+            raise RuntimeError(f"STORAGE_BACKEND=couchbase but the cluster is unreachable: {e}") from e
+        print("  Falling back to in-memory storage")
+        return False
+
+
+async def _restore_memory_log() -> None:
+    """Restore the in-memory backend from MEMORY_LOG_DIR with the cyclic GC paused.
+
+    Restoring creates millions of objects, which would trigger repeated full
+    collections rescanning everything restored so far; none of it forms
+    cycles. Collection resumes as normal once the restore is done.
+    """
+    gc.disable()
+    try:
+        restored = await store.persist_memory(AppConfig.MEMORY_LOG_DIR)
+    finally:
+        gc.enable()
+    print(
+        f"✓ Using in-memory storage logged to {AppConfig.MEMORY_LOG_DIR}: restored "
+        f"{restored['documents']} documents ({restored['replayed']} log records) in {restored['seconds']}s"
+    )
 
 
 async def on_startup() -> None:
     """Initialize services on application startup."""
     print("\n=== Application Startup ===")
     
-    if CouchbaseConfig.USE_COUCHBASE:
-        try:
-            print("Connecting to Couchbase...")
-            CouchbaseClient.connect()
-            print("✓ Couchbase connected")
-        except Exception as e:
-            print(f"⚠ Couchbase connection failed: {e}")
-            print("  Falling back to in-memory storage")
-    else:
-        print("ℹ Using in-memory storage (set USE_COUCHBASE=true to use Couchbase)")
+    if AppConfig.STORAGE_BACKEND not in STORAGE_BACKENDS:
+        # a typo must not silently fall back to memory and lose every write on restart
+        raise ValueError(
+            f"Unknown STORAGE_BACKEND {AppConfig.STORAGE_BACKEND!r} (expected one of {', '.join(STORAGE_BACKENDS)})"
+        )
+    if AppConfig.STORAGE_BACKEND == "sqlite":
+        store.use_backend(SQLiteBackend(AppConfig.SQLITE_PATH))
+        print(f"✓ Using SQLite storage: {AppConfig.SQLITE_PATH}")
+    elif AppConfig.STORAGE_BACKEND == "couchbase":
+        await _connect_couchbase(required=True)
+        store.use_backend(CouchbaseBackend())
+    elif AppConfig.STORAGE_BACKEND == "auto" and CouchbaseConfig.USE_COUCHBASE:
+        if await _connect_couchbase():
+            store.use_backend(CouchbaseBackend())
+    
+    if store.backend_name() == "memory":
+        if AppConfig.MEMORY_LOG_DIR:
+            await _restore_memory_log()
+        else:
+            print("ℹ Using in-memory storage (set USE_COUCHBASE=true, STORAGE_BACKEND=sqlite or MEMORY_LOG_DIR to persist)")
+    
+    await analysis_jobs.start()
+    print(f"✓ Started {analysis_jobs.workers} analysis workers")
+    recovered = await analysis_jobs.recover()
+    if recovered:
+        print(f"✓ Requeued {recovered} analyses left pending or running by the previous run")
+    if tracing.tracer.enabled:
+        print(f"✓ Tracing {tracing.tracer.sample_rate:.0%} of requests to {tracing.tracer.path} ({tracing.tracer.format})")
 
 
 async def on_shutdown() -> None:
     """Cleanup resources on application shutdown."""
     print("\n=== Application Shutdown ===")
     
+    await analysis_jobs.stop()
+    analysis_engine.shutdown()
+    await resilience.recovery_probe.stop()
+    await store.close()
+    
+    if AsyncCouchbaseClient.is_connected():
+        await AsyncCouchbaseClient.disconnect()
     if CouchbaseClient.is_connected():
         CouchbaseClient.disconnect()
+    tracing.tracer.close()
     
     print("✓ Shutdown complete")
@@ -0,0 +1,429 @@
+"""Append-only change log and compacted snapshots for the in-memory backend.
+
+With AppConfig.MEMORY_LOG_DIR set, MemoryBackend survives restarts without
+a database. The directory holds generation-numbered files:
+
+- snapshot-<gen>.tls: every document as of the start of generation <gen>
+- log-<gen>.tls: changes made since then, one record per put or delete
+  (a patch is logged as the resulting document)
+
+Every write appends a record to the newest log. Once the log grows past
+`compact_bytes` the backend compacts: writes move to a new generation's log
+while a worker thread writes that generation's snapshot from the documents
+in memory. Replaying a record twice is harmless, so it does not matter if
+the snapshot already holds some of the new log's changes.
+
+Startup memory-maps the newest complete snapshot and reads only its index
+columns (types, IDs, offsets, index entries); document bodies stay
+in the mapping as memory_store.LazyDoc and are decoded on first access.
+The logs from the snapshot's generation on are then replayed. A record torn
+by a crash fails its CRC check and is truncated away with everything after
+it.
+
+Records are encoded by the caller and written by a writer thread, so no
+file I/O happens on the event loop. put() and delete() return a future
+that completes once the record is written unbuffered (it then survives a
+process crash); with fsync=True, once it is also flushed to disk (survives
+power loss). Records queued while the writer is busy are written and
+fsynced together, so concurrent writes share one fsync. Offsets are stored
+in native byte order, so a directory is not portable across architectures.
+"""
+import array
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+from concurrent.futures import Future
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from .memory_store import LazyDoc
+
+_SNAPSHOT_MAGIC = b"TLSNAP2\n"
+_SNAPSHOT_V1_MAGIC = b"TLSNAP1\n"  # index entries were the indexed field value alone
+_LOG_MAGIC = b"TLLOG01\n"
+_FOOTER = struct.Struct("<Q")  # length of the JSON footer, at the very end of a snapshot
+_RECORD = struct.Struct("<IIB")  # payload length, CRC32 of op + payload, op
+_PUT, _DELETE = 1, 2
+_FILE = re.compile(r"^(snapshot|log)-(\d{8})\.tls$")
+
+# Column encoding for IDs and indexed values: newline-separated strings, with
+# None and anything that is not a plain single-line string escaped
+_NONE = "\x00"
+_JSON = "\x01"
+
+
+class Record(NamedTuple):
+    """A replayed change: doc is None for a delete."""
+    doc_type: str
+    doc_id: str
+    doc: Optional[Dict[str, Any]]
+
+
+class Snapshot(NamedTuple):
+    """Documents of a snapshot, still encoded (LazyDoc.value is the stored index entry).
+
+    version is 1 for snapshots written before index entries held more than
+    the indexed field value.
+    """
+    rows: List[Tuple[str, str, LazyDoc]]
+    generation: int
+    version: int = 2
+
+
+def _encode(value: Any) -> str:
+    if value is None:
+        return _NONE
+    if isinstance(value, str) and "\n" not in value and not value.startswith((_NONE, _JSON)):
+        return value
+    return _JSON + json.dumps(value)
+
+
+def _decode_column(blob: bytes, count: int) -> List[Any]:
+    if not count:
+        return []
+    values: List[Any] = blob.decode("utf-8").split("\n")
+    if _NONE in values or any(value[:1] == _JSON for value in values):
+        values = [
+            None if value == _NONE else json.loads(value[1:]) if value[:1] == _JSON else value
+            for value in values
+        ]
+    return values
+
+
+def _dumps(doc: Dict[str, Any]) -> bytes:
+    return json.dumps(doc, separators=(",", ":")).encode("utf-8")
+
+
+def _fsync_dir(directory: str) -> None:
+    # makes renames and new files durable; directories cannot be opened on Windows
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class DocumentLog:
+    """Change log and snapshots of MemoryBackend in one directory."""
+
+    def __init__(self, directory: str, compact_bytes: int = 64 * 1024 * 1024, fsync: bool = False):
+        """Use (creating if needed) `directory`; call load() before logging changes.
+
+        Args:
+            directory: Where snapshots and logs are kept
+            compact_bytes: Log size past which should_compact() is true
+            fsync: Flush every record to disk, not just to the OS
+        """
+        self.directory = directory
+        self.compact_bytes = compact_bytes
+        self.fsync = fsync
+        self.generation = 0
+        self.records = 0
+        self.compactions = 0
+        self._log: Optional[BinaryIO] = None
+        self._log_bytes = 0
+        self._snapshot_mmap: Optional[mmap.mmap] = None
+        # writer thread state: records (bytes) and generation switches (int) not yet
+        # written, the future of that batch and of the batch being written
+        self._cond = threading.Condition()
+        self._pending: List[Union[bytes, int]] = []
+        self._done: Future = Future()
+        self._writing: Optional[Future] = None
+        self._closing = False
+        self._writer: Optional[threading.Thread] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, kind: str, generation: int) -> str:
+        return os.path.join(self.directory, f"{kind}-{generation:08d}.tls")
+
+    def _files(self) -> Dict[str, List[int]]:
+        found: Dict[str, List[int]] = {"snapshot": [], "log": []}
+        for name in os.listdir(self.directory):
+            match = _FILE.match(name)
+            if match:
+                found[match.group(1)].append(int(match.group(2)))
+        return {kind: sorted(generations) for kind, generations in found.items()}
+
+    # --- startup ---
+
+    def load(self) -> Tuple[Snapshot, List[Record]]:
+        """Map the newest snapshot and read the logs written since; opens the log for appending.
+
+        Files of older generations and unfinished snapshots are removed.
+
+        Returns:
+            (snapshot, records to replay on top of it, oldest first)
+        """
+        files = self._files()
+        base = files["snapshot"][-1] if files["snapshot"] else 0
+        snapshot = self._read_snapshot(base) if files["snapshot"] else Snapshot([], 0)
+        records: List[Record] = []
+        logs = [generation for generation in files["log"] if generation >= base]
+        for generation in logs:
+            records.extend(self._read_log(generation))
+        self.generation = logs[-1] if logs else base
+        self._open_log(self.generation)
+        self._log_bytes = self._log.tell()
+        self._writer = threading.Thread(target=self._write_loop, name="memory-log-writer", daemon=True)
+        self._writer.start()
+        self._remove_before(base)
+        for name in os.listdir(self.directory):
+            if name.endswith(".tls.tmp"):
+                os.remove(os.path.join(self.directory, name))  # snapshots interrupted by a crash
+        return snapshot, records
+
+    def _read_snapshot(self, generation: int) -> Snapshot:
+        with open(self._path("snapshot", generation), "rb") as f:
+            # the mapping outlives the file object; LazyDocs keep it alive
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (footer_len,) = _FOOTER.unpack_from(mm, len(mm) - _FOOTER.size)
+        footer = json.loads(mm[len(mm) - _FOOTER.size - footer_len:len(mm) - _FOOTER.size])
+        count = footer["count"]
+
+        def section(name: str) -> bytes:
+            start, length = footer["sections"][name]
+            return mm[start:start + length]
+
+        types = [footer["types"][code] for code in section("types")]
+        ids = _decode_column(section("ids"), count)
+        values = _decode_column(section("values"), count)
+        offsets = array.array("Q")
+        offsets.frombytes(section("offsets"))
+        lengths = array.array("I")
+        lengths.frombytes(section("lengths"))
+        self._snapshot_mmap = mm
+        rows = [
+            (doc_type, doc_id, LazyDoc(mm, offset, length, value))
+            for doc_type, doc_id, offset, length, value in zip(types, ids, offsets, lengths, values)
+        ]
+        return Snapshot(rows, generation, 1 if mm[:len(_SNAPSHOT_V1_MAGIC)] == _SNAPSHOT_V1_MAGIC else 2)
+
+    def _read_log(self, generation: int) -> List[Record]:
+        path = self._path("log", generation)
+        with open(path, "rb") as f:
+            data = f.read()
+        records: List[Record] = []
+        pos = len(_LOG_MAGIC) if data.startswith(_LOG_MAGIC) else 0
+        while pos and pos + _RECORD.size <= len(data):
+            length, crc, op = _RECORD.unpack_from(data, pos)
+            end = pos + _RECORD.size + length
+            payload = data[pos + _RECORD.size:end]
+            if end > len(data) or zlib.crc32(bytes((op,)) + payload) != crc:
+                break
+            fields = json.loads(payload)
+            records.append(Record(fields[0], fields[1], fields[2] if op == _PUT else None))
+            pos = end
+        if pos != len(data):
+            print(f"⚠ Truncating torn tail of {path} at byte {pos}")
+            with open(path, "r+b") as f:
+                if pos:
+                    f.truncate(pos)
+                else:
+                    f.truncate(0)
+                    f.write(_LOG_MAGIC)
+        return records
+
+    def _remove_before(self, generation: int) -> None:
+        for kind, generations in self._files().items():
+            for old in generations:
+                if old < generation:
+                    try:
+                        os.remove(self._path(kind, old))
+                    except OSError:
+                        pass  # still mapped (Windows); removed on the next start
+
+    # --- logging ---
+
+    def _open_log(self, generation: int) -> None:
+        path = self._path("log", generation)
+        log = open(path, "ab", buffering=0)
+        if log.tell() == 0:
+            log.write(_LOG_MAGIC)
+        if self._log is not None:
+            self._log.close()
+        self._log = log
+
+    def _write_loop(self) -> None:
+        """Writer thread: write queued records batch by batch until closed."""
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, []
+                done, self._done = self._done, Future()
+                self._writing = done
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                done.set_exception(e)
+            else:
+                done.set_result(None)
+            with self._cond:
+                if self._writing is done:
+                    self._writing = None
+
+    def _write_batch(self, batch: List[Union[bytes, int]]) -> None:
+        chunk = bytearray()
+        for item in batch:
+            if isinstance(item, int):  # rotate(): later records go to this generation's log
+                self._write(chunk)
+                chunk = bytearray()
+                self._open_log(item)
+            else:
+                chunk += item
+        self._write(chunk)
+
+    def _write(self, chunk: bytearray) -> None:
+        # whole records only, so a crash can only tear the tail
+        view = memoryview(chunk)
+        while view:
+            view = view[self._log.write(view):]
+        if chunk and self.fsync:
+            os.fsync(self._log.fileno())
+
+    def _enqueue(self, item: Union[bytes, int]) -> Future:
+        with self._cond:
+            if self._writer is None:
+                raise RuntimeError("DocumentLog.load() must be called before logging changes")
+            self._pending.append(item)
+            self._cond.notify()
+            return self._done
+
+    def _append(self, op: int, payload: bytes) -> Future:
+        header = _RECORD.pack(len(payload), zlib.crc32(bytes((op,)) + payload), op)
+        done = self._enqueue(header + payload)
+        self._log_bytes += len(header) + len(payload)
+        self.records += 1
+        return done
+
+    def put(self, doc_type: str, doc_id: str, doc: Dict[str, Any]) -> Future:
+        """Log that a document was saved; the future completes once the record is written."""
+        return self._append(_PUT, _dumps([doc_type, doc_id, doc]))
+
+    def delete(self, doc_type: str, doc_id: str) -> Future:
+        """Log that a document was deleted; the future completes once the record is written."""
+        return self._append(_DELETE, _dumps([doc_type, doc_id]))
+
+    def flush(self) -> None:
+        """Block until every record logged so far is written.
+
+        Raises:
+            OSError: If writing the last batch failed
+        """
+        with self._cond:
+            done = self._done if self._pending else self._writing
+        if done is not None:
+            done.result()
+
+    def should_compact(self) -> bool:
+        """Whether the current log has grown past compact_bytes."""
+        return self._log_bytes > self.compact_bytes
+
+    # --- compaction ---
+
+    def rotate(self) -> int:
+        """Start the next generation's log; returns the generation whose snapshot to write."""
+        self.generation += 1
+        self._enqueue(self.generation)
+        self._log_bytes = len(_LOG_MAGIC)
+        return self.generation
+
+    def write_snapshot(
+        self,
+        generation: int,
+        rows: Iterable[Tuple[str, str, Any]],
+        value_of: Callable[[str, Dict[str, Any]], Any],
+    ) -> int:
+        """Write the snapshot of `generation` and drop the files it supersedes.
+
+        Blocking; run it in a worker thread.
+
+        Args:
+            generation: As returned by rotate()
+            rows: (doc_type, doc_id, document or LazyDoc); documents must not
+                be mutated while this runs
+            value_of: Index entry of a decoded document (stored so loading
+                can index documents without decoding them)
+
+        Returns:
+            Number of documents written
+        """
+        rows = sorted(rows, key=lambda row: (row[0], row[1]))
+        path = self._path("snapshot", generation)
+        tmp = path + ".tmp"
+        type_codes: Dict[str, int] = {}
+        ids: List[str] = []
+        values: List[str] = []
+        codes = bytearray()
+        offsets = array.array("Q")
+        lengths = array.array("I")
+        with open(tmp, "wb") as f:
+            f.write(_SNAPSHOT_MAGIC)
+            pos = len(_SNAPSHOT_MAGIC)
+            for doc_type, doc_id, doc in rows:
+                if type(doc) is LazyDoc:
+                    body, value = doc.raw(), doc.value
+                else:
+                    body, value = _dumps(doc), value_of(doc_type, doc)
+                f.write(body)
+                offsets.append(pos)
+                lengths.append(len(body))
+                pos += len(body)
+                codes.append(type_codes.setdefault(doc_type, len(type_codes)))
+                ids.append(_encode(doc_id))
+                values.append(_encode(value))
+            sections = {}
+            for name, blob in (
+                ("types", bytes(codes)),
+                ("ids", "\n".join(ids).encode("utf-8")),
+                ("values", "\n".join(values).encode("utf-8")),
+                ("offsets", offsets.tobytes()),
+                ("lengths", lengths.tobytes()),
+            ):
+                f.write(blob)
+                sections[name] = [pos, len(blob)]
+                pos += len(blob)
+            footer = json.dumps({"count": len(rows), "types": list(type_codes), "sections": sections}).encode()
+            f.write(footer + _FOOTER.pack(len(footer)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        _fsync_dir(self.directory)
+        self.compactions += 1
+        self.flush()  # the older logs' last records are written before those files go
+        self._remove_before(generation)
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        """Generation, current log size and counters."""
+        return {
+            "directory": self.directory,
+            "generation": self.generation,
+            "log_bytes": self._log_bytes,
+            "records": self.records,
+            "compactions": self.compactions,
+            "fsync": self.fsync,
+        }
+
+    def close(self) -> None:
+        """Write what is still queued and close the current log (mapped snapshot bodies stay readable).
+
+        Blocking; run it in a worker thread from the event loop.
+        """
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+        if self._log is not None:
+            self._log.close()
+            self._log = None
@@ -0,0 +1,397 @@
+"""Bounded, sharded in-memory document store.
+
+Backs MemoryBackend (storage.py). Documents are spread over N shards by
+hash of (type, ID); each shard has its own lock and LRU order, so worker
+threads touching different documents rarely contend. A budget of entries
+and/or (approximate, JSON-encoded) bytes is split evenly across shards.
+When a write takes a shard over its share, least recently used documents
+are evicted until it fits again. Documents also expire after an optional
+TTL.
+
+Documents for which `pinned(doc_type, doc)` is true (analyses that are
+still pending or running) are never evicted and never expire: they exist
+nowhere else. A shard holding only pinned documents may exceed its share.
+
+A stored document may be a LazyDoc: still JSON-encoded in a buffer (the
+memory-mapped snapshot of memory_log.py) and decoded on first access.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, MutableMapping, Optional, Tuple
+
+Key = Tuple[str, str]  # (doc_type, doc_id)
+
+_NEVER = float("inf")
+
+
+def json_size(doc: Dict[str, Any]) -> int:
+    """Approximate memory cost of a document: the length of its JSON encoding."""
+    return len(json.dumps(doc, separators=(",", ":"), default=str))
+
+
+class LazyDoc:
+    """A JSON-encoded document in a buffer, decoded when first read.
+
+    `value` carries the document's index entry (see memory_log.py), so it
+    can be indexed and re-snapshotted without decoding.
+    """
+    __slots__ = ("buffer", "offset", "length", "value")
+
+    def __init__(self, buffer: Any, offset: int, length: int, value: Any = None):
+        self.buffer = buffer
+        self.offset = offset
+        self.length = length
+        self.value = value
+
+    def raw(self) -> bytes:
+        """The encoded document."""
+        return self.buffer[self.offset:self.offset + self.length]
+
+    def load(self) -> Dict[str, Any]:
+        """The decoded document."""
+        return json.loads(self.raw())
+
+
+def _doc(entry: "_Entry") -> Dict[str, Any]:
+    """An entry's document, decoding (once) a LazyDoc. Call with the shard lock held."""
+    doc = entry.doc
+    if type(doc) is LazyDoc:
+        doc = entry.doc = doc.load()
+    return doc
+
+
+class _Entry:
+    __slots__ = ("doc", "size", "expires_at", "pinned")
+
+    def __init__(self, doc: Any, size: int, expires_at: float, pinned: bool):
+        self.doc = doc
+        self.size = size
+        self.expires_at = expires_at
+        self.pinned = pinned
+
+
+class _Shard:
+    __slots__ = ("lock", "entries", "bytes", "evictions", "expirations")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[Key, _Entry]" = OrderedDict()
+        self.bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+
+class ShardedStore:
+    """Thread-safe document store with per-shard locks, LRU/TTL eviction and stats."""
+
+    def __init__(
+        self,
+        shards: int = 16,
+        max_entries: int = 0,
+        max_bytes: int = 0,
+        ttl: float = 0,
+        pinned: Optional[Callable[[str, Dict[str, Any]], bool]] = None,
+        on_evict: Optional[Callable[[str, str], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Create an empty store.
+
+        Args:
+            shards: Number of independently locked shards
+            max_entries: Document budget (0 = unlimited)
+            max_bytes: Approximate byte budget (0 = unlimited; sizes are only
+                computed when set)
+            ttl: Seconds a document lives after its last write (0 = forever)
+            pinned: Predicate for documents that must never be evicted
+            on_evict: Called with (doc_type, doc_id) after a document is
+                evicted or expires, outside the shard lock
+            clock: Monotonic time source
+        """
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._pinned = pinned or (lambda doc_type, doc: False)
+        self._on_evict = on_evict
+        self._clock = clock
+        # per-shard shares of the budget
+        self._shard_entries = -(-max_entries // len(self._shards)) if max_entries else 0
+        self._shard_bytes = -(-max_bytes // len(self._shards)) if max_bytes else 0
+
+    def _shard(self, key: Key) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _entry(self, doc_type: str, doc: Dict[str, Any]) -> _Entry:
+        pinned = self._pinned(doc_type, doc)
+        expires_at = self._clock() + self.ttl if self.ttl and not pinned else _NEVER
+        return _Entry(doc, json_size(doc) if self.max_bytes else 0, expires_at, pinned)
+
+    def _notify(self, dropped: List[Key]) -> None:
+        if self._on_evict is not None:
+            for doc_type, doc_id in dropped:
+                self._on_evict(doc_type, doc_id)
+
+    def _set(self, shard: _Shard, key: Key, entry: _Entry) -> None:
+        old = shard.entries.pop(key, None)
+        if old is not None:
+            shard.bytes -= old.size
+        shard.entries[key] = entry
+        shard.bytes += entry.size
+
+    def _evict(self, shard: _Shard, keep: Optional[Key]) -> List[Key]:
+        """Drop LRU entries until the shard fits its share; pinned entries and `keep` stay."""
+        dropped: List[Key] = []
+        entries = shard.entries
+        skipped = 0
+        while (
+            (self._shard_entries and len(entries) > self._shard_entries)
+            or (self._shard_bytes and shard.bytes > self._shard_bytes)
+        ) and skipped < len(entries):
+            key, entry = next(iter(entries.items()))
+            if entry.pinned or key == keep:
+                # rotate past it so the next candidate is the next-least-recently used
+                entries.move_to_end(key)
+                skipped += 1
+                continue
+            del entries[key]
+            shard.bytes -= entry.size
+            dropped.append(key)
+        shard.evictions += len(dropped)
+        return dropped
+
+    @property
+    def evictions(self) -> int:
+        """Documents dropped to stay within the budget."""
+        return sum(shard.evictions for shard in self._shards)
+
+    @property
+    def expirations(self) -> int:
+        """Documents dropped because their TTL passed."""
+        return sum(shard.expirations for shard in self._shards)
+
+    def get(self, doc_type: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Document by ID (marking it recently used), or None if absent or expired."""
+        key = (doc_type, doc_id)
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at > self._clock():
+                shard.entries.move_to_end(key)
+                return _doc(entry)
+            del shard.entries[key]
+            shard.bytes -= entry.size
+            shard.expirations += 1
+        self._notify([key])
+        return None
+
+    def put(self, doc_type: str, doc_id: str, doc: Dict[str, Any]) -> None:
+        """Insert or replace a document, evicting others if over budget."""
+        key = (doc_type, doc_id)
+        entry = self._entry(doc_type, doc)
+        shard = self._shard(key)
+        with shard.lock:
+            self._set(shard, key, entry)
+            dropped = self._evict(shard, key)
+        self._notify(dropped)
+
+    def update(
+        self, doc_type: str, doc_id: str, fn: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+    ) -> Optional[Dict[str, Any]]:
+        """Atomically replace a document with fn(current).
+
+        fn returning None leaves the document unchanged.
+
+        Returns:
+            The new document, or None if absent, expired or left unchanged
+        """
+        key = (doc_type, doc_id)
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is None or entry.expires_at <= self._clock():
+                return None
+            doc = fn(_doc(entry))
+            if doc is None:
+                return None
+            self._set(shard, key, self._entry(doc_type, doc))
+            dropped = self._evict(shard, key)
+        self._notify(dropped)
+        return doc
+
+    def pop(self, doc_type: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Remove a document; returns it, or None if absent."""
+        key = (doc_type, doc_id)
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.entries.pop(key, None)
+            if entry is None:
+                return None
+            shard.bytes -= entry.size
+            return _doc(entry)
+
+    def load(self, rows: Iterable[Tuple[str, str, LazyDoc, bool]]) -> None:
+        """Bulk-insert (doc_type, doc_id, lazy document, pinned) rows, then evict down to the budget.
+
+        Lazy documents count their encoded length against the byte budget.
+        """
+        # grouped by shard first: this runs for every document at startup
+        shards = self._shards
+        groups: List[List[Tuple[Key, _Entry]]] = [[] for _ in shards]
+        expires_at = self._clock() + self.ttl if self.ttl else _NEVER
+        sized = bool(self.max_bytes)
+        for doc_type, doc_id, lazy, pinned in rows:
+            key = (doc_type, doc_id)
+            entry = _Entry(lazy, lazy.length if sized else 0, _NEVER if pinned else expires_at, pinned)
+            groups[hash(key) % len(shards)].append((key, entry))
+        for shard, group in zip(shards, groups):
+            with shard.lock:
+                entries = shard.entries
+                for key, entry in group:
+                    old = entries.pop(key, None)
+                    if old is not None:
+                        shard.bytes -= old.size
+                    entries[key] = entry
+                if sized:
+                    shard.bytes += sum(entry.size for _, entry in group)
+                dropped = self._evict(shard, None)
+            self._notify(dropped)
+
+    def raw_items(self) -> List[Tuple[str, str, Any]]:
+        """Snapshot of every (doc_type, doc_id, document) without decoding: documents may be LazyDocs."""
+        result = []
+        for shard in self._shards:
+            with shard.lock:
+                result.extend((key[0], key[1], entry.doc) for key, entry in shard.entries.items())
+        return result
+
+    def items(self, doc_type: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Snapshot of (ID, document) pairs of one type (expired ones included until touched)."""
+        result = []
+        for shard in self._shards:
+            with shard.lock:
+                result.extend((key[1], _doc(entry)) for key, entry in shard.entries.items() if key[0] == doc_type)
+        return result
+
+    def ids(self, doc_type: str) -> List[str]:
+        """Snapshot of the IDs of one type, without decoding any document."""
+        result = []
+        for shard in self._shards:
+            with shard.lock:
+                result.extend(key[1] for key in shard.entries if key[0] == doc_type)
+        return result
+
+    def count(self, doc_type: Optional[str] = None) -> int:
+        """Number of stored documents, of one type or in total."""
+        total = 0
+        for shard in self._shards:
+            with shard.lock:
+                if doc_type is None:
+                    total += len(shard.entries)
+                else:
+                    total += sum(1 for key in shard.entries if key[0] == doc_type)
+        return total
+
+    def clear(self, doc_type: Optional[str] = None) -> None:
+        """Drop every document, of one type or all of them."""
+        for shard in self._shards:
+            with shard.lock:
+                if doc_type is None:
+                    shard.entries.clear()
+                    shard.bytes = 0
+                    continue
+                for key in [key for key in shard.entries if key[0] == doc_type]:
+                    shard.bytes -= shard.entries.pop(key).size
+
+    def bucket(
+        self,
+        doc_type: str,
+        put: Optional[Callable[[str, str, Dict[str, Any]], Any]] = None,
+        delete: Optional[Callable[[str, str], bool]] = None,
+    ) -> "Bucket":
+        """Mapping view of the documents of one type (see Bucket for `put` and `delete`)."""
+        return Bucket(self, doc_type, put, delete)
+
+    def stats(self) -> Dict[str, Any]:
+        """Size, budget and eviction counters."""
+        entries = nbytes = pinned = evictions = expirations = 0
+        by_type: Dict[str, int] = {}
+        for shard in self._shards:
+            with shard.lock:
+                entries += len(shard.entries)
+                evictions += shard.evictions
+                expirations += shard.expirations
+                nbytes += shard.bytes
+                for (doc_type, _), entry in shard.entries.items():
+                    by_type[doc_type] = by_type.get(doc_type, 0) + 1
+                    pinned += entry.pinned
+        return {
+            "entries": entries,
+            "bytes": nbytes if self.max_bytes else None,
+            "by_type": by_type,
+            "pinned": pinned,
+            "shards": len(self._shards),
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "evictions": evictions,
+            "expirations": expirations,
+        }
+
+
+class Bucket(MutableMapping):
+    """dict-like view of one document type in a ShardedStore.
+
+    Item assignment and deletion call `put(doc_type, doc_id, doc)` and
+    `delete(doc_type, doc_id)` when given, so an owner that keeps indexes
+    or a log beside the store (MemoryBackend) sees every change; otherwise
+    they go to the store directly. `delete` returns whether the document
+    existed.
+    """
+
+    def __init__(
+        self,
+        store: ShardedStore,
+        doc_type: str,
+        put: Optional[Callable[[str, str, Dict[str, Any]], Any]] = None,
+        delete: Optional[Callable[[str, str], bool]] = None,
+    ):
+        self._store = store
+        self.doc_type = doc_type
+        self._put = put
+        self._delete = delete
+
+    def __getitem__(self, doc_id: Hashable) -> Dict[str, Any]:
+        doc = self._store.get(self.doc_type, doc_id)
+        if doc is None:
+            raise KeyError(doc_id)
+        return doc
+
+    def __setitem__(self, doc_id: str, doc: Dict[str, Any]) -> None:
+        if self._put is None:
+            self._store.put(self.doc_type, doc_id, doc)
+        else:
+            self._put(self.doc_type, doc_id, doc)
+
+    def __delitem__(self, doc_id: str) -> None:
+        if self._delete is None:
+            existed = self._store.pop(self.doc_type, doc_id) is not None
+        else:
+            existed = self._delete(self.doc_type, doc_id)
+        if not existed:
+            raise KeyError(doc_id)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.ids(self.doc_type))
+
+    def __len__(self) -> int:
+        return self._store.count(self.doc_type)
+
+    def clear(self) -> None:
+        self._store.clear(self.doc_type)
+
+    def __repr__(self) -> str:
+        return f"Bucket({self.doc_type!r}, {len(self)} documents)"
@@ -0,0 +1,242 @@
+"""In-process metrics rendered in the Prometheus text format (GET /metrics).
+
+Counters and histograms are cheap enough to update on every store call and
+resolver: each thread that records into a metric gets its own array of
+counts, so recording is a few list operations with no lock, and a scrape
+adds the arrays up. Locks are only taken when a thread records into a
+label combination for the first time and while scraping. Values read by a
+scrape may be a few observations apart from each other, as usual for
+Prometheus clients.
+
+Gauges are callbacks evaluated at scrape time (queue depth, subscribers),
+so they cost nothing in between scrapes.
+
+Metrics register themselves on REGISTRY when created, normally at import
+time of the module they measure:
+
+    STORE_OPS = metrics.histogram("truthlens_store_op_seconds", "...", ("backend", "op", "doc_type"))
+    STORE_OPS.labels("memory", "get", "user").observe(0.0002)
+"""
+import math
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+# Seconds; from a memory-store hit up to a slow Couchbase query
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+GaugeValue = Union[float, Dict[Tuple[str, ...], float]]
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Shards:
+    """Per-thread arrays of `size` numbers, summed on read."""
+
+    __slots__ = ("size", "local", "_arrays", "_lock")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.local = threading.local()  # .array once this thread has recorded
+        self._arrays: List[List[float]] = []
+        self._lock = threading.Lock()
+
+    def add(self) -> List[float]:
+        """Create this thread's array."""
+        array = [0] * self.size
+        with self._lock:
+            self._arrays.append(array)
+        self.local.array = array
+        return array
+
+    def total(self) -> List[float]:
+        with self._lock:
+            arrays = list(self._arrays)
+        return [sum(column) for column in zip(*arrays)] if arrays else [0] * self.size
+
+
+class Counter:
+    """Monotonic count of one label combination."""
+
+    __slots__ = ("_shards", "_local")
+
+    def __init__(self):
+        self._shards = _Shards(1)
+        self._local = self._shards.local
+
+    def inc(self, amount: float = 1) -> None:
+        try:
+            array = self._local.array
+        except AttributeError:
+            array = self._shards.add()
+        array[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._shards.total()[0]
+
+
+class Histogram:
+    """Bucketed observations of one label combination (counts per bucket, then the sum)."""
+
+    __slots__ = ("bounds", "_shards", "_local")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self._shards = _Shards(len(self.bounds) + 2)
+        self._local = self._shards.local
+
+    def observe(self, value: float) -> None:
+        # the thread-local lookup is inlined; this runs on every store call
+        try:
+            array = self._local.array
+        except AttributeError:
+            array = self._shards.add()
+        array[bisect_left(self.bounds, value)] += 1  # first bucket whose upper bound is >= value
+        array[-1] += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """Cumulative counts per bucket (the last being +Inf) and the sum of observations."""
+        total = self._shards.total()
+        cumulative, running = [], 0
+        for count in total[:-1]:
+            running += count
+            cumulative.append(int(running))
+        return cumulative, total[-1]
+
+    @property
+    def count(self) -> int:
+        return self.snapshot()[0][-1]
+
+
+class Family:
+    """A named metric and its children, one per combination of label values."""
+
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: Sequence[str], factory: Callable):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children: Dict[Tuple[str, ...], Union[Counter, Histogram]] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self.labels()  # exported as 0 before anything is recorded
+
+    def labels(self, *values: str) -> Union[Counter, Histogram]:
+        """The child for these label values (in labelnames order), created on first use."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._factory())
+        return child
+
+    # unlabelled metrics are used directly
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.copy().items()):
+            if isinstance(child, Histogram):
+                counts, total = child.snapshot()
+                for bound, count in zip(child.bounds + (math.inf,), counts):
+                    le = 'le="' + _format(bound) + '"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, le)} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {_format(total)}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {counts[-1]}")
+            else:
+                lines.append(f"{self.name}{_labels(self.labelnames, values)} {_format(child.value)}")
+        return lines
+
+
+class Gauge:
+    """A value computed at scrape time by `read`: a number, or values by label tuple."""
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], GaugeValue], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._read = read
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        value = self._read()
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for values, number in sorted(items):
+            lines.append(f"{self.name}{_labels(self.labelnames, values)} {_format(number)}")
+        return lines
+
+
+class Registry:
+    """Every metric of the process, in registration order."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Union[Family, Gauge]] = {}
+
+    def register(self, metric: Union[Family, Gauge]) -> Union[Family, Gauge]:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                print(f"⚠ Could not collect metric {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Family:
+    """Create and register a counter family."""
+    return REGISTRY.register(Family(name, documentation, "counter", labelnames, Counter))
+
+
+def histogram(
+    name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+) -> Family:
+    """Create and register a histogram family with the given bucket upper bounds."""
+    return REGISTRY.register(Family(name, documentation, "histogram", labelnames, lambda: Histogram(buckets)))
+
+
+def gauge(
+    name: str, documentation: str, read: Callable[[], GaugeValue], labelnames: Sequence[str] = ()
+) -> Gauge:
+    """Create and register a gauge read at scrape time."""
+    return REGISTRY.register(Gauge(name, documentation, read, labelnames))
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text format."""
+    return REGISTRY.render()
@@ -0,0 +1,149 @@
+"""In-process publish/subscribe registry for GraphQL subscriptions.
+
+Subscribers register on a topic (e.g. an upload ID) and receive events in
+their own bounded queue, so a publish only touches the subscribers of that
+topic and one subscriber can never consume another's events.
+
+Events published as final (an analysis reaching ready or failed) are never
+dropped on overflow: an older non-final event is evicted to make room, so a
+subscriber waiting for the outcome always receives it.
+"""
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Set, Tuple
+
+from . import metrics
+from .app_config import AppConfig
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest")
+
+EVENTS_DROPPED = metrics.counter(
+    "truthlens_subscription_events_dropped_total",
+    "Events dropped because a subscriber's queue was full",
+)
+
+
+class Subscriber:
+    """A single subscriber's bounded event buffer."""
+
+    def __init__(self, topic: str, maxsize: int, overflow: str):
+        self.topic = topic
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.dropped = 0
+        self._events: Deque[Tuple[Any, bool]] = deque()
+        self._waiter: Optional[asyncio.Future] = None
+
+    def _dropped(self) -> None:
+        self.dropped += 1
+        EVENTS_DROPPED.inc()
+
+    def _evict(self) -> bool:
+        """Drop the oldest non-final event; False if every buffered event is final."""
+        for i, (_, final) in enumerate(self._events):
+            if not final:
+                del self._events[i]
+                return True
+        return False
+
+    def offer(self, event: Any, final: bool = False) -> bool:
+        """Enqueue an event without blocking, applying the overflow policy.
+
+        A final event is always enqueued, evicting an older non-final one
+        if the buffer is full, whatever the policy.
+
+        Returns:
+            True if the event was enqueued, False if it was dropped
+        """
+        if len(self._events) >= self.maxsize:
+            # a final event goes in even if every buffered event is final too
+            if (final or self.overflow == "drop_oldest") and self._evict():
+                self._dropped()
+            elif not final:
+                self._dropped()
+                return False
+        self._events.append((event, final))
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+        return True
+
+    def __aiter__(self) -> "Subscriber":
+        return self
+
+    async def __anext__(self) -> Any:
+        while not self._events:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return self._events.popleft()[0]
+
+
+class TopicRegistry:
+    """Topic -> subscribers map with bounded per-subscriber queues."""
+
+    def __init__(self, maxsize: int = 16, overflow: str = "drop_oldest"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow!r}; expected one of {OVERFLOW_POLICIES}")
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self._topics: Dict[str, Set[Subscriber]] = {}
+
+    @asynccontextmanager
+    async def subscribe(self, topic: str) -> AsyncIterator[Subscriber]:
+        """Register a subscriber for the duration of the context.
+
+        The subscriber is removed on exit, including when the consuming
+        generator is closed or cancelled because the client disconnected.
+        """
+        subscriber = Subscriber(topic, self.maxsize, self.overflow)
+        self._topics.setdefault(topic, set()).add(subscriber)
+        try:
+            yield subscriber
+        finally:
+            self._unsubscribe(subscriber)
+
+    def _unsubscribe(self, subscriber: Subscriber) -> None:
+        subscribers = self._topics.get(subscriber.topic)
+        if subscribers is None:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._topics[subscriber.topic]
+
+    def publish(self, topic: str, event: Any, final: bool = False) -> int:
+        """Deliver an event to every subscriber of a topic.
+
+        Args:
+            topic: Topic to publish on
+            event: The event
+            final: The last event of its run, never dropped on overflow
+
+        Returns:
+            Number of subscribers the event was enqueued for
+        """
+        subscribers = self._topics.get(topic)
+        if not subscribers:
+            return 0
+        return sum(subscriber.offer(event, final) for subscriber in tuple(subscribers))
+
+    def subscriber_count(self, topic: Optional[str] = None) -> int:
+        """Number of subscribers on a topic, or across all topics."""
+        if topic is not None:
+            return len(self._topics.get(topic, ()))
+        return sum(len(subscribers) for subscribers in self._topics.values())
+
+
+# Analysis status events, keyed by upload ID
+analysis_events = TopicRegistry(
+    maxsize=AppConfig.SUBSCRIPTION_QUEUE_SIZE,
+    overflow=AppConfig.SUBSCRIPTION_OVERFLOW,
+)
+
+metrics.gauge(
+    "truthlens_subscriptions",
+    "Active analysis event subscribers (open GraphQL subscriptions)",
+    lambda: analysis_events.subscriber_count(),
+)
@@ -0,0 +1,332 @@
+"""Retries and circuit breaking for Couchbase calls.
+
+Every KV and query call made by CouchbaseQuery / AsyncCouchbaseQuery goes
+through call() / acall():
+
+- Retryable errors (timeouts, temporary failures, service unavailable) are
+  retried up to CouchbaseConfig.MAX_RETRIES times with full-jitter
+  exponential backoff.
+- A CircuitBreaker counts calls that still fail after their retries. Once
+  BREAKER_FAILURE_THRESHOLD of them happen in a row it opens and further
+  calls fail immediately with CircuitOpenError instead of piling up on an
+  unhealthy cluster.
+- While the breaker is open, a RecoveryProbe started at application
+  startup pings the cluster in the background and closes the breaker as
+  soon as a probe succeeds. If no probe is running, one trial call is let
+  through after BREAKER_RESET_TIMEOUT_S (half-open).
+
+Errors that prove the cluster answered (document not found, CAS mismatch,
+query parse errors, ...) count as successes for the breaker and are never
+retried. Any other error - authentication, missing bucket, internal server
+failure, a canceled request or a non-Couchbase exception - counts as a
+failure. A call cancelled mid-flight records no outcome but gives up its
+half-open trial, so the next call can try.
+"""
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from couchbase.exceptions import (
+    AmbiguousTimeoutException, CasMismatchException,
+    DocumentExistsException, DocumentLockedException, DocumentNotFoundException,
+    ParsingFailedException, PathExistsException, PathMismatchException,
+    PathNotFoundException, QueryIndexNotFoundException, ServiceUnavailableException,
+    TemporaryFailException, TimeoutException, UnAmbiguousTimeoutException,
+)
+
+from . import metrics, tracing
+from .couchbase_config import CouchbaseConfig
+
+T = TypeVar("T")
+
+RETRYABLE_ERRORS = (
+    AmbiguousTimeoutException,
+    UnAmbiguousTimeoutException,
+    TimeoutException,
+    TemporaryFailException,
+    ServiceUnavailableException,
+)
+
+# Errors that can only come back from a responsive cluster; they say
+# nothing about its health, so the breaker treats them like a success
+ANSWERED_ERRORS = (
+    DocumentNotFoundException,
+    DocumentExistsException,
+    DocumentLockedException,
+    CasMismatchException,
+    PathNotFoundException,
+    PathExistsException,
+    PathMismatchException,
+    ParsingFailedException,
+    QueryIndexNotFoundException,
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Couchbase while the circuit breaker is open."""
+
+
+# Errors meaning the cluster could not be reached (as opposed to an answer
+# such as "not found"); callers may fall back to cached data on these
+UNAVAILABLE_ERRORS = (CircuitOpenError,) + RETRYABLE_ERRORS
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter: delay n is uniform in [0, min(max_delay, base * 2**n)]."""
+
+    def __init__(self, max_retries: int, base_delay: float, max_delay: float, rng: Optional[random.Random] = None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng or random.Random()
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before retry number `attempt` (0-based)."""
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker, safe to use from worker threads."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_started_at: Optional[float] = None
+        # counters exposed as metrics
+        self.opened_total = 0
+        self.rejected_total = 0
+        self.failures_total = 0
+        self.retries_total = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go to the cluster now (counts a rejection if not)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = self._clock()
+            if self.state == OPEN and now - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._trial_started_at = None
+            if self.state == HALF_OPEN:
+                # one trial call at a time; a trial that never reported back is replaced
+                if self._trial_started_at is None or now - self._trial_started_at >= self.reset_timeout:
+                    self._trial_started_at = now
+                    return True
+            self.rejected_total += 1
+            return False
+
+    def record_retry(self) -> None:
+        """Count a retried call."""
+        with self._lock:
+            self.retries_total += 1
+
+    def record_success(self) -> None:
+        """A call reached a responsive cluster: close the breaker."""
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self._trial_started_at = None
+
+    def release_trial(self) -> None:
+        """A call ended without an outcome (cancelled): let the next call be the half-open trial."""
+        with self._lock:
+            self._trial_started_at = None
+
+    def record_failure(self) -> None:
+        """A call failed after its retries: open the breaker at the threshold (or on a failed trial)."""
+        with self._lock:
+            self.failures_total += 1
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opened_total += 1
+                self.state = OPEN
+                self._opened_at = self._clock()
+                self._trial_started_at = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Breaker state and counters."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened_total": self.opened_total,
+            "rejected_total": self.rejected_total,
+            "failures_total": self.failures_total,
+            "retries_total": self.retries_total,
+        }
+
+
+COUCHBASE_ERRORS = metrics.counter(
+    "truthlens_couchbase_errors_total",
+    "Errors raised by Couchbase calls, counting every attempt of a retried call",
+    ("op", "error"),
+)
+
+
+def _count_error(fn: Callable[..., Any], error: Exception) -> None:
+    COUCHBASE_ERRORS.labels(getattr(fn, "__name__", "call"), type(error).__name__).inc()
+
+
+def _check(breaker: CircuitBreaker) -> None:
+    if not breaker.allow():
+        raise CircuitOpenError("Couchbase is unavailable (circuit breaker open)")
+
+
+def _record(breaker: CircuitBreaker, answered: Optional[bool]) -> None:
+    if answered is None:
+        breaker.release_trial()
+    elif answered:
+        breaker.record_success()
+    else:
+        breaker.record_failure()
+
+
+def call(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking Couchbase call with retries, guarded by the breaker.
+
+    Raises:
+        CircuitOpenError: If the breaker is open
+        Exception: The call's own error, after retries if retryable
+    """
+    _check(breaker)
+    answered = None  # stays None only if the call is interrupted (cancelled)
+    try:
+        for attempt in range(retry_policy.max_retries + 1):
+            try:
+                result = fn(*args, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                _count_error(fn, e)
+                if attempt == retry_policy.max_retries:
+                    answered = False
+                    raise
+                breaker.record_retry()
+                tracing.set_attributes(**{"couchbase.retries": attempt + 1})
+                time.sleep(retry_policy.delay(attempt))
+                continue
+            except Exception as e:
+                _count_error(fn, e)
+                answered = isinstance(e, ANSWERED_ERRORS)
+                raise
+            answered = True
+            return result
+        raise AssertionError("unreachable")
+    finally:
+        _record(breaker, answered)
+
+
+async def acall(fn: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+    """Awaitable counterpart of call() for the acouchbase client.
+
+    Raises:
+        CircuitOpenError: If the breaker is open
+        Exception: The call's own error, after retries if retryable
+    """
+    _check(breaker)
+    answered = None  # stays None only if the call is interrupted (cancelled)
+    try:
+        for attempt in range(retry_policy.max_retries + 1):
+            try:
+                result = await fn(*args, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                _count_error(fn, e)
+                if attempt == retry_policy.max_retries:
+                    answered = False
+                    raise
+                breaker.record_retry()
+                tracing.set_attributes(**{"couchbase.retries": attempt + 1})
+                await asyncio.sleep(retry_policy.delay(attempt))
+                continue
+            except Exception as e:
+                _count_error(fn, e)
+                answered = isinstance(e, ANSWERED_ERRORS)
+                raise
+            answered = True
+            return result
+        raise AssertionError("unreachable")
+    finally:
+        _record(breaker, answered)
+
+
+class RecoveryProbe:
+    """Background task that probes the cluster while the breaker is not closed."""
+
+    def __init__(self, breaker: CircuitBreaker, interval: float = 5.0):
+        self.breaker = breaker
+        self.interval = interval
+        self.probes_total = 0
+        self.probe_failures_total = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def probe_once(self, probe: Callable[[], Awaitable[Any]]) -> bool:
+        """Run one probe and update the breaker; returns whether it succeeded."""
+        self.probes_total += 1
+        try:
+            await probe()
+        except Exception:
+            self.probe_failures_total += 1
+            self.breaker.record_failure()
+            return False
+        self.breaker.record_success()
+        return True
+
+    async def _run(self, probe: Callable[[], Awaitable[Any]]) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            if self.breaker.state != CLOSED:
+                await self.probe_once(probe)
+
+    def start(self, probe: Callable[[], Awaitable[Any]]) -> None:
+        """Start probing on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(probe))
+
+    async def stop(self) -> None:
+        """Stop the background task."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+
+# Shared instances used by the Couchbase client
+retry_policy = RetryPolicy(
+    max_retries=CouchbaseConfig.MAX_RETRIES,
+    base_delay=CouchbaseConfig.RETRY_BASE_DELAY_MS / 1000,
+    max_delay=CouchbaseConfig.RETRY_MAX_DELAY_MS / 1000,
+)
+breaker = CircuitBreaker(
+    failure_threshold=CouchbaseConfig.BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=CouchbaseConfig.BREAKER_RESET_TIMEOUT_S,
+)
+recovery_probe = RecoveryProbe(breaker, interval=CouchbaseConfig.PROBE_INTERVAL_S)
+
+metrics.gauge(
+    "truthlens_couchbase_breaker_open",
+    "1 while the Couchbase circuit breaker is open or half-open",
+    lambda: breaker.state != CLOSED,
+)
+
+
+def health() -> Dict[str, Any]:
+    """Breaker state plus retry and probe counters, for the health endpoint."""
+    return dict(
+        breaker.stats(),
+        probe_running=recovery_probe.running,
+        probes_total=recovery_probe.probes_total,
+        probe_failures_total=recovery_probe.probe_failures_total,
+    )
@@ -0,0 +1,108 @@
+"""In-memory secondary indexes for keyset pagination.
+
+A SecondaryIndex maps one document field (e.g. an upload's user_id) to the
+documents holding each value, sorted newest first by (created_at, ID),
+mirroring a Couchbase index on (field, created_at DESC, META().id DESC).
+Listing a page seeks to the cursor with bisect, so a page costs
+O(log n + page size) however many documents share the value.
+
+Documents without created_at sort as "", i.e. after every dated one.
+"""
+from bisect import bisect_left, insort
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+# Position of a document in listing order: (created_at or "", document ID)
+Key = Tuple[str, str]
+
+
+def order_key(doc_id: str, doc: Dict[str, Any], order: str = "created_at") -> Key:
+    """A document's position in listing order."""
+    return (doc.get(order) or "", doc_id)
+
+
+class SecondaryIndex:
+    """Listing-ordered document keys per value of one field."""
+
+    def __init__(self, field: str, order: str = "created_at"):
+        self.field = field
+        self.order = order
+        self._keys: Dict[Hashable, List[Key]] = {}  # value -> keys in ascending order
+        self._entries: Dict[str, Tuple[Hashable, Key]] = {}  # doc_id -> value and key it is indexed under
+
+    def add(self, doc_id: str, doc: Dict[str, Any]) -> None:
+        """Index (or re-index) a saved document."""
+        entry = (doc.get(self.field), order_key(doc_id, doc, self.order))
+        if doc_id in self._entries:
+            if self._entries[doc_id] == entry:
+                return
+            self.remove(doc_id)
+        self._entries[doc_id] = entry
+        insort(self._keys.setdefault(entry[0], []), entry[1])
+
+    def remove(self, doc_id: str) -> None:
+        """Drop a document from the index (no-op if it is not indexed)."""
+        if doc_id not in self._entries:
+            return
+        value, key = self._entries.pop(doc_id)
+        keys = self._keys[value]
+        keys.pop(bisect_left(keys, key))
+        if not keys:
+            del self._keys[value]
+
+    def load(self, entries: Iterable[Tuple[str, Hashable, Optional[str]]]) -> None:
+        """Bulk-index (doc_id, value, created_at) triples, replacing earlier entries for those IDs."""
+        for doc_id, value, created_at in entries:
+            if doc_id in self._entries:
+                self.remove(doc_id)
+            key = (created_at or "", doc_id)
+            self._entries[doc_id] = (value, key)
+            self._keys.setdefault(value, []).append(key)
+        for keys in self._keys.values():
+            keys.sort()
+
+    def ids(self, value: Hashable) -> List[str]:
+        """IDs of the documents indexed under `value`, newest first."""
+        return [doc_id for _, doc_id in reversed(self._keys.get(value, ()))]
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._keys.clear()
+        self._entries.clear()
+
+    def page(
+        self,
+        value: Hashable,
+        bucket: Dict[str, Dict[str, Any]],
+        limit: int,
+        after: Optional[Key] = None,
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """Return up to `limit` documents with field == value listed after the `after` key.
+
+        Entries whose document is gone from `bucket` or no longer holds the
+        value and created_at it is indexed under (e.g. the ShardedStore was
+        modified directly) are skipped and re-indexed.
+
+        Returns:
+            (documents newest first, whether more documents follow)
+        """
+        keys = self._keys.get(value, [])
+        i = bisect_left(keys, tuple(after)) if after is not None else len(keys)
+        docs: List[Dict[str, Any]] = []
+        stale: List[str] = []
+        while i > 0:
+            key = keys[i - 1]
+            i -= 1
+            doc = bucket.get(key[1])
+            if doc is None or doc.get(self.field) != value or order_key(key[1], doc, self.order) != key:
+                stale.append(key[1])
+                continue
+            if len(docs) == limit:
+                i += 1
+                break
+            docs.append(doc)
+        has_next = i > 0
+        for doc_id in stale:
+            self.remove(doc_id)
+            if doc_id in bucket:
+                self.add(doc_id, bucket[doc_id])
+        return docs, has_next
@@ -0,0 +1,240 @@
+"""SQLite storage backend for single-node deployments.
+
+Documents live in one database file, one table per type with (id, JSON body)
+rows. The database runs in WAL mode: readers never block the writer or each
+other, and a commit appends to the write-ahead log instead of rewriting
+pages in place. With the default synchronous=NORMAL a commit survives an
+application crash, but the last transactions before a power loss may be
+lost; pass synchronous="FULL" to fsync every commit.
+
+Keyset lookups use expression indexes on the field, created_at and id, the
+equivalent of the Couchbase (field, created_at DESC, META().id DESC) indexes.
+
+sqlite3 calls block, so every operation runs in a worker thread. Writes go
+through one connection behind a lock; each worker thread reads through its
+own connection.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from .secondary_index import Key
+from .storage import BulkResult, INDEXES, ORDER_FIELD
+
+T = TypeVar("T")
+
+_TABLES = {"user": "users", "upload": "uploads", "analysis": "analyses"}
+
+# Rows read per worker-thread hop while scanning, and IDs per IN (...) batch
+_SCAN_CHUNK = 500
+_BATCH = 500
+
+
+def _field(field: str) -> str:
+    """SQL expression for a top-level document field (must match the index definition)."""
+    return f"json_extract(body, '$.{field}')"
+
+
+# Listing order column; an undated document sorts as "", as in memory
+_ORDER = f"ifnull({_field(ORDER_FIELD)}, '')"
+
+
+def _dumps(doc: Dict[str, Any]) -> str:
+    return json.dumps(doc, separators=(",", ":"))
+
+
+class SQLiteBackend:
+    """Documents in a SQLite database file in WAL mode."""
+    name = "sqlite"
+    remote = False
+
+    def __init__(self, path: str, synchronous: str = "NORMAL"):
+        """Open (creating if needed) the database at `path`.
+
+        Args:
+            path: Database file; readers use their own connections, so this
+                must be a file rather than ':memory:'
+            synchronous: SQLite synchronous pragma (NORMAL or FULL)
+        """
+        self.path = path
+        self.synchronous = synchronous
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._writer = self._connect()
+        self._write(self._create_schema)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection) -> None:
+        for table in _TABLES.values():
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (id TEXT PRIMARY KEY, body TEXT NOT NULL) WITHOUT ROWID"
+            )
+        for name, (doc_type, field) in INDEXES.items():
+            conn.execute(f"DROP INDEX IF EXISTS idx_{name}")  # (field, id) index of older versions
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{name}_created ON {_TABLES[doc_type]} ({_field(field)}, {_ORDER}, id)"
+            )
+
+    def _reader(self) -> sqlite3.Connection:
+        """This thread's read connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _write(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """Run fn in one write transaction."""
+        with self._write_lock:
+            conn = self._writer
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+
+    # --- blocking operations (run in worker threads) ---
+
+    def _get(self, doc_type: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        row = self._reader().execute(
+            f"SELECT body FROM {_TABLES[doc_type]} WHERE id = ?", (doc_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _get_fields(self, doc_type: str, doc_id: str, fields: List[str]) -> Optional[Dict[str, Any]]:
+        # json_object keeps nested objects and arrays as JSON, so one decode of a small object
+        pairs = ", ".join("?, json_extract(body, ?)" for _ in fields)
+        params = [value for field in fields for value in (field, f'$."{field}"')]
+        row = self._reader().execute(
+            f"SELECT json_object({pairs}) FROM {_TABLES[doc_type]} WHERE id = ?", (*params, doc_id)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _get_many(self, doc_type: str, doc_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        conn = self._reader()
+        found: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(doc_ids), _BATCH):
+            batch = doc_ids[start:start + _BATCH]
+            rows = conn.execute(
+                f"SELECT id, body FROM {_TABLES[doc_type]} WHERE id IN ({','.join('?' * len(batch))})", batch
+            )
+            found.update((doc_id, json.loads(body)) for doc_id, body in rows)
+        return {doc_id: found.get(doc_id) for doc_id in doc_ids}
+
+    def _put_many(self, doc_type: str, docs: Dict[str, Dict[str, Any]]) -> None:
+        rows = [(doc_id, _dumps(doc)) for doc_id, doc in docs.items()]
+        self._write(lambda conn: conn.executemany(
+            f"INSERT OR REPLACE INTO {_TABLES[doc_type]} (id, body) VALUES (?, ?)", rows
+        ))
+
+    def _delete_many(self, doc_type: str, doc_ids: List[str]) -> Dict[str, bool]:
+        def delete(conn: sqlite3.Connection) -> Dict[str, bool]:
+            sql = f"DELETE FROM {_TABLES[doc_type]} WHERE id = ?"
+            return {doc_id: conn.execute(sql, (doc_id,)).rowcount > 0 for doc_id in doc_ids}
+        return self._write(delete)
+
+    def _patch(
+        self, doc_type: str, doc_id: str, changes: Dict[str, Any], expected: Optional[Dict[str, Any]]
+    ) -> bool:
+        table = _TABLES[doc_type]
+
+        def patch(conn: sqlite3.Connection) -> bool:
+            row = conn.execute(f"SELECT body FROM {table} WHERE id = ?", (doc_id,)).fetchone()
+            if row is None:
+                return False
+            doc = json.loads(row[0])
+            if expected and any(doc.get(field) != value for field, value in expected.items()):
+                return False
+            conn.execute(f"UPDATE {table} SET body = ? WHERE id = ?", (_dumps({**doc, **changes}), doc_id))
+            return True
+        return self._write(patch)
+
+    def _scan_chunk(self, doc_type: str, after: str, limit: int) -> List[Tuple[str, str]]:
+        return self._reader().execute(
+            f"SELECT id, body FROM {_TABLES[doc_type]} WHERE id > ? ORDER BY id LIMIT ?", (after, limit)
+        ).fetchall()
+
+    def _lookup(
+        self, index: str, value: Any, limit: int, after: Optional[Key]
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        doc_type, field = INDEXES[index]
+        if after is None:
+            seek, params = "", (value,)
+        else:
+            # the row-value comparison alone is not used as an index range; the <= bound is
+            seek, params = f"AND {_ORDER} <= ? AND ({_ORDER}, id) < (?, ?)", (value, after[0], *after)
+        rows = self._reader().execute(
+            f"SELECT body FROM {_TABLES[doc_type]} WHERE {_field(field)} = ? {seek} "
+            f"ORDER BY {_ORDER} DESC, id DESC LIMIT ?",
+            (*params, limit + 1),
+        ).fetchall()
+        return [json.loads(body) for body, in rows[:limit]], len(rows) > limit
+
+    # --- StorageBackend ---
+
+    async def get(self, doc_type: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, doc_type, doc_id)
+
+    async def get_fields(self, doc_type: str, doc_id: str, fields: List[str]) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get_fields, doc_type, doc_id, fields)
+
+    async def put(self, doc_type: str, doc_id: str, doc: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._put_many, doc_type, {doc_id: doc})
+
+    async def delete(self, doc_type: str, doc_id: str) -> bool:
+        return (await asyncio.to_thread(self._delete_many, doc_type, [doc_id]))[doc_id]
+
+    async def patch(
+        self, doc_type: str, doc_id: str, changes: Dict[str, Any], expected: Optional[Dict[str, Any]]
+    ) -> bool:
+        return await asyncio.to_thread(self._patch, doc_type, doc_id, changes, expected)
+
+    async def get_many(self, doc_type: str, doc_ids: List[str]) -> BulkResult:
+        return BulkResult(await asyncio.to_thread(self._get_many, doc_type, doc_ids), {})
+
+    async def put_many(self, doc_type: str, docs: Dict[str, Dict[str, Any]]) -> BulkResult:
+        await asyncio.to_thread(self._put_many, doc_type, docs)
+        return BulkResult(dict.fromkeys(docs, True), {})
+
+    async def delete_many(self, doc_type: str, doc_ids: List[str]) -> BulkResult:
+        return BulkResult(await asyncio.to_thread(self._delete_many, doc_type, doc_ids), {})
+
+    async def scan(self, doc_type: str, chunk_size: Optional[int]) -> AsyncIterator[Any]:
+        # keyset over the primary key; documents saved during the scan may or may not be seen
+        after = ""
+        while True:
+            rows = await asyncio.to_thread(self._scan_chunk, doc_type, after, chunk_size or _SCAN_CHUNK)
+            if not rows:
+                return
+            after = rows[-1][0]
+            docs = [json.loads(body) for _, body in rows]
+            if chunk_size:
+                yield docs
+            else:
+                for doc in docs:
+                    yield doc
+
+    async def lookup(
+        self, index: str, value: Any, limit: int, after: Optional[Key]
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        return await asyncio.to_thread(self._lookup, index, value, limit, after)
+
+    async def close(self) -> None:
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
@@ -0,0 +1,479 @@
+"""Storage backends behind the store module.
+
+store.py talks to exactly one StorageBackend, chosen once at startup (see
+lifespan.py and AppConfig.STORAGE_BACKEND):
+
+- MemoryBackend: a bounded, sharded in-process store (the default; tests,
+  development and single-process deployments), optionally persisted to an
+  append-only log with snapshots (memory_log.py)
+- CouchbaseBackend: the Couchbase cluster, through whichever client is connected
+- SQLiteBackend (sqlite_backend.py): one database file in WAL mode, durable
+  storage for single-node deployments without a Couchbase cluster
+
+Documents are grouped by type ("user", "upload", "analysis"). Besides KV
+operations, every backend answers the keyset-paginated lookups in INDEXES,
+listing matching documents newest first by (created_at, ID).
+"""
+import asyncio
+import time
+from concurrent.futures import Future
+from typing import (
+    Any, AsyncIterator, Dict, Iterable, List, NamedTuple, Optional, Protocol, Tuple, runtime_checkable,
+)
+
+from .app_config import AppConfig
+from .couchbase_client import CouchbaseQuery, AsyncCouchbaseQuery, AsyncCouchbaseClient, MAX_LOOKUP_PATHS
+from .memory_log import DocumentLog
+from .memory_store import Bucket, ShardedStore
+from .secondary_index import Key, SecondaryIndex
+
+DOC_TYPES = ("user", "upload", "analysis")
+
+# Keyset lookups: name -> (document type, field). Couchbase runs the registered
+# statements of the same name; the other backends keep an equivalent index.
+INDEXES: Dict[str, Tuple[str, str]] = {
+    "uploads_by_user": ("upload", "user_id"),
+    "analyses_by_status": ("analysis", "status"),
+}
+
+# Lookups list documents newest first by this field, then by ID (both descending)
+ORDER_FIELD = "created_at"
+
+
+class BulkResult(NamedTuple):
+    """Per-key outcome of a bulk store operation.
+
+    results: documents (None if missing) for get_many_*, or True/False
+        (saved / deleted vs. not found) for save_many_* and delete_many_*
+    errors: failure message for every key whose operation raised
+    """
+    results: Dict[str, Any]
+    errors: Dict[str, str]
+
+
+@runtime_checkable
+class StorageBackend(Protocol):
+    """Operations store.py needs from a backend.
+
+    Attributes:
+        name: Short name reported by the health endpoint
+        remote: Whether reads cross the network (store.py only puts its
+            read-through cache in front of remote backends)
+    """
+    name: str
+    remote: bool
+
+    async def get(self, doc_type: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Document by ID, or None if missing."""
+
+    async def put(self, doc_type: str, doc_id: str, doc: Dict[str, Any]) -> None:
+        """Insert or replace a document."""
+
+    async def delete(self, doc_type: str, doc_id: str) -> bool:
+        """Delete a document; False if it did not exist."""
+
+    async def get_fields(self, doc_type: str, doc_id: str, fields: List[str]) -> Optional[Dict[str, Any]]:
+        """Only the given top-level fields of a document (None for absent ones), or None if missing."""
+
+    async def patch(
+        self, doc_type: str, doc_id: str, changes: Dict[str, Any], expected: Optional[Dict[str, Any]]
+    ) -> bool:
+        """Set top-level fields, only if the `expected` fields match; False if missing or mismatched."""
+
+    async def get_many(self, doc_type: str, doc_ids: List[str]) -> BulkResult:
+        """Documents (None if missing) for distinct IDs."""
+
+    async def put_many(self, doc_type: str, docs: Dict[str, Dict[str, Any]]) -> BulkResult:
+        """Insert or replace many documents."""
+
+    async def delete_many(self, doc_type: str, doc_ids: List[str]) -> BulkResult:
+        """Delete distinct IDs; False for those that did not exist."""
+
+    def scan(self, doc_type: str, chunk_size: Optional[int]) -> AsyncIterator[Any]:
+        """Every document of a type (or lists of up to chunk_size), in constant memory."""
+
+    async def lookup(
+        self, index: str, value: Any, limit: int, after: Optional[Key]
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """Up to `limit` documents matching an INDEXES entry, newest first from key `after`, and whether more follow."""
+
+    async def close(self) -> None:
+        """Release connections and files."""
+
+
+def project(doc: Optional[Dict[str, Any]], fields: Iterable[str]) -> Optional[Dict[str, Any]]:
+    """The given top-level fields of a document (None for absent ones), like get_fields."""
+    if doc is None:
+        return None
+    return {field: doc.get(field) for field in fields}
+
+
+def _copy(value: Any) -> Any:
+    """A deep copy of a JSON-like value (dicts and lists are copied, anything else is shared).
+
+    Stored documents and the caller's documents never share nested fact
+    checks or breakdowns, so changing either cannot bypass the store.
+    """
+    if type(value) is dict:
+        return {key: _copy(item) for key, item in value.items()}
+    if type(value) is list:
+        return [_copy(item) for item in value]
+    return value
+
+
+def _chunks(docs: List[Any], chunk_size: Optional[int]) -> Iterable[Any]:
+    """Documents one by one, or in lists of chunk_size."""
+    if not chunk_size:
+        return docs
+    return (docs[start:start + chunk_size] for start in range(0, len(docs), chunk_size))
+
+
+# Analyses still being computed exist nowhere else; the memory store never evicts them
+_IN_PROGRESS = ("pending", "running")
+
+
+def _pinned(doc_type: str, doc: Dict[str, Any]) -> bool:
+    return doc_type == "analysis" and doc.get("status") in _IN_PROGRESS
+
+
+# Indexed field per document type; snapshots store its value and created_at
+# next to each document so a restart can rebuild the indexes without decoding bodies
+_INDEXED_FIELDS: Dict[str, str] = {doc_type: field for doc_type, field in INDEXES.values()}
+assert len(_INDEXED_FIELDS) == len(INDEXES), "snapshots hold one indexed field per document type"
+
+
+def _index_entry(doc_type: str, doc: Dict[str, Any]) -> Optional[List[Any]]:
+    field = _INDEXED_FIELDS.get(doc_type)
+    return [doc.get(field), doc.get(ORDER_FIELD)] if field else None
+
+
+class MemoryBackend:
+    """Documents in a ShardedStore (memory_store.py), bounded by AppConfig.MEMORY_STORE_*.
+
+    The store's shard locks make each operation atomic, including a patch's
+    check and write. The secondary indexes are only touched from the event
+    loop thread. Stored dicts are replaced rather than mutated by patches,
+    and reads and writes deep-copy documents, nested lists and dicts
+    included, so documents handed out by earlier reads do not change under
+    their holders and changing a saved or returned document does not change
+    the stored one, as with Couchbase. The snapshot writer relies on stored
+    dicts never changing in place.
+
+    After attach_log() every change is also appended to a DocumentLog, and
+    the log is compacted into a snapshot in a worker thread once it grows
+    past its compact_bytes. Changing a document and logging it happen
+    without an await in between, as does starting a new generation, so a
+    snapshot never misses a change its log does not hold. The log's writer
+    thread does the file I/O; a write returns once its record is written.
+    Evicted and expired documents are not logged as deletions; they are
+    left out of the next snapshot. Assigning or deleting items of `buckets`
+    takes the same indexed, logged path, without waiting for the write.
+    """
+    name = "memory"
+    remote = False
+
+    def __init__(
+        self,
+        shards: int = AppConfig.MEMORY_STORE_SHARDS,
+        max_entries: int = AppConfig.MEMORY_STORE_MAX_ENTRIES,
+        max_bytes: int = AppConfig.MEMORY_STORE_MAX_BYTES,
+        ttl: float = AppConfig.MEMORY_STORE_TTL,
+    ):
+        self.store = ShardedStore(
+            shards=shards, max_entries=max_entries, max_bytes=max_bytes, ttl=ttl,
+            pinned=_pinned, on_evict=self._unindex,
+        )
+        # item assignment and deletion on a bucket are indexed and logged like put() and delete()
+        self.buckets: Dict[str, Bucket] = {
+            doc_type: self.store.bucket(doc_type, put=self._save, delete=self._discard) for doc_type in DOC_TYPES
+        }
+        self.indexes: Dict[str, SecondaryIndex] = {
+            name: SecondaryIndex(field, ORDER_FIELD) for name, (_, field) in INDEXES.items()
+        }
+        self._type_indexes: Dict[str, List[SecondaryIndex]] = {
+            doc_type: [self.indexes[name] for name, (t, _) in INDEXES.items() if t == doc_type]
+            for doc_type in DOC_TYPES
+        }
+        self.log: Optional[DocumentLog] = None
+        self._compaction: Optional[asyncio.Task] = None
+
+    def _unindex(self, doc_type: str, doc_id: str) -> None:
+        """Drop an evicted or expired document from its type's indexes."""
+        for index in self._type_indexes[doc_type]:
+            index.remove(doc_id)
+
+    def _index(self, doc_type: str, doc_id: str, doc: Dict[str, Any]) -> None:
+        for index in self._type_indexes[doc_type]:
+            index.add(doc_id, doc)
+
+    def _log(self, doc_type: str, doc_id: str, doc: Optional[Dict[str, Any]]) -> Optional[Future]:
+        """Queue a save (or, for doc=None, a delete) in the log; the future completes once it is written.
+
+        The log's writer thread does the file I/O. Starts a compaction when
+        one is due and an event loop is running.
+        """
+        if self.log is None:
+            return None
+        if doc is None:
+            written = self.log.delete(doc_type, doc_id)
+        else:
+            written = self.log.put(doc_type, doc_id, doc)
+        if self._compaction is None and self.log.should_compact():
+            try:
+                self._compaction = asyncio.get_running_loop().create_task(self.compact())
+            except RuntimeError:
+                pass  # no loop (a bucket changed from synchronous code); the next write starts it
+        return written
+
+    @staticmethod
+    async def _written(written: Optional[Future]) -> None:
+        if written is not None:
+            await asyncio.wrap_future(written)
+
+    def _save(self, doc_type: str, doc_id: str, doc: Dict[str, Any]) -> Optional[Future]:
+        """Store, index and log a copy of a document, without waiting for the log write."""
+        doc = _copy(doc)  # later changes to the caller's dict must go through the store
+        self.store.put(doc_type, doc_id, doc)
+        self._index(doc_type, doc_id, doc)
+        return self._log(doc_type, doc_id, doc)
+
+    def _discard(self, doc_type: str, doc_id: str) -> bool:
+        """Remove, unindex and log the deletion of a document; False if it did not exist."""
+        if self.store.pop(doc_type, doc_id) is None:
+            return False
+        self._unindex(doc_type, doc_id)
+        self._log(doc_type, doc_id, None)
+        return True
+
+    async def attach_log(self, log: DocumentLog) -> Dict[str, Any]:
+        """Replace the contents with the documents saved in `log`, then log every change to it.
+
+        Snapshot documents are indexed from the values stored beside them and
+        decoded on first access; log records are applied on top.
+
+        Returns:
+            Restored document counts and the time taken
+        """
+        start = time.perf_counter()
+        restored = await self._restore(log)
+        self.log = log
+        return dict(restored, documents=self.store.count(), seconds=round(time.perf_counter() - start, 3))
+
+    async def _restore(self, log: DocumentLog) -> Dict[str, int]:
+        snapshot, records = await asyncio.to_thread(log.load)
+        self.clear()
+        if snapshot.version < 2:
+            # older snapshots hold only the indexed value; created_at is read from the documents once
+            for doc_type, _, lazy in snapshot.rows:
+                if doc_type in _INDEXED_FIELDS:
+                    lazy.value = _index_entry(doc_type, lazy.load())
+        for name, (doc_type, _) in INDEXES.items():
+            self.indexes[name].load(
+                (doc_id, *lazy.value) for row_type, doc_id, lazy in snapshot.rows if row_type == doc_type
+            )
+        in_progress = {
+            doc_id for status in _IN_PROGRESS for doc_id in self.indexes["analyses_by_status"].ids(status)
+        }
+        self.store.load(
+            (doc_type, doc_id, lazy, doc_type == "analysis" and doc_id in in_progress)
+            for doc_type, doc_id, lazy in snapshot.rows
+        )
+        for doc_type, doc_id, doc in records:
+            if doc is None:
+                await self.delete(doc_type, doc_id)
+            else:
+                await self.put(doc_type, doc_id, doc)
+        return {"snapshot": len(snapshot.rows), "replayed": len(records)}
+
+    async def compact(self) -> int:
+        """Start a new log generation and snapshot the documents in memory into it.
+
+        Returns:
+            Number of documents in the snapshot
+        """
+        try:
+            generation = self.log.rotate()
+            rows = self.store.raw_items()
+            return await asyncio.to_thread(self.log.write_snapshot, generation, rows, _index_entry)
+        except Exception as e:
+            # nothing is lost: until a snapshot completes, startup replays the older logs too
+            print(f"⚠ Memory log compaction failed: {type(e).__name__}: {e}")
+            return 0
+        finally:
+            self._compaction = None
+
+    async def get(self, doc_type: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        return _copy(self.store.get(doc_type, doc_id))
+
+    async def get_fields(self, doc_type: str, doc_id: str, fields: List[str]) -> Optional[Dict[str, Any]]:
+        return _copy(project(self.store.get(doc_type, doc_id), fields))
+
+    async def put(self, doc_type: str, doc_id: str, doc: Dict[str, Any]) -> None:
+        await self._written(self._save(doc_type, doc_id, doc))
+
+    async def delete(self, doc_type: str, doc_id: str) -> bool:
+        if self.store.pop(doc_type, doc_id) is None:
+            return False
+        self._unindex(doc_type, doc_id)
+        await self._written(self._log(doc_type, doc_id, None))
+        return True
+
+    async def patch(
+        self, doc_type: str, doc_id: str, changes: Dict[str, Any], expected: Optional[Dict[str, Any]]
+    ) -> bool:
+        def apply(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            if expected and any(doc.get(field) != value for field, value in expected.items()):
+                return None
+            return {**doc, **_copy(changes)}
+
+        doc = self.store.update(doc_type, doc_id, apply)
+        if doc is None:
+            return False
+        self._index(doc_type, doc_id, doc)
+        await self._written(self._log(doc_type, doc_id, doc))
+        return True
+
+    async def get_many(self, doc_type: str, doc_ids: List[str]) -> BulkResult:
+        return BulkResult({doc_id: _copy(self.store.get(doc_type, doc_id)) for doc_id in doc_ids}, {})
+
+    async def put_many(self, doc_type: str, docs: Dict[str, Dict[str, Any]]) -> BulkResult:
+        for doc_id, doc in docs.items():
+            await self.put(doc_type, doc_id, doc)
+        return BulkResult(dict.fromkeys(docs, True), {})
+
+    async def delete_many(self, doc_type: str, doc_ids: List[str]) -> BulkResult:
+        return BulkResult({doc_id: await self.delete(doc_type, doc_id) for doc_id in doc_ids}, {})
+
+    async def scan(self, doc_type: str, chunk_size: Optional[int]) -> AsyncIterator[Any]:
+        docs = [_copy(doc) for _, doc in self.store.items(doc_type)]  # snapshot: callers may save while iterating
+        for item in _chunks(docs, chunk_size):
+            yield item
+
+    async def lookup(
+        self, index: str, value: Any, limit: int, after: Optional[Key]
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        doc_type, _ = INDEXES[index]
+        items, has_next = self.indexes[index].page(value, self.buckets[doc_type], limit, after)
+        return [_copy(doc) for doc in items], has_next
+
+    def clear(self) -> None:
+        """Drop every document."""
+        self.store.clear()
+        for index in self.indexes.values():
+            index.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Size, budget and eviction counters of the underlying store, and the log's if attached."""
+        stats = self.store.stats()
+        stats["log"] = self.log.stats() if self.log is not None else None
+        return stats
+
+    async def close(self) -> None:
+        """Finish a running compaction and detach the log."""
+        if self._compaction is not None:
+            await asyncio.shield(self._compaction)
+        if self.log is not None:
+            log, self.log = self.log, None
+            await asyncio.to_thread(log.close)
+
+
+# Rows fetched per worker-thread hop when streaming through the blocking SDK
+_SYNC_STREAM_CHUNK = 500
+
+
+class CouchbaseBackend:
+    """Documents in Couchbase, through whichever client is connected.
+
+    With the asyncio client (COUCHBASE_ASYNC=true) operations are awaited
+    natively; with the blocking SDK they run in a worker thread so the
+    event loop keeps serving other requests while one is in flight.
+    """
+    name = "couchbase"
+    remote = True
+
+    async def get(self, doc_type: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        if AsyncCouchbaseClient.is_connected():
+            return await AsyncCouchbaseQuery.get_document(doc_id)
+        return await asyncio.to_thread(CouchbaseQuery.get_document, doc_id)
+
+    async def get_fields(self, doc_type: str, doc_id: str, fields: List[str]) -> Optional[Dict[str, Any]]:
+        # a sub-document lookup, so large unrequested fields stay on the server
+        if len(fields) > MAX_LOOKUP_PATHS:
+            return project(await self.get(doc_type, doc_id), fields)
+        if AsyncCouchbaseClient.is_connected():
+            return await AsyncCouchbaseQuery.get_fields(doc_id, fields)
+        return await asyncio.to_thread(CouchbaseQuery.get_fields, doc_id, fields)
+
+    async def put(self, doc_type: str, doc_id: str, doc: Dict[str, Any]) -> None:
+        if AsyncCouchbaseClient.is_connected():
+            await AsyncCouchbaseQuery.save_document(doc_id, doc)
+        else:
+            await asyncio.to_thread(CouchbaseQuery.save_document, doc_id, doc)
+
+    async def delete(self, doc_type: str, doc_id: str) -> bool:
+        if AsyncCouchbaseClient.is_connected():
+            return await AsyncCouchbaseQuery.delete_document(doc_id)
+        return await asyncio.to_thread(CouchbaseQuery.delete_document, doc_id)
+
+    async def patch(
+        self, doc_type: str, doc_id: str, changes: Dict[str, Any], expected: Optional[Dict[str, Any]]
+    ) -> bool:
+        # a CAS-guarded sub-document mutation
+        if AsyncCouchbaseClient.is_connected():
+            return await AsyncCouchbaseQuery.patch_document(doc_id, changes, expected)
+        return await asyncio.to_thread(CouchbaseQuery.patch_document, doc_id, changes, expected)
+
+    async def get_many(self, doc_type: str, doc_ids: List[str]) -> BulkResult:
+        if AsyncCouchbaseClient.is_connected():
+            return BulkResult(*await AsyncCouchbaseQuery.get_documents(doc_ids))
+        return BulkResult(*await asyncio.to_thread(CouchbaseQuery.get_documents, doc_ids))
+
+    async def put_many(self, doc_type: str, docs: Dict[str, Dict[str, Any]]) -> BulkResult:
+        if AsyncCouchbaseClient.is_connected():
+            return BulkResult(*await AsyncCouchbaseQuery.save_documents(docs))
+        return BulkResult(*await asyncio.to_thread(CouchbaseQuery.save_documents, docs))
+
+    async def delete_many(self, doc_type: str, doc_ids: List[str]) -> BulkResult:
+        if AsyncCouchbaseClient.is_connected():
+            return BulkResult(*await AsyncCouchbaseQuery.delete_documents(doc_ids))
+        return BulkResult(*await asyncio.to_thread(CouchbaseQuery.delete_documents, doc_ids))
+
+    async def scan(self, doc_type: str, chunk_size: Optional[int]) -> AsyncIterator[Any]:
+        statement = f"stream:{doc_type}"
+        if AsyncCouchbaseClient.is_connected():
+            async for item in AsyncCouchbaseQuery.stream(statement, chunk_size=chunk_size):
+                yield item
+            return
+        # the blocking iterator is advanced a chunk at a time in a worker thread
+        chunks = CouchbaseQuery.stream(statement, chunk_size=chunk_size or _SYNC_STREAM_CHUNK)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    return
+                if chunk_size:
+                    yield chunk
+                else:
+                    for row in chunk:
+                        yield row
+        finally:
+            chunks.close()
+
+    async def lookup(
+        self, index: str, value: Any, limit: int, after: Optional[Key]
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        # the registered keyset statements run on the (field, created_at DESC, META().id DESC)
+        # index; one extra row tells whether another page follows
+        if after is None:
+            statement, params = index, [value, limit + 1]
+        else:
+            statement, params = f"{index}:after", [value, *after, limit + 1]
+        if AsyncCouchbaseClient.is_connected():
+            rows = await AsyncCouchbaseQuery.execute(statement, params)
+        else:
+            rows = await asyncio.to_thread(CouchbaseQuery.execute, statement, params)
+        return rows[:limit], len(rows) > limit
+
+    async def close(self) -> None:
+        # connections belong to the clients; lifespan.py disconnects them
+        pass
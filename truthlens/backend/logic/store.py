@@ -1,107 +1,530 @@
 """Data store abstraction for users, uploads, and analyses.
 
-Supports both in-memory (fallback) and Couchbase backends.
-Uses Couchbase when available, falls back to in-memory for testing.
+Every function delegates to one StorageBackend (storage.py), selected once
+at startup with use_backend(): in-memory dicts (the default, used by tests),
+Couchbase, or SQLite in WAL mode for single-node deployments.
+
+All store functions are coroutines. Blocking backends (the synchronous
+Couchbase SDK, sqlite3) run in worker threads so the event loop keeps
+serving other requests while a slow operation is in flight.
+
+Couchbase calls are retried and guarded by a circuit breaker (resilience.py).
+When the cluster is unreachable, reads are answered from the read-through
+cache if it holds a copy, even one up to STORE_CACHE_STALE_GRACE seconds
+past its TTL; otherwise the error is raised. The in-memory dicts are never
+used as a fallback once Couchbase is selected, since they would report
+existing documents as missing.
+
+With AppConfig.MEMORY_LOG_DIR set, lifespan.py calls persist_memory() so the
+in-memory backend keeps an append-only log with snapshots (memory_log.py)
+and restores its documents on the next start.
+
+stream_users/stream_uploads/stream_analyses are async iterators over every
+document of a type; backends stream rows rather than collecting them, so
+exports, rescoring and migrations run in constant memory.
 """
-from typing import Optional, Dict, Any
+import base64
+import binascii
+import functools
+import json
+import time
+from typing import Optional, Dict, Any, Iterable, List, NamedTuple, AsyncIterator, Union
+
+from . import metrics, resilience, tracing
+from .app_config import AppConfig
+from .cache import LRUCache
+from .memory_log import DocumentLog
+from .secondary_index import Key, order_key
+from .storage import INDEXES, ORDER_FIELD, BulkResult, MemoryBackend, StorageBackend, project
+from .utils import make_etag
+
+# Default in-memory backend; its dicts and indexes are exposed for tests and fixtures
+_memory = MemoryBackend()
+_users: Dict[str, Dict[str, Any]] = _memory.buckets["user"]
+_uploads: Dict[str, Dict[str, Any]] = _memory.buckets["upload"]
+_analyses: Dict[str, Dict[str, Any]] = _memory.buckets["analysis"]
+_uploads_by_user = _memory.indexes["uploads_by_user"]
+_analyses_by_status = _memory.indexes["analyses_by_status"]
+
+_backend: StorageBackend = _memory
+
+
+class Page(NamedTuple):
+    """One page of a keyset-paginated listing.
+    
+    items: documents newest first (by created_at, then ID, both descending)
+    end_cursor: pass as `after` to fetch the next page (None if the page is empty)
+    has_next_page: whether more documents follow this page
+    """
+    items: List[Dict[str, Any]]
+    end_cursor: Optional[str]
+    has_next_page: bool
+
+
+# Optional read-through cache in front of remote backends (STORE_CACHE_ENABLED)
+_cache: Optional[LRUCache] = (
+    LRUCache(AppConfig.STORE_CACHE_MAX_ENTRIES, stale_grace=AppConfig.STORE_CACHE_STALE_GRACE)
+    if AppConfig.STORE_CACHE_ENABLED else None
+)
+_CACHE_TTLS: Dict[str, float] = {
+    "user": AppConfig.STORE_CACHE_TTL_USER,
+    "upload": AppConfig.STORE_CACHE_TTL_UPLOAD,
+    "analysis": AppConfig.STORE_CACHE_TTL_ANALYSIS,
+}
+
+STORE_OP_SECONDS = metrics.histogram(
+    "truthlens_store_op_seconds",
+    "Latency of store operations, including read-through cache hits",
+    ("backend", "op", "doc_type"),
+)
+
+
+def _timed(op: str):
+    """Record the latency (and a trace span) of a generic operation whose first argument is the document type."""
+    span_name = "store." + op
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        async def timed(doc_type: str, *args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                if tracing.current() is None:
+                    return await fn(doc_type, *args, **kwargs)
+                with tracing.span(span_name, backend=_backend.name, doc_type=doc_type):
+                    return await fn(doc_type, *args, **kwargs)
+            finally:
+                STORE_OP_SECONDS.labels(_backend.name, op, doc_type).observe(time.perf_counter() - start)
+        return timed
+    return decorate
+
+
+# --- Backend selection ---
+
+def use_backend(backend: Optional[StorageBackend]) -> None:
+    """Route every store call to `backend` (None restores the in-memory backend).
+    
+    Called once at startup; cached documents from the previous backend are dropped.
+    """
+    global _backend
+    _backend = backend if backend is not None else _memory
+    clear_cache()
+
+
+def backend_name() -> str:
+    """Name of the active backend ("memory", "couchbase", "sqlite")."""
+    return _backend.name
+
+
+async def close() -> None:
+    """Close the active backend and fall back to the in-memory one."""
+    backend = _backend
+    use_backend(None)
+    await backend.close()
+
+
+async def persist_memory(directory: str) -> Dict[str, Any]:
+    """Restore the in-memory backend from `directory` and log every later change there.
+    
+    Args:
+        directory: Log and snapshot directory (created if missing)
+    
+    Returns:
+        Restored document counts and the time taken (see MemoryBackend.attach_log)
+    """
+    log = DocumentLog(
+        directory, compact_bytes=AppConfig.MEMORY_LOG_COMPACT_BYTES, fsync=AppConfig.MEMORY_LOG_FSYNC
+    )
+    return await _memory.attach_log(log)
+
+
+def _cached() -> Optional[LRUCache]:
+    """The read-through cache, if enabled and the backend is remote."""
+    return _cache if _backend.remote else None
+
+
+# --- Generic operations ---
+
+@_timed("put")
+async def _save(doc_type: str, doc_id: str, doc: Dict[str, Any]) -> None:
+    """Insert or replace one document."""
+    await _backend.put(doc_type, doc_id, doc)
+    _invalidate(doc_id)
+
+
+@_timed("delete")
+async def _delete(doc_type: str, doc_id: str) -> bool:
+    """Delete one document; False if it did not exist."""
+    deleted = await _backend.delete(doc_type, doc_id)
+    _invalidate(doc_id)
+    return deleted
+
+
+async def _stream(doc_type: str, chunk_size: Optional[int]) -> AsyncIterator[Any]:
+    """Yield every document of one type (or lists of them) in constant memory."""
+    async for item in _backend.scan(doc_type, chunk_size):
+        yield item
+
+
+@_timed("get_many")
+async def _get_many(doc_type: str, doc_ids: Iterable[str]) -> BulkResult:
+    """Fetch many documents of one type; duplicate IDs are fetched once."""
+    return await _cached_get_many(doc_type, list(dict.fromkeys(doc_ids)))
+
+
+@_timed("put_many")
+async def _save_many(doc_type: str, docs: Dict[str, Dict[str, Any]]) -> BulkResult:
+    """Save many documents of one type."""
+    result = await _backend.put_many(doc_type, docs)
+    _invalidate(*docs)
+    return result
+
+
+@_timed("delete_many")
+async def _delete_many(doc_type: str, doc_ids: Iterable[str]) -> BulkResult:
+    """Delete many documents of one type."""
+    ids = list(dict.fromkeys(doc_ids))
+    result = await _backend.delete_many(doc_type, ids)
+    _invalidate(*ids)
+    return result
+
+
+@_timed("patch")
+async def _patch(
+    doc_type: str,
+    doc_id: str,
+    changes: Dict[str, Any],
+    expected: Optional[Dict[str, Any]],
+) -> bool:
+    """Set top-level fields of a stored document, optionally only if others match.
+    
+    In Couchbase this is a CAS-guarded sub-document mutation; SQLite checks
+    and writes in one transaction; in memory the check and the write happen
+    without yielding to the event loop. Documents handed out by earlier
+    reads never change under their holders.
+    """
+    patched = await _backend.patch(doc_type, doc_id, changes, expected)
+    _invalidate(doc_id)
+    return patched
+
+
+# --- Keyset pagination ---
+
+def _encode_cursor(doc: Dict[str, Any]) -> str:
+    """Opaque cursor for the position just after doc in listing order."""
+    key = order_key(str(doc["id"]), doc, ORDER_FIELD)
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Key:
+    """(created_at, document ID) key encoded in a cursor.
+    
+    Raises:
+        Exception: If the cursor is malformed
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise Exception("Invalid cursor")
+    if not (isinstance(key, list) and len(key) == 2 and all(isinstance(part, str) for part in key)):
+        raise Exception("Invalid cursor")
+    return key[0], key[1]
 
-from .couchbase_config import CouchbaseConfig
-from .couchbase_client import CouchbaseQuery, CouchbaseClient
 
-# In-memory fallback store (used when Couchbase is disabled)
-_users: Dict[str, Dict[str, Any]] = {}
-_uploads: Dict[str, Dict[str, Any]] = {}
-_analyses: Dict[str, Dict[str, Any]] = {}
+async def _list_by(index: str, value: Any, first: int, after: Optional[str]) -> Page:
+    """List documents of one of storage.INDEXES with field == value, newest first.
+    
+    Seeks past the cursor's (created_at, ID) instead of skipping an offset,
+    so every page costs O(page size) on each backend's
+    (field, created_at, id) index.
+    """
+    after_key = _decode_cursor(after) if after else None
+    start = time.perf_counter()
+    try:
+        with tracing.span("store.lookup", backend=_backend.name, index=index):
+            items, has_next = await _backend.lookup(index, value, first, after_key)
+    finally:
+        STORE_OP_SECONDS.labels(_backend.name, "lookup", INDEXES[index][0]).observe(time.perf_counter() - start)
+    end_cursor = _encode_cursor(items[-1]) if items else None
+    return Page(items, end_cursor, has_next)
 
 
-def _use_couchbase() -> bool:
-    """Check if Couchbase should be used."""
-    return CouchbaseConfig.USE_COUCHBASE and CouchbaseClient.is_connected()
+# --- Read-through cache ---
+
+def _cacheable(doc_type: str, doc: Dict[str, Any]) -> bool:
+    """Analyses may still change until they are ready; everything else relies on TTLs."""
+    return doc_type != "analysis" or doc.get("status") == "ready"
+
+
+@_timed("get")
+async def _cached_get(
+    doc_type: str, doc_id: str, fields: Optional[List[str]] = None
+) -> Optional[Dict[str, Any]]:
+    """Backend get that is served from the cache when possible.
+    
+    With `fields`, only those top-level fields are fetched (get_fields);
+    such partial documents are answered from a cached full copy but never
+    cached themselves.
+    """
+    cache = _cached()
+    if cache is None:
+        if fields is not None:
+            return await _backend.get_fields(doc_type, doc_id, fields)
+        return await _backend.get(doc_type, doc_id)
+    doc = cache.get(doc_id)
+    if doc is not None:
+        return project(doc, fields) if fields is not None else doc
+    generation = cache.generation
+    try:
+        if fields is not None:
+            return await _backend.get_fields(doc_type, doc_id, fields)
+        doc = await _backend.get(doc_type, doc_id)
+    except resilience.UNAVAILABLE_ERRORS:
+        stale = cache.get_stale(doc_id)
+        if stale is None:
+            raise
+        return project(stale, fields) if fields is not None else stale
+    # skip caching if a write invalidated anything while the fetch was in flight
+    if doc is not None and generation == cache.generation and _cacheable(doc_type, doc):
+        cache.set(doc_id, doc, _CACHE_TTLS[doc_type])
+    return doc
+
+
+async def _cached_get_many(doc_type: str, doc_ids: List[str]) -> BulkResult:
+    """Backend bulk get that only fetches the IDs missing from the cache."""
+    cache = _cached()
+    if cache is None:
+        return await _backend.get_many(doc_type, doc_ids)
+    found = {}
+    missing = []
+    for doc_id in doc_ids:
+        doc = cache.get(doc_id)
+        if doc is None:
+            missing.append(doc_id)
+        else:
+            found[doc_id] = doc
+    if not missing:
+        return BulkResult(found, {})
+    generation = cache.generation
+    fetched = await _backend.get_many(doc_type, missing)
+    if generation == cache.generation:
+        for doc_id, doc in fetched.results.items():
+            if doc is not None and _cacheable(doc_type, doc):
+                cache.set(doc_id, doc, _CACHE_TTLS[doc_type])
+    found.update(fetched.results)
+    errors = {}
+    for doc_id, error in fetched.errors.items():
+        stale = cache.get_stale(doc_id)
+        if stale is None:
+            errors[doc_id] = error
+        else:
+            found[doc_id] = stale
+    results = {doc_id: found.get(doc_id) for doc_id in doc_ids if doc_id not in errors}
+    return BulkResult(results, errors)
+
+
+def _invalidate(*doc_ids: str) -> None:
+    """Drop documents from the cache once a write or delete has completed.
+
+    Bumping the cache generation also stops reads that were in flight during
+    the write from caching what they fetched.
+    """
+    if _cache is not None:
+        for doc_id in doc_ids:
+            _cache.invalidate(doc_id)
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Return read-through cache size and hit/miss counters ({} when disabled)."""
+    return _cache.stats() if _cache is not None else {}
+
+
+def health() -> Dict[str, Any]:
+    """Return the active backend, Couchbase breaker/retry counters and cache stats."""
+    return {
+        "backend": _backend.name,
+        "couchbase": resilience.health(),
+        "cache": cache_stats(),
+        "memory": _memory.stats() if _backend is _memory else None,
+    }
+
+
+def clear_cache() -> None:
+    """Drop every cached document and reset the counters."""
+    if _cache is not None:
+        _cache.clear()
 
 
 # --- User Store ---
 
-def save_user(user_id: str, user_doc: Dict[str, Any]) -> None:
+async def save_user(user_id: str, user_doc: Dict[str, Any]) -> None:
     """Save a user document."""
-    if _use_couchbase():
-        CouchbaseQuery.save_document(user_id, user_doc)
-    else:
-        _users[user_id] = user_doc
+    await _save("user", user_id, user_doc)
 
 
-def get_user(user_id: str) -> Optional[Dict[str, Any]]:
+async def get_user(user_id: str) -> Optional[Dict[str, Any]]:
     """Retrieve a user document by ID."""
-    if _use_couchbase():
-        return CouchbaseQuery.get_document(user_id)
-    else:
-        return _users.get(user_id)
+    return await _cached_get("user", user_id)
 
 
-def delete_user(user_id: str) -> bool:
+async def delete_user(user_id: str) -> bool:
     """Delete a user document by ID."""
-    if _use_couchbase():
-        return CouchbaseQuery.delete_document(user_id)
-    else:
-        if user_id in _users:
-            del _users[user_id]
-            return True
-        return False
+    return await _delete("user", user_id)
+
+
+async def get_many_users(user_ids: Iterable[str]) -> BulkResult:
+    """Retrieve many user documents in one batched round trip."""
+    return await _get_many("user", user_ids)
+
+
+async def save_many_users(user_docs: Dict[str, Dict[str, Any]]) -> BulkResult:
+    """Save many user documents, keyed by ID, in one batched round trip."""
+    return await _save_many("user", user_docs)
+
+
+async def delete_many_users(user_ids: Iterable[str]) -> BulkResult:
+    """Delete many user documents in one batched round trip."""
+    return await _delete_many("user", user_ids)
+
+
+def stream_users(chunk_size: Optional[int] = None) -> AsyncIterator[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+    """Iterate over every user document, or lists of up to chunk_size of them."""
+    return _stream("user", chunk_size)
 
 
 # --- Upload Store ---
 
-def save_upload(upload_id: str, upload_doc: Dict[str, Any]) -> None:
+async def save_upload(upload_id: str, upload_doc: Dict[str, Any]) -> None:
     """Save an upload document."""
-    if _use_couchbase():
-        CouchbaseQuery.save_document(upload_id, upload_doc)
-    else:
-        _uploads[upload_id] = upload_doc
+    await _save("upload", upload_id, upload_doc)
 
 
-def get_upload(upload_id: str) -> Optional[Dict[str, Any]]:
+async def get_upload(upload_id: str) -> Optional[Dict[str, Any]]:
     """Retrieve an upload document by ID."""
-    if _use_couchbase():
-        return CouchbaseQuery.get_document(upload_id)
-    else:
-        return _uploads.get(upload_id)
+    return await _cached_get("upload", upload_id)
 
 
-def delete_upload(upload_id: str) -> bool:
+async def delete_upload(upload_id: str) -> bool:
     """Delete an upload document by ID."""
-    if _use_couchbase():
-        return CouchbaseQuery.delete_document(upload_id)
-    else:
-        if upload_id in _uploads:
-            del _uploads[upload_id]
-            return True
-        return False
+    return await _delete("upload", upload_id)
+
+
+async def patch_upload(
+    upload_id: str,
+    changes: Dict[str, Any],
+    expected: Optional[Dict[str, Any]] = None,
+) -> bool:
+    """Set fields of an upload without rewriting the whole document.
+    
+    Args:
+        upload_id: Upload ID
+        changes: New values by field name
+        expected: Only apply if these fields currently have these values
+    
+    Returns:
+        True if applied, False if the upload is missing or `expected` did not match
+    
+    Raises:
+        ConcurrentModificationError: If concurrent writers kept winning the CAS race
+    """
+    return await _patch("upload", upload_id, changes, expected)
+
+
+async def get_many_uploads(upload_ids: Iterable[str]) -> BulkResult:
+    """Retrieve many upload documents in one batched round trip."""
+    return await _get_many("upload", upload_ids)
+
+
+async def save_many_uploads(upload_docs: Dict[str, Dict[str, Any]]) -> BulkResult:
+    """Save many upload documents, keyed by ID, in one batched round trip."""
+    return await _save_many("upload", upload_docs)
+
+
+async def delete_many_uploads(upload_ids: Iterable[str]) -> BulkResult:
+    """Delete many upload documents in one batched round trip."""
+    return await _delete_many("upload", upload_ids)
+
+
+async def list_uploads_by_user(user_id: str, first: int = 20, after: Optional[str] = None) -> Page:
+    """List a user's uploads, `first` at a time, starting after cursor `after`."""
+    return await _list_by("uploads_by_user", user_id, first, after)
+
+
+def stream_uploads(chunk_size: Optional[int] = None) -> AsyncIterator[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+    """Iterate over every upload document, or lists of up to chunk_size of them."""
+    return _stream("upload", chunk_size)
 
 
 # --- Analysis Store ---
 
-def save_analysis(analysis_id: str, analysis_doc: Dict[str, Any]) -> None:
-    """Save an analysis document."""
-    if _use_couchbase():
-        CouchbaseQuery.save_document(analysis_id, analysis_doc)
-    else:
-        _analyses[analysis_id] = analysis_doc
+async def save_analysis(analysis_id: str, analysis_doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Save an analysis document with a new etag; analysis_doc itself is left unchanged.
+    
+    The etag is the analysis's content version: every write changes it, so
+    HTTP responses built from the document can be validated without hashing
+    their bodies.
+    
+    Returns:
+        The document as saved, etag included
+    """
+    saved = dict(analysis_doc, etag=make_etag())
+    await _save("analysis", analysis_id, saved)
+    return saved
 
 
-def get_analysis(analysis_id: str) -> Optional[Dict[str, Any]]:
-    """Retrieve an analysis document by ID."""
-    if _use_couchbase():
-        return CouchbaseQuery.get_document(analysis_id)
-    else:
-        return _analyses.get(analysis_id)
+async def get_analysis(analysis_id: str, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """Retrieve an analysis document by ID.
+    
+    Args:
+        analysis_id: Analysis document ID
+        fields: Top-level fields to fetch (None = the whole document); the
+            backend reads only these, so large unrequested fields such as
+            fact_checks are skipped. Other fields are left out of the result.
+    """
+    return await _cached_get("analysis", analysis_id, fields)
 
 
-def delete_analysis(analysis_id: str) -> bool:
+async def delete_analysis(analysis_id: str) -> bool:
     """Delete an analysis document by ID."""
-    if _use_couchbase():
-        return CouchbaseQuery.delete_document(analysis_id)
-    else:
-        if analysis_id in _analyses:
-            del _analyses[analysis_id]
-            return True
-        return False
+    return await _delete("analysis", analysis_id)
+
+
+async def patch_analysis(
+    analysis_id: str,
+    changes: Dict[str, Any],
+    expected: Optional[Dict[str, Any]] = None,
+) -> bool:
+    """Set fields of an analysis without rewriting the whole document.
+    
+    Also gives it a new etag, unless `changes` sets one. See patch_upload.
+    """
+    return await _patch("analysis", analysis_id, {"etag": make_etag(), **changes}, expected)
+
+
+async def get_many_analyses(analysis_ids: Iterable[str]) -> BulkResult:
+    """Retrieve many analysis documents in one batched round trip."""
+    return await _get_many("analysis", analysis_ids)
+
+
+async def save_many_analyses(analysis_docs: Dict[str, Dict[str, Any]]) -> BulkResult:
+    """Save many analysis documents, keyed by ID, in one batched round trip; each gets a new etag.
+    
+    The documents in `analysis_docs` are left unchanged.
+    """
+    return await _save_many(
+        "analysis", {analysis_id: dict(doc, etag=make_etag()) for analysis_id, doc in analysis_docs.items()}
+    )
+
+
+async def delete_many_analyses(analysis_ids: Iterable[str]) -> BulkResult:
+    """Delete many analysis documents in one batched round trip."""
+    return await _delete_many("analysis", analysis_ids)
+
+
+def stream_analyses(chunk_size: Optional[int] = None) -> AsyncIterator[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+    """Iterate over every analysis document, or lists of up to chunk_size of them."""
+    return _stream("analysis", chunk_size)
+
 
+async def list_analyses_by_status(status: str, first: int = 20, after: Optional[str] = None) -> Page:
+    """List analyses in a status, `first` at a time, starting after cursor `after`."""
+    return await _list_by("analyses_by_status", status, first, after)
@@ -0,0 +1,417 @@
+"""Request tracing from the HTTP request down to each store and Couchbase call.
+
+TraceMiddleware (app/main.py) opens a root span for a sample of HTTP
+requests. Everything the request does underneath records child spans: the
+GraphQL operation and every field with its own resolver (graphql_tracing.py),
+each store operation (store.py), each CouchbaseQuery call, and the analysis
+job the request enqueued (jobs.py), with its checks (engine.py).
+
+The current span lives in a contextvar, so it follows the request across
+awaits and into tasks, and into worker threads started with
+asyncio.to_thread. loop.run_in_executor does not copy the context; wrap
+the function with bind_context() for thread pools. Process pools get no
+context: their work shows as one span in the parent.
+
+Tracing is off unless TRACE_FILE is set. Then a request is traced if it
+carries a W3C `traceparent` header with the sampled flag (its trace and
+parent IDs are kept), otherwise with probability TRACE_SAMPLE_RATE; the
+response carries the `traceparent` of its root span. Outside a sampled
+request, span() returns a shared no-op span; hot paths (store.py) check
+current() first and skip the `with` block, so they only pay a contextvar
+read.
+
+Spans are written to TRACE_FILE once their request (or job) finishes, one
+write per trace, in TRACE_FORMAT:
+
+- "chrome": Trace Event Format ("X" events, one line each), for
+  chrome://tracing, https://ui.perfetto.dev or speedscope. Spans running
+  concurrently (gathered tasks, threads) get their own track (tid).
+- "otlp": OTLP/JSON, one ExportTraceServiceRequest per line, as written by
+  the OpenTelemetry Collector's file exporter and read by its otlpjsonfile
+  receiver or otel-desktop-viewer.
+"""
+import asyncio
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar, Union
+
+from .app_config import AppConfig
+
+T = TypeVar("T")
+
+# OTLP span kinds
+INTERNAL = 1
+SERVER = 2
+CLIENT = 3
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("truthlens_span", default=None)
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+def _new_id(nbytes: int) -> str:
+    # random, not secrets: IDs only need to be unique, and urandom is a syscall per span
+    return f"{random.getrandbits(nbytes * 8):0{nbytes * 2}x}"
+
+
+def _lane() -> int:
+    """Track for a span starting now: its asyncio task, else its thread."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return id(task) if task is not None else threading.get_ident()
+
+
+class _Batch:
+    """Spans of one trace recorded in this process, exported when `root` ends."""
+
+    __slots__ = ("root", "spans")
+
+    def __init__(self):
+        self.root: Optional[Span] = None
+        self.spans: Optional[List[Span]] = []  # None once exported
+
+
+class Span:
+    """One timed operation of a trace."""
+
+    __slots__ = (
+        "name", "kind", "trace_id", "span_id", "parent_id", "attributes",
+        "error", "start_ns", "end_ns", "lane", "_batch", "_token",
+    )
+
+    def __init__(
+        self, name: str, trace_id: str, parent_id: Optional[str], batch: _Batch,
+        kind: int = INTERNAL, attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+        self.lane = _lane()
+        self._batch = batch
+        self._token = None
+        self.end_ns: Optional[int] = None
+        self.start_ns = time.time_ns()
+
+    def set(self, **attributes: Any) -> None:
+        """Add or replace attributes."""
+        self.attributes.update(attributes)
+
+    def traceparent(self) -> str:
+        """W3C trace context header naming this span as the parent."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        """Finish the span, recording `error` if given; exports the batch if this is its root."""
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        batch = self._batch
+        spans = batch.spans
+        if spans is None:
+            tracer.export([self])  # finished after its request, e.g. a leftover task
+            return
+        spans.append(self)
+        if batch.root is self:
+            batch.spans = None
+            tracer.export(spans)
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _current.reset(self._token)
+        self.end(exc if isinstance(exc, Exception) else None)
+
+
+class _NoopSpan:
+    """Stand-in returned outside sampled requests; every method does nothing."""
+
+    __slots__ = ()
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP = _NoopSpan()
+
+
+# --- Export ---
+
+def _chrome_events(spans: List[Span]) -> List[Dict[str, Any]]:
+    pid = os.getpid()
+    return [
+        {
+            "name": s.name,
+            "cat": s.name.split(".", 1)[0].split(" ", 1)[0],
+            "ph": "X",
+            "ts": s.start_ns / 1000,
+            "dur": (s.end_ns - s.start_ns) / 1000,
+            "pid": pid,
+            "tid": s.lane,
+            "args": dict(
+                s.attributes, trace_id=s.trace_id, span_id=s.span_id, parent_id=s.parent_id,
+                **({"error": s.error} if s.error else {}),
+            ),
+        }
+        for s in spans
+    ]
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_request(spans: List[Span]) -> Dict[str, Any]:
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "truthlens"}}]},
+        "scopeSpans": [{
+            "scope": {"name": "backend.logic.tracing"},
+            "spans": [
+                {
+                    "traceId": s.trace_id,
+                    "spanId": s.span_id,
+                    **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+                    "name": s.name,
+                    "kind": s.kind,
+                    "startTimeUnixNano": str(s.start_ns),
+                    "endTimeUnixNano": str(s.end_ns),
+                    "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+                    "status": {"code": 2, "message": s.error} if s.error else {},
+                }
+                for s in spans
+            ],
+        }],
+    }]}
+
+
+class Tracer:
+    """Sampling decisions and the trace file.
+
+    Args:
+        path: File spans are appended to ("" = tracing off)
+        sample_rate: Fraction of requests without a traceparent header to trace
+        format: "chrome" or "otlp"
+        rng: Random source for sampling (tests pass a seeded one)
+    """
+
+    def __init__(self, path: str = "", sample_rate: float = 0.0, format: str = "chrome",
+                 rng: Optional[random.Random] = None):
+        if format not in ("chrome", "otlp"):
+            raise ValueError(f"Unknown trace format {format!r} (expected 'chrome' or 'otlp')")
+        self.path = path
+        self.sample_rate = sample_rate
+        self.format = format
+        self.spans_exported = 0
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._file = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def start(self, name: str, traceparent: Optional[str] = None, kind: int = SERVER, **attributes: Any) -> Optional[Span]:
+        """Root span of a new trace, or None if the request is not sampled.
+
+        A valid traceparent header decides by its sampled flag and supplies
+        the trace ID and remote parent; otherwise sample_rate decides.
+        """
+        if not self.path:
+            return None
+        match = _TRACEPARENT.match(traceparent.strip().lower()) if traceparent else None
+        if match:
+            if not int(match.group(3), 16) & 1:
+                return None
+            trace_id, parent_id = match.group(1), match.group(2)
+        elif self.sample_rate > 0 and self._rng.random() < self.sample_rate:
+            trace_id, parent_id = _new_id(16), None
+        else:
+            return None
+        batch = _Batch()
+        root = batch.root = Span(name, trace_id, parent_id, batch, kind, attributes)
+        return root
+
+    def export(self, spans: List[Span]) -> None:
+        """Append finished spans to the trace file in one write."""
+        if self.format == "otlp":
+            text = json.dumps(_otlp_request(spans), default=str) + "\n"
+        else:
+            text = "".join(json.dumps(event, default=str) + ",\n" for event in _chrome_events(spans))
+        try:
+            with self._lock:
+                if self._file is None:
+                    self._file = open(self.path, "a", encoding="utf-8")
+                    if self.format == "chrome" and self._file.tell() == 0:
+                        # JSON Array Format; viewers accept the missing "]" and trailing comma
+                        self._file.write("[\n")
+                self._file.write(text)
+                self._file.flush()
+                self.spans_exported += len(spans)
+        except OSError as e:
+            print(f"⚠ Could not write trace file {self.path}: {e}")
+
+    def close(self) -> None:
+        """Close the trace file (reopened on the next export)."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+# Shared tracer configured from AppConfig
+tracer = Tracer(AppConfig.TRACE_FILE, AppConfig.TRACE_SAMPLE_RATE, AppConfig.TRACE_FORMAT)
+
+
+# --- Instrumentation API ---
+
+def current() -> Optional[Span]:
+    """The active span, or None outside a sampled request."""
+    return _current.get()
+
+
+def span(name: str, kind: int = INTERNAL, parent: Optional[Span] = None, **attributes: Any) -> Union[Span, _NoopSpan]:
+    """Child span of `parent` (default: the active span), used as a context manager.
+
+    The span becomes the active one inside the `with` block and records the
+    exception leaving it, if any. Without a parent it is a no-op.
+
+    An explicit parent is for work handed to another task (a queued job)
+    that may outlive the parent's request: the span and its children are
+    exported together when it ends, rather than with the parent's trace.
+    """
+    if parent is not None:
+        batch = _Batch()
+        child = batch.root = Span(name, parent.trace_id, parent.span_id, batch, kind, attributes)
+        return child
+    parent = _current.get()
+    if parent is None:
+        return NOOP
+    return Span(name, parent.trace_id, parent.span_id, parent._batch, kind, attributes)
+
+
+@contextlib.contextmanager
+def activate(active: Union[Span, _NoopSpan]) -> Iterator[None]:
+    """Make a span the active one for a block without ending it."""
+    if active is NOOP:
+        yield
+        return
+    token = _current.set(active)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def detach() -> None:
+    """Forget the active span for the rest of this task (long-lived tasks started inside a request)."""
+    _current.set(None)
+
+
+def set_attributes(**attributes: Any) -> None:
+    """Add attributes to the active span, if any."""
+    active = _current.get()
+    if active is not None:
+        active.attributes.update(attributes)
+
+
+def bind_context(fn: Callable[..., T]) -> Callable[..., T]:
+    """Run `fn` in a copy of the current context, for executors that do not copy it."""
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+def traced(name: str, kind: int = INTERNAL, key: Optional[str] = None) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Decorator recording a span around every call made inside a sampled request.
+
+    Args:
+        name: Span name
+        kind: OTLP span kind (CLIENT for calls to another service)
+        key: Attribute recording the first argument (its length if it is not a string)
+    """
+    def attributes(args: tuple) -> Dict[str, Any]:
+        if key is None or not args:
+            return {}
+        return {key: args[0] if isinstance(args[0], str) else len(args[0])}
+
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def traced_async(*args: Any, **kwargs: Any) -> Any:
+                if _current.get() is None:
+                    return await fn(*args, **kwargs)
+                with span(name, kind, **attributes(args)):
+                    return await fn(*args, **kwargs)
+            return traced_async
+
+        @functools.wraps(fn)
+        def traced_sync(*args: Any, **kwargs: Any) -> Any:
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            with span(name, kind, **attributes(args)):
+                return fn(*args, **kwargs)
+        return traced_sync
+    return decorate
+
+
+class TraceMiddleware:
+    """ASGI middleware opening the root span of each sampled HTTP request.
+
+    The span lasts until the application has sent the whole response, and
+    records the status code. WebSocket connections are not traced.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled:
+            return await self.app(scope, receive, send)
+        header = next((v for k, v in scope.get("headers") or () if k == b"traceparent"), None)
+        root = tracer.start(
+            f"{scope['method']} {scope['path']}",
+            header.decode("latin-1") if header else None,
+            **{"http.method": scope["method"], "http.target": scope["path"]},
+        )
+        if root is None:
+            return await self.app(scope, receive, send)
+
+        async def send_traced(message):
+            if message["type"] == "http.response.start":
+                root.set(**{"http.status_code": message["status"]})
+                headers = list(message.get("headers") or ()) + [(b"traceparent", root.traceparent().encode())]
+                message = dict(message, headers=headers)
+            await send(message)
+
+        with root:
+            await self.app(scope, receive, send_traced)
@@ -18,3 +18,8 @@ def make_id(prefix: str) -> str:
         String in format 'prefix::uuid'
     """
     return f"{prefix}::{uuid.uuid4()}"
+
+
+def make_etag() -> str:
+    """Generate an opaque content version, assigned to a document on every write."""
+    return uuid.uuid4().hex
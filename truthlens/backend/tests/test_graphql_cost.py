@@ -0,0 +1,114 @@
+"""Tests for GraphQL query cost and depth limits."""
+import pytest
+from graphql import parse
+
+from backend.graphql.graphql_cost import operation_cost
+from backend.graphql.graphql_schema import schema
+from backend.logic import store
+from backend.logic.app_config import AppConfig
+
+
+def _cost(query, variables=None, operation_name=None):
+    return operation_cost(schema._schema, parse(query), operation_name, variables)
+
+
+@pytest.fixture
+def resolver_calls(monkeypatch):
+    """Record every upload read, to check that rejected queries never run."""
+    calls = []
+    original = store.get_upload
+
+    async def wrapper(upload_id, *args, **kwargs):
+        calls.append(upload_id)
+        return await original(upload_id, *args, **kwargs)
+    monkeypatch.setattr(store, "get_upload", wrapper)
+    return calls
+
+
+class TestOperationCost:
+    """Test static scoring of operations."""
+
+    def test_scalars_are_free(self):
+        """A store read costs its weight; scalar fields add nothing."""
+        assert _cost('{ user(id: "1") { id name email } }') == (10, 2)
+
+    def test_lists_multiply_their_selections(self):
+        """Nested lists are scored per expected item."""
+        # upload 10 + files 1 + 5 files x (user 10)
+        assert _cost('{ upload(id: "1") { files { user { name } } } }') == (10 + 1 + 5 * 10, 4)
+
+    def test_page_size_comes_from_first(self):
+        """Page fields are scored by their `first` argument, literal, variable or default."""
+        query = "query($n: Int!) { uploadsByUser(userId: \"u\", first: $n) { items { id } } }"
+        assert _cost(query, {"n": 3}).cost == 10 + 3 * 1
+        assert _cost('{ uploadsByUser(userId: "u") { items { id } } }').cost == 10 + 20 * 1
+
+    def test_fragments_count_as_written_out(self):
+        """Fragment spreads and inline fragments add their selections at the same depth."""
+        inline = '{ upload(id: "1") { settings { factCheck } analysis { status } } }'
+        fragments = """
+        { upload(id: "1") { ...U } }
+        fragment U on Upload { settings { factCheck } ... on Upload { analysis { status } } }
+        """
+        assert _cost(fragments) == _cost(inline)
+
+    def test_introspection_is_free(self):
+        """Introspection fields neither cost nor count towards depth."""
+        assert _cost("{ __schema { types { fields { type { ofType { name } } } } } }") == (0, 0)
+
+    def test_named_operation(self):
+        """Only the executed operation of a document is scored."""
+        query = 'query A { user(id: "1") { id } } query B { upload(id: "1") { files { id } } }'
+        assert _cost(query, operation_name="A").cost == 10
+        assert _cost(query, operation_name="B").cost == 11
+
+
+class TestQueryCostExtension:
+    """Test that the schema enforces the budgets before resolvers run."""
+
+    @pytest.mark.asyncio
+    async def test_cost_reported_in_extensions(self):
+        """Accepted operations report their cost and the budgets."""
+        result = await schema.execute('{ upload(id: "missing") { id } }')
+        assert result.errors is None
+        assert result.extensions["cost"] == {
+            "requested": 10, "maximum": AppConfig.GRAPHQL_MAX_COST,
+            "depth": 2, "maxDepth": AppConfig.GRAPHQL_MAX_DEPTH,
+        }
+
+    @pytest.mark.asyncio
+    async def test_too_expensive_is_rejected(self, monkeypatch, resolver_calls):
+        """An operation over the cost budget fails with QUERY_TOO_COMPLEX and resolves nothing."""
+        monkeypatch.setattr(AppConfig, "GRAPHQL_MAX_COST", 50)
+        result = await schema.execute('{ upload(id: "1") { files { user { name } } } }')
+        assert result.data is None
+        assert result.errors[0].extensions["code"] == "QUERY_TOO_COMPLEX"
+        assert result.extensions["cost"]["requested"] == 61
+        assert resolver_calls == []
+
+    @pytest.mark.asyncio
+    async def test_too_deep_is_rejected(self, monkeypatch, resolver_calls):
+        """An operation nested past the depth budget fails with QUERY_TOO_DEEP."""
+        monkeypatch.setattr(AppConfig, "GRAPHQL_MAX_DEPTH", 3)
+        result = await schema.execute('{ upload(id: "1") { files { user { name } } } }')
+        assert result.errors[0].extensions["code"] == "QUERY_TOO_DEEP"
+        assert resolver_calls == []
+
+    @pytest.mark.asyncio
+    async def test_cost_depends_on_variables(self, monkeypatch):
+        """The same (cached) document is accepted or rejected depending on its variables."""
+        monkeypatch.setattr(AppConfig, "GRAPHQL_MAX_COST", 50)
+        query = "query($n: Int!) { uploadsByUser(userId: \"u\", first: $n) { items { id } } }"
+        small = await schema.execute(query, variable_values={"n": 5})
+        large = await schema.execute(query, variable_values={"n": 100})
+        assert small.errors is None
+        assert large.errors[0].extensions["code"] == "QUERY_TOO_COMPLEX"
+
+    @pytest.mark.asyncio
+    async def test_zero_disables_limits(self, monkeypatch):
+        """Budgets of 0 score operations without rejecting any."""
+        monkeypatch.setattr(AppConfig, "GRAPHQL_MAX_COST", 0)
+        monkeypatch.setattr(AppConfig, "GRAPHQL_MAX_DEPTH", 0)
+        result = await schema.execute('{ uploadsByUser(userId: "u", first: 100) { items { files { id } } } }')
+        assert result.errors is None
+        assert result.extensions["cost"]["maximum"] is None
@@ -1,7 +1,11 @@
 """Integration tests for GraphQL API through HTTP."""
+import json
+
 import pytest
 from fastapi.testclient import TestClient
 from backend.app.main import app
+from backend.graphql import graphql_documents
+from backend.graphql.graphql_documents import query_hash
 from backend.logic import store
 
 
@@ -151,3 +155,162 @@ class TestGraphQLQueries:
         
         data = response.json()
         assert data["data"]["user"] is None
+
+    def test_query_upload_with_nested_analysis(self, client):
+        """upload query resolves the linked analysis and file uploader."""
+        user_query = 'mutation { createUser(input: {accountId: "acc1", name: "Uploader"}) { id } }'
+        user_id = client.post("/graphql", json={"query": user_query}).json()["data"]["createUser"]["id"]
+        upload_query = f"""
+        mutation {{
+            createUpload(input: {{userId: "{user_id}", files: [{{name: "doc.txt"}}]}}) {{ id }}
+        }}
+        """
+        upload_id = client.post("/graphql", json={"query": upload_query}).json()["data"]["createUpload"]["id"]
+        client.post("/graphql", json={"query": f'mutation {{ startAnalysis(uploadId: "{upload_id}") {{ id }} }}'})
+
+        query = f"""
+        query {{
+            upload(id: "{upload_id}") {{
+                analysis {{ status uploadId }}
+                files {{ name user {{ name }} }}
+            }}
+        }}
+        """
+        response = client.post("/graphql", json={"query": query})
+        assert response.status_code == 200
+
+        data = response.json()["data"]["upload"]
+        assert data["analysis"]["uploadId"] == upload_id
+        assert data["files"] == [{"name": "doc.txt", "user": {"name": "Uploader"}}]
+
+
+class TestPersistedQueries:
+    """Test automatic persisted queries and the parsed-document cache."""
+
+    QUERY = 'query { user(id: "user::missing") { id name } }'
+
+    @pytest.fixture(autouse=True)
+    def clear_documents(self):
+        """Start each test with empty query caches."""
+        graphql_documents.clear()
+        yield
+        graphql_documents.clear()
+
+    def _persisted(self, digest):
+        return {"persistedQuery": {"version": 1, "sha256Hash": digest}}
+
+    def test_unknown_hash_is_not_found(self, client):
+        """A hash the server has not seen asks the client to send the query."""
+        response = client.post("/graphql", json={"extensions": self._persisted(query_hash(self.QUERY))})
+        assert response.status_code == 200
+        error = response.json()["errors"][0]
+        assert error["message"] == "PersistedQueryNotFound"
+        assert error["extensions"]["code"] == "PERSISTED_QUERY_NOT_FOUND"
+
+    def test_register_then_send_hash_only(self, client):
+        """Sending query and hash once lets later requests send the hash alone."""
+        extensions = self._persisted(query_hash(self.QUERY))
+        first = client.post("/graphql", json={"query": self.QUERY, "extensions": extensions})
+        assert first.json()["data"] == {"user": None}
+
+        second = client.post("/graphql", json={"extensions": extensions})
+        assert second.json()["data"] == {"user": None}
+        assert graphql_documents.stats()["persisted_queries"]["hits"] == 1
+
+    def test_hash_mismatch_is_rejected(self, client):
+        """A hash that is not the query's SHA-256 is not registered."""
+        extensions = self._persisted(query_hash("{ __typename }"))
+        response = client.post("/graphql", json={"query": self.QUERY, "extensions": extensions})
+        assert response.json()["errors"][0]["extensions"]["code"] == "BAD_USER_INPUT"
+        assert graphql_documents.stats()["persisted_queries"]["size"] == 0
+
+    def test_repeated_query_hits_document_cache(self, client):
+        """The second identical query reuses the parsed and validated document."""
+        for _ in range(3):
+            assert client.post("/graphql", json={"query": self.QUERY}).json()["data"] == {"user": None}
+        documents = client.get("/api/health").json()["graphql"]["documents"]
+        assert (documents["size"], documents["hits"], documents["misses"]) == (1, 2, 1)
+
+    def test_cached_validation_errors_are_returned(self, client):
+        """An invalid query keeps failing validation when served from the cache."""
+        query = "{ user(id: \"1\") { noSuchField } }"
+        messages = [client.post("/graphql", json={"query": query}).json()["errors"][0]["message"] for _ in range(2)]
+        assert messages[0] == messages[1]
+        assert "noSuchField" in messages[0]
+        assert graphql_documents.stats()["documents"]["hits"] == 1
+
+    def test_syntax_errors_are_not_cached(self, client):
+        """Queries that fail to parse are not stored."""
+        client.post("/graphql", json={"query": "{ user("})
+        assert graphql_documents.stats()["documents"]["size"] == 0
+
+
+class TestHTTPCaching:
+    """Test ETag / If-None-Match on GET queries for analyses."""
+
+    QUERY = "query($id: ID!) { analysis(id: $id) { status breakdown { overallCredibilityScore } } }"
+
+    async def _save(self, status):
+        await store.save_analysis("analysis::1", {
+            "id": "analysis::1", "upload_id": "upload::1", "status": status,
+            "started_at": None, "finished_at": None, "summary": None, "breakdown": None,
+            "fact_checks": [], "fallacies": [], "ai_check": None,
+        })
+
+    def _get(self, client, etag=None):
+        params = {"query": self.QUERY, "variables": json.dumps({"id": "analysis::1"})}
+        return client.get("/graphql", params=params, headers={"If-None-Match": etag} if etag else {})
+
+    @pytest.mark.asyncio
+    async def test_ready_analysis_is_immutable(self, client):
+        """A ready analysis gets an ETag, a long-lived Cache-Control and a 304 on revalidation."""
+        await self._save("ready")
+        first = self._get(client)
+        assert first.status_code == 200
+        assert first.headers["Cache-Control"].endswith("immutable")
+
+        second = self._get(client, first.headers["ETag"])
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["ETag"] == first.headers["ETag"]
+
+    @pytest.mark.asyncio
+    async def test_pending_analysis_revalidates(self, client):
+        """A pending analysis must be revalidated, and a write changes its ETag."""
+        await self._save("pending")
+        first = self._get(client)
+        assert first.headers["Cache-Control"] == "no-cache"
+        assert self._get(client, first.headers["ETag"]).status_code == 304
+
+        await store.patch_analysis("analysis::1", {"status": "running"})
+        changed = self._get(client, first.headers["ETag"])
+        assert changed.status_code == 200
+        assert changed.json()["data"]["analysis"]["status"] == "running"
+        assert changed.headers["ETag"] != first.headers["ETag"]
+
+    @pytest.mark.asyncio
+    async def test_persisted_query_get(self, client):
+        """A hash-only GET revalidates against the ETag of the registering request."""
+        await self._save("ready")
+        variables = json.dumps({"id": "analysis::1"})
+        extensions = json.dumps({"persistedQuery": {"version": 1, "sha256Hash": query_hash(self.QUERY)}})
+        first = client.get("/graphql", params={"query": self.QUERY, "variables": variables, "extensions": extensions})
+        assert first.status_code == 200
+
+        polled = client.get(
+            "/graphql",
+            params={"variables": variables, "extensions": extensions},
+            headers={"If-None-Match": first.headers["ETag"]},
+        )
+        assert polled.status_code == 304
+
+    @pytest.mark.asyncio
+    async def test_other_fields_and_post_are_not_cached(self, client):
+        """Only GET responses made up entirely of versioned analyses carry validators."""
+        await self._save("ready")
+        mixed = client.get("/graphql", params={"query": '{ analysis(id: "analysis::1") { status } user(id: "x") { id } }'})
+        post = client.post("/graphql", json={"query": self.QUERY, "variables": {"id": "analysis::1"}})
+        missing = client.get("/graphql", params={"query": '{ analysis(id: "analysis::none") { status } }'})
+        for response in (mixed, post, missing):
+            assert response.status_code == 200
+            assert "ETag" not in response.headers
@@ -0,0 +1,139 @@
+"""Tests for request-scoped GraphQL DataLoaders."""
+import pytest
+from backend.logic import store
+from backend.graphql.graphql_loaders import Loaders
+from backend.graphql.graphql_schema import schema
+
+
+@pytest.fixture(autouse=True)
+def clear_stores():
+    """Clear stores before and after each test."""
+    for s in [store._users, store._uploads, store._analyses]:
+        s.clear()
+    yield
+    for s in [store._users, store._uploads, store._analyses]:
+        s.clear()
+
+
+@pytest.fixture
+def get_many_calls(monkeypatch):
+    """Record every bulk fetch issued by the loaders."""
+    calls = []
+
+    def spy(name):
+        original = getattr(store, name)
+
+        async def wrapper(ids):
+            calls.append((name, list(ids)))
+            return await original(ids)
+        monkeypatch.setattr(store, name, wrapper)
+
+    for name in ["get_many_users", "get_many_uploads", "get_many_analyses"]:
+        spy(name)
+    return calls
+
+
+async def _seed_uploads(count):
+    """Store `count` uploads, each with two files by the same user and a linked analysis."""
+    await store.save_user("user::1", {
+        "id": "user::1", "account_id": "acc1", "name": "Alice",
+        "email": None, "wallet_address": None, "created_at": "2026-02-13T10:00:00Z",
+    })
+    for i in range(count):
+        await store.save_analysis(f"analysis::{i}", {
+            "id": f"analysis::{i}", "upload_id": f"upload::{i}", "status": "ready",
+            "started_at": None, "finished_at": None, "summary": None,
+            "breakdown": {"fact_check_score": 0.5, "logical_fallacy_score": None,
+                          "ai_generation_score": None, "overall_credibility_score": 0.5},
+            "fact_checks": [], "fallacies": [], "ai_check": None,
+        })
+        await store.save_upload(f"upload::{i}", {
+            "id": f"upload::{i}", "user_id": "user::1", "created_at": "2026-02-13T10:00:00Z",
+            "status": "ready",
+            "files": [
+                {"id": f"file::{i}a", "user_id": "user::1", "name": "a.txt",
+                 "content_type": None, "size": None, "storage_url": None},
+                {"id": f"file::{i}b", "user_id": "user::1", "name": "b.txt",
+                 "content_type": None, "size": None, "storage_url": None},
+            ],
+            "settings": {"fact_check": True, "logical_fallacy_check": False, "ai_generation_check": False},
+            "analysis_id": f"analysis::{i}",
+        })
+
+
+class TestLoaders:
+    """Test DataLoader batching and deduplication."""
+
+    @pytest.mark.asyncio
+    async def test_loads_in_same_tick_are_batched(self, get_many_calls):
+        """Concurrent loads become one deduplicated bulk fetch."""
+        import asyncio
+        await store.save_user("user::1", {"id": "user::1"})
+        loaders = Loaders()
+
+        results = await asyncio.gather(
+            loaders.users.load("user::1"),
+            loaders.users.load("user::1"),
+            loaders.users.load("user::missing"),
+        )
+
+        assert results == [{"id": "user::1"}, {"id": "user::1"}, None]
+        assert get_many_calls == [("get_many_users", ["user::1", "user::missing"])]
+
+    @pytest.mark.asyncio
+    async def test_bulk_errors_fail_only_their_keys(self, monkeypatch):
+        """A per-key error from the store surfaces as that key's exception."""
+        async def get_many_users(ids):
+            return store.BulkResult({"user::1": {"id": "user::1"}}, {"user::2": "timeout"})
+        monkeypatch.setattr(store, "get_many_users", get_many_users)
+        loaders = Loaders()
+
+        assert await loaders.users.load("user::1") == {"id": "user::1"}
+        with pytest.raises(Exception, match="timeout"):
+            await loaders.users.load("user::2")
+
+
+class TestNestedFields:
+    """Test Upload.analysis and FileRef.user nested fields."""
+
+    @pytest.mark.asyncio
+    async def test_upload_analysis_and_file_user(self, get_many_calls):
+        """Nested links resolve through one bulk fetch per document type."""
+        await _seed_uploads(3)
+        query = """
+        {
+            u0: upload(id: "upload::0") { ...fields }
+            u1: upload(id: "upload::1") { ...fields }
+            u2: upload(id: "upload::2") { ...fields }
+        }
+        fragment fields on Upload {
+            analysis { id breakdown { overallCredibilityScore } }
+            files { name user { name } }
+        }
+        """
+
+        result = await schema.execute(query, context_value={})
+
+        assert result.errors is None
+        assert result.data["u1"]["analysis"]["id"] == "analysis::1"
+        assert result.data["u1"]["analysis"]["breakdown"]["overallCredibilityScore"] == 0.5
+        assert result.data["u2"]["files"][1]["user"]["name"] == "Alice"
+        assert sorted(get_many_calls) == [
+            ("get_many_analyses", ["analysis::0", "analysis::1", "analysis::2"]),
+            ("get_many_users", ["user::1"]),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_unlinked_upload_has_no_analysis(self):
+        """Upload.analysis is null when no analysis has been started."""
+        await store.save_upload("upload::1", {
+            "id": "upload::1", "user_id": None, "created_at": "2026-02-13T10:00:00Z",
+            "status": "pending", "files": [],
+            "settings": {"fact_check": False, "logical_fallacy_check": False, "ai_generation_check": False},
+            "analysis_id": None,
+        })
+
+        result = await schema.execute('{ upload(id: "upload::1") { analysis { id } } }')
+
+        assert result.errors is None
+        assert result.data["upload"]["analysis"] is None
@@ -3,6 +3,7 @@ import pytest
 import asyncio
 from backend.logic import store
 from backend.graphql.graphql_resolvers import Query, Mutation
+from backend.logic.jobs import analysis_jobs
 from backend.graphql.graphql_types import (
     CreateUserInput, CreateUploadInput, FileInput, UploadSettingsInput
 )
@@ -21,11 +22,12 @@ def clear_stores():
 class TestQueryResolver:
     """Test GraphQL Query resolvers."""
 
-    def test_query_user_exists(self):
+    @pytest.mark.asyncio
+    async def test_query_user_exists(self):
         """Query.user() returns user when it exists."""
         # Setup: save a user
         user_id = "user::test123"
-        store.save_user(user_id, {
+        await store.save_user(user_id, {
             "id": user_id,
             "account_id": "acc123",
             "name": "Alice",
@@ -36,24 +38,26 @@ class TestQueryResolver:
         
         # Test
         query = Query()
-        result = query.user(user_id)
+        result = await query.user(user_id)
         
         assert result is not None
         assert result.id == user_id
         assert result.name == "Alice"
         assert result.email == "alice@example.com"
 
-    def test_query_user_not_found(self):
+    @pytest.mark.asyncio
+    async def test_query_user_not_found(self):
         """Query.user() returns None when user doesn't exist."""
         query = Query()
-        result = query.user("user::nonexistent")
+        result = await query.user("user::nonexistent")
         
         assert result is None
 
-    def test_query_upload_exists(self):
+    @pytest.mark.asyncio
+    async def test_query_upload_exists(self):
         """Query.upload() returns upload when it exists."""
         upload_id = "upload::test123"
-        store.save_upload(upload_id, {
+        await store.save_upload(upload_id, {
             "id": upload_id,
             "user_id": "user::123",
             "created_at": "2026-02-13T10:00:00Z",
@@ -68,16 +72,17 @@ class TestQueryResolver:
         })
         
         query = Query()
-        result = query.upload(upload_id)
+        result = await query.upload(upload_id)
         
         assert result is not None
         assert result.id == upload_id
         assert result.status == "pending"
 
-    def test_query_analysis_exists(self):
+    @pytest.mark.asyncio
+    async def test_query_analysis_exists(self):
         """Query.analysis() returns analysis when it exists."""
         analysis_id = "analysis::test123"
-        store.save_analysis(analysis_id, {
+        await store.save_analysis(analysis_id, {
             "id": analysis_id,
             "upload_id": "upload::123",
             "status": "ready",
@@ -95,18 +100,99 @@ class TestQueryResolver:
             "ai_check": None,
         })
         
-        query = Query()
-        result = query.analysis(analysis_id)
+        from backend.graphql.graphql_schema import schema
+        result = await schema.execute(
+            'query($id: ID!) { analysis(id: $id) { id status } }', variable_values={"id": analysis_id}
+        )
         
-        assert result is not None
-        assert result.id == analysis_id
-        assert result.status == "ready"
+        assert result.errors is None
+        assert result.data["analysis"] == {"id": analysis_id, "status": "ready"}
+
+    @pytest.mark.asyncio
+    async def test_uploads_by_user(self):
+        """uploads_by_user returns a page of the user's uploads with a cursor."""
+        for i in range(3):
+            await store.save_upload(f"upload::{i}", {
+                "id": f"upload::{i}", "user_id": "user::1", "created_at": "2024-01-01T00:00:00Z",
+                "status": "pending", "files": [], "analysis_id": None,
+                "settings": {"fact_check": False, "logical_fallacy_check": False, "ai_generation_check": False},
+            })
+
+        query = Query()
+        first = await query.uploads_by_user("user::1", first=2)
+        rest = await query.uploads_by_user("user::1", first=2, after=first.end_cursor)
+
+        assert [u.id for u in first.items] == ["upload::2", "upload::1"]
+        assert first.has_next_page is True
+        assert [u.id for u in rest.items] == ["upload::0"]
+        assert rest.has_next_page is False
+
+    @pytest.mark.asyncio
+    async def test_query_analysis_fetches_selected_fields(self, monkeypatch):
+        """Query.analysis asks the store only for the selected fields, fragments included."""
+        from backend.graphql.graphql_schema import schema
+        await store.save_analysis("analysis::1", {
+            "id": "analysis::1", "upload_id": "upload::1", "status": "ready",
+            "started_at": None, "finished_at": None, "summary": None,
+            "breakdown": {"fact_check_score": 0.5, "logical_fallacy_score": None,
+                          "ai_generation_score": None, "overall_credibility_score": 0.5},
+            "fact_checks": [{"id": "fc1", "statement": "s", "score": 0.5, "sources_for": [], "sources_against": []}],
+            "fallacies": [], "ai_check": None,
+        })
+        requested = []
+        get_fields = store._memory.get_fields
+
+        async def spy(doc_type, doc_id, fields):
+            requested.append(fields)
+            return await get_fields(doc_type, doc_id, fields)
+
+        monkeypatch.setattr(store._memory, "get_fields", spy)
+
+        result = await schema.execute("""
+            query { analysis(id: "analysis::1") { status ...Scores __typename } }
+            fragment Scores on Analysis { breakdown { overallCredibilityScore } }
+        """)
+
+        assert result.errors is None
+        assert result.data["analysis"] == {
+            "status": "ready", "breakdown": {"overallCredibilityScore": 0.5}, "__typename": "Analysis",
+        }
+        assert requested == [["breakdown", "etag", "status"]]  # etag and status for HTTP caching
+
+    @pytest.mark.asyncio
+    async def test_query_analysis_merges_repeated_selections(self):
+        """Repeated selections of one response key are merged, so every one of them is fetched."""
+        from backend.graphql.graphql_schema import schema
+        await store.save_analysis("analysis::1", {
+            "id": "analysis::1", "upload_id": "upload::1", "status": "ready",
+            "started_at": None, "finished_at": None, "summary": None,
+            "breakdown": {"fact_check_score": 0.5, "logical_fallacy_score": None,
+                          "ai_generation_score": None, "overall_credibility_score": 0.5},
+            "fact_checks": [], "fallacies": [], "ai_check": None,
+        })
+
+        result = await schema.execute("""
+            query {
+                analysis(id: "analysis::1") { status }
+                analysis(id: "analysis::1") { breakdown { factCheckScore } }
+            }
+        """)
+
+        assert result.errors is None
+        assert result.data["analysis"] == {"status": "ready", "breakdown": {"factCheckScore": 0.5}}
+
+    @pytest.mark.asyncio
+    async def test_page_size_limit(self):
+        """Page sizes outside 1..MAX_PAGE_SIZE are rejected."""
+        with pytest.raises(Exception, match="first must be between"):
+            await Query().analyses_by_status("ready", first=0)
 
 
 class TestMutationResolver:
     """Test GraphQL Mutation resolvers."""
 
-    def test_create_user(self):
+    @pytest.mark.asyncio
+    async def test_create_user(self):
         """Mutation.create_user() creates and stores a user."""
         input_data = CreateUserInput(
             account_id="acc456",
@@ -116,7 +202,7 @@ class TestMutationResolver:
         )
         
         mutation = Mutation()
-        result = mutation.create_user(input_data)
+        result = await mutation.create_user(input_data)
         
         assert result.id is not None
         assert result.account_id == "acc456"
@@ -126,11 +212,12 @@ class TestMutationResolver:
         assert result.created_at is not None
         
         # Verify it was saved
-        retrieved = store.get_user(str(result.id))
+        retrieved = await store.get_user(str(result.id))
         assert retrieved is not None
         assert retrieved["name"] == "Bob"
 
-    def test_create_upload_minimal(self):
+    @pytest.mark.asyncio
+    async def test_create_upload_minimal(self):
         """Mutation.create_upload() creates an upload with minimal input."""
         input_data = CreateUploadInput(
             files=[
@@ -143,16 +230,17 @@ class TestMutationResolver:
         )
         
         mutation = Mutation()
-        result = mutation.create_upload(input_data)
+        result = await mutation.create_upload(input_data)
         
         assert result.id is not None
         assert result.status == "pending"
         # Verify it was saved
-        retrieved = store.get_upload(str(result.id))
+        retrieved = await store.get_upload(str(result.id))
         assert retrieved is not None
         assert retrieved["status"] == "pending"
 
-    def test_create_upload_with_settings(self):
+    @pytest.mark.asyncio
+    async def test_create_upload_with_settings(self):
         """Mutation.create_upload() stores settings correctly."""
         input_data = CreateUploadInput(
             files=[FileInput(name="test.txt")],
@@ -164,15 +252,16 @@ class TestMutationResolver:
         )
         
         mutation = Mutation()
-        result = mutation.create_upload(input_data)
+        result = await mutation.create_upload(input_data)
         
         # Verify it was saved with correct settings
-        retrieved = store.get_upload(str(result.id))
+        retrieved = await store.get_upload(str(result.id))
         assert retrieved["settings"]["fact_check"] is True
         assert retrieved["settings"]["logical_fallacy_check"] is True
         assert retrieved["settings"]["ai_generation_check"] is False
 
-    def test_create_upload_inherits_user_id(self):
+    @pytest.mark.asyncio
+    async def test_create_upload_inherits_user_id(self):
         """Mutation.create_upload() inherits user_id to files if not specified."""
         user_id = "user::alice"
         input_data = CreateUploadInput(
@@ -181,18 +270,18 @@ class TestMutationResolver:
         )
         
         mutation = Mutation()
-        result = mutation.create_upload(input_data)
+        result = await mutation.create_upload(input_data)
         
         # Verify user_id was inherited in stored file
-        retrieved = store.get_upload(str(result.id))
+        retrieved = await store.get_upload(str(result.id))
         assert retrieved["files"][0]["user_id"] == user_id
 
     @pytest.mark.asyncio
     async def test_start_analysis(self):
-        """Mutation.start_analysis() creates analysis and links it."""
+        """Mutation.start_analysis() returns a pending analysis that a worker completes."""
         # Setup: create an upload
         upload_id = "upload::test"
-        store.save_upload(upload_id, {
+        await store.save_upload(upload_id, {
             "id": upload_id,
             "user_id": "user::123",
             "created_at": "2026-02-13T10:00:00Z",
@@ -208,12 +297,18 @@ class TestMutationResolver:
         
         assert result.id is not None
         assert result.upload_id == upload_id
-        assert result.status == "ready"
+        assert result.status == "pending"
         
         # Verify upload was linked
-        retrieved_upload = store.get_upload(upload_id)
+        retrieved_upload = await store.get_upload(upload_id)
         assert retrieved_upload["analysis_id"] == str(result.id)
-        assert retrieved_upload["status"] == "ready"
+        
+        # Background worker carries the analysis to ready
+        await analysis_jobs.join()
+        retrieved_analysis = await store.get_analysis(str(result.id))
+        assert retrieved_analysis["status"] == "ready"
+        assert retrieved_analysis["breakdown"]["overall_credibility_score"] is not None
+        assert (await store.get_upload(upload_id))["status"] == "ready"
 
     @pytest.mark.asyncio
     async def test_start_analysis_not_found(self):
@@ -223,43 +318,82 @@ class TestMutationResolver:
         with pytest.raises(Exception, match="Upload not found"):
             await mutation.start_analysis("upload::nonexistent")
 
-    def test_clear_upload(self):
+    @pytest.mark.asyncio
+    async def test_clear_upload(self):
         """Mutation.clear_upload() deletes upload and related analysis."""
         # Setup
         upload_id = "upload::test"
         analysis_id = "analysis::test"
         
-        store.save_upload(upload_id, {
+        await store.save_upload(upload_id, {
             "id": upload_id,
             "analysis_id": analysis_id,
         })
-        store.save_analysis(analysis_id, {"id": analysis_id})
+        await store.save_analysis(analysis_id, {"id": analysis_id})
         
         # Test
         mutation = Mutation()
-        result = mutation.clear_upload(upload_id)
+        result = await mutation.clear_upload(upload_id)
         
         assert result is True
-        assert store.get_upload(upload_id) is None
-        assert store.get_analysis(analysis_id) is None
+        assert await store.get_upload(upload_id) is None
+        assert await store.get_analysis(analysis_id) is None
 
-    def test_clear_upload_not_found(self):
+    @pytest.mark.asyncio
+    async def test_clear_upload_not_found(self):
         """Mutation.clear_upload() returns False if upload not found."""
         mutation = Mutation()
-        result = mutation.clear_upload("upload::nonexistent")
+        result = await mutation.clear_upload("upload::nonexistent")
         
         assert result is False
 
-    def test_clear_upload_without_analysis(self):
+    @pytest.mark.asyncio
+    async def test_clear_upload_without_analysis(self):
         """Mutation.clear_upload() works even if no analysis linked."""
         upload_id = "upload::test"
-        store.save_upload(upload_id, {
+        await store.save_upload(upload_id, {
             "id": upload_id,
             "analysis_id": None,
         })
         
         mutation = Mutation()
-        result = mutation.clear_upload(upload_id)
+        result = await mutation.clear_upload(upload_id)
         
         assert result is True
-        assert store.get_upload(upload_id) is None
+        assert await store.get_upload(upload_id) is None
+
+
+class TestSubscriptionResolver:
+    """Test GraphQL Subscription resolvers."""
+
+    @pytest.mark.asyncio
+    async def test_analysis_ready_only_receives_own_upload(self):
+        """analysis_ready yields the analysis for its upload and ignores others."""
+        from backend.graphql.graphql_resolvers import Subscription
+        from backend.logic.pubsub import analysis_events
+
+        for upload_id in ["upload::mine", "upload::other"]:
+            await store.save_upload(upload_id, {
+                "id": upload_id,
+                "user_id": None,
+                "created_at": "2026-02-13T10:00:00Z",
+                "status": "pending",
+                "files": [],
+                "settings": {"fact_check": True, "logical_fallacy_check": False, "ai_generation_check": False},
+                "analysis_id": None,
+            })
+
+        stream = Subscription().analysis_ready("upload::mine")
+        next_item = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+
+        mutation = Mutation()
+        await mutation.start_analysis("upload::other")
+        mine = await mutation.start_analysis("upload::mine")
+
+        item = await asyncio.wait_for(next_item, timeout=1)
+        assert item.id == mine.id
+        assert item.upload_id == "upload::mine"
+
+        await stream.aclose()
+        assert analysis_events.subscriber_count() == 0
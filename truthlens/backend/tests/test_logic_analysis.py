@@ -1,6 +1,10 @@
 """Tests for backend.logic.analysis module."""
+import math
+
 import pytest
-from backend.logic.analysis import compute_breakdown
+from backend.logic.analysis import (
+    BreakdownAccumulator, compute_breakdown, compute_breakdown_columns, compute_breakdowns_batch,
+)
 
 
 class TestComputeBreakdown:
@@ -105,3 +109,127 @@ class TestComputeBreakdown:
         assert result["fact_check_score"] == pytest.approx(0.75)
         assert result["logical_fallacy_score"] == pytest.approx(0.75)
         assert result["ai_generation_score"] == pytest.approx(0.1)
+
+
+class TestComputeBreakdownsBatch:
+    """Test the vectorized batch breakdown against the scalar function."""
+
+    def test_empty_batch(self):
+        """compute_breakdowns_batch() returns an empty list for no analyses."""
+        assert compute_breakdowns_batch([]) == []
+
+    def test_matches_scalar_exactly(self):
+        """Every breakdown equals compute_breakdown() bit for bit."""
+        import random
+        rng = random.Random(42)
+        analyses = []
+        for _ in range(500):
+            analyses.append({
+                "fact_checks": [
+                    {"score": rng.choice([rng.random(), 0, 1, 1e-17])} if rng.random() > 0.1 else {"statement": "x"}
+                    for _ in range(rng.randint(0, 25))
+                ],
+                "fallacies": [{"severity": rng.random()} for _ in range(rng.randint(0, 6))],
+                "ai_check": rng.choice([None, {}, {"score": rng.random()}, {"is_ai": True}]),
+            })
+
+        batch = compute_breakdowns_batch(analyses)
+
+        for analysis, breakdown in zip(analyses, batch):
+            expected = compute_breakdown(analysis["fact_checks"], analysis["fallacies"], analysis["ai_check"])
+            assert breakdown == expected
+
+    def test_missing_sections(self):
+        """Analyses without checks produce all-None breakdowns."""
+        result = compute_breakdowns_batch([{}, {"fact_checks": None, "fallacies": [], "ai_check": None}])
+
+        assert result == [compute_breakdown([], [], None)] * 2
+
+    def test_columns_with_one_long_analysis(self):
+        """Segment lengths can be very uneven; every column still matches compute_breakdown()."""
+        import random
+        rng = random.Random(3)
+        fact_scores = [[rng.random() for _ in range(n)] for n in [3000, 0, 1, 2, 5] * 40]
+        severities = [[rng.random()] * (i % 3) for i in range(len(fact_scores))]
+        ai_scores = [None] * len(fact_scores)
+
+        columns = compute_breakdown_columns(fact_scores, severities, ai_scores)
+
+        for i, (facts, sev) in enumerate(zip(fact_scores, severities)):
+            expected = compute_breakdown([{"score": s} for s in facts], [{"severity": s} for s in sev])
+            for key, value in expected.items():
+                actual = float(columns[key][i])
+                assert math.isnan(actual) if value is None else actual == value
+
+    def test_columns_match_scalar(self):
+        """compute_breakdown_columns() matches compute_breakdown(), with NaN for None."""
+        fact_scores = [[0.5, 1], [], [0.1, 0.2, 0.3]]
+        severities = [[0.25], [], []]
+        ai_scores = [0.4, None, 0.9]
+
+        columns = compute_breakdown_columns(fact_scores, severities, ai_scores)
+
+        for i in range(3):
+            expected = compute_breakdown(
+                [{"score": s} for s in fact_scores[i]],
+                [{"severity": s} for s in severities[i]],
+                {"score": ai_scores[i]} if ai_scores[i] is not None else None,
+            )
+            for key, value in expected.items():
+                actual = float(columns[key][i])
+                assert math.isnan(actual) if value is None else actual == value
+
+
+class TestBreakdownAccumulator:
+    """Test incremental breakdown accumulation."""
+
+    def test_empty_matches_compute_breakdown(self):
+        """A fresh accumulator reports the all-None breakdown."""
+        assert BreakdownAccumulator().breakdown() == compute_breakdown([], [], None)
+
+    def test_incremental_matches_compute_breakdown(self):
+        """Adding results one by one gives the same scores as the full lists."""
+        fact_checks = [{"score": 0.9}, {"statement": "no score"}, {"score": 0.4}]
+        fallacies = [{"severity": 0.3}, {"severity": 0.6}]
+        ai_check = {"score": 0.2}
+        acc = BreakdownAccumulator()
+
+        for fc in fact_checks:
+            acc.add_fact_check(fc)
+        for f in fallacies:
+            acc.add_fallacy(f)
+        acc.add_ai_check(ai_check)
+
+        expected = compute_breakdown(fact_checks, fallacies, ai_check)
+        for key, value in acc.breakdown().items():
+            assert value == pytest.approx(expected[key])
+
+    def test_partial_scores(self):
+        """Scores are available before all checks have reported."""
+        acc = BreakdownAccumulator()
+        acc.add_fact_check({"score": 0.8})
+
+        result = acc.breakdown()
+
+        assert result["fact_check_score"] == pytest.approx(0.8)
+        assert result["logical_fallacy_score"] is None
+        assert result["overall_credibility_score"] == pytest.approx(0.8)
+
+    def test_merge(self):
+        """Merged accumulators equal one accumulator fed all results."""
+        left, right, combined = BreakdownAccumulator(), BreakdownAccumulator(), BreakdownAccumulator()
+        for acc, score in ((left, 0.2), (right, 0.6)):
+            acc.add_fact_check({"score": score})
+            acc.add_ai_check({"score": score})
+            combined.add_fact_check({"score": score})
+            combined.add_ai_check({"score": score})
+
+        assert left.merge(right).breakdown() == pytest.approx(combined.breakdown())
+
+    def test_empty_ai_check_ignored(self):
+        """An empty AI-check document is not counted, as in compute_breakdown."""
+        acc = BreakdownAccumulator()
+        acc.add_ai_check({})
+        acc.add_ai_check(None)
+
+        assert acc.breakdown()["ai_generation_score"] is None
@@ -0,0 +1,85 @@
+"""Tests for backend.logic.cache module."""
+import pytest
+from backend.logic.cache import LRUCache
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache:
+    """Test LRU eviction, TTL expiry and counters."""
+
+    def test_get_and_set(self):
+        """Cached values are returned and counted as hits."""
+        cache = LRUCache(max_entries=10)
+        cache.set("a", 1, ttl=60)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["hit_rate"] == pytest.approx(0.5)
+
+    def test_evicts_least_recently_used(self):
+        """The least recently used entry is evicted when full."""
+        cache = LRUCache(max_entries=2)
+        cache.set("a", 1, ttl=60)
+        cache.set("b", 2, ttl=60)
+        cache.get("a")
+        cache.set("c", 3, ttl=60)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.evictions == 1
+
+    def test_entries_expire(self):
+        """Entries are dropped once their TTL has passed."""
+        clock = FakeClock()
+        cache = LRUCache(max_entries=10, clock=clock)
+        cache.set("a", 1, ttl=5)
+
+        clock.now = 4.9
+        assert cache.get("a") == 1
+        clock.now = 5.0
+        assert cache.get("a") is None
+        assert cache.expirations == 1
+        assert len(cache) == 0
+
+    def test_stale_grace(self):
+        """Expired entries miss for get() but stay available to get_stale() during the grace period."""
+        clock = FakeClock()
+        cache = LRUCache(max_entries=10, clock=clock, stale_grace=10)
+        cache.set("a", 1, ttl=5)
+
+        clock.now = 6
+        assert cache.get("a") is None
+        assert cache.get_stale("a") == 1
+        clock.now = 15
+        assert cache.get_stale("a") is None
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_zero_ttl_is_not_cached(self):
+        """A TTL of zero disables caching for that entry."""
+        cache = LRUCache()
+        cache.set("a", 1, ttl=0)
+        assert len(cache) == 0
+
+    def test_invalidate_bumps_generation(self):
+        """invalidate drops the key and advances the generation."""
+        cache = LRUCache()
+        cache.set("a", 1, ttl=60)
+        generation = cache.generation
+
+        cache.invalidate("a")
+
+        assert cache.get("a") is None
+        assert cache.generation == generation + 1
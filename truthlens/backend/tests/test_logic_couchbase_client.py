@@ -0,0 +1,351 @@
+"""Tests for backend.logic.couchbase_client module."""
+from types import SimpleNamespace
+
+import pytest
+from couchbase.exceptions import (
+    CasMismatchException, CouchbaseException, DocumentNotFoundException, PathNotFoundException,
+    UnAmbiguousTimeoutException,
+)
+
+from backend.logic import couchbase_client, resilience
+from backend.logic.couchbase_client import (
+    AsyncCouchbaseClient, AsyncCouchbaseQuery, ConcurrentModificationError, CouchbaseClient,
+    CouchbaseQuery, StatementRegistry,
+)
+
+
+class _Cluster:
+    """Stand-in cluster recording each query's text and options; fails the first `failures` calls."""
+
+    def __init__(self, rows, failures=0, code=4050):
+        self.rows_ = rows
+        self.failures = failures
+        self.code = code
+        self.calls = []
+        self.texts = []
+
+    def query(self, sql, options):
+        self.calls.append(options)
+        self.texts.append(sql)
+        if self.failures:
+            self.failures -= 1
+            raise CouchbaseException(message="query failed", context=SimpleNamespace(first_error_code=self.code))
+        return self
+
+    def rows(self):
+        return iter(self.rows_)
+
+
+@pytest.fixture
+def cluster(monkeypatch):
+    """Connect the blocking client to a stand-in cluster."""
+    def connect(rows, **kwargs):
+        stand_in = _Cluster(rows, **kwargs)
+        monkeypatch.setattr(CouchbaseClient, "_cluster", stand_in)
+        return stand_in
+    return connect
+
+
+class TestStatementRegistry:
+    """Test registration of prepared statements."""
+
+    def test_register_is_idempotent(self):
+        """Registering the same SQL twice returns the same statement."""
+        registry = StatementRegistry()
+
+        first = registry.register("q", "SELECT 1")
+
+        assert registry.register("q", "SELECT 1") is first
+        assert list(registry) == [first]
+
+    def test_conflicting_sql_rejected(self):
+        """A name cannot be re-registered with different SQL."""
+        registry = StatementRegistry()
+        registry.register("q", "SELECT 1")
+
+        with pytest.raises(ValueError):
+            registry.register("q", "SELECT 2")
+
+    def test_project_statements_are_parameterized(self):
+        """The keyset statements take their values as positional parameters and list newest first."""
+        first = couchbase_client.statements.get("uploads_by_user").sql
+        after = couchbase_client.statements.get("uploads_by_user:after").sql
+
+        assert "$1" in first and "$2" in first and "$3" not in first
+        assert all(f"${n}" in after for n in range(1, 5))
+        assert "ORDER BY d.user_id, d.created_at DESC, META(d).id DESC" in after
+
+
+class TestPreparedExecution:
+    """Test execution of registered statements."""
+
+    def test_execute_is_prepared(self, cluster):
+        """Registered statements run with adhoc=False and positional parameters."""
+        stand_in = cluster([{"id": "upload::1"}])
+
+        rows = CouchbaseQuery.execute("uploads_by_user", ["user::1", "", 21])
+
+        assert rows == [{"id": "upload::1"}]
+        assert stand_in.calls[0]["adhoc"] is False
+        assert stand_in.calls[0]["positional_parameters"] == ["user::1", "", 21]
+
+    def test_reprepare_on_plan_invalidation(self, cluster):
+        """A stale plan is dropped and the statement prepared again, for this call and the next."""
+        stand_in = cluster([{"id": "upload::1"}], failures=1)
+        statement = couchbase_client.statements.get("uploads_by_user")
+        before = (statement.executions, statement.reprepares)
+
+        rows = CouchbaseQuery.execute("uploads_by_user", ["user::1", "", 21])
+        CouchbaseQuery.execute("uploads_by_user", ["user::1", "", 21])
+
+        assert rows == [{"id": "upload::1"}]
+        assert [o["adhoc"] for o in stand_in.calls] == [False, False, False]
+        stale, fresh, later = stand_in.texts
+        assert fresh != stale and later == fresh
+        assert (statement.executions, statement.reprepares) == (before[0] + 2, before[1] + 1)
+
+    def test_other_errors_raised(self, cluster):
+        """Errors unrelated to the plan are not retried."""
+        stand_in = cluster([], failures=1, code=12003)
+
+        with pytest.raises(CouchbaseException):
+            CouchbaseQuery.execute("uploads_by_user", ["user::1", "", 21])
+        assert len(stand_in.calls) == 1
+
+    def test_stream_reprepares_before_first_row(self, cluster):
+        """Streams also recover from a stale plan when opening the result."""
+        stand_in = cluster([{"id": "user::1"}, {"id": "user::2"}], failures=1)
+
+        rows = list(CouchbaseQuery.stream("stream:user"))
+
+        assert len(rows) == 2
+        assert [o["adhoc"] for o in stand_in.calls] == [False, False]
+        assert stand_in.texts[0] != stand_in.texts[1]
+
+    def test_stream_by_type_uses_scan_statement(self, cluster, monkeypatch):
+        """stream_by_type runs the SELECT RAW statement CouchbaseBackend.scan uses."""
+        stand_in = cluster([{"id": "user::1"}])
+        sql = []
+        query = stand_in.query
+        monkeypatch.setattr(stand_in, "query", lambda text, options: sql.append(text) or query(text, options))
+
+        rows = list(CouchbaseQuery.stream_by_type("user"))
+
+        assert rows == [{"id": "user::1"}]
+        assert sql == [couchbase_client.statements.get("stream:user").text]
+        assert "SELECT RAW" in sql[0]
+
+    @pytest.mark.asyncio
+    async def test_async_execute_is_prepared(self, monkeypatch):
+        """The asyncio client executes registered statements as prepared too."""
+        calls = []
+
+        class Result:
+            async def rows(self):
+                yield {"id": "analysis::1"}
+
+        class Cluster:
+            def query(self, sql, options):
+                calls.append(options)
+                return Result()
+
+        monkeypatch.setattr(AsyncCouchbaseClient, "_cluster", Cluster())
+
+        rows = await AsyncCouchbaseQuery.execute("analyses_by_status", ["ready", "", 21])
+
+        assert rows == [{"id": "analysis::1"}]
+        assert calls[0]["adhoc"] is False
+
+
+class _Collection:
+    """Stand-in collection with sub-document ops and CAS."""
+
+    def __init__(self, doc, races=0):
+        self.doc = doc
+        self.cas = 1
+        self.races = races  # concurrent writes to simulate between lookup and mutate
+        self.mutations = 0
+
+    def lookup_in(self, doc_id, specs):
+        if self.doc is None:
+            raise DocumentNotFoundException()
+        # specs are tuples: (opcode, path, ...)
+        values = [{"status": 0, "value": self.doc[s[1]]} if s[1] in self.doc else {"status": 1}
+                  for s in specs]
+        result = type("LookupIn", (), {})()
+        result.cas = self.cas
+        result.content_as = _Content(values)
+        return result
+
+    def mutate_in(self, doc_id, specs, options):
+        if self.doc is None:
+            raise DocumentNotFoundException()
+        if self.races:
+            self.races -= 1
+            self.cas += 1
+        if options.get("cas") not in (None, 0, self.cas):
+            raise CasMismatchException()
+        self.mutations += 1
+        self.cas += 1
+        for spec in specs:  # (opcode, path, ..., value)
+            self.doc[spec[1]] = spec[-1]
+
+
+class _Content:
+    def __init__(self, values):
+        self.values = values
+
+    def __getitem__(self, type_):
+        def get(index):
+            if self.values[index]["status"]:
+                raise PathNotFoundException()
+            return type_(self.values[index]["value"])
+        return get
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    """Point the blocking client at a stand-in collection."""
+    def connect(doc, **kwargs):
+        stand_in = _Collection(doc, **kwargs)
+        monkeypatch.setattr(CouchbaseClient, "get_collection", classmethod(lambda cls: stand_in))
+        return stand_in
+    return connect
+
+
+class TestPatchDocument:
+    """Test sub-document patches with CAS."""
+
+    def test_unconditional_patch(self, collection):
+        """Fields are upserted with one mutate_in and no CAS."""
+        stand_in = collection({"id": "upload::1", "status": "pending"})
+
+        assert CouchbaseQuery.patch_document("upload::1", {"status": "ready"}) is True
+        assert stand_in.doc == {"id": "upload::1", "status": "ready"}
+
+    def test_expected_mismatch(self, collection):
+        """Nothing is written when an expected field differs."""
+        stand_in = collection({"id": "upload::1", "analysis_id": "analysis::2"})
+
+        assert CouchbaseQuery.patch_document("upload::1", {"status": "ready"}, {"analysis_id": "analysis::1"}) is False
+        assert stand_in.mutations == 0
+
+    def test_missing_expected_field_is_none(self, collection):
+        """A missing field compares equal to None."""
+        collection({"id": "upload::1"})
+
+        assert CouchbaseQuery.patch_document("upload::1", {"status": "ready"}, {"analysis_id": None}) is True
+
+    def test_cas_race_retried(self, collection):
+        """A lost CAS race re-reads and retries."""
+        stand_in = collection({"id": "upload::1", "analysis_id": "analysis::1"}, races=2)
+
+        assert CouchbaseQuery.patch_document("upload::1", {"status": "ready"}, {"analysis_id": "analysis::1"}) is True
+        assert stand_in.doc["status"] == "ready"
+
+    def test_gives_up_after_retries(self, collection, monkeypatch):
+        """Losing every race raises ConcurrentModificationError."""
+        monkeypatch.setattr(couchbase_client.CouchbaseConfig, "CAS_RETRIES", 3)
+        collection({"id": "upload::1", "analysis_id": "analysis::1"}, races=3)
+
+        with pytest.raises(ConcurrentModificationError):
+            CouchbaseQuery.patch_document("upload::1", {"status": "ready"}, {"analysis_id": "analysis::1"})
+
+    def test_missing_document(self, collection):
+        """Patching a missing document reports False."""
+        collection(None)
+
+        assert CouchbaseQuery.patch_document("upload::1", {"status": "ready"}) is False
+
+
+class TestGetFields:
+    """Test projected reads with sub-document lookups."""
+
+    def test_only_requested_fields(self, collection):
+        """Requested fields come back by name, None when absent."""
+        collection({"id": "analysis::1", "status": "ready", "fact_checks": [{"id": "fc"}]})
+
+        assert CouchbaseQuery.get_fields("analysis::1", ["status", "error"]) == {"status": "ready", "error": None}
+
+    def test_missing_document(self, collection):
+        """A missing document is None."""
+        collection(None)
+
+        assert CouchbaseQuery.get_fields("analysis::1", ["status"]) is None
+
+
+class _FlakyCollection:
+    """Stand-in collection whose get fails with `error` for the first `failures` calls."""
+
+    def __init__(self, doc, failures=0, error=UnAmbiguousTimeoutException):
+        self.doc = doc
+        self.failures = failures
+        self.error = error
+        self.gets = 0
+
+    def get(self, doc_id):
+        self.gets += 1
+        if self.failures:
+            self.failures -= 1
+            raise self.error(message="boom")
+        if self.doc is None:
+            raise DocumentNotFoundException()
+        result = type("GetResult", (), {})()
+        result.content_as = {dict: self.doc}
+        return result
+
+
+class TestResilientGet:
+    """Test that transient failures are retried and never reported as not found."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_breaker(self, monkeypatch):
+        monkeypatch.setattr(resilience, "breaker", resilience.CircuitBreaker(failure_threshold=1))
+        monkeypatch.setattr(resilience, "retry_policy", resilience.RetryPolicy(2, 0, 0))
+
+    def _connect(self, monkeypatch, stand_in):
+        monkeypatch.setattr(CouchbaseClient, "get_collection", classmethod(lambda cls: stand_in))
+        return stand_in
+
+    def test_timeout_retried(self, monkeypatch):
+        """A timeout followed by success returns the document."""
+        stand_in = self._connect(monkeypatch, _FlakyCollection({"id": "user::1"}, failures=1))
+
+        assert CouchbaseQuery.get_document("user::1") == {"id": "user::1"}
+        assert stand_in.gets == 2
+
+    def test_persistent_timeout_raises(self, monkeypatch):
+        """A cluster that keeps timing out raises instead of returning None."""
+        self._connect(monkeypatch, _FlakyCollection({"id": "user::1"}, failures=10))
+
+        with pytest.raises(UnAmbiguousTimeoutException):
+            CouchbaseQuery.get_document("user::1")
+        with pytest.raises(resilience.CircuitOpenError):
+            CouchbaseQuery.get_document("user::1")
+
+    def test_missing_document_is_none(self, monkeypatch):
+        """Only a not-found answer maps to None."""
+        self._connect(monkeypatch, _FlakyCollection(None))
+
+        assert CouchbaseQuery.get_document("user::1") is None
+
+    @pytest.mark.asyncio
+    async def test_query_with_open_breaker_is_empty(self, monkeypatch):
+        """Ad hoc queries and query_by_type return no rows, as on other query errors, while the breaker is open."""
+        resilience.breaker.record_failure()
+        monkeypatch.setattr(CouchbaseClient, "_cluster", _Cluster([{"id": "user::1"}]))
+        monkeypatch.setattr(AsyncCouchbaseClient, "_cluster", _Cluster([{"id": "user::1"}]))
+
+        assert CouchbaseQuery.query("SELECT 1") == []
+        assert CouchbaseQuery.query_by_type("user") == []
+        assert await AsyncCouchbaseQuery.query("SELECT 1") == []
+        assert await AsyncCouchbaseQuery.query_by_type("user") == []
+
+    def test_probe_accepts_not_found(self, monkeypatch):
+        """The recovery probe treats a not-found answer as healthy, and bypasses an open breaker."""
+        stand_in = self._connect(monkeypatch, _FlakyCollection(None))
+        resilience.breaker.record_failure()
+
+        CouchbaseQuery.probe()
+
+        assert stand_in.gets == 1
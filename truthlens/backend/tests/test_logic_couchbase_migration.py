@@ -0,0 +1,124 @@
+"""Tests for backend.logic.couchbase_migration module."""
+import pytest
+
+from backend.logic.couchbase_client import CouchbaseClient
+from backend.logic.couchbase_migration import (
+    SUPERSEDED_INDEXES, advise_indexes, check_plan, create_indexes, explain_queries,
+)
+
+KEYSET_PLAN = {"#operator": "Sequence", "~children": [
+    {"#operator": "IndexScan3", "index": "idx_upload_user_created", "limit": "$2"},
+    {"#operator": "Fetch"},
+    {"#operator": "Limit", "expr": "$2"},
+]}
+PRIMARY_PLAN = {"#operator": "Sequence", "~children": [
+    {"#operator": "PrimaryScan3", "index": "#primary"},
+    {"#operator": "Fetch"},
+    {"#operator": "Order", "sort_terms": []},
+]}
+
+
+class _Cluster:
+    """Stand-in cluster answering EXPLAIN / ADVISE and recording DDL."""
+
+    def __init__(self, plan=KEYSET_PLAN, advice=None):
+        self.plan = plan
+        self.advice = advice or "No index recommendation at this time."
+        self.executed = []
+        self._rows = []
+
+    def query(self, sql):
+        if sql.startswith("EXPLAIN"):
+            self._rows = [{"plan": self.plan}]
+        elif sql.startswith("ADVISE"):
+            self._rows = [{"advice": {"adviseinfo": {"recommended_indexes": self.advice}}}]
+        else:
+            self.executed.append(" ".join(sql.split()))
+            self._rows = []
+        return self
+
+    def rows(self):
+        return iter(self._rows)
+
+    def execute(self):
+        return list(self._rows)
+
+
+@pytest.fixture
+def cluster(monkeypatch):
+    """Connect the blocking client to a stand-in cluster."""
+    def connect(**kwargs):
+        stand_in = _Cluster(**kwargs)
+        monkeypatch.setattr(CouchbaseClient, "_cluster", stand_in)
+        return stand_in
+    return connect
+
+
+class TestCheckPlan:
+    """Test EXPLAIN plan inspection."""
+
+    def test_indexed_keyset_plan_is_clean(self):
+        """An index scan with the limit pushed down has no problems."""
+        report = check_plan(KEYSET_PLAN)
+
+        assert report["indexes"] == ["idx_upload_user_created"]
+        assert report["problems"] == []
+
+    def test_primary_scan_flagged(self):
+        """Primary scans, unlimited fetches and in-memory sorts are all flagged."""
+        report = check_plan(PRIMARY_PLAN)
+
+        assert report["problems"] == ["primary scan", "fetch without index limit", "in-memory sort"]
+
+    def test_covering_scan(self):
+        """A scan that lists the covered expressions is reported as covering."""
+        report = check_plan({"#operator": "IndexScan3", "index": "idx", "covers": ["cover((d.user_id))"]})
+
+        assert report["covering"] is True
+
+
+class TestExplainAndAdvise:
+    """Test the explain / advise subcommands."""
+
+    def test_explain_passes_on_indexed_plans(self, cluster, capsys):
+        """explain succeeds when no registered query scans the primary index."""
+        cluster()
+
+        assert explain_queries() is True
+        assert "✓ uploads_by_user: idx_upload_user_created" in capsys.readouterr().out
+
+    def test_explain_fails_on_primary_scan(self, cluster):
+        """explain fails when a registered query falls back to a primary scan."""
+        cluster(plan=PRIMARY_PLAN)
+
+        assert explain_queries() is False
+
+    def test_advise_only_reports_without_create(self, cluster):
+        """advise prints proposals but runs no DDL unless asked to."""
+        stand_in = cluster()
+
+        assert advise_indexes() is True
+        assert stand_in.executed == []
+
+    def test_advise_create(self, cluster):
+        """advise --create creates each index the advisor recommends once."""
+        stmt = "CREATE INDEX adv_user_id ON `truthlens`(`user_id`)"
+        stand_in = cluster(advice={"covering_indexes": [{"index_statement": stmt}]})
+
+        assert advise_indexes(create=True) is True
+        assert stand_in.executed == [stmt]
+
+
+class TestCreateIndexes:
+    """Test the setup subcommand's index DDL."""
+
+    def test_superseded_indexes_dropped_after_replacements(self, cluster):
+        """The created_at-ordered indexes are created, and the older definitions dropped after they exist."""
+        stand_in = cluster()
+
+        assert create_indexes() is True
+        created = [sql.split()[5] for sql in stand_in.executed if sql.startswith("CREATE")]
+        dropped = [sql.split()[4] for sql in stand_in.executed if sql.startswith("DROP")]
+        assert "idx_upload_user_created" in created and "idx_analysis_status_created" in created
+        assert dropped == list(SUPERSEDED_INDEXES)
+        assert all(sql.startswith("CREATE") for sql in stand_in.executed[:len(created)])
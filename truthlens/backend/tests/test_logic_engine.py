@@ -0,0 +1,112 @@
+"""Tests for backend.logic.engine module."""
+import asyncio
+
+import pytest
+from backend.logic import engine
+from backend.logic.analysis import compute_breakdown
+from backend.logic.engine import AnalysisEngine
+
+
+def _upload(files=1, **settings):
+    return {
+        "id": "upload::1",
+        "files": [{"id": f"file::{i}", "name": f"doc{i}.txt"} for i in range(files)],
+        "settings": {
+            "fact_check": settings.get("fact_check", False),
+            "logical_fallacy_check": settings.get("logical_fallacy_check", False),
+            "ai_generation_check": settings.get("ai_generation_check", False),
+        },
+    }
+
+
+class TestAnalysisEngine:
+    """Test check dispatch and result assembly."""
+
+    @pytest.mark.asyncio
+    async def test_runs_checks_in_worker_processes(self):
+        """Units run in a separate process and results assemble into the breakdown shape."""
+        engine_ = AnalysisEngine(processes=1)
+        try:
+            result = await engine_.analyze(_upload(
+                files=2, fact_check=True, logical_fallacy_check=True, ai_generation_check=True
+            ))
+        finally:
+            engine_.shutdown()
+
+        assert len(result["fact_checks"]) == 2
+        assert len(result["fallacies"]) == 2
+        assert result["ai_check"]["is_ai"] is False
+        breakdown = compute_breakdown(result["fact_checks"], result["fallacies"], result["ai_check"])
+        assert breakdown["overall_credibility_score"] is not None
+
+    @pytest.mark.asyncio
+    async def test_only_enabled_checks_run(self):
+        """Checks disabled in the upload settings are skipped."""
+        result = await AnalysisEngine(processes=0).analyze(_upload(fact_check=True))
+
+        assert result["fact_checks"]
+        assert result["fallacies"] == []
+        assert result["ai_check"] is None
+
+    @pytest.mark.asyncio
+    async def test_ai_checks_merged_across_files(self, monkeypatch):
+        """Per-file AI checks combine into one: mean score, flagged if any file is."""
+        scores = iter([0.2, 0.8])
+        monkeypatch.setitem(engine.CHECKS, "ai_generation_check", lambda file: {
+            "id": "ai", "is_ai": False, "score": next(scores), "explanation": None,
+        })
+
+        result = await AnalysisEngine(processes=0).analyze(_upload(files=2, ai_generation_check=True))
+
+        assert result["ai_check"]["score"] == pytest.approx(0.5)
+
+    @pytest.mark.asyncio
+    async def test_unscored_ai_check_skipped(self, monkeypatch):
+        """An AI check without a score is left out of the mean; the checks after it still count."""
+        scores = iter([0.2, None, 0.6])
+        monkeypatch.setitem(engine.CHECKS, "ai_generation_check", lambda file: {
+            "id": "ai", "is_ai": False, "score": next(scores), "explanation": None,
+        })
+        seen = []
+
+        result = await AnalysisEngine(processes=0).analyze(
+            _upload(files=3, ai_generation_check=True),
+            on_progress=lambda progress: seen.append(progress.breakdown()),
+        )
+
+        assert result["ai_check"]["score"] == pytest.approx(0.4)
+        assert seen[-1]["ai_generation_score"] == pytest.approx(0.4)
+
+    @pytest.mark.asyncio
+    async def test_failed_check_cancels_the_rest(self, monkeypatch):
+        """When one check fails, the checks still running are cancelled before the error is raised."""
+        cancelled = asyncio.Event()
+
+        async def run_check(self, check, file):
+            if check == "fact_check":
+                await asyncio.sleep(0)
+                raise RuntimeError("checker crashed")
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+        monkeypatch.setattr(AnalysisEngine, "run_check", run_check)
+
+        with pytest.raises(RuntimeError, match="checker crashed"):
+            await AnalysisEngine(processes=0).analyze(_upload(fact_check=True, ai_generation_check=True))
+        assert cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_progress_reports_running_breakdown(self):
+        """on_progress sees the partial breakdown after every unit, ending at the final one."""
+        seen = []
+
+        result = await AnalysisEngine(processes=0).analyze(
+            _upload(files=2, fact_check=True, ai_generation_check=True),
+            on_progress=lambda progress: seen.append(progress.breakdown()),
+        )
+
+        assert len(seen) == 4
+        final = compute_breakdown(result["fact_checks"], result["fallacies"], result["ai_check"])
+        assert seen[-1]["overall_credibility_score"] == pytest.approx(final["overall_credibility_score"])
@@ -1,6 +1,6 @@
 """Tests for fixture data loading."""
 import pytest
-from backend.logic.fixtures import load_fixture_analysis
+from backend.logic.fixtures import load_fixture_analysis, clear_fixture_cache
 
 
 class TestLoadFixture:
@@ -83,3 +83,56 @@ class TestLoadFixture:
                 score = ai_check["score"]
                 assert isinstance(score, (int, float))
                 assert 0.0 <= score <= 1.0
+
+
+class TestFixtureCache:
+    """Test cached fixture loading."""
+
+    @pytest.fixture(autouse=True)
+    def empty_cache(self):
+        """Start and end every test with an empty fixture cache."""
+        clear_fixture_cache()
+        yield
+        clear_fixture_cache()
+
+    def test_loads_independent_of_working_directory(self, tmp_path, monkeypatch):
+        """The default fixture path does not depend on the current directory."""
+        monkeypatch.chdir(tmp_path)
+        assert load_fixture_analysis() is not None
+
+    def test_callers_get_isolated_copies(self):
+        """Patching one loaded fixture never leaks into the next load."""
+        first = load_fixture_analysis()
+        first["id"] = "analysis::patched"
+        first["fact_checks"].clear()
+
+        second = load_fixture_analysis()
+        assert second["id"] != "analysis::patched"
+        assert second["fact_checks"]
+
+    def test_file_read_once_until_modified(self, tmp_path, monkeypatch):
+        """The file is only re-read when its mtime changes."""
+        import builtins
+        import os
+        path = tmp_path / "analysis.json"
+        path.write_text('{"id": "a", "status": "ready"}')
+        opened = []
+        real_open = builtins.open
+
+        def counting_open(file, *args, **kwargs):
+            opened.append(file)
+            return real_open(file, *args, **kwargs)
+        monkeypatch.setattr(builtins, "open", counting_open)
+
+        load_fixture_analysis(path)
+        load_fixture_analysis(path)
+        assert len(opened) == 1
+
+        path.write_text('{"id": "b", "status": "ready"}')
+        os.utime(path, ns=(0, path.stat().st_mtime_ns + 1_000_000))
+        assert load_fixture_analysis(path)["id"] == "b"
+        assert len(opened) == 2
+
+    def test_missing_file_returns_none(self, tmp_path):
+        """A missing fixture file yields None."""
+        assert load_fixture_analysis(tmp_path / "missing.json") is None
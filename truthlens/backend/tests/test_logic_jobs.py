@@ -0,0 +1,173 @@
+"""Tests for backend.logic.jobs module."""
+import asyncio
+import pytest
+from backend.logic import store, jobs
+from backend.logic.fixtures import load_fixture_analysis
+from backend.logic.jobs import AnalysisJobQueue, QueueFullError, compute_analysis, new_analysis_doc, run_analysis
+from backend.logic.pubsub import analysis_events
+
+
+@pytest.fixture(autouse=True)
+def clear_stores():
+    """Clear stores before and after each test."""
+    for s in [store._users, store._uploads, store._analyses]:
+        s.clear()
+    yield
+    for s in [store._users, store._uploads, store._analyses]:
+        s.clear()
+
+
+async def _seed(upload_id="upload::1", analysis_id="analysis::1"):
+    """Store an upload linked to a pending analysis."""
+    await store.save_upload(upload_id, {"id": upload_id, "status": "pending", "analysis_id": analysis_id})
+    await store.save_analysis(analysis_id, new_analysis_doc(analysis_id, upload_id))
+
+
+class TestRunAnalysis:
+    """Test the analysis state machine."""
+
+    @pytest.mark.asyncio
+    async def test_transitions_publish_running_then_ready(self):
+        """run_analysis publishes running and ready events and marks the upload ready."""
+        await _seed()
+        async with analysis_events.subscribe("upload::1") as events:
+            doc = await run_analysis("analysis::1", "upload::1")
+
+            statuses = [(await events.__anext__())["status"] for _ in range(2)]
+
+        assert statuses == ["running", "ready"]
+        assert doc["started_at"] is not None
+        assert doc["finished_at"] is not None
+        assert (await store.get_upload("upload::1"))["status"] == "ready"
+
+    @pytest.mark.asyncio
+    async def test_failure_marks_analysis_failed(self, monkeypatch):
+        """An exception during analysis ends in the failed state with the error recorded."""
+        async def broken(upload, on_progress=None):
+            raise RuntimeError("checker crashed")
+        monkeypatch.setattr(jobs, "compute_analysis", broken)
+        await _seed()
+
+        doc = await run_analysis("analysis::1", "upload::1")
+
+        assert doc["status"] == "failed"
+        assert doc["error"] == "checker crashed"
+        assert (await store.get_upload("upload::1"))["status"] == "failed"
+
+    @pytest.mark.asyncio
+    async def test_upload_with_nothing_to_check_gets_fixture_analysis(self):
+        """An upload without files or enabled checks still gets the fixture's scored analysis."""
+        fixture = load_fixture_analysis()
+        for upload in ({"files": [], "settings": {"fact_check": True}},
+                       {"files": [{"id": "file::1"}], "settings": {}}):
+            result = await compute_analysis(upload)
+            assert result["summary"] == fixture["summary"]
+            assert len(result["fact_checks"]) == len(fixture["fact_checks"])
+            assert result["breakdown"]["overall_credibility_score"] is not None
+
+    @pytest.mark.asyncio
+    async def test_unsaved_transition_still_ends_failed(self, monkeypatch):
+        """If the ready state cannot be saved, the analysis is marked failed and subscribers get a final event."""
+        patch = store.patch_analysis
+
+        async def flaky(analysis_id, changes, expected=None):
+            if changes.get("status") == "ready":
+                raise RuntimeError("store unavailable")
+            return await patch(analysis_id, changes, expected)
+        monkeypatch.setattr(store, "patch_analysis", flaky)
+        await _seed()
+
+        async with analysis_events.subscribe("upload::1") as events:
+            doc = await run_analysis("analysis::1", "upload::1")
+            statuses = [(await events.__anext__())["status"] for _ in range(2)]
+
+        assert statuses == ["running", "failed"]
+        assert doc["status"] == "failed" and "store unavailable" in doc["error"]
+        assert (await store.get_analysis("analysis::1"))["status"] == "failed"
+
+    @pytest.mark.asyncio
+    async def test_deleted_analysis_is_skipped(self):
+        """A job whose analysis was deleted before it ran does nothing."""
+        assert await run_analysis("analysis::gone", "upload::1") is None
+
+
+class TestAnalysisJobQueue:
+    """Test the worker pool."""
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self, monkeypatch):
+        """No more than `workers` analyses run at once."""
+        running = 0
+        peak = 0
+
+        async def slow(upload, on_progress=None):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return {}
+        monkeypatch.setattr(jobs, "compute_analysis", slow)
+
+        queue = AnalysisJobQueue(workers=2)
+        for i in range(6):
+            await _seed(f"upload::{i}", f"analysis::{i}")
+            queue.submit(f"analysis::{i}", f"upload::{i}")
+        await queue.join()
+        await queue.stop()
+
+        assert peak == 2
+        assert all(a["status"] == "ready" for a in store._analyses.values())
+
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects_jobs(self):
+        """submit raises QueueFullError once max_pending jobs are waiting."""
+        queue = AnalysisJobQueue(workers=1, max_pending=1)
+        queue.submit("analysis::1", "upload::1")
+
+        with pytest.raises(QueueFullError):
+            queue.submit("analysis::2", "upload::2")
+        assert queue.depth == 1
+        await queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_interrupted_analyses_are_recovered(self, monkeypatch):
+        """stop() puts a running analysis back to pending, and recover() requeues it to completion."""
+        started = asyncio.Event()
+
+        async def hang(upload, on_progress=None):
+            started.set()
+            await asyncio.Event().wait()
+        monkeypatch.setattr(jobs, "compute_analysis", hang)
+        await _seed()
+        queue = AnalysisJobQueue(workers=1)
+        queue.submit("analysis::1", "upload::1")
+        await started.wait()
+        await queue.stop()
+
+        assert (await store.get_analysis("analysis::1"))["status"] == "pending"
+
+        async def quick(upload, on_progress=None):
+            return {}
+        monkeypatch.setattr(jobs, "compute_analysis", quick)
+        queue = AnalysisJobQueue(workers=1)
+        await queue.start()
+        assert await queue.recover() == 1
+        await queue.join()
+        await queue.stop()
+
+        assert (await store.get_analysis("analysis::1"))["status"] == "ready"
+
+    @pytest.mark.asyncio
+    async def test_recovery_overflow_is_failed(self):
+        """Stranded analyses beyond the queue's capacity are marked failed instead of left pending."""
+        for i in range(2):
+            await _seed(f"upload::{i}", f"analysis::{i}")
+        queue = AnalysisJobQueue(workers=1, max_pending=1)
+        await queue.start()
+
+        assert await queue.recover() == 1
+        # listed newest first, so the older analysis is the one that does not fit
+        assert (await store.get_analysis("analysis::0"))["status"] == "failed"
+        await queue.join()
+        await queue.stop()
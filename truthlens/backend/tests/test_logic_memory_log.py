@@ -0,0 +1,210 @@
+"""Tests for backend.logic.memory_log module."""
+import asyncio
+import os
+import threading
+
+import pytest
+
+from backend.logic import memory_log
+from backend.logic.memory_log import DocumentLog
+from backend.logic.memory_store import LazyDoc
+from backend.logic.storage import MemoryBackend
+
+
+async def _reopen(directory, **kwargs):
+    """A fresh MemoryBackend restored from `directory`, and the restore report."""
+    backend = MemoryBackend()
+    restored = await backend.attach_log(DocumentLog(str(directory), **kwargs))
+    return backend, restored
+
+
+class TestReplay:
+    """Test restoring documents from the log."""
+
+    @pytest.mark.asyncio
+    async def test_changes_survive_restart(self, tmp_path):
+        """Saves, patches and deletes are replayed, indexes included."""
+        backend, restored = await _reopen(tmp_path)
+        assert restored["documents"] == 0
+        await backend.put("upload", "upload::1", {"id": "upload::1", "user_id": "user::1", "status": "pending"})
+        await backend.put_many("upload", {"upload::2": {"id": "upload::2", "user_id": "user::1"}})
+        await backend.patch("upload", "upload::1", {"status": "ready"}, None)
+        await backend.put("user", "user::1", {"id": "user::1"})
+        await backend.delete("user", "user::1")
+        await backend.close()
+
+        reopened, restored = await _reopen(tmp_path)
+        docs, _ = await reopened.lookup("uploads_by_user", "user::1", 10, None)
+
+        assert restored["replayed"] == 5
+        assert [d["id"] for d in docs] == ["upload::2", "upload::1"]
+        assert docs[1]["status"] == "ready"
+        assert await reopened.get("user", "user::1") is None
+        await reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_torn_tail_is_truncated(self, tmp_path):
+        """A half-written last record is dropped; the records before it are kept."""
+        backend, _ = await _reopen(tmp_path)
+        await backend.put("user", "user::1", {"id": "user::1"})
+        await backend.put("user", "user::2", {"id": "user::2"})
+        await backend.close()
+        path = tmp_path / "log-00000000.tls"
+        intact = path.stat().st_size
+        with open(path, "r+b") as f:
+            f.truncate(intact - 3)
+
+        reopened, restored = await _reopen(tmp_path)
+        await reopened.put("user", "user::3", {"id": "user::3"})
+        await reopened.close()
+        again, _ = await _reopen(tmp_path)
+
+        assert restored["documents"] == 1
+        assert sorted(again.buckets["user"]) == ["user::1", "user::3"]
+        await again.close()
+
+
+class TestSnapshots:
+    """Test compaction into memory-mapped snapshots."""
+
+    @pytest.mark.asyncio
+    async def test_compaction_and_lazy_restore(self, tmp_path):
+        """Compaction leaves one snapshot; restored documents decode on first access."""
+        backend, _ = await _reopen(tmp_path, compact_bytes=2000)
+        for i in range(50):
+            await backend.put("analysis", f"analysis::{i:02d}", {"id": f"analysis::{i:02d}", "status": "ready"})
+        await backend.put("analysis", "analysis::pending", {"id": "analysis::pending", "status": "pending"})
+        await backend.close()
+
+        assert backend.stats()["entries"] == 51
+        assert len(list(tmp_path.glob("snapshot-*.tls"))) == 1
+        assert len(list(tmp_path.glob("log-*.tls"))) == 1
+
+        reopened, restored = await _reopen(tmp_path)
+        lazy = sum(type(doc) is LazyDoc for _, _, doc in reopened.store.raw_items())
+        docs, more = await reopened.lookup("analyses_by_status", "ready", 2, None)
+
+        assert restored["documents"] == 51 and lazy == restored["snapshot"] > 0
+        assert [d["id"] for d in docs] == ["analysis::49", "analysis::48"] and more
+        assert reopened.stats()["pinned"] == 1
+        await reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_lazy_documents_carried_into_next_snapshot(self, tmp_path):
+        """Documents never read since the restore are copied into the next snapshot encoded."""
+        backend, _ = await _reopen(tmp_path)
+        await backend.put("upload", "upload::1", {"id": "upload::1", "user_id": "user::1"})
+        await backend.compact()
+        await backend.close()
+
+        reopened, _ = await _reopen(tmp_path)
+        await reopened.put("upload", "upload::2", {"id": "upload::2", "user_id": "user::1"})
+        await reopened.compact()
+        await reopened.close()
+        final, restored = await _reopen(tmp_path)
+
+        assert (restored["documents"], restored["snapshot"], restored["replayed"]) == (2, 2, 0)
+        docs, _ = await final.lookup("uploads_by_user", "user::1", 10, None)
+        assert [d["id"] for d in docs] == ["upload::2", "upload::1"]
+        await final.close()
+
+    @pytest.mark.asyncio
+    async def test_version_1_snapshot_indexes_by_created_at(self, tmp_path):
+        """Snapshots that stored only the indexed value still restore newest-first listings."""
+        log = DocumentLog(str(tmp_path))
+        log.load()
+        rows = [
+            ("upload", f"upload::{i}", {"id": f"upload::{i}", "user_id": "user::1", "created_at": f"2024-01-0{3 - i}"})
+            for i in range(3)
+        ]
+        log.write_snapshot(log.rotate(), rows, lambda doc_type, doc: doc["user_id"])
+        log.close()
+        path = tmp_path / "snapshot-00000001.tls"
+        path.write_bytes(b"TLSNAP1\n" + path.read_bytes()[len(b"TLSNAP1\n"):])
+
+        backend, _ = await _reopen(tmp_path)
+        docs, _ = await backend.lookup("uploads_by_user", "user::1", 10, None)
+        await backend.compact()
+        await backend.close()
+        reopened, _ = await _reopen(tmp_path)
+
+        assert [d["id"] for d in docs] == ["upload::0", "upload::1", "upload::2"]
+        assert sorted((doc_id, lazy.value) for _, doc_id, lazy in reopened.store.raw_items()) == [
+            (f"upload::{i}", ["user::1", f"2024-01-0{3 - i}"]) for i in range(3)
+        ]
+        await reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_interrupted_compaction_replays_both_logs(self, tmp_path):
+        """If a snapshot never completes, the previous logs are still replayed."""
+        backend, _ = await _reopen(tmp_path)
+        await backend.put("user", "user::1", {"id": "user::1"})
+        backend.log.rotate()  # new generation, snapshot never written
+        await backend.put("user", "user::2", {"id": "user::2"})
+        await backend.close()
+
+        reopened, restored = await _reopen(tmp_path)
+
+        assert restored["replayed"] == 2
+        assert sorted(reopened.buckets["user"]) == ["user::1", "user::2"]
+        await reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_writes_share_fsyncs_off_the_event_loop(self, tmp_path, monkeypatch):
+        """Concurrent writes are fsynced in batches by the writer thread, and each waits for its record."""
+        fsyncs = []
+        fsync = os.fsync
+        monkeypatch.setattr(memory_log.os, "fsync", lambda fd: fsyncs.append(threading.current_thread()) or fsync(fd))
+        backend, _ = await _reopen(tmp_path, fsync=True)
+
+        await asyncio.gather(*(backend.put("user", f"user::{i}", {"id": f"user::{i}"}) for i in range(50)))
+
+        assert 0 < len(fsyncs) < 50
+        assert threading.main_thread() not in fsyncs
+        await backend.close()
+        reopened, restored = await _reopen(tmp_path)
+        assert restored["replayed"] == 50
+        await reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_compaction_is_logged_not_raised(self, tmp_path, monkeypatch, capsys):
+        """Any snapshot error is reported and leaves the backend able to compact again."""
+        backend, _ = await _reopen(tmp_path)
+        await backend.put("user", "user::1", {"id": "user::1"})
+
+        def broken(*args):
+            raise ValueError("unencodable")
+
+        monkeypatch.setattr(backend.log, "write_snapshot", broken)
+        assert await backend.compact() == 0
+        assert "Memory log compaction failed: ValueError: unencodable" in capsys.readouterr().out
+        assert backend._compaction is None
+        await backend.close()
+
+        reopened, restored = await _reopen(tmp_path)
+        assert restored["replayed"] == 1
+        await reopened.close()
+
+    def test_awkward_ids_and_values(self, tmp_path):
+        """IDs and indexed values that are not plain strings survive the column encoding."""
+        log = DocumentLog(str(tmp_path))
+        log.load()
+        rows = [
+            ("upload", "line\nbreak", {"user_id": None}),
+            ("upload", "\x01json", {"user_id": 7}),
+            ("upload", "", {"user_id": "user::1"}),
+        ]
+        log.write_snapshot(log.rotate(), rows, lambda doc_type, doc: doc["user_id"])
+        log.close()
+
+        reopened = DocumentLog(str(tmp_path))
+        snapshot, _ = reopened.load()
+        reopened.close()
+
+        restored = {doc_id: (lazy.value, lazy.load()) for _, doc_id, lazy in snapshot.rows}
+        assert restored == {
+            "line\nbreak": (None, {"user_id": None}),
+            "\x01json": (7, {"user_id": 7}),
+            "": ("user::1", {"user_id": "user::1"}),
+        }
+        assert sorted(os.listdir(tmp_path)) == ["log-00000001.tls", "snapshot-00000001.tls"]
@@ -0,0 +1,165 @@
+"""Tests for backend.logic.memory_store module."""
+import threading
+
+import pytest
+
+from backend.logic.memory_log import DocumentLog
+from backend.logic.memory_store import LazyDoc, ShardedStore, json_size
+from backend.logic.storage import MemoryBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _pending(doc_type, doc):
+    return doc_type == "analysis" and doc.get("status") == "pending"
+
+
+class TestEviction:
+    """Test budget enforcement."""
+
+    def test_lru_evicted_at_entry_budget(self):
+        """The least recently used document goes first."""
+        store = ShardedStore(shards=1, max_entries=2)
+        store.put("user", "a", {"id": "a"})
+        store.put("user", "b", {"id": "b"})
+        store.get("user", "a")
+
+        store.put("user", "c", {"id": "c"})
+
+        assert store.get("user", "b") is None
+        assert store.get("user", "a") == {"id": "a"}
+        assert store.stats()["evictions"] == 1
+
+    def test_byte_budget(self):
+        """Documents are evicted until the byte budget fits."""
+        doc = {"id": "x", "body": "y" * 100}
+        store = ShardedStore(shards=1, max_bytes=json_size(doc) * 2)
+        for key in "abc":
+            store.put("user", key, dict(doc, id=key))
+
+        stats = store.stats()
+        assert stats["entries"] == 2
+        assert stats["bytes"] <= json_size(doc) * 2
+
+    def test_pending_analyses_never_evicted(self):
+        """Pinned documents survive; they become evictable once no longer pinned."""
+        store = ShardedStore(shards=1, max_entries=1, pinned=_pending)
+        store.put("analysis", "a1", {"status": "pending"})
+        store.put("analysis", "a2", {"status": "pending"})
+
+        assert store.get("analysis", "a1") and store.get("analysis", "a2")
+        assert store.stats()["pinned"] == 2
+
+        store.update("analysis", "a1", lambda doc: dict(doc, status="ready"))
+        store.put("user", "u", {"id": "u"})
+
+        assert store.get("analysis", "a1") is None
+        assert store.get("analysis", "a2") == {"status": "pending"}
+
+    def test_ttl_expiry_notifies(self):
+        """Expired documents are dropped on access and reported to on_evict."""
+        clock = FakeClock()
+        dropped = []
+        store = ShardedStore(ttl=10, clock=clock, pinned=_pending, on_evict=lambda t, i: dropped.append((t, i)))
+        store.put("user", "u", {"id": "u"})
+        store.put("analysis", "a", {"status": "pending"})
+
+        clock.now = 10
+        assert store.get("user", "u") is None
+        assert store.get("analysis", "a") == {"status": "pending"}
+        assert dropped == [("user", "u")]
+        assert store.stats()["expirations"] == 1
+
+
+class TestConcurrency:
+    """Test the store from several threads."""
+
+    def test_parallel_writers(self):
+        """Concurrent puts and updates lose nothing and respect the budget."""
+        store = ShardedStore(shards=8, max_entries=4000)
+
+        def writer(n):
+            for i in range(1000):
+                store.put("user", f"{n}-{i}", {"n": 0})
+                store.update("user", f"{n}-{i}", lambda doc: {"n": doc["n"] + 1})
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert store.count() + store.evictions == 4000
+        assert all(doc == {"n": 1} for _, doc in store.items("user"))
+
+
+class TestBucket:
+    """Test the dict-like per-type view."""
+
+    def test_mapping_interface(self):
+        """Buckets behave like dicts of one document type."""
+        store = ShardedStore()
+        users = store.bucket("user")
+        users["u1"] = {"id": "u1"}
+        store.put("upload", "u1", {"id": "upload"})
+
+        assert users == {"u1": {"id": "u1"}}
+        assert len(users) == 1 and "u1" in users
+        del users["u1"]
+        assert users == {}
+        with pytest.raises(KeyError):
+            del users["u1"]
+        users.clear()
+        assert store.get("upload", "u1") == {"id": "upload"}
+
+    def test_iteration_does_not_decode(self):
+        """Iterating a bucket lists IDs without decoding lazily loaded documents."""
+        store = ShardedStore()
+        store.load([("user", "u1", LazyDoc(b'{"id": "u1"}', 0, 12), False)])
+
+        assert list(store.bucket("user")) == ["u1"]
+        assert type(store.raw_items()[0][2]) is LazyDoc
+
+    @pytest.mark.asyncio
+    async def test_backend_buckets_are_indexed_and_logged(self, tmp_path):
+        """Assigning and deleting bucket items updates MemoryBackend's indexes and log."""
+        backend = MemoryBackend()
+        await backend.attach_log(DocumentLog(str(tmp_path)))
+        uploads = backend.buckets["upload"]
+        uploads["upload::1"] = {"id": "upload::1", "user_id": "user::1"}
+        uploads["upload::2"] = {"id": "upload::2", "user_id": "user::1"}
+        del uploads["upload::2"]
+
+        docs, _ = await backend.lookup("uploads_by_user", "user::1", 10, None)
+        await backend.close()
+        reopened = MemoryBackend()
+        restored = await reopened.attach_log(DocumentLog(str(tmp_path)))
+
+        assert [d["id"] for d in docs] == ["upload::1"]
+        assert restored["replayed"] == 3
+        assert (await reopened.lookup("uploads_by_user", "user::1", 10, None))[0] == [
+            {"id": "upload::1", "user_id": "user::1"}
+        ]
+        await reopened.close()
+
+
+class TestMemoryBackendEviction:
+    """Test eviction through MemoryBackend."""
+
+    @pytest.mark.asyncio
+    async def test_evicted_documents_leave_indexes(self):
+        """Evicted uploads disappear from index lookups and stats report them."""
+        backend = MemoryBackend(shards=1, max_entries=2)
+        for i in range(3):
+            await backend.put("upload", f"upload::{i}", {"id": f"upload::{i}", "user_id": "user::1"})
+
+        docs, _ = await backend.lookup("uploads_by_user", "user::1", 10, None)
+
+        assert [d["id"] for d in docs] == ["upload::2", "upload::1"]
+        assert backend.stats()["evictions"] == 1
@@ -0,0 +1,106 @@
+"""Tests for backend.logic.metrics module."""
+import threading
+
+import pytest
+from backend.logic.metrics import Family, Gauge, Histogram, Counter, Registry
+
+
+def _histogram(labelnames=("op",), buckets=(0.1, 1.0)):
+    return Family("test_seconds", "Test latency", "histogram", labelnames, lambda: Histogram(buckets))
+
+
+class TestHistogram:
+    """Test bucketing and rendering of histograms."""
+
+    def test_buckets_are_cumulative_upper_bounds(self):
+        """An observation counts in every bucket whose bound is >= the value."""
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+        counts, total = histogram.snapshot()
+        assert counts == [2, 3, 4]
+        assert total == pytest.approx(3.65)
+        assert histogram.count == 4
+
+    def test_render(self):
+        """Histograms render _bucket series with le, then _sum and _count."""
+        family = _histogram()
+        family.labels("get").observe(0.5)
+        assert family.render() == [
+            "# HELP test_seconds Test latency",
+            "# TYPE test_seconds histogram",
+            'test_seconds_bucket{op="get",le="0.1"} 0',
+            'test_seconds_bucket{op="get",le="1"} 1',
+            'test_seconds_bucket{op="get",le="+Inf"} 1',
+            'test_seconds_sum{op="get"} 0.5',
+            'test_seconds_count{op="get"} 1',
+        ]
+
+    def test_observations_from_many_threads(self):
+        """Per-thread arrays are summed without losing observations."""
+        histogram = Histogram((1.0,))
+
+        def work():
+            for _ in range(10000):
+                histogram.observe(0.5)
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert histogram.count == 80000
+
+
+class TestFamily:
+    """Test labels, counters and gauges."""
+
+    def test_labels_are_checked(self):
+        """Children need exactly one value per label name."""
+        with pytest.raises(ValueError):
+            _histogram().labels("get", "extra")
+
+    def test_same_labels_same_child(self):
+        """labels() returns the same child for the same values."""
+        family = _histogram()
+        assert family.labels("get") is family.labels("get")
+
+    def test_unlabelled_counter_starts_at_zero(self):
+        """Metrics without labels are exported before anything is recorded."""
+        family = Family("test_total", "Test count", "counter", (), Counter)
+        assert family.render()[-1] == "test_total 0"
+        family.inc(2)
+        assert family.render()[-1] == "test_total 2"
+
+    def test_label_values_are_escaped(self):
+        """Quotes, backslashes and newlines in label values are escaped."""
+        family = Family("test_total", "Test count", "counter", ("error",), Counter)
+        family.labels('a"b\\c\nd').inc()
+        assert family.render()[-1] == 'test_total{error="a\\"b\\\\c\\nd"} 1'
+
+    def test_gauge_read_at_render(self):
+        """Gauges call their read function on every render, with or without labels."""
+        depth = {"value": 3}
+        gauge = Gauge("test_depth", "Test depth", lambda: depth["value"])
+        by_status = Gauge("test_jobs", "Test jobs", lambda: {("ready",): 2, ("failed",): 1}, ("status",))
+        assert gauge.render()[-1] == "test_depth 3"
+        depth["value"] = 0
+        assert gauge.render()[-1] == "test_depth 0"
+        assert by_status.render()[2:] == ['test_jobs{status="failed"} 1', 'test_jobs{status="ready"} 2']
+
+
+class TestRegistry:
+    """Test the registry."""
+
+    def test_duplicate_names_rejected(self):
+        """Two metrics cannot share a name."""
+        registry = Registry()
+        registry.register(_histogram())
+        with pytest.raises(ValueError):
+            registry.register(_histogram())
+
+    def test_failing_gauge_skipped(self):
+        """A gauge whose read fails does not break the scrape."""
+        registry = Registry()
+        registry.register(Gauge("test_broken", "Broken", lambda: 1 / 0))
+        registry.register(Family("test_total", "Test count", "counter", (), Counter))
+        assert registry.render().endswith("test_total 0\n")
@@ -0,0 +1,88 @@
+"""Tests for backend.logic.pubsub module."""
+import asyncio
+import pytest
+from backend.logic.pubsub import TopicRegistry
+
+
+class TestTopicRegistry:
+    """Test topic fan-out, overflow and cleanup."""
+
+    @pytest.mark.asyncio
+    async def test_publish_reaches_only_topic_subscribers(self):
+        """Events go to every subscriber of their topic and no one else."""
+        registry = TopicRegistry()
+        async with registry.subscribe("upload::1") as a, \
+                registry.subscribe("upload::1") as b, \
+                registry.subscribe("upload::2") as other:
+            delivered = registry.publish("upload::1", {"id": "analysis::1"})
+
+            assert delivered == 2
+            assert await a.__anext__() == {"id": "analysis::1"}
+            assert await b.__anext__() == {"id": "analysis::1"}
+            assert not other._events
+
+    def test_publish_without_subscribers(self):
+        """Publishing to a topic nobody listens on is a no-op."""
+        registry = TopicRegistry()
+        assert registry.publish("upload::1", {}) == 0
+
+    @pytest.mark.asyncio
+    async def test_drop_oldest_overflow(self):
+        """drop_oldest keeps the most recent events when the buffer is full."""
+        registry = TopicRegistry(maxsize=2, overflow="drop_oldest")
+        async with registry.subscribe("t") as sub:
+            for i in range(4):
+                registry.publish("t", i)
+
+            assert sub.dropped == 2
+            assert [await sub.__anext__(), await sub.__anext__()] == [2, 3]
+
+    @pytest.mark.asyncio
+    async def test_drop_newest_overflow(self):
+        """drop_newest keeps the oldest events when the buffer is full."""
+        registry = TopicRegistry(maxsize=2, overflow="drop_newest")
+        async with registry.subscribe("t") as sub:
+            delivered = [registry.publish("t", i) for i in range(3)]
+
+            assert delivered == [1, 1, 0]
+            assert [await sub.__anext__(), await sub.__anext__()] == [0, 1]
+
+    @pytest.mark.asyncio
+    async def test_final_event_never_dropped(self):
+        """A final event evicts the oldest non-final one, even under drop_newest."""
+        for overflow in ("drop_newest", "drop_oldest"):
+            registry = TopicRegistry(maxsize=2, overflow=overflow)
+            async with registry.subscribe("t") as sub:
+                registry.publish("t", "ready", final=True)
+                registry.publish("t", 1)
+                registry.publish("t", 2)
+
+                assert registry.publish("t", "failed", final=True) == 1
+                events = [await sub.__anext__() for _ in range(2)]
+                assert events == ["ready", "failed"]
+                assert sub.dropped == 2
+
+    def test_unknown_overflow_policy(self):
+        """Unknown overflow policies are rejected."""
+        with pytest.raises(ValueError):
+            TopicRegistry(overflow="block")
+
+    @pytest.mark.asyncio
+    async def test_cancelled_subscriber_is_removed(self):
+        """A subscriber waiting for events is unregistered when cancelled."""
+        registry = TopicRegistry()
+
+        async def consume():
+            async with registry.subscribe("t") as sub:
+                async for _ in sub:
+                    pass
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0)
+        assert registry.subscriber_count("t") == 1
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert registry.subscriber_count() == 0
+        assert registry._topics == {}
@@ -0,0 +1,247 @@
+"""Tests for backend.logic.resilience module."""
+import asyncio
+import random
+
+import pytest
+from couchbase.exceptions import (
+    AuthenticationException, CouchbaseException, DocumentNotFoundException, UnAmbiguousTimeoutException,
+)
+
+from backend.logic import resilience
+from backend.logic.resilience import CircuitBreaker, CircuitOpenError, RecoveryProbe, RetryPolicy
+
+
+class _Clock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    """Fresh shared breaker and a no-delay retry policy for call()/acall()."""
+    clock = _Clock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    monkeypatch.setattr(resilience, "breaker", breaker)
+    monkeypatch.setattr(resilience, "retry_policy", RetryPolicy(2, 0, 0))
+    return breaker, clock
+
+
+def _failing(times, error=UnAmbiguousTimeoutException):
+    """Callable that raises `error` for its first `times` calls, then returns "ok"."""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= times:
+            raise error(message="boom")
+        return "ok"
+    fn.calls = calls
+    return fn
+
+
+class TestRetryPolicy:
+    """Test jittered exponential backoff."""
+
+    def test_delay_bounded(self):
+        """Delays are jittered within [0, min(max_delay, base * 2**attempt)]."""
+        policy = RetryPolicy(5, base_delay=0.1, max_delay=0.5, rng=random.Random(1))
+
+        for attempt in range(8):
+            for _ in range(50):
+                assert 0 <= policy.delay(attempt) <= min(0.5, 0.1 * 2 ** attempt)
+
+
+class TestCircuitBreaker:
+    """Test breaker state transitions."""
+
+    def test_opens_at_threshold(self):
+        """Consecutive failures open the breaker; it then rejects calls."""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=_Clock())
+
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+
+        assert breaker.state == resilience.OPEN
+        assert not breaker.allow()
+        assert breaker.stats()["rejected_total"] == 1
+        assert breaker.stats()["opened_total"] == 1
+
+    def test_success_resets_count(self):
+        """A success in between keeps the breaker closed."""
+        breaker = CircuitBreaker(failure_threshold=2, clock=_Clock())
+
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        assert breaker.state == resilience.CLOSED
+
+    def test_half_open_single_trial(self):
+        """After the reset timeout exactly one trial call is let through."""
+        clock = _Clock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+
+        clock.now = 10
+        assert breaker.allow()
+        assert breaker.state == resilience.HALF_OPEN
+        assert not breaker.allow()
+
+        breaker.record_failure()
+        assert breaker.state == resilience.OPEN
+        clock.now = 20
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == resilience.CLOSED
+
+
+class TestCall:
+    """Test retries and breaker accounting in call()/acall()."""
+
+    def test_retries_transient_errors(self, shared):
+        """A timeout followed by success is retried transparently."""
+        breaker, _ = shared
+        fn = _failing(2)
+
+        assert resilience.call(fn) == "ok"
+        assert len(fn.calls) == 3
+        assert breaker.retries_total == 2
+        assert breaker.failures_total == 0
+
+    def test_exhausted_retries_raise_and_open(self, shared):
+        """Calls that keep timing out raise; enough of them open the breaker."""
+        breaker, _ = shared
+
+        for _ in range(2):
+            with pytest.raises(UnAmbiguousTimeoutException):
+                resilience.call(_failing(10))
+
+        assert breaker.state == resilience.OPEN
+        fn = _failing(0)
+        with pytest.raises(CircuitOpenError):
+            resilience.call(fn)
+        assert fn.calls == []
+
+    def test_answers_are_not_retried(self, shared):
+        """Errors returned by a healthy cluster are raised at once and count as success."""
+        breaker, _ = shared
+        breaker.record_failure()
+        fn = _failing(1, DocumentNotFoundException)
+
+        with pytest.raises(DocumentNotFoundException):
+            resilience.call(fn)
+
+        assert len(fn.calls) == 1
+        assert breaker.consecutive_failures == 0
+
+    def test_other_errors_count_as_failures(self, shared):
+        """Cluster-side errors such as authentication failures open the breaker without retries."""
+        breaker, _ = shared
+
+        for _ in range(2):
+            fn = _failing(1, AuthenticationException)
+            with pytest.raises(AuthenticationException):
+                resilience.call(fn)
+            assert len(fn.calls) == 1
+
+        assert breaker.state == resilience.OPEN
+
+    def test_non_couchbase_error_ends_half_open_trial(self, shared):
+        """A trial call failing with any exception reopens the breaker instead of blocking further trials."""
+        breaker, clock = shared
+        breaker.record_failure()
+        breaker.record_failure()
+        clock.now = 10
+
+        def broken():
+            raise ValueError("bad document")
+        with pytest.raises(ValueError):
+            resilience.call(broken)
+
+        assert breaker.state == resilience.OPEN
+        clock.now = 20
+        assert resilience.call(_failing(0)) == "ok"
+        assert breaker.state == resilience.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_cancelled_trial_frees_the_slot(self, shared):
+        """A half-open trial cancelled mid-call lets the next call try at once."""
+        breaker, clock = shared
+        breaker.record_failure()
+        breaker.record_failure()
+        clock.now = 10
+
+        async def hang():
+            await asyncio.Event().wait()
+        task = asyncio.ensure_future(resilience.acall(hang))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert breaker.state == resilience.HALF_OPEN
+        assert breaker.allow()
+
+    @pytest.mark.asyncio
+    async def test_acall_retries(self, shared):
+        """acall() retries awaitables the same way."""
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            if len(calls) == 1:
+                raise UnAmbiguousTimeoutException(message="boom")
+            return "ok"
+
+        assert await resilience.acall(fn) == "ok"
+        assert len(calls) == 2
+
+
+class TestRecoveryProbe:
+    """Test background recovery probing."""
+
+    @pytest.mark.asyncio
+    async def test_probe_updates_breaker(self):
+        """A failed probe keeps the breaker open; a successful one closes it."""
+        breaker = CircuitBreaker(failure_threshold=1, clock=_Clock())
+        breaker.record_failure()
+        probe = RecoveryProbe(breaker)
+
+        async def down():
+            raise CouchbaseException(message="unreachable")
+
+        async def up():
+            return None
+
+        assert not await probe.probe_once(down)
+        assert breaker.state == resilience.OPEN
+        assert await probe.probe_once(up)
+        assert breaker.state == resilience.CLOSED
+        assert (probe.probes_total, probe.probe_failures_total) == (2, 1)
+
+    @pytest.mark.asyncio
+    async def test_background_task_closes_breaker(self):
+        """The started task probes while the breaker is open and can be stopped."""
+        breaker = CircuitBreaker(failure_threshold=1, clock=_Clock())
+        breaker.record_failure()
+        probe = RecoveryProbe(breaker, interval=0.001)
+
+        async def up():
+            return None
+
+        probe.start(up)
+        assert probe.running
+        for _ in range(100):
+            if breaker.state == resilience.CLOSED:
+                break
+            await asyncio.sleep(0.005)
+        await probe.stop()
+
+        assert breaker.state == resilience.CLOSED
+        assert not probe.running
@@ -0,0 +1,78 @@
+"""Tests for backend.logic.secondary_index module."""
+from backend.logic.secondary_index import SecondaryIndex, order_key
+
+
+def _index(docs):
+    index = SecondaryIndex("user_id")
+    for doc_id, doc in docs.items():
+        index.add(doc_id, doc)
+    return index
+
+
+class TestSecondaryIndex:
+    """Test keyset pages over an in-memory index."""
+
+    def test_pages_newest_first(self):
+        """Pages run newest first by created_at, then ID, resume after the cursor and report more data."""
+        created = ["2024-01-02", "2024-01-05", "2024-01-02", "2024-01-09", None]
+        docs = {
+            f"upload::{i}": {"id": f"upload::{i}", "user_id": "u1", "created_at": created_at}
+            for i, created_at in enumerate(created)
+        }
+        index = _index(docs)
+
+        first, more = index.page("u1", docs, 2)
+        second, _ = index.page("u1", docs, 2, after=order_key("upload::1", docs["upload::1"]))
+        last, no_more = index.page("u1", docs, 2, after=("2024-01-02", "upload::0"))
+
+        assert [d["id"] for d in first] == ["upload::3", "upload::1"]
+        assert more is True
+        assert [d["id"] for d in second] == ["upload::2", "upload::0"]
+        assert [d["id"] for d in last] == ["upload::4"]
+        assert no_more is False
+        assert index.ids("u1") == ["upload::3", "upload::1", "upload::2", "upload::0", "upload::4"]
+
+    def test_reindex_on_created_at_change(self):
+        """A document whose created_at changes moves to its new position."""
+        docs = {
+            f"upload::{i}": {"id": f"upload::{i}", "user_id": "u1", "created_at": f"2024-01-0{i + 1}"}
+            for i in range(2)
+        }
+        index = _index(docs)
+
+        docs["upload::0"] = dict(docs["upload::0"], created_at="2024-02-01")
+        index.add("upload::0", docs["upload::0"])
+
+        assert index.ids("u1") == ["upload::0", "upload::1"]
+
+    def test_reindex_on_value_change(self):
+        """Re-adding a document under a new value moves it between lists."""
+        docs = {"upload::1": {"id": "upload::1", "user_id": "u1"}}
+        index = _index(docs)
+
+        docs["upload::1"] = {"id": "upload::1", "user_id": "u2"}
+        index.add("upload::1", docs["upload::1"])
+
+        assert index.page("u1", docs, 10) == ([], False)
+        assert index.page("u2", docs, 10)[0] == [docs["upload::1"]]
+
+    def test_remove(self):
+        """Removed documents no longer appear; removing twice is a no-op."""
+        docs = {"upload::1": {"id": "upload::1", "user_id": "u1"}}
+        index = _index(docs)
+
+        index.remove("upload::1")
+        index.remove("upload::1")
+
+        assert index.page("u1", docs, 10) == ([], False)
+
+    def test_stale_entries_skipped(self):
+        """Documents deleted or changed behind the index's back are skipped and cleaned up."""
+        docs = {f"upload::{i}": {"id": f"upload::{i}", "user_id": "u1"} for i in range(3)}
+        index = _index(docs)
+
+        del docs["upload::0"]
+        docs["upload::1"]["user_id"] = "u2"
+
+        assert [d["id"] for d in index.page("u1", docs, 10)[0]] == ["upload::2"]
+        assert [d["id"] for d in index.page("u2", docs, 10)[0]] == ["upload::1"]
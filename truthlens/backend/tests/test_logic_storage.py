@@ -0,0 +1,189 @@
+"""Tests for backend.logic.storage and backend.logic.sqlite_backend modules."""
+import sqlite3
+
+import pytest
+
+from backend.logic import lifespan, store
+from backend.logic.app_config import AppConfig
+from backend.logic.sqlite_backend import SQLiteBackend
+from backend.logic.storage import CouchbaseBackend, MemoryBackend, StorageBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+async def backend(request, tmp_path):
+    """Each local backend, empty."""
+    if request.param == "memory":
+        instance = MemoryBackend()
+    else:
+        instance = SQLiteBackend(str(tmp_path / "store.db"))
+    yield instance
+    await instance.close()
+
+
+class TestBackendContract:
+    """Behaviour every StorageBackend must share."""
+
+    def test_implements_protocol(self, backend):
+        """Backends satisfy the StorageBackend protocol."""
+        assert isinstance(backend, StorageBackend)
+        assert isinstance(CouchbaseBackend(), StorageBackend)
+
+    @pytest.mark.asyncio
+    async def test_put_get_delete(self, backend):
+        """Documents round-trip by type and ID; deletes report whether they existed."""
+        await backend.put("user", "user::1", {"id": "user::1", "name": "Alice"})
+
+        assert await backend.get("user", "user::1") == {"id": "user::1", "name": "Alice"}
+        assert await backend.get("upload", "user::1") is None
+        assert await backend.delete("user", "user::1") is True
+        assert await backend.delete("user", "user::1") is False
+        assert await backend.get("user", "user::1") is None
+
+    @pytest.mark.asyncio
+    async def test_returned_documents_are_copies(self, backend):
+        """Changing a document passed to put or returned by get leaves the stored one alone."""
+        doc = {"id": "analysis::1", "status": "pending"}
+        await backend.put("analysis", "analysis::1", doc)
+        doc["status"] = "running"
+        read = await backend.get("analysis", "analysis::1")
+        read["status"] = "ready"
+        (await backend.get_many("analysis", ["analysis::1"])).results["analysis::1"]["status"] = "failed"
+
+        assert await backend.get("analysis", "analysis::1") == {"id": "analysis::1", "status": "pending"}
+
+    @pytest.mark.asyncio
+    async def test_nested_values_are_copied(self, backend):
+        """Nested fact checks and breakdowns are not shared with saved, patched or returned documents."""
+        doc = {"id": "analysis::1", "status": "ready", "fact_checks": [{"score": 0.5}], "breakdown": None}
+        breakdown = {"overall_credibility_score": 0.5}
+        await backend.put("analysis", "analysis::1", doc)
+        await backend.patch("analysis", "analysis::1", {"breakdown": breakdown}, None)
+        doc["fact_checks"][0]["score"] = 0.0
+        breakdown["overall_credibility_score"] = 0.0
+        (await backend.get("analysis", "analysis::1"))["fact_checks"].append({"score": 1.0})
+        (await backend.lookup("analyses_by_status", "ready", 1, None))[0][0]["breakdown"].clear()
+        (await backend.get_fields("analysis", "analysis::1", ["fact_checks"]))["fact_checks"].clear()
+
+        stored = await backend.get("analysis", "analysis::1")
+        assert stored["fact_checks"] == [{"score": 0.5}]
+        assert stored["breakdown"] == {"overall_credibility_score": 0.5}
+
+    @pytest.mark.asyncio
+    async def test_get_fields(self, backend):
+        """Projected reads return only the requested fields, None for absent ones."""
+        await backend.put("analysis", "analysis::1", {
+            "id": "analysis::1", "status": "ready", "breakdown": {"score": 0.5}, "fact_checks": [{"id": "fc"}],
+        })
+
+        assert await backend.get_fields("analysis", "analysis::1", ["breakdown", "status", "error"]) == {
+            "breakdown": {"score": 0.5}, "status": "ready", "error": None,
+        }
+        assert await backend.get_fields("analysis", "analysis::2", ["status"]) is None
+
+    @pytest.mark.asyncio
+    async def test_bulk_operations(self, backend):
+        """Bulk calls report per-key outcomes."""
+        saved = await backend.put_many("user", {"user::1": {"id": "user::1"}, "user::2": {"id": "user::2"}})
+        assert saved.results == {"user::1": True, "user::2": True}
+
+        fetched = await backend.get_many("user", ["user::1", "user::3"])
+        assert fetched.results == {"user::1": {"id": "user::1"}, "user::3": None}
+
+        deleted = await backend.delete_many("user", ["user::2", "user::3"])
+        assert deleted.results == {"user::2": True, "user::3": False}
+
+    @pytest.mark.asyncio
+    async def test_patch(self, backend):
+        """Patches set fields only when the expected values match."""
+        await backend.put("upload", "upload::1", {"id": "upload::1", "status": "pending", "analysis_id": None})
+
+        assert await backend.patch("upload", "upload::1", {"status": "ready"}, {"analysis_id": "analysis::1"}) is False
+        assert await backend.patch("upload", "upload::1", {"status": "ready"}, {"analysis_id": None}) is True
+        assert (await backend.get("upload", "upload::1"))["status"] == "ready"
+        assert await backend.patch("upload", "upload::2", {"status": "ready"}, None) is False
+
+    @pytest.mark.asyncio
+    async def test_scan_chunks(self, backend):
+        """Scans yield every document of a type, optionally in chunks."""
+        await backend.put_many("analysis", {f"analysis::{i}": {"id": f"analysis::{i}"} for i in range(5)})
+
+        chunks = [chunk async for chunk in backend.scan("analysis", 2)]
+        docs = [doc async for doc in backend.scan("analysis", None)]
+
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+        assert sorted(doc["id"] for doc in docs) == [f"analysis::{i}" for i in range(5)]
+
+    @pytest.mark.asyncio
+    async def test_lookup_pages_newest_first(self, backend):
+        """Index lookups follow saves and patches and page newest first by created_at, then ID."""
+        created = {"a": "2024-01-03", "b": "2024-01-05", "c": "2024-01-09", "d": "2024-01-03", "e": "2024-01-04"}
+        await backend.put_many("upload", {
+            f"upload::{c}": {"id": f"upload::{c}", "user_id": "user::1" if c != "c" else "user::2", "created_at": at}
+            for c, at in created.items()
+        })
+        await backend.patch("upload", "upload::e", {"user_id": "user::2"}, None)
+
+        first, more = await backend.lookup("uploads_by_user", "user::1", 2, None)
+        rest, done = await backend.lookup("uploads_by_user", "user::1", 2, ("2024-01-03", "upload::d"))
+
+        assert [d["id"] for d in first] == ["upload::b", "upload::d"] and more
+        assert [d["id"] for d in rest] == ["upload::a"] and not done
+
+
+class TestSQLiteBackend:
+    """Test SQLite-specific behaviour."""
+
+    @pytest.mark.asyncio
+    async def test_documents_survive_reopen(self, tmp_path):
+        """Committed documents are on disk and the database runs in WAL mode."""
+        path = str(tmp_path / "store.db")
+        backend = SQLiteBackend(path)
+        await backend.put("user", "user::1", {"id": "user::1"})
+        await backend.close()
+
+        reopened = SQLiteBackend(path)
+        try:
+            assert await reopened.get("user", "user::1") == {"id": "user::1"}
+        finally:
+            await reopened.close()
+        assert sqlite3.connect(path).execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    @pytest.mark.asyncio
+    async def test_lookup_uses_index(self, tmp_path):
+        """Keyset lookups are answered from the expression index."""
+        backend = SQLiteBackend(str(tmp_path / "store.db"))
+        try:
+            plan = backend._reader().execute(
+                "EXPLAIN QUERY PLAN SELECT body FROM uploads "
+                "WHERE json_extract(body, '$.user_id') = ? AND id > ? ORDER BY id LIMIT ?",
+                ("user::1", "", 3),
+            ).fetchall()
+        finally:
+            await backend.close()
+        assert any("idx_uploads_by_user" in row[-1] for row in plan)
+
+
+class TestStoreBackendSelection:
+    """Test routing store calls to the selected backend."""
+
+    @pytest.mark.asyncio
+    async def test_use_backend(self, tmp_path):
+        """Store functions go to the selected backend until it is closed."""
+        store.use_backend(SQLiteBackend(str(tmp_path / "store.db")))
+        try:
+            await store.save_user("user::1", {"id": "user::1"})
+            assert store.backend_name() == "sqlite"
+            assert await store.get_user("user::1") == {"id": "user::1"}
+            assert "user::1" not in store._users
+        finally:
+            await store.close()
+        assert store.backend_name() == "memory"
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("value", ["sqllite", "couch"])
+    async def test_unknown_backend_refuses_to_start(self, monkeypatch, value):
+        """A misspelled STORAGE_BACKEND stops startup instead of falling back to memory."""
+        monkeypatch.setattr(AppConfig, "STORAGE_BACKEND", value)
+        with pytest.raises(ValueError, match="Unknown STORAGE_BACKEND"):
+            await lifespan.on_startup()
+        assert store.backend_name() == "memory"
@@ -1,6 +1,12 @@
 """Tests for backend.logic.store module."""
+import base64
+
 import pytest
 from backend.logic import store
+from backend.logic.couchbase_client import (
+    AsyncCouchbaseClient, AsyncCouchbaseQuery, CouchbaseClient, CouchbaseQuery, statements,
+)
+from backend.logic.storage import CouchbaseBackend
 
 
 @pytest.fixture(autouse=True)
@@ -10,6 +16,8 @@ def clear_stores():
     store._users.clear()
     store._uploads.clear()
     store._analyses.clear()
+    store._uploads_by_user.clear()
+    store._analyses_by_status.clear()
     
     yield
     
@@ -22,7 +30,8 @@ def clear_stores():
 class TestUserStore:
     """Test user document CRUD operations."""
 
-    def test_save_and_get_user(self):
+    @pytest.mark.asyncio
+    async def test_save_and_get_user(self):
         """save_user and get_user work together."""
         user_id = "user::12345"
         user_doc = {
@@ -32,49 +41,54 @@ class TestUserStore:
             "wallet_address": "0x123...",
         }
         
-        store.save_user(user_id, user_doc)
-        retrieved = store.get_user(user_id)
+        await store.save_user(user_id, user_doc)
+        retrieved = await store.get_user(user_id)
         
         assert retrieved == user_doc
         assert retrieved["name"] == "Alice"
 
-    def test_get_nonexistent_user(self):
+    @pytest.mark.asyncio
+    async def test_get_nonexistent_user(self):
         """get_user returns None for nonexistent user."""
-        result = store.get_user("user::nonexistent")
+        result = await store.get_user("user::nonexistent")
         assert result is None
 
-    def test_delete_user(self):
+    @pytest.mark.asyncio
+    async def test_delete_user(self):
         """delete_user removes a user and returns True."""
         user_id = "user::12345"
         user_doc = {"id": user_id, "name": "Bob"}
         
-        store.save_user(user_id, user_doc)
-        assert store.get_user(user_id) is not None
+        await store.save_user(user_id, user_doc)
+        assert await store.get_user(user_id) is not None
         
-        deleted = store.delete_user(user_id)
+        deleted = await store.delete_user(user_id)
         assert deleted is True
-        assert store.get_user(user_id) is None
+        assert await store.get_user(user_id) is None
 
-    def test_delete_nonexistent_user(self):
+    @pytest.mark.asyncio
+    async def test_delete_nonexistent_user(self):
         """delete_user returns False for nonexistent user."""
-        result = store.delete_user("user::nonexistent")
+        result = await store.delete_user("user::nonexistent")
         assert result is False
 
-    def test_update_user(self):
+    @pytest.mark.asyncio
+    async def test_update_user(self):
         """Users can be updated by saving with same ID."""
         user_id = "user::12345"
         
-        store.save_user(user_id, {"id": user_id, "name": "Charlie"})
-        store.save_user(user_id, {"id": user_id, "name": "Charles"})
+        await store.save_user(user_id, {"id": user_id, "name": "Charlie"})
+        await store.save_user(user_id, {"id": user_id, "name": "Charles"})
         
-        retrieved = store.get_user(user_id)
+        retrieved = await store.get_user(user_id)
         assert retrieved["name"] == "Charles"
 
 
 class TestUploadStore:
     """Test upload document CRUD operations."""
 
-    def test_save_and_get_upload(self):
+    @pytest.mark.asyncio
+    async def test_save_and_get_upload(self):
         """save_upload and get_upload work together."""
         upload_id = "upload::abc123"
         upload_doc = {
@@ -84,36 +98,40 @@ class TestUploadStore:
             "files": [],
         }
         
-        store.save_upload(upload_id, upload_doc)
-        retrieved = store.get_upload(upload_id)
+        await store.save_upload(upload_id, upload_doc)
+        retrieved = await store.get_upload(upload_id)
         
         assert retrieved == upload_doc
         assert retrieved["status"] == "pending"
 
-    def test_get_nonexistent_upload(self):
+    @pytest.mark.asyncio
+    async def test_get_nonexistent_upload(self):
         """get_upload returns None for nonexistent upload."""
-        result = store.get_upload("upload::nonexistent")
+        result = await store.get_upload("upload::nonexistent")
         assert result is None
 
-    def test_delete_upload(self):
+    @pytest.mark.asyncio
+    async def test_delete_upload(self):
         """delete_upload removes an upload."""
         upload_id = "upload::abc123"
-        store.save_upload(upload_id, {"id": upload_id})
+        await store.save_upload(upload_id, {"id": upload_id})
         
-        deleted = store.delete_upload(upload_id)
+        deleted = await store.delete_upload(upload_id)
         assert deleted is True
-        assert store.get_upload(upload_id) is None
+        assert await store.get_upload(upload_id) is None
 
-    def test_delete_nonexistent_upload(self):
+    @pytest.mark.asyncio
+    async def test_delete_nonexistent_upload(self):
         """delete_upload returns False for nonexistent upload."""
-        result = store.delete_upload("upload::nonexistent")
+        result = await store.delete_upload("upload::nonexistent")
         assert result is False
 
 
 class TestAnalysisStore:
     """Test analysis document CRUD operations."""
 
-    def test_save_and_get_analysis(self):
+    @pytest.mark.asyncio
+    async def test_save_and_get_analysis(self):
         """save_analysis and get_analysis work together."""
         analysis_id = "analysis::xyz789"
         analysis_doc = {
@@ -125,58 +143,501 @@ class TestAnalysisStore:
             },
         }
         
-        store.save_analysis(analysis_id, analysis_doc)
-        retrieved = store.get_analysis(analysis_id)
+        saved = await store.save_analysis(analysis_id, analysis_doc)
+        retrieved = await store.get_analysis(analysis_id)
         
-        assert retrieved == analysis_doc
+        assert retrieved == saved == dict(analysis_doc, etag=saved["etag"])
         assert retrieved["status"] == "ready"
+        assert "etag" not in analysis_doc
 
-    def test_get_nonexistent_analysis(self):
+    @pytest.mark.asyncio
+    async def test_get_nonexistent_analysis(self):
         """get_analysis returns None for nonexistent analysis."""
-        result = store.get_analysis("analysis::nonexistent")
+        result = await store.get_analysis("analysis::nonexistent")
         assert result is None
 
-    def test_delete_analysis(self):
+    @pytest.mark.asyncio
+    async def test_delete_analysis(self):
         """delete_analysis removes an analysis."""
         analysis_id = "analysis::xyz789"
-        store.save_analysis(analysis_id, {"id": analysis_id})
+        await store.save_analysis(analysis_id, {"id": analysis_id})
         
-        deleted = store.delete_analysis(analysis_id)
+        deleted = await store.delete_analysis(analysis_id)
         assert deleted is True
-        assert store.get_analysis(analysis_id) is None
+        assert await store.get_analysis(analysis_id) is None
 
-    def test_delete_nonexistent_analysis(self):
+    @pytest.mark.asyncio
+    async def test_delete_nonexistent_analysis(self):
         """delete_analysis returns False for nonexistent analysis."""
-        result = store.delete_analysis("analysis::nonexistent")
+        result = await store.delete_analysis("analysis::nonexistent")
         assert result is False
 
+    @pytest.mark.asyncio
+    async def test_every_write_sets_new_etag(self):
+        """Saves and patches give the analysis a new etag; a patch may set its own."""
+        analysis_id = "analysis::etag"
+        await store.save_analysis(analysis_id, {"id": analysis_id, "status": "pending"})
+        saved = (await store.get_analysis(analysis_id))["etag"]
+
+        await store.patch_analysis(analysis_id, {"status": "running"})
+        patched = (await store.get_analysis(analysis_id))["etag"]
+        await store.patch_analysis(analysis_id, {"status": "ready", "etag": "v3"})
+
+        assert saved and patched and saved != patched
+        assert (await store.get_analysis(analysis_id))["etag"] == "v3"
+
 
 class TestStoreInteraction:
     """Test interactions between different store types."""
 
-    def test_multiple_documents(self):
+    @pytest.mark.asyncio
+    async def test_multiple_documents(self):
         """Store can hold multiple documents of different types."""
         user_id = "user::1"
         upload_id = "upload::1"
         analysis_id = "analysis::1"
         
-        store.save_user(user_id, {"id": user_id, "name": "User"})
-        store.save_upload(upload_id, {"id": upload_id, "status": "pending"})
-        store.save_analysis(analysis_id, {"id": analysis_id, "status": "ready"})
+        await store.save_user(user_id, {"id": user_id, "name": "User"})
+        await store.save_upload(upload_id, {"id": upload_id, "status": "pending"})
+        await store.save_analysis(analysis_id, {"id": analysis_id, "status": "ready"})
         
-        assert store.get_user(user_id) is not None
-        assert store.get_upload(upload_id) is not None
-        assert store.get_analysis(analysis_id) is not None
+        assert await store.get_user(user_id) is not None
+        assert await store.get_upload(upload_id) is not None
+        assert await store.get_analysis(analysis_id) is not None
 
-    def test_store_isolation(self):
+    @pytest.mark.asyncio
+    async def test_store_isolation(self):
         """Deleting one document type doesn't affect others."""
         user_id = "user::1"
         upload_id = "upload::1"
         
-        store.save_user(user_id, {"id": user_id})
-        store.save_upload(upload_id, {"id": upload_id})
+        await store.save_user(user_id, {"id": user_id})
+        await store.save_upload(upload_id, {"id": upload_id})
         
-        store.delete_user(user_id)
+        await store.delete_user(user_id)
         
-        assert store.get_user(user_id) is None
-        assert store.get_upload(upload_id) is not None
+        assert await store.get_user(user_id) is None
+        assert await store.get_upload(upload_id) is not None
+
+
+class TestCouchbaseRouting:
+    """Test that store calls are routed through the Couchbase clients."""
+
+    @pytest.fixture
+    def async_cluster(self, monkeypatch):
+        """Pretend the asyncio Couchbase client is connected."""
+        docs = {}
+
+        async def get_document(doc_id):
+            return docs.get(doc_id)
+
+        async def save_document(doc_id, doc):
+            docs[doc_id] = doc
+            return True
+
+        monkeypatch.setattr(store, "_backend", CouchbaseBackend())
+        monkeypatch.setattr(AsyncCouchbaseClient, "is_connected", classmethod(lambda cls: True))
+        monkeypatch.setattr(AsyncCouchbaseQuery, "get_document", staticmethod(get_document))
+        monkeypatch.setattr(AsyncCouchbaseQuery, "save_document", staticmethod(save_document))
+        return docs
+
+    @pytest.mark.asyncio
+    async def test_async_client_used_when_connected(self, async_cluster):
+        """Store functions await the acouchbase client instead of the in-memory dicts."""
+        await store.save_user("user::1", {"id": "user::1"})
+
+        assert async_cluster == {"user::1": {"id": "user::1"}}
+        assert store._users == {}
+        assert await store.get_user("user::1") == {"id": "user::1"}
+
+    @pytest.mark.asyncio
+    async def test_sync_client_runs_off_event_loop(self, monkeypatch):
+        """The blocking SDK is called from a worker thread, not the event loop thread."""
+        import threading
+        calls = []
+
+        def get_document(doc_id):
+            calls.append(threading.current_thread())
+            return {"id": doc_id}
+
+        monkeypatch.setattr(store, "_backend", CouchbaseBackend())
+        monkeypatch.setattr(CouchbaseClient, "is_connected", classmethod(lambda cls: True))
+        monkeypatch.setattr(CouchbaseQuery, "get_document", staticmethod(get_document))
+
+        assert await store.get_upload("upload::1") == {"id": "upload::1"}
+        assert calls and calls[0] is not threading.main_thread()
+
+
+class TestPagination:
+    """Test keyset-paginated listings."""
+
+    @pytest.mark.asyncio
+    async def test_uploads_by_user_pages(self):
+        """Walking the cursors returns each of the user's uploads exactly once, newest first."""
+        for i in range(5):
+            await store.save_upload(f"upload::{i}", {
+                "id": f"upload::{i}", "user_id": "user::1", "created_at": f"2024-01-0{i * 3 % 5 + 1}",
+            })
+        await store.save_upload("upload::other", {"id": "upload::other", "user_id": "user::2"})
+
+        seen, after = [], None
+        while True:
+            page = await store.list_uploads_by_user("user::1", first=2, after=after)
+            seen += [u["id"] for u in page.items]
+            if not page.has_next_page:
+                break
+            after = page.end_cursor
+
+        assert seen == ["upload::3", "upload::1", "upload::4", "upload::2", "upload::0"]
+
+    @pytest.mark.asyncio
+    async def test_analyses_by_status_follows_saves_and_deletes(self):
+        """Status changes and deletes are reflected in the status listing."""
+        await store.save_analysis("analysis::1", {"id": "analysis::1", "status": "pending"})
+        await store.save_analysis("analysis::2", {"id": "analysis::2", "status": "pending"})
+
+        await store.save_analysis("analysis::1", {"id": "analysis::1", "status": "ready"})
+        await store.delete_analysis("analysis::2")
+
+        assert (await store.list_analyses_by_status("pending")).items == []
+        ready = await store.list_analyses_by_status("ready")
+        assert [a["id"] for a in ready.items] == ["analysis::1"]
+        assert ready.has_next_page is False
+
+    @pytest.mark.asyncio
+    async def test_empty_page(self):
+        """An unknown user has an empty page with no cursor."""
+        page = await store.list_uploads_by_user("user::nobody")
+
+        assert page == store.Page([], None, False)
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor(self):
+        """Malformed cursors are rejected."""
+        with pytest.raises(Exception, match="Invalid cursor"):
+            await store.list_uploads_by_user("user::1", after="not a cursor!")
+        with pytest.raises(Exception, match="Invalid cursor"):
+            await store.list_uploads_by_user("user::1", after=base64.urlsafe_b64encode(b"upload::1").decode())
+
+    @pytest.mark.asyncio
+    async def test_couchbase_keyset_query(self, monkeypatch):
+        """With Couchbase, a page is one indexed query seeking past the cursor."""
+        calls = []
+
+        async def execute(name, params):
+            calls.append((name, params))
+            return [{"id": f"upload::{c}", "created_at": "2024-01-01"} for c in "dcb"]
+
+        monkeypatch.setattr(store, "_backend", CouchbaseBackend())
+        monkeypatch.setattr(AsyncCouchbaseClient, "is_connected", classmethod(lambda cls: True))
+        monkeypatch.setattr(AsyncCouchbaseQuery, "execute", staticmethod(execute))
+
+        cursor = store._encode_cursor({"id": "upload::e", "created_at": "2024-01-01"})
+        page = await store.list_uploads_by_user("user::1", first=2, after=cursor)
+
+        name, params = calls[0]
+        sql = statements.get(name).sql
+        assert name == "uploads_by_user:after"
+        assert "d.user_id = $1 AND (d.created_at < $2 OR (d.created_at = $2 AND META(d).id < $3))" in sql
+        assert "ORDER BY d.user_id, d.created_at DESC, META(d).id DESC" in sql
+        assert params == ["user::1", "2024-01-01", "upload::e", 3]
+        assert [u["id"] for u in page.items] == ["upload::d", "upload::c"]
+        assert page.has_next_page is True
+        assert store._decode_cursor(page.end_cursor) == ("2024-01-01", "upload::c")
+
+
+class TestPatch:
+    """Test field-level patches of uploads and analyses."""
+
+    @pytest.mark.asyncio
+    async def test_patch_sets_fields(self):
+        """patch_upload changes only the given fields."""
+        await store.save_upload("upload::1", {"id": "upload::1", "status": "pending", "files": ["f"]})
+
+        assert await store.patch_upload("upload::1", {"status": "ready"}) is True
+        assert await store.get_upload("upload::1") == {"id": "upload::1", "status": "ready", "files": ["f"]}
+
+    @pytest.mark.asyncio
+    async def test_patch_missing_document(self):
+        """Patching a missing document does not create it."""
+        assert await store.patch_upload("upload::missing", {"status": "ready"}) is False
+        assert await store.get_upload("upload::missing") is None
+
+    @pytest.mark.asyncio
+    async def test_expected_values_guard_patch(self):
+        """A patch whose expected values do not match is not applied."""
+        await store.save_upload("upload::1", {"id": "upload::1", "analysis_id": "analysis::2", "status": "pending"})
+
+        applied = await store.patch_upload("upload::1", {"status": "ready"}, expected={"analysis_id": "analysis::1"})
+
+        assert applied is False
+        assert (await store.get_upload("upload::1"))["status"] == "pending"
+
+    @pytest.mark.asyncio
+    async def test_earlier_reads_unchanged(self):
+        """Documents returned before a patch are not mutated by it."""
+        await store.save_analysis("analysis::1", {"id": "analysis::1", "status": "pending"})
+        before = await store.get_analysis("analysis::1")
+
+        await store.patch_analysis("analysis::1", {"status": "running"})
+
+        assert before["status"] == "pending"
+        assert (await store.get_analysis("analysis::1"))["status"] == "running"
+
+    @pytest.mark.asyncio
+    async def test_patch_updates_secondary_index(self):
+        """A status patch moves the analysis between status listings."""
+        await store.save_analysis("analysis::1", {"id": "analysis::1", "status": "pending"})
+
+        await store.patch_analysis("analysis::1", {"status": "ready"})
+
+        assert (await store.list_analyses_by_status("pending")).items == []
+        assert [a["id"] for a in (await store.list_analyses_by_status("ready")).items] == ["analysis::1"]
+
+
+class TestStreaming:
+    """Test streaming iteration over every document of a type."""
+
+    class _Rows:
+        """Stand-in N1QL result that counts how many rows were pulled."""
+
+        def __init__(self, count):
+            self.count = count
+            self.pulled = 0
+
+        def _next(self):
+            self.pulled += 1
+            return {"id": f"analysis::{self.pulled}"}
+
+        def rows(self):
+            for _ in range(self.count):
+                yield self._next()
+
+    @pytest.mark.asyncio
+    async def test_memory_stream_chunks(self):
+        """In memory, documents are yielded one by one or in chunks."""
+        for i in range(5):
+            await store.save_analysis(f"analysis::{i}", {"id": f"analysis::{i}"})
+
+        docs = [doc async for doc in store.stream_analyses()]
+        chunks = [len(chunk) async for chunk in store.stream_analyses(chunk_size=2)]
+
+        assert len(docs) == 5
+        assert chunks == [2, 2, 1]
+
+    @pytest.mark.asyncio
+    async def test_sync_client_streams_lazily(self, monkeypatch):
+        """With the blocking SDK, rows are pulled a chunk at a time, not all up front."""
+        rows = self._Rows(1200)
+        cluster = type("Cluster", (), {"query": lambda self, sql, *args, **kw: rows})()
+        monkeypatch.setattr(store, "_backend", CouchbaseBackend())
+        monkeypatch.setattr(CouchbaseClient, "_cluster", cluster)
+        monkeypatch.setattr(CouchbaseClient, "_bucket", object())
+
+        stream = store.stream_uploads(chunk_size=100)
+        first = await stream.__anext__()
+        pulled_after_first = rows.pulled
+        rest = [chunk async for chunk in stream]
+
+        assert len(first) == 100
+        assert pulled_after_first == 100
+        assert sum(map(len, rest)) == 1100
+
+    @pytest.mark.asyncio
+    async def test_async_client_streams_rows(self, monkeypatch):
+        """With the asyncio SDK, rows are re-yielded as the async result produces them."""
+        class Result:
+            async def rows(self):
+                for i in range(3):
+                    yield {"id": f"user::{i}"}
+
+        cluster = type("Cluster", (), {"query": lambda self, sql, *args, **kw: Result()})()
+        monkeypatch.setattr(store, "_backend", CouchbaseBackend())
+        monkeypatch.setattr(AsyncCouchbaseClient, "_cluster", cluster)
+        monkeypatch.setattr(AsyncCouchbaseClient, "_bucket", object())
+
+        docs = [doc async for doc in store.stream_users()]
+        chunks = [chunk async for chunk in store.stream_users(chunk_size=2)]
+
+        assert [d["id"] for d in docs] == ["user::0", "user::1", "user::2"]
+        assert [len(c) for c in chunks] == [2, 1]
+
+
+class TestBulkOperations:
+    """Test get_many/save_many/delete_many bulk operations."""
+
+    @pytest.mark.asyncio
+    async def test_save_and_get_many_users(self):
+        """save_many_users stores every document; get_many_users returns them by ID."""
+        docs = {f"user::{i}": {"id": f"user::{i}", "name": f"User {i}"} for i in range(3)}
+
+        saved = await store.save_many_users(docs)
+        fetched = await store.get_many_users(list(docs) + ["user::missing"])
+
+        assert saved.results == dict.fromkeys(docs, True)
+        assert saved.errors == {}
+        assert fetched.results == {**docs, "user::missing": None}
+        assert fetched.errors == {}
+
+    @pytest.mark.asyncio
+    async def test_get_many_deduplicates_ids(self):
+        """Repeated IDs are fetched once."""
+        await store.save_upload("upload::1", {"id": "upload::1"})
+
+        fetched = await store.get_many_uploads(["upload::1", "upload::1"])
+
+        assert fetched.results == {"upload::1": {"id": "upload::1"}}
+
+    @pytest.mark.asyncio
+    async def test_delete_many_analyses(self):
+        """delete_many_analyses reports True for deleted and False for missing IDs."""
+        await store.save_many_analyses({"analysis::1": {"id": "analysis::1"}})
+
+        deleted = await store.delete_many_analyses(["analysis::1", "analysis::missing"])
+
+        assert deleted.results == {"analysis::1": True, "analysis::missing": False}
+        assert await store.get_analysis("analysis::1") is None
+
+    @pytest.mark.asyncio
+    async def test_couchbase_partial_failures(self, monkeypatch):
+        """Missing keys map to None and other per-key errors are reported, not raised."""
+        from couchbase.exceptions import DocumentNotFoundException, TimeoutException
+
+        class Result:
+            def __init__(self, doc):
+                self.content_as = {dict: doc}
+
+        class MultiResult:
+            results = {"user::1": Result({"id": "user::1"})}
+            exceptions = {
+                "user::2": DocumentNotFoundException(),
+                "user::3": TimeoutException("timed out"),
+            }
+
+        class Collection:
+            def get_multi(self, keys, **kwargs):
+                return MultiResult()
+
+        monkeypatch.setattr(store, "_backend", CouchbaseBackend())
+        monkeypatch.setattr(CouchbaseClient, "is_connected", classmethod(lambda cls: True))
+        monkeypatch.setattr(CouchbaseClient, "get_collection", classmethod(lambda cls: Collection()))
+
+        fetched = await store.get_many_users(["user::1", "user::2", "user::3"])
+
+        assert fetched.results == {"user::1": {"id": "user::1"}, "user::2": None}
+        assert list(fetched.errors) == ["user::3"]
+
+
+class TestReadThroughCache:
+    """Test the read-through cache in front of Couchbase."""
+
+    @pytest.fixture
+    def cached_cluster(self, monkeypatch):
+        """Pretend the asyncio Couchbase client is connected and enable the cache."""
+        from backend.logic.cache import LRUCache
+        docs = {}
+        reads = []
+
+        async def get_document(doc_id):
+            reads.append(doc_id)
+            return docs.get(doc_id)
+
+        async def get_documents(doc_ids):
+            reads.extend(doc_ids)
+            return {doc_id: docs.get(doc_id) for doc_id in doc_ids}, {}
+
+        async def save_document(doc_id, doc):
+            docs[doc_id] = doc
+            return True
+
+        monkeypatch.setattr(store, "_backend", CouchbaseBackend())
+        monkeypatch.setattr(AsyncCouchbaseClient, "is_connected", classmethod(lambda cls: True))
+        monkeypatch.setattr(AsyncCouchbaseQuery, "get_document", staticmethod(get_document))
+        monkeypatch.setattr(AsyncCouchbaseQuery, "get_documents", staticmethod(get_documents))
+        monkeypatch.setattr(AsyncCouchbaseQuery, "save_document", staticmethod(save_document))
+        monkeypatch.setattr(store, "_cache", LRUCache(max_entries=100))
+        return reads
+
+    @pytest.mark.asyncio
+    async def test_ready_analysis_served_from_cache(self, cached_cluster):
+        """A ready analysis is fetched from Couchbase once, then from the cache."""
+        await store.save_analysis("analysis::1", {"id": "analysis::1", "status": "ready"})
+
+        await store.get_analysis("analysis::1")
+        await store.get_analysis("analysis::1")
+
+        assert cached_cluster == ["analysis::1"]
+        assert store.cache_stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_projected_read_uses_cached_copy(self, cached_cluster, monkeypatch):
+        """Projected reads are answered from a cached full copy; partial documents are not cached."""
+        lookups = []
+
+        async def get_fields(doc_id, fields):
+            lookups.append(doc_id)
+            return {"status": "ready"}
+
+        monkeypatch.setattr(AsyncCouchbaseQuery, "get_fields", staticmethod(get_fields))
+        await store.save_analysis("analysis::1", {"id": "analysis::1", "status": "ready"})
+
+        assert await store.get_analysis("analysis::1", fields=["status"]) == {"status": "ready"}
+        await store.get_analysis("analysis::1")
+        assert await store.get_analysis("analysis::1", fields=["status"]) == {"status": "ready"}
+
+        assert lookups == ["analysis::1"]
+        assert cached_cluster == ["analysis::1"]
+
+    @pytest.mark.asyncio
+    async def test_pending_analysis_not_cached(self, cached_cluster):
+        """Analyses that are not ready yet are always re-read."""
+        await store.save_analysis("analysis::1", {"id": "analysis::1", "status": "pending"})
+
+        await store.get_analysis("analysis::1")
+        await store.get_analysis("analysis::1")
+
+        assert cached_cluster == ["analysis::1", "analysis::1"]
+
+    @pytest.mark.asyncio
+    async def test_save_invalidates(self, cached_cluster):
+        """Saving a document drops the cached copy."""
+        await store.save_user("user::1", {"id": "user::1", "name": "Old"})
+        await store.get_user("user::1")
+
+        await store.save_user("user::1", {"id": "user::1", "name": "New"})
+
+        assert (await store.get_user("user::1"))["name"] == "New"
+        assert cached_cluster == ["user::1", "user::1"]
+
+    @pytest.mark.asyncio
+    async def test_get_many_fetches_only_uncached(self, cached_cluster):
+        """Bulk gets only go to Couchbase for IDs missing from the cache."""
+        await store.save_user("user::1", {"id": "user::1"})
+        await store.save_user("user::2", {"id": "user::2"})
+        await store.get_user("user::1")
+
+        result = await store.get_many_users(["user::1", "user::2"])
+
+        assert result.results == {"user::1": {"id": "user::1"}, "user::2": {"id": "user::2"}}
+        assert cached_cluster == ["user::1", "user::2"]
+
+    @pytest.mark.asyncio
+    async def test_stale_copy_served_when_unavailable(self, cached_cluster, monkeypatch):
+        """While Couchbase is unreachable an expired cached copy is served; without one the error is raised."""
+        from backend.logic.cache import LRUCache
+        from backend.logic.resilience import CircuitOpenError
+        now = [0.0]
+        monkeypatch.setattr(store, "_cache", LRUCache(max_entries=100, clock=lambda: now[0], stale_grace=60))
+        await store.save_user("user::1", {"id": "user::1"})
+        await store.get_user("user::1")
+
+        async def unavailable(doc_id):
+            raise CircuitOpenError("open")
+
+        monkeypatch.setattr(AsyncCouchbaseQuery, "get_document", staticmethod(unavailable))
+        now[0] = store.AppConfig.STORE_CACHE_TTL_USER + 1
+
+        assert await store.get_user("user::1") == {"id": "user::1"}
+        assert store.cache_stats()["stale_hits"] == 1
+        with pytest.raises(CircuitOpenError):
+            await store.get_user("user::2")
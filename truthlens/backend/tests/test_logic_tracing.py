@@ -0,0 +1,211 @@
+"""Tests for backend.logic.tracing module."""
+import asyncio
+import json
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.logic import store, tracing
+from backend.logic.engine import analysis_engine
+from backend.logic.jobs import AnalysisJobQueue, new_analysis_doc
+
+TRACEPARENT = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+def _chrome_events(path):
+    """Parse a Chrome trace file written without its closing bracket."""
+    return json.loads(path.read_text().rstrip().rstrip(",") + "]")
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    """Trace every request into a Chrome trace file for the duration of a test."""
+    path = tmp_path / "trace.json"
+    monkeypatch.setattr(tracing, "tracer", tracing.Tracer(str(path), 1.0, "chrome"))
+    yield path
+    tracing.tracer.close()
+
+
+class TestSampling:
+    """Test which requests get a root span."""
+
+    def test_off_without_file(self):
+        """No trace file means no spans, whatever the sample rate."""
+        assert tracing.Tracer("", 1.0).start("GET /") is None
+
+    def test_sample_rate(self, tmp_path):
+        """Requests without a traceparent are sampled at sample_rate."""
+        tracer = tracing.Tracer(str(tmp_path / "t.json"), 0.25, rng=random.Random(7))
+        sampled = sum(tracer.start("GET /") is not None for _ in range(4000))
+        assert 800 < sampled < 1200
+        assert tracing.Tracer(str(tmp_path / "t.json"), 0.0).start("GET /") is None
+
+    def test_traceparent_decides(self, tmp_path):
+        """A valid traceparent header's sampled flag wins and its IDs are kept."""
+        tracer = tracing.Tracer(str(tmp_path / "t.json"), 0.0)
+        root = tracer.start("GET /", TRACEPARENT)
+        assert root.trace_id == "0af7651916cd43dd8448eb211c80319c"
+        assert root.parent_id == "b7ad6b7169203331"
+        always = tracing.Tracer(str(tmp_path / "t.json"), 1.0)
+        assert always.start("GET /", TRACEPARENT[:-2] + "00") is None
+        assert always.start("GET /", "garbage").parent_id is None
+
+    def test_unknown_format(self):
+        """Only the chrome and otlp formats are accepted."""
+        with pytest.raises(ValueError):
+            tracing.Tracer("t.json", 1.0, "zipkin")
+
+
+class TestPropagation:
+    """Test that child spans find their parent across awaits, tasks and threads."""
+
+    def test_no_span_outside_a_trace(self):
+        """span() is the shared no-op span when nothing is being traced."""
+        assert tracing.current() is None
+        assert tracing.span("store.get") is tracing.NOOP
+
+    @pytest.mark.asyncio
+    async def test_children_across_tasks_and_threads(self, trace_file):
+        """Spans opened in gathered tasks, to_thread and bound executor calls share the trace."""
+        def in_thread(name):
+            with tracing.span(name):
+                return tracing.current().trace_id
+
+        async def in_task(name):
+            await asyncio.sleep(0)
+            with tracing.span(name):
+                await asyncio.sleep(0)
+
+        root = tracing.tracer.start("GET /")
+        with root:
+            await asyncio.gather(in_task("a"), in_task("b"))
+            assert await asyncio.to_thread(in_thread, "c") == root.trace_id
+            loop = asyncio.get_running_loop()
+            assert await loop.run_in_executor(None, tracing.bind_context(in_thread), "d") == root.trace_id
+
+        events = {e["name"]: e for e in _chrome_events(trace_file)}
+        assert set(events) == {"GET /", "a", "b", "c", "d"}
+        assert all(events[n]["args"]["parent_id"] == root.span_id for n in "abcd")
+        assert events["a"]["tid"] != events["b"]["tid"]  # concurrent spans get their own track
+
+    @pytest.mark.asyncio
+    async def test_explicit_parent_exports_separately(self, trace_file):
+        """A span handed another task's span as parent is exported when it ends, after its parent's trace."""
+        root = tracing.tracer.start("POST /graphql")
+        with root:
+            parent = tracing.current()
+        assert len(_chrome_events(trace_file)) == 1
+        with tracing.span("analysis.job", parent=parent):
+            with tracing.span("store.get"):
+                pass
+        events = _chrome_events(trace_file)
+        assert [e["name"] for e in events] == ["POST /graphql", "store.get", "analysis.job"]
+        assert events[2]["args"]["parent_id"] == root.span_id
+
+    def test_traced_records_errors(self, trace_file):
+        """traced() spans record the first argument and the exception leaving the call."""
+        @tracing.traced("couchbase.get_document", tracing.CLIENT, "db.key")
+        def get_document(doc_id):
+            raise KeyError(doc_id)
+
+        with tracing.tracer.start("GET /"):
+            with pytest.raises(KeyError):
+                get_document("user::1")
+        event = _chrome_events(trace_file)[0]
+        assert event["args"]["db.key"] == "user::1"
+        assert event["args"]["error"] == "KeyError: 'user::1'"
+
+
+class TestExport:
+    """Test the trace file formats."""
+
+    def test_otlp_json_lines(self, tmp_path, monkeypatch):
+        """OTLP output is one ExportTraceServiceRequest per trace, with parent links and kinds."""
+        path = tmp_path / "trace.jsonl"
+        monkeypatch.setattr(tracing, "tracer", tracing.Tracer(str(path), 1.0, "otlp"))
+        root = tracing.tracer.start("GET /", **{"http.status_code": 200})
+        with root:
+            with tracing.span("couchbase.get_document", tracing.CLIENT):
+                pass
+        tracing.tracer.close()
+        lines = path.read_text().splitlines()
+        assert len(lines) == 1
+        spans = json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        child, parent = spans
+        assert child["parentSpanId"] == parent["spanId"] == root.span_id
+        assert child["kind"] == tracing.CLIENT and parent["kind"] == tracing.SERVER
+        assert "parentSpanId" not in parent
+        assert parent["attributes"] == [{"key": "http.status_code", "value": {"intValue": "200"}}]
+        assert int(parent["endTimeUnixNano"]) >= int(child["endTimeUnixNano"])
+
+
+class TestEndToEnd:
+    """Test a traced GraphQL request through the app."""
+
+    @pytest.fixture(autouse=True)
+    def clear_stores(self):
+        """Start from empty stores."""
+        for s in [store._users, store._uploads, store._analyses]:
+            s.clear()
+        yield
+        for s in [store._users, store._uploads, store._analyses]:
+            s.clear()
+
+    def test_request_to_store_spans(self, trace_file):
+        """An HTTP request's spans nest request -> operation -> resolver -> store op."""
+        client = TestClient(app)
+        response = client.post(
+            "/graphql",
+            json={"query": 'mutation Add { createUpload(input: {files: [{name: "a.txt", size: 1}]}) { id } }'},
+            headers={"traceparent": TRACEPARENT},
+        )
+        assert response.status_code == 200
+        assert response.headers["traceparent"].startswith("00-0af7651916cd43dd8448eb211c80319c-")
+
+        events = {e["name"]: e for e in _chrome_events(trace_file)}
+        root = events["POST /graphql/"]  # after the mount's redirect from /graphql
+        operation = events["graphql mutation Add"]
+        resolver = events["graphql.resolve Mutation.createUpload"]
+        put = events["store.put"]
+        assert root["args"]["parent_id"] == "b7ad6b7169203331"
+        assert root["args"]["http.status_code"] == 200
+        assert operation["args"]["parent_id"] == root["args"]["span_id"]
+        assert resolver["args"]["parent_id"] == operation["args"]["span_id"]
+        assert put["args"]["parent_id"] == resolver["args"]["span_id"]
+        assert put["args"]["backend"] == "memory" and put["args"]["doc_type"] == "upload"
+        assert "graphql.resolve Upload.id" not in events  # plain document fields are not traced
+
+    @pytest.mark.asyncio
+    async def test_job_spans_follow_the_request(self, trace_file, monkeypatch):
+        """A job submitted in a traced request records its store ops and checks, down to fixture loading."""
+        monkeypatch.setattr(analysis_engine, "processes", 0)
+        await store.save_upload("upload::1", {
+            "id": "upload::1", "status": "pending", "analysis_id": "analysis::1",
+            "files": [{"id": "file::1", "name": "a.txt", "size": 1}],
+            "settings": {"fact_check": True, "logical_fallacy_check": False, "ai_generation_check": False},
+        })
+        await store.save_analysis("analysis::1", new_analysis_doc("analysis::1", "upload::1"))
+        queue = AnalysisJobQueue(workers=1)
+        with tracing.tracer.start("POST /graphql/") as root:
+            queue.submit("analysis::1", "upload::1")
+        await queue.join()
+        await queue.stop()
+
+        events = _chrome_events(trace_file)
+        by_id = {e["args"]["span_id"]: e["name"] for e in events}
+        parents = {e["name"]: by_id.get(e["args"]["parent_id"]) for e in events}
+        assert parents["analysis.job"] == "POST /graphql/"
+        assert parents["engine.check"] == "analysis.job"
+        assert parents["fixtures.load_analysis"] == "engine.check"
+        assert all(e["args"]["trace_id"] == root.trace_id for e in events)
+
+    def test_unsampled_request_writes_nothing(self, tmp_path, monkeypatch):
+        """Requests that are not sampled produce no spans and no traceparent header."""
+        path = tmp_path / "trace.json"
+        monkeypatch.setattr(tracing, "tracer", tracing.Tracer(str(path), 0.0))
+        response = TestClient(app).get("/")
+        assert response.status_code == 200
+        assert "traceparent" not in response.headers
+        assert not path.exists()
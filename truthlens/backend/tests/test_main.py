@@ -24,3 +24,26 @@ class TestHealth:
         assert response.status_code == 200
         # Just verify that the response is valid
         assert "message" in response.json()
+
+    def test_health_reports_storage(self):
+        """GET /api/health reports the backend, breaker state and cache stats."""
+        response = client.get("/api/health")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["backend"] == "memory"
+        assert data["couchbase"]["state"] == "closed"
+        assert "retries_total" in data["couchbase"]
+
+
+class TestMetrics:
+    """Test the Prometheus metrics endpoint."""
+
+    def test_metrics_endpoint(self):
+        """GET /metrics serves resolver, store and queue metrics as Prometheus text."""
+        client.post("/graphql", json={"query": '{ user(id: "user::missing") { id } }'})
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'truthlens_graphql_resolver_seconds_count{field="Query.user"}' in response.text
+        assert 'truthlens_store_op_seconds_count{backend="memory",op="get",doc_type="user"}' in response.text
+        assert "truthlens_analysis_queue_depth 0" in response.text
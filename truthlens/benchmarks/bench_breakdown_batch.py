@@ -0,0 +1,65 @@
+"""Scalar compute_breakdown loop vs the batch breakdown functions.
+
+Generates synthetic analyses (fact checks, fallacies, AI check) and times
+rescoring all of them with the scalar function in a loop versus one
+compute_breakdowns_batch call on the documents, verifying the results are
+identical. Also times compute_breakdown_columns, the vectorized pass, on
+pre-extracted score lists. Try --analyses 2000 --fact-checks 2000 for a
+few long analyses instead of many short ones.
+
+Usage (from the truthlens directory):
+    python -m benchmarks.bench_breakdown_batch [--analyses 50000] [--fact-checks 20]
+"""
+import argparse
+import random
+import time
+
+from backend.logic.analysis import compute_breakdown, compute_breakdown_columns, compute_breakdowns_batch
+
+
+def _make_analyses(count: int, fact_checks: int, fallacies: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return [
+        {
+            "fact_checks": [{"score": rng.random()} for _ in range(rng.randint(0, fact_checks))],
+            "fallacies": [{"severity": rng.random()} for _ in range(rng.randint(0, fallacies))],
+            "ai_check": {"score": rng.random()} if rng.random() < 0.8 else None,
+        }
+        for _ in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--analyses", type=int, default=50000)
+    parser.add_argument("--fact-checks", type=int, default=20)
+    parser.add_argument("--fallacies", type=int, default=5)
+    args = parser.parse_args()
+
+    analyses = _make_analyses(args.analyses, args.fact_checks, args.fallacies)
+
+    start = time.perf_counter()
+    scalar = [compute_breakdown(a["fact_checks"], a["fallacies"], a["ai_check"]) for a in analyses]
+    scalar_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = compute_breakdowns_batch(analyses)
+    batch_s = time.perf_counter() - start
+
+    assert batch == scalar, "batch results differ from compute_breakdown"
+
+    fact_scores = [[fc["score"] for fc in a["fact_checks"]] for a in analyses]
+    severities = [[f["severity"] for f in a["fallacies"]] for a in analyses]
+    ai_scores = [a["ai_check"]["score"] if a["ai_check"] else None for a in analyses]
+    start = time.perf_counter()
+    compute_breakdown_columns(fact_scores, severities, ai_scores)
+    columns_s = time.perf_counter() - start
+
+    print(f"{args.analyses} analyses, up to {args.fact_checks} fact checks / {args.fallacies} fallacies each")
+    print(f"  scalar  {scalar_s * 1000:9.1f} ms")
+    print(f"  batch   {batch_s * 1000:9.1f} ms  ({scalar_s / batch_s:.1f}x)")
+    print(f"  columns {columns_s * 1000:9.1f} ms  ({scalar_s / columns_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""start_analysis latency with and without the fixture cache.
+
+Runs Mutation.start_analysis against the in-memory store, waits for the
+background job to finish, and reports the mean/median per-analysis latency
+when the fixture is re-read from disk on every call (cache cleared before
+each call) versus served from the cache.
+
+Usage (from the truthlens directory):
+    python -m benchmarks.bench_fixture_loading [--iterations 2000]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from backend.graphql.graphql_resolvers import Mutation
+from backend.logic import store
+from backend.logic.jobs import analysis_jobs
+from backend.logic.fixtures import clear_fixture_cache
+
+UPLOAD_ID = "upload::bench"
+
+
+async def _measure(iterations: int, cached: bool) -> list:
+    mutation = Mutation()
+    timings = []
+    clear_fixture_cache()
+    for _ in range(iterations):
+        if not cached:
+            clear_fixture_cache()
+        start = time.perf_counter()
+        await mutation.start_analysis(UPLOAD_ID)
+        await analysis_jobs.join()
+        timings.append(time.perf_counter() - start)
+        store._analyses.clear()
+    await analysis_jobs.stop()
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    store._uploads[UPLOAD_ID] = {
+        "id": UPLOAD_ID, "user_id": None, "created_at": "2026-01-01T00:00:00Z",
+        "status": "pending", "files": [], "analysis_id": None,
+        "settings": {"fact_check": True, "logical_fallacy_check": True, "ai_generation_check": True},
+    }
+    print(f"start_analysis, {args.iterations} calls, in-memory store")
+    for label, cached in (("uncached", False), ("cached", True)):
+        timings = asyncio.run(_measure(args.iterations, cached))
+        print(f"  {label:<9} mean {statistics.mean(timings) * 1e6:8.1f} us"
+              f"  median {statistics.median(timings) * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
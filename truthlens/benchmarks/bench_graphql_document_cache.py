@@ -0,0 +1,111 @@
+"""Parse and validation time saved by the GraphQL document cache and persisted queries.
+
+Executes the same large query (a frontend-style upload + analysis query with
+fragments, about 2 KB) --requests times through three schemas:
+
+- no cache:   the schema without the PersistedQueries/DocumentCache
+              extensions; every request parses and validates the query
+- cache:      the application schema; the first request fills the document
+              cache and every later one skips parsing and validation
+- APQ:        as "cache", but requests carry only the query's SHA-256 hash
+
+The queried upload does not exist, so execution is trivial and the times
+are dominated by parsing and validation. Bytes per request compare the
+JSON bodies a client would upload.
+
+Usage (from the truthlens directory):
+    python -m benchmarks.bench_graphql_document_cache [--requests 2000]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import strawberry
+from strawberry.schema.config import StrawberryConfig
+
+from backend.graphql import graphql_documents
+from backend.graphql.graphql_documents import query_hash
+from backend.graphql.graphql_resolvers import Mutation, Query, Subscription
+from backend.graphql.graphql_schema import schema
+from backend.graphql.graphql_types import doc_field
+
+QUERY = """
+query UploadDetails($id: ID!) {
+  upload(id: $id) {
+    ...UploadFields
+    files { ...FileFields user { ...UserFields } }
+    analysis { ...AnalysisFields }
+  }
+}
+
+fragment UserFields on User { id accountId name email walletAddress createdAt }
+
+fragment FileFields on FileRef { id userId name contentType size storageUrl }
+
+fragment UploadFields on Upload {
+  id userId createdAt status analysisId
+  settings { factCheck logicalFallacyCheck aiGenerationCheck }
+}
+
+fragment SourceFields on Source { title url score }
+
+fragment AnalysisFields on Analysis {
+  id uploadId status startedAt finishedAt error
+  summary { factChecks fallacies aiScore }
+  breakdown { factCheckScore logicalFallacyScore aiGenerationScore overallCredibilityScore }
+  factChecks {
+    id statement score
+    sourcesFor { ...SourceFields }
+    sourcesAgainst { ...SourceFields }
+  }
+  fallacies { id name statement contextExcerpt position severity }
+  aiCheck { id isAi score explanation }
+}
+"""
+
+_VARIABLES = {"id": "upload::missing"}
+
+
+async def _run(label: str, target: strawberry.Schema, requests: int, query, extensions, baseline=None) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        result = await target.execute(query, variable_values=_VARIABLES, operation_extensions=extensions)
+        assert result.errors is None, result.errors
+    elapsed = time.perf_counter() - start
+    body = len(json.dumps({"query": query, "variables": _VARIABLES, "extensions": extensions}).encode())
+    speedup = f"  {baseline / elapsed:5.1f}x" if baseline else ""
+    print(f"  {label:<9} {elapsed / requests * 1e6:8.0f} µs/request  {body:5d} B/request{speedup}")
+    return elapsed
+
+
+async def _main(args: argparse.Namespace) -> None:
+    uncached = strawberry.Schema(
+        query=Query,
+        mutation=Mutation,
+        subscription=Subscription,
+        config=StrawberryConfig(default_resolver=doc_field),
+    )
+    persisted = {"persistedQuery": {"version": 1, "sha256Hash": query_hash(QUERY)}}
+    print(f"{args.requests} requests of a {len(QUERY)} byte query:")
+
+    baseline = await _run("no cache", uncached, args.requests, QUERY, None)
+    graphql_documents.clear()
+    await _run("cache", schema, args.requests, QUERY, None, baseline)
+    cache = graphql_documents.stats()["documents"]
+
+    graphql_documents.clear()
+    await schema.execute(QUERY, variable_values=_VARIABLES, operation_extensions=persisted)  # registers the hash
+    await _run("APQ", schema, args.requests, None, persisted, baseline)
+
+    print(f"  document cache hit rate {cache['hit_rate']:.4f} ({cache['hits']} hits, {cache['misses']} misses)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Warm-restart time of the in-memory backend from its snapshot and change log.
+
+Writes a snapshot of --docs uploads (spread over --users users) plus --tail
+log records made after it to a temporary directory, then measures:
+
+- restore:      MemoryBackend.attach_log(), i.e. what startup waits for:
+                map the snapshot, read its index columns, replay the log
+- first reads:  1000 random gets, each decoding its document from the mapping
+- lookup:       one page of 20 uploads per user
+- full decode:  a scan touching every document; roughly what a restore
+                that decoded everything eagerly would add to startup
+
+The snapshot file is freshly written, so it is served from the page cache
+as on a restart of the same host.
+
+Usage (from the truthlens directory):
+    python -m benchmarks.bench_memory_log_startup [--docs 1000000] [--users 1000] [--tail 10000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import tempfile
+import time
+
+from backend.logic.memory_log import DocumentLog
+from backend.logic.memory_store import LazyDoc
+from backend.logic.storage import MemoryBackend
+
+_TEMPLATE = (
+    '{"id":"upload::bench%08d","user_id":"user::bench%d","status":"ready",'
+    '"created_at":"2026-01-01T00:00:00Z","files":[{"id":"file::%d","name":"doc.txt","size":1024}],'
+    '"settings":{"fact_check":true,"logical_fallacy_check":true,"ai_generation_check":false},'
+    '"analysis_id":"analysis::bench%08d"}'
+)
+
+
+def _write(directory: str, docs: int, users: int, tail: int) -> None:
+    log = DocumentLog(directory)
+    log.load()
+    rows = []
+    for i in range(docs):
+        body = (_TEMPLATE % (i, i % users, i, i)).encode()
+        rows.append(("upload", f"upload::bench{i:08d}", LazyDoc(body, 0, len(body), f"user::bench{i % users}")))
+    log.write_snapshot(log.rotate(), rows, lambda doc_type, doc: doc.get("user_id"))
+    for i in range(tail):
+        log.put("upload", f"upload::tail{i:08d}", {"id": f"upload::tail{i:08d}", "user_id": f"user::bench{i % users}"})
+    log.close()
+
+
+def _size(directory: str) -> float:
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) / 1e6
+
+
+async def _main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        _write(directory, args.docs, args.users, args.tail)
+        print(f"{args.docs} uploads + {args.tail} log records over {args.users} users: "
+              f"{_size(directory):.0f} MB written in {time.perf_counter() - start:.1f} s")
+
+        backend = MemoryBackend(max_entries=0)
+        restored = await backend.attach_log(DocumentLog(directory))
+        print(f"  restore     {restored['seconds'] * 1000:9.1f} ms  "
+              f"({restored['snapshot']} from snapshot, {restored['replayed']} replayed)")
+
+        ids = [f"upload::bench{random.randrange(args.docs):08d}" for _ in range(1000)] if args.docs else []
+        start = time.perf_counter()
+        for doc_id in ids:
+            await backend.get("upload", doc_id)
+        elapsed = time.perf_counter() - start
+        print(f"  first reads {elapsed * 1000:9.1f} ms  {len(ids) / max(elapsed, 1e-9):11.0f} ops/s")
+
+        start = time.perf_counter()
+        for u in range(args.users):
+            await backend.lookup("uploads_by_user", f"user::bench{u}", 20, None)
+        print(f"  lookup      {(time.perf_counter() - start) * 1000:9.1f} ms  ({args.users} pages of 20)")
+
+        start = time.perf_counter()
+        async for _ in backend.scan("upload", 500):
+            pass
+        print(f"  full decode {(time.perf_counter() - start) * 1000:9.1f} ms")
+
+        await backend.close()
+        print(f"  peak RSS    {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:9.0f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tail", type=int, default=10_000, help="log records written after the snapshot")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Cost of recording metrics on the hot paths.
+
+Measures:
+
+- observe:      Histogram.observe() on a child looked up once
+- labels+obs:   labels(...).observe(), as store.py records every operation
+- scrape:       rendering /metrics with --series label combinations
+- graphql:      a query resolving --uploads uploads with their files, with
+                and without the ResolverMetrics extension
+
+Usage (from the truthlens directory):
+    python -m benchmarks.bench_metrics_overhead [--ops 1000000] [--series 200] [--uploads 50]
+"""
+import argparse
+import asyncio
+import time
+
+import strawberry
+from strawberry.schema.config import StrawberryConfig
+
+from backend.graphql.graphql_cost import QueryCost
+from backend.graphql.graphql_documents import DocumentCache, PersistedQueries
+from backend.graphql.graphql_resolvers import Mutation, Query, Subscription
+from backend.graphql.graphql_schema import schema
+from backend.graphql.graphql_types import doc_field
+from backend.logic import metrics, store
+
+QUERY = "query($u: ID!, $n: Int!) { uploadsByUser(userId: $u, first: $n) { items { id status files { name size } } } }"
+
+
+def _per_op(label: str, seconds: float, ops: int) -> None:
+    print(f"  {label:<12} {seconds / ops * 1e9:8.0f} ns/op")
+
+
+async def _graphql(target: strawberry.Schema, requests: int, uploads: int) -> float:
+    variables = {"u": "user::bench", "n": uploads}
+    start = time.perf_counter()
+    for _ in range(requests):
+        result = await target.execute(QUERY, variable_values=variables)
+        assert result.errors is None, result.errors
+    return (time.perf_counter() - start) / requests
+
+
+async def _main(args: argparse.Namespace) -> None:
+    family = metrics.Family("bench_seconds", "Benchmark", "histogram", ("backend", "op", "doc_type"),
+                            lambda: metrics.Histogram(metrics.LATENCY_BUCKETS))
+    child = family.labels("memory", "get", "upload")
+    start = time.perf_counter()
+    for _ in range(args.ops):
+        child.observe(0.0003)
+    _per_op("observe", time.perf_counter() - start, args.ops)
+
+    start = time.perf_counter()
+    for _ in range(args.ops):
+        family.labels("memory", "get", "upload").observe(0.0003)
+    _per_op("labels+obs", time.perf_counter() - start, args.ops)
+
+    for i in range(args.series):
+        family.labels("memory", f"op{i}", "upload").observe(0.001)
+    start = time.perf_counter()
+    text = metrics.render() + "\n".join(family.render())
+    print(f"  scrape       {(time.perf_counter() - start) * 1000:8.2f} ms  ({len(text) / 1000:.0f} kB)")
+
+    for i in range(args.uploads):
+        await store.save_upload(f"upload::bench{i}", {
+            "id": f"upload::bench{i}", "user_id": "user::bench", "status": "ready", "created_at": "",
+            "files": [{"id": f"file::{i}", "name": "doc.txt", "size": 1024}],
+            "settings": {"fact_check": True, "logical_fallacy_check": False, "ai_generation_check": False},
+            "analysis_id": None,
+        })
+    unmetered = strawberry.Schema(
+        query=Query, mutation=Mutation, subscription=Subscription,
+        config=StrawberryConfig(default_resolver=doc_field), extensions=[PersistedQueries, DocumentCache, QueryCost],
+    )
+    requests = 500
+    await _graphql(schema, 50, args.uploads)  # warm up both
+    await _graphql(unmetered, 50, args.uploads)
+    without = await _graphql(unmetered, requests, args.uploads)
+    with_metrics = await _graphql(schema, requests, args.uploads)
+    print(f"  graphql      {without * 1e6:8.0f} µs/request without ResolverMetrics, "
+          f"{with_metrics * 1e6:.0f} µs with it ({(with_metrics / without - 1) * 100:+.0f}%)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=1_000_000)
+    parser.add_argument("--series", type=int, default=200, help="extra label combinations present at scrape time")
+    parser.add_argument("--uploads", type=int, default=50)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Repeated list queries: ad-hoc N1QL vs registered prepared statements.
+
+Runs the uploadsByUser keyset query many times for different users, once as
+ad-hoc SQL with the values formatted into the text (how query_by_type used
+to build statements) and once through CouchbaseQuery.execute, which runs the
+registered parameterized statement with adhoc=False.
+
+By default a stand-in query service is used that charges --plan-ms for
+parsing and planning every statement text it has not prepared yet, plus
+--exec-ms for executing it; the numbers therefore show the shape of the win,
+not real cluster latencies. Pass --cluster to run against the Couchbase
+cluster configured in the environment (COUCHBASE_*) instead.
+
+Usage (from the truthlens directory):
+    python -m benchmarks.bench_prepared_statements [--queries 500] [--plan-ms 2] [--exec-ms 1] [--cluster]
+"""
+import argparse
+import time
+
+from backend.logic.couchbase_client import CouchbaseClient, CouchbaseQuery, statements
+from backend.logic.couchbase_config import CouchbaseConfig
+
+
+class _StandInCluster:
+    """Query service stand-in with a per-process prepared plan cache."""
+
+    def __init__(self, plan_s: float, exec_s: float):
+        self.plan_s = plan_s
+        self.exec_s = exec_s
+        self.prepared = set()
+        self.plans = 0
+
+    def query(self, sql, options=None, **kwargs):
+        adhoc = options["adhoc"] if options is not None and "adhoc" in options else True
+        if adhoc or sql not in self.prepared:
+            self.plans += 1
+            time.sleep(self.plan_s)
+            if not adhoc:
+                self.prepared.add(sql)
+        time.sleep(self.exec_s)
+        return self
+
+    def rows(self):
+        return iter(())
+
+
+def _adhoc(user_id: str, limit: int) -> None:
+    CouchbaseQuery.query(f"""
+        SELECT RAW d FROM {CouchbaseConfig.BUCKET_NAME} AS d
+        WHERE META(d).id LIKE 'upload::%' AND d.user_id = '{user_id}' AND META(d).id > ''
+        ORDER BY d.user_id, META(d).id
+        LIMIT {limit}
+        """)
+
+
+def _prepared(user_id: str, limit: int) -> None:
+    CouchbaseQuery.execute("uploads_by_user", [user_id, "", limit])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--plan-ms", type=float, default=2.0)
+    parser.add_argument("--exec-ms", type=float, default=1.0)
+    parser.add_argument("--cluster", action="store_true", help="use the configured Couchbase cluster")
+    args = parser.parse_args()
+
+    if args.cluster:
+        CouchbaseClient.connect()
+        target = "configured cluster"
+    else:
+        CouchbaseClient._cluster = _StandInCluster(args.plan_ms / 1000, args.exec_ms / 1000)
+        target = f"stand-in (plan {args.plan_ms} ms, exec {args.exec_ms} ms)"
+
+    print(f"{args.queries} uploadsByUser queries over {args.users} users, {target}")
+    try:
+        for label, run in (("ad-hoc", _adhoc), ("prepared", _prepared)):
+            start = time.perf_counter()
+            for i in range(args.queries):
+                run(f"user::{i % args.users}", 21)
+            elapsed = time.perf_counter() - start
+            plans = f"  plans {CouchbaseClient._cluster.plans}" if not args.cluster else ""
+            print(f"  {label:<9} {elapsed / args.queries * 1000:7.2f} ms/query{plans}")
+            if not args.cluster:
+                CouchbaseClient._cluster.plans = 0
+        print(f"  statement stats: {statements.stats()['uploads_by_user']}")
+    finally:
+        if args.cluster:
+            CouchbaseClient.disconnect()
+        else:
+            CouchbaseClient._cluster = None
+
+
+if __name__ == "__main__":
+    main()
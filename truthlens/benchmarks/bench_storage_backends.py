@@ -0,0 +1,126 @@
+"""Shared workload against every storage backend: memory, SQLite and Couchbase.
+
+Each backend gets the same sequence through the StorageBackend interface:
+
+- put:      --docs uploads saved one at a time
+- get:      every upload read back one at a time
+- get_many: the same reads in batches of 100
+- patch:    a status change on every upload
+- lookup:   every user's uploads, listed in pages of 20
+- scan:     every upload streamed in chunks of 500
+
+The memory and SQLite backends always run; SQLite writes to a temporary
+file (WAL mode, synchronous=NORMAL). Pass --cluster to add the Couchbase
+cluster configured in the environment (COUCHBASE_*); its documents are
+deleted afterwards.
+
+Usage (from the truthlens directory):
+    python -m benchmarks.bench_storage_backends [--docs 5000] [--users 50] [--cluster]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Callable, Awaitable, List
+
+from backend.logic.couchbase_client import AsyncCouchbaseClient
+from backend.logic.sqlite_backend import SQLiteBackend
+from backend.logic.storage import CouchbaseBackend, MemoryBackend, StorageBackend
+
+
+def _upload(i: int, users: int) -> dict:
+    return {
+        "id": f"upload::bench{i:08d}",
+        "user_id": f"user::bench{i % users}",
+        "status": "pending",
+        "created_at": "2026-01-01T00:00:00Z",
+        "files": [{"id": f"file::{i}", "name": "doc.txt", "size": 1024}],
+        "settings": {"fact_check": True, "logical_fallacy_check": True, "ai_generation_check": False},
+        "analysis_id": None,
+    }
+
+
+async def _timed(label: str, ops: int, run: Callable[[], Awaitable[None]]) -> None:
+    start = time.perf_counter()
+    await run()
+    elapsed = time.perf_counter() - start
+    print(f"    {label:<9} {elapsed * 1000:9.1f} ms  {ops / elapsed:11.0f} ops/s")
+
+
+async def _workload(backend: StorageBackend, docs: List[dict], users: int) -> None:
+    ids = [doc["id"] for doc in docs]
+
+    async def put():
+        for doc in docs:
+            await backend.put("upload", doc["id"], doc)
+
+    async def get():
+        for doc_id in ids:
+            await backend.get("upload", doc_id)
+
+    async def get_many():
+        for start in range(0, len(ids), 100):
+            await backend.get_many("upload", ids[start:start + 100])
+
+    async def patch():
+        for doc_id in ids:
+            await backend.patch("upload", doc_id, {"status": "ready"}, None)
+
+    async def lookup():
+        for u in range(users):
+            after = None
+            while True:
+                page, more = await backend.lookup("uploads_by_user", f"user::bench{u}", 20, after)
+                if not more:
+                    break
+                after = page[-1]["id"]
+
+    async def scan():
+        async for _ in backend.scan("upload", 500):
+            pass
+
+    await _timed("put", len(docs), put)
+    await _timed("get", len(docs), get)
+    await _timed("get_many", len(docs), get_many)
+    await _timed("patch", len(docs), patch)
+    await _timed("lookup", len(docs), lookup)
+    await _timed("scan", len(docs), scan)
+    await backend.delete_many("upload", ids)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    docs = [_upload(i, args.users) for i in range(args.docs)]
+    print(f"{args.docs} uploads over {args.users} users")
+
+    print("  memory")
+    await _workload(MemoryBackend(), docs, args.users)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        backend = SQLiteBackend(path)
+        print(f"  sqlite ({path})")
+        try:
+            await _workload(backend, docs, args.users)
+        finally:
+            await backend.close()
+
+    if args.cluster:
+        await AsyncCouchbaseClient.connect()
+        print("  couchbase (configured cluster)")
+        try:
+            await _workload(CouchbaseBackend(), docs, args.users)
+        finally:
+            await AsyncCouchbaseClient.disconnect()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--cluster", action="store_true", help="also run against the configured Couchbase cluster")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
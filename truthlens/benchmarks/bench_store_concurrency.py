@@ -0,0 +1,114 @@
+"""Concurrent request throughput on a single worker: blocking vs asyncio Couchbase.
+
+Simulates a Couchbase collection whose KV operations take a fixed latency and
+fires many concurrent `user` queries through the GraphQL schema on one event
+loop. Three modes are compared:
+
+- blocking: the pre-async code path, calling the sync SDK inline from the resolver
+- thread:   the sync SDK offloaded to worker threads (COUCHBASE_ASYNC=false)
+- async:    the acouchbase client awaited natively (COUCHBASE_ASYNC=true)
+
+Usage (from the truthlens directory):
+    python -m benchmarks.bench_store_concurrency [--requests 200] [--latency-ms 20]
+"""
+import argparse
+import asyncio
+import time
+
+from backend.graphql.graphql_schema import schema
+from backend.logic import store
+from backend.logic.couchbase_client import (
+    CouchbaseClient, CouchbaseQuery, AsyncCouchbaseClient
+)
+from backend.logic.storage import CouchbaseBackend
+
+
+class _Result:
+    def __init__(self, doc):
+        self.content_as = {dict: doc}
+
+
+class _BlockingCollection:
+    """Stand-in for couchbase.collection.Collection with fixed KV latency."""
+
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+
+    def get(self, doc_id):
+        time.sleep(self.latency_s)
+        return _Result({
+            "id": doc_id, "account_id": "acc", "name": "Bench",
+            "email": None, "wallet_address": None, "created_at": "2026-01-01T00:00:00Z",
+        })
+
+
+class _AsyncCollection(_BlockingCollection):
+    """Stand-in for acouchbase.collection.Collection with fixed KV latency."""
+
+    async def get(self, doc_id):
+        await asyncio.sleep(self.latency_s)
+        return _Result({
+            "id": doc_id, "account_id": "acc", "name": "Bench",
+            "email": None, "wallet_address": None, "created_at": "2026-01-01T00:00:00Z",
+        })
+
+
+class _Bucket:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def default_collection(self):
+        return self._collection
+
+
+QUERY = '{ user(id: "user::bench") { id name } }'
+
+
+async def _run(requests: int) -> float:
+    start = time.perf_counter()
+    results = await asyncio.gather(*(schema.execute(QUERY) for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    assert all(r.errors is None for r in results)
+    return elapsed
+
+
+async def _bench_mode(mode: str, requests: int, latency_s: float) -> float:
+    CouchbaseClient._cluster = CouchbaseClient._bucket = None
+    AsyncCouchbaseClient._cluster = AsyncCouchbaseClient._bucket = None
+    original_get_user = store.get_user
+
+    if mode == "async":
+        AsyncCouchbaseClient._cluster = object()
+        AsyncCouchbaseClient._bucket = _Bucket(_AsyncCollection(latency_s))
+    else:
+        CouchbaseClient._cluster = object()
+        CouchbaseClient._bucket = _Bucket(_BlockingCollection(latency_s))
+        if mode == "blocking":
+            async def blocking_get_user(user_id):
+                return CouchbaseQuery.get_document(user_id)
+            store.get_user = blocking_get_user
+
+    try:
+        return await _run(requests)
+    finally:
+        store.get_user = original_get_user
+        CouchbaseClient._cluster = CouchbaseClient._bucket = None
+        AsyncCouchbaseClient._cluster = AsyncCouchbaseClient._bucket = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    store.use_backend(CouchbaseBackend())
+    latency_s = args.latency_ms / 1000.0
+    print(f"{args.requests} concurrent requests, {args.latency_ms} ms per KV op, 1 worker")
+    for mode in ("blocking", "thread", "async"):
+        elapsed = asyncio.run(_bench_mode(mode, args.requests, latency_s))
+        print(f"  {mode:<9} {elapsed * 1000:9.1f} ms  {args.requests / elapsed:9.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Cost of tracing instrumentation, sampled and not.
+
+Measures:
+
+- unsampled:    the current() check store calls make outside a sampled request
+- noop span:    `with tracing.span(...)` outside a sampled request
+- span:         creating and ending a child span inside a sampled request
+- graphql:      a query resolving --uploads uploads with their files, outside a
+                trace and inside a sampled one (spans written to a temp file)
+
+Usage (from the truthlens directory):
+    python -m benchmarks.bench_tracing_overhead [--ops 1000000] [--uploads 50] [--format chrome]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from backend.graphql.graphql_schema import schema
+from backend.logic import store, tracing
+
+QUERY = "query($u: ID!, $n: Int!) { uploadsByUser(userId: $u, first: $n) { items { id status files { name size } } } }"
+
+
+def _per_op(label: str, seconds: float, ops: int) -> None:
+    print(f"  {label:<12} {seconds / ops * 1e9:8.0f} ns/op")
+
+
+async def _graphql(requests: int, uploads: int, sampled: bool) -> float:
+    variables = {"u": "user::bench", "n": uploads}
+    start = time.perf_counter()
+    for _ in range(requests):
+        root = tracing.tracer.start("POST /graphql") if sampled else None
+        with root or tracing.NOOP:
+            result = await schema.execute(QUERY, variable_values=variables)
+        assert result.errors is None, result.errors
+    return (time.perf_counter() - start) / requests
+
+
+async def _main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        tracing.tracer = tracing.Tracer(os.path.join(tmp, "trace.json"), 1.0, args.format)
+
+        start = time.perf_counter()
+        for _ in range(args.ops):
+            if tracing.current() is not None:
+                raise AssertionError("not sampled")
+        _per_op("unsampled", time.perf_counter() - start, args.ops)
+
+        start = time.perf_counter()
+        for _ in range(args.ops):
+            with tracing.span("store.get", backend="memory", doc_type="upload"):
+                pass
+        _per_op("noop span", time.perf_counter() - start, args.ops)
+
+        ops = args.ops // 10
+        with tracing.tracer.start("bench"):
+            start = time.perf_counter()
+            for _ in range(ops):
+                with tracing.span("store.get", backend="memory", doc_type="upload"):
+                    pass
+            _per_op("span", time.perf_counter() - start, ops)
+
+        for i in range(args.uploads):
+            await store.save_upload(f"upload::bench{i}", {
+                "id": f"upload::bench{i}", "user_id": "user::bench", "status": "ready", "created_at": "",
+                "files": [{"id": f"file::{i}", "name": "doc.txt", "size": 1024}],
+                "settings": {"fact_check": True, "logical_fallacy_check": False, "ai_generation_check": False},
+                "analysis_id": None,
+            })
+        requests = 500
+        await _graphql(50, args.uploads, False)  # warm up both
+        await _graphql(50, args.uploads, True)
+        untraced = await _graphql(requests, args.uploads, False)
+        exported = tracing.tracer.spans_exported
+        traced = await _graphql(requests, args.uploads, True)
+        spans = (tracing.tracer.spans_exported - exported) / requests
+        print(f"  graphql      {untraced * 1e6:8.0f} µs/request not sampled, "
+              f"{traced * 1e6:.0f} µs sampled ({(traced / untraced - 1) * 100:+.0f}%, {spans:.0f} spans each)")
+        tracing.tracer.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=1_000_000)
+    parser.add_argument("--uploads", type=int, default=50)
+    parser.add_argument("--format", choices=("chrome", "otlp"), default="chrome")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()